@@ -0,0 +1,68 @@
+""" Micro-benchmark comparing the previous BSON -> JSON string round-trip in MongoDB._convert_bson_to_json against
+the direct type-mapping conversion. Runs entirely offline against synthetic appointment documents.
+
+    python3 -m benchmarks.bson_conversion [document_count]
+"""
+import json
+import sys
+import time
+import uuid
+
+from bson import ObjectId
+from bson.json_util import dumps as bson_dumps
+
+from src.db.mongo import MongoDB
+from constants import BSON_OBJECT_ID
+
+DEFAULT_DOCUMENT_COUNT = 100_000
+
+
+def build_documents(count):
+    """Build appointment documents shaped like those returned by pymongo (including an ObjectId _id)."""
+    return [
+        {
+            BSON_OBJECT_ID: ObjectId(),
+            'patient': '1953262716',
+            'status': 'active',
+            'time': '2025-06-04T16:30:00+01:00',
+            'duration': '1h',
+            'clinician': 'Bethany Rice-Hammond',
+            'department': 'oncology',
+            'postcode': 'IM2N 4LG',
+            'id': str(uuid.UUID(int=index)),
+        }
+        for index in range(count)
+    ]
+
+
+def convert_with_string_round_trip(bson_data):
+    """The conversion previously used by MongoDB._convert_bson_to_json."""
+    json_data = json.loads(bson_dumps(bson_data))
+    if BSON_OBJECT_ID in json_data:
+        del json_data[BSON_OBJECT_ID]
+    return json_data
+
+
+def time_conversion(convert, documents):
+    """Return the wall-clock seconds taken to convert every document."""
+    start = time.perf_counter()
+    for document in documents:
+        convert(document)
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DOCUMENT_COUNT
+    documents = build_documents(count)
+
+    old_seconds = time_conversion(convert_with_string_round_trip, documents)
+    new_seconds = time_conversion(MongoDB._convert_bson_to_json, documents)
+
+    print(f'documents:               {count}')
+    print(f'bson_dumps + json.loads: {old_seconds:.3f}s ({count / old_seconds:,.0f} docs/s)')
+    print(f'direct type mapping:     {new_seconds:.3f}s ({count / new_seconds:,.0f} docs/s)')
+    print(f'speed-up:                {old_seconds / new_seconds:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+""" Benchmark of free slot searches against the in-memory repository backend, comparing the indexed search with reading
+every appointment and filtering them, as clients did before. Runs entirely offline against synthetic appointments.
+
+    python3 -m benchmarks.free_slots [appointment_count]
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from src.db.memory import MemoryDatabase
+from src.db.synthetic import generate_appointments, DEPARTMENTS
+from src.repository.appointment_storage import parse_time, parse_duration
+from src.repository.memory.appointment import MemoryAppointmentRepository
+from src.repository.memory.patient import MemoryPatientRepository
+from src.service.appointment_service import AppointmentService
+from src.service.slots import free_slots
+from constants import (
+    DEFAULT_SYNTHETIC_SEED,
+    APPOINTMENT_FIELD_DEPARTMENT,
+    APPOINTMENT_FIELD_STATUS,
+    APPOINTMENT_FIELD_TIME,
+    APPOINTMENT_FIELD_DURATION,
+    STATUS_CANCELLED,
+)
+
+DEFAULT_APPOINTMENT_COUNT = 300_000
+APPOINTMENTS_PER_PATIENT = 3
+# Month-long windows over the years the synthetic appointments cover
+WINDOW_STARTS = [datetime(year, month, 1, tzinfo=timezone.utc) for year in (2019, 2022) for month in range(1, 13)]
+WINDOW = timedelta(days=31)
+SLOT_DURATION = '30m'
+SLOT_LIMIT = '100'
+
+
+def previous_find_free_slots(appointments, department, start, end):
+    """Filter every appointment for the department's busy times in the window, then sweep them."""
+    busy_times = []
+    for appointment in appointments:
+        if appointment[APPOINTMENT_FIELD_DEPARTMENT] != department or \
+                appointment[APPOINTMENT_FIELD_STATUS] == STATUS_CANCELLED:
+            continue
+        busy_start = parse_time(appointment[APPOINTMENT_FIELD_TIME])
+        busy_end = busy_start + parse_duration(appointment[APPOINTMENT_FIELD_DURATION])
+        if busy_start < end and busy_end > start:
+            busy_times.append((busy_start, busy_end))
+    busy_times.sort()
+    return free_slots(busy_times, start, end, parse_duration(SLOT_DURATION), int(SLOT_LIMIT))
+
+
+async def run(count):
+    repository = MemoryAppointmentRepository(MemoryDatabase())
+    await repository.upsert_many(list(generate_appointments(count // APPOINTMENTS_PER_PATIENT, APPOINTMENTS_PER_PATIENT,
+                                                            DEFAULT_SYNTHETIC_SEED)))
+    service = AppointmentService(repository, MemoryPatientRepository(MemoryDatabase()))
+    searches = [(department, start) for department in DEPARTMENTS for start in WINDOW_STARTS]
+
+    start_time = time.perf_counter()
+    for department, start in searches:
+        await service.find_free_slots(
+            department=department, time_from=start.isoformat(), time_to=(start + WINDOW).isoformat(),
+            duration=SLOT_DURATION, limit=SLOT_LIMIT
+        )
+    indexed_seconds = time.perf_counter() - start_time
+
+    # Reading every appointment is slow enough that one search per department is plenty
+    previous_searches = [(department, WINDOW_STARTS[0]) for department in DEPARTMENTS]
+    start_time = time.perf_counter()
+    for department, start in previous_searches:
+        previous_find_free_slots(await repository.get_all(), department, start, start + WINDOW)
+    previous_seconds = time.perf_counter() - start_time
+
+    print(f'appointments: {len(repository.collection)}')
+    print(f'  read every appointment: {previous_seconds / len(previous_searches) * 1000:.1f}ms per search')
+    print(f'  indexed search:         {indexed_seconds / len(searches) * 1000:.2f}ms per search')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_APPOINTMENT_COUNT
+    asyncio.run(run(count))
+
+
+if __name__ == '__main__':
+    main()
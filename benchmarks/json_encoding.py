@@ -0,0 +1,58 @@
+""" Micro-benchmark of response serialization: Tornado's own write(dict) encoding against the standard library and
+orjson encoders BaseHandler can use, for a page of appointments encoded as one document and for the same appointments
+encoded one document at a time, as stream_collection does. Runs entirely offline against synthetic appointments.
+
+    python3 -m benchmarks.json_encoding [appointment_count] [repeats]
+"""
+import sys
+import time
+
+from tornado.escape import json_encode, utf8
+
+from src.api.json_encoding import encode_with_orjson, encode_with_stdlib, orjson
+from src.db.synthetic import generate_appointments
+from constants import DEFAULT_SYNTHETIC_SEED, PANDA_RESPONSE_FIELD_APPOINTMENTS
+
+DEFAULT_APPOINTMENT_COUNT = 10_000
+DEFAULT_REPEATS = 20
+
+
+def encode_with_tornado(value):
+    """The encoding RequestHandler.write applies to a dict."""
+    return utf8(json_encode(value))
+
+
+def time_encoding(encode, values, repeats):
+    """Return the fastest wall-clock seconds taken, over repeats runs, to encode every value."""
+    fastest = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for value in values:
+            encode(value)
+        fastest = min(fastest, time.perf_counter() - start)
+    return fastest
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_APPOINTMENT_COUNT
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_REPEATS
+    appointments = list(generate_appointments(count, 1, DEFAULT_SYNTHETIC_SEED))
+    page = {PANDA_RESPONSE_FIELD_APPOINTMENTS: appointments}
+
+    encoders = [('tornado write(dict)', encode_with_tornado), ('stdlib', encode_with_stdlib)]
+    if orjson is not None:
+        encoders.append(('orjson', encode_with_orjson))
+
+    print(f'appointments: {count}, fastest of {repeats} runs')
+    baseline = None
+    for name, encode in encoders:
+        page_seconds = time_encoding(encode, [page], repeats)
+        document_seconds = time_encoding(encode, appointments, repeats)
+        baseline = baseline or (page_seconds, document_seconds)
+        print(f'{name:<20} one document {page_seconds * 1000:7.2f}ms ({baseline[0] / page_seconds:4.1f}x), '
+              f'per document {document_seconds * 1000:7.2f}ms ({baseline[1] / document_seconds:4.1f}x), '
+              f'{len(encode(page)):,} bytes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+""" Benchmark of the patient service layer against the in-memory repository backend, so the cost of the services and
+validation is measured without any database round-trips. Runs entirely offline against synthetic patients.
+
+    python3 -m benchmarks.service_layer [patient_count]
+"""
+import asyncio
+import sys
+import time
+
+from src.db.memory import MemoryDatabase
+from src.db.synthetic import generate_patients
+from src.repository.memory.patient import MemoryPatientRepository
+from src.service.patient_service import PatientService
+from constants import DEFAULT_SYNTHETIC_SEED, MAX_PAGE_LIMIT, PATIENT_FIELD_NHS_NUMBER
+
+DEFAULT_PATIENT_COUNT = 100_000
+
+
+async def time_operation(operation, arguments):
+    """Return the wall-clock seconds taken to await operation once for each set of arguments."""
+    start = time.perf_counter()
+    for argument in arguments:
+        await operation(*argument)
+    return time.perf_counter() - start
+
+
+async def run(count):
+    patients = list(generate_patients(count, DEFAULT_SYNTHETIC_SEED))
+    service = PatientService(MemoryPatientRepository(MemoryDatabase()))
+    nhs_numbers = [patient[PATIENT_FIELD_NHS_NUMBER] for patient in patients]
+
+    results = [
+        ('create_patient', count, await time_operation(
+            service.create_patient,
+            [(patient, patient[PATIENT_FIELD_NHS_NUMBER]) for patient in patients]
+        )),
+        ('get_patient', count, await time_operation(service.get_patient, [(nhs_number,) for nhs_number in nhs_numbers])),
+    ]
+
+    pages = 0
+    start = time.perf_counter()
+    response = await service.get_patients_page(MAX_PAGE_LIMIT)
+    while response.next_cursor:
+        pages += 1
+        response = await service.get_patients_page(MAX_PAGE_LIMIT, response.next_cursor)
+    results.append((f'get_patients_page ({MAX_PAGE_LIMIT})', pages + 1, time.perf_counter() - start))
+
+    print(f'patients: {count}')
+    for name, operations, seconds in results:
+        print(f'{name:<26} {seconds:.3f}s ({operations / seconds:,.0f} ops/s)')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PATIENT_COUNT
+    asyncio.run(run(count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+""" Micro-benchmark comparing the previous per-call patient and appointment validation against the compiled validators
+and their validate_many batch entry point. Runs entirely offline against synthetic records.
+
+    python3 -m benchmarks.validation [record_count]
+"""
+import re
+import sys
+import time
+from datetime import datetime
+from uuid import UUID
+
+from src.db.synthetic import generate_patients, generate_appointments
+from src.service import patient_validation, appointment_validation
+from constants import (
+    DEFAULT_SYNTHETIC_SEED,
+    NHS_NUMBER_REGEX,
+    DURATION_REGEX,
+    DATE_FORMAT,
+    UK_POSTCODE_VALIDATION_REGEX,
+    STATUS_ACTIVE,
+    STATUS_ATTENDED,
+    STATUS_CANCELLED,
+    STATUS_MISSED,
+)
+
+DEFAULT_RECORD_COUNT = 100_000
+APPOINTMENTS_PER_PATIENT = 3
+REPEATS = 3
+
+
+# The previous implementation, as it was in validation_utils, patient_validation and appointment_validation, without
+# the print of each invalid record
+
+
+def previous_check_required_fields(data, required_fields):
+    errors = []
+    for field in required_fields:
+        if not data.get(field):
+            errors.append(f'Missing required field: {field}')
+    return errors
+
+
+def previous_check_regex(value, regex, error_msg):
+    if not re.fullmatch(regex, str(value)):
+        return [error_msg]
+    return []
+
+
+def previous_check_min_length(value, min_length, error_msg):
+    if not isinstance(value, str) or len(value) < min_length:
+        return [error_msg]
+    return []
+
+
+def previous_check_date_format(value, date_format, error_msg, future_error_msg=None):
+    try:
+        dob = datetime.strptime(value, date_format).date()
+        if future_error_msg and dob > datetime.today().date():
+            return [future_error_msg]
+        return []
+    except (ValueError, TypeError):
+        return [error_msg]
+
+
+def previous_nhs_number_checksum(nhs_number):
+    if not isinstance(nhs_number, str) or len(nhs_number) != 10 or not nhs_number.isdigit():
+        return False
+    multiplications = []
+    for digit, weight in zip(nhs_number[:9], [10, 9, 8, 7, 6, 5, 4, 3, 2]):
+        multiplications.append(int(digit) * weight)
+    calculated_check_digit = 11 - sum(multiplications) % 11
+    if calculated_check_digit == 11:
+        calculated_check_digit = 0
+    elif calculated_check_digit == 10:
+        return False
+    return calculated_check_digit == int(nhs_number[9])
+
+
+def previous_validate_patient(patient):
+    errors = []
+    required_fields = ['nhs_number', 'name', 'date_of_birth', 'postcode']
+    errors += previous_check_required_fields(patient, required_fields)
+    if errors:
+        return errors
+    nhs_number = patient.get('nhs_number', '')
+    if not re.match(NHS_NUMBER_REGEX, nhs_number):
+        errors.append('nhs_number')
+    elif not previous_nhs_number_checksum(nhs_number):
+        errors.append('nhs_number checksum')
+    errors += previous_check_min_length(patient['name'], 3, 'name')
+    errors += previous_check_date_format(patient['date_of_birth'], DATE_FORMAT, 'date_of_birth', 'future')
+    if not isinstance(patient['postcode'], str) or \
+            not re.match(UK_POSTCODE_VALIDATION_REGEX, patient['postcode'].strip(), re.IGNORECASE):
+        errors.append('postcode')
+    return errors
+
+
+def previous_validate_appointment(appointment):
+    errors = []
+    required_fields = ['patient', 'status', 'time', 'duration', 'clinician', 'department', 'postcode', 'id']
+    errors += previous_check_required_fields(appointment, required_fields)
+    if errors:
+        return errors
+    try:
+        UUID(appointment['id'])
+    except ValueError:
+        errors.append('id')
+    try:
+        datetime.fromisoformat(appointment['time'])
+    except ValueError:
+        errors.append('time')
+    errors += previous_check_regex(appointment['duration'], DURATION_REGEX, 'duration')
+    if appointment['status'] not in [STATUS_ACTIVE, STATUS_ATTENDED, STATUS_CANCELLED, STATUS_MISSED]:
+        errors.append('status')
+    if not re.match(NHS_NUMBER_REGEX, appointment['patient']):
+        errors.append('patient')
+    elif not previous_nhs_number_checksum(appointment['patient']):
+        errors.append('patient checksum')
+    errors += previous_check_min_length(appointment['clinician'], 3, 'clinician')
+    if not re.match(UK_POSTCODE_VALIDATION_REGEX, appointment['postcode'], re.IGNORECASE):
+        errors.append('postcode')
+    if not isinstance(appointment['department'], str) or not appointment['department']:
+        errors.append('department')
+    return errors
+
+
+def time_per_record(validate, records):
+    """Return the best wall-clock seconds taken to validate every record with one call each."""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for record in records:
+            validate(record)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def time_batch(validate_many, records):
+    """Return the best wall-clock seconds taken to validate every record in one call."""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        validate_many(records)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RECORD_COUNT
+    datasets = [
+        ('patients', list(generate_patients(count, DEFAULT_SYNTHETIC_SEED)),
+         previous_validate_patient, patient_validation),
+        ('appointments', list(generate_appointments(count // APPOINTMENTS_PER_PATIENT, APPOINTMENTS_PER_PATIENT,
+                                                    DEFAULT_SYNTHETIC_SEED)),
+         previous_validate_appointment, appointment_validation),
+    ]
+
+    for name, records, previous_validate, validation in datasets:
+        previous_seconds = time_per_record(previous_validate, records)
+        compiled_seconds = time_per_record(validation.validate, records)
+        batch_seconds = time_batch(validation.validate_many, records)
+        print(f'{name}: {len(records)}')
+        print(f'  previous validate: {previous_seconds:.3f}s ({len(records) / previous_seconds:,.0f} records/s)')
+        print(f'  compiled validate: {compiled_seconds:.3f}s ({len(records) / compiled_seconds:,.0f} records/s)')
+        print(f'  validate_many:     {batch_seconds:.3f}s ({len(records) / batch_seconds:,.0f} records/s)')
+        print(f'  speed-up:          {previous_seconds / batch_seconds:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
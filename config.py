@@ -1,7 +1,48 @@
 """ This module constitutes as the single point of configuration for the application and pulls
 # the necessary environment variables required to run the application. Such as secrets. """
 import os
+import socket
 
 PORT = int(os.environ.get('PORT', '8888'))
 MONGODB_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
-HOST = os.environ.get('HOST', '0.0.0.0')
\ No newline at end of file
+HOST = os.environ.get('HOST', '0.0.0.0')
+
+# Number of API worker processes forked to share the listening socket, 0 for one per CPU core. Only the mongo backend
+# can run more than one
+WORKER_PROCESSES = int(os.environ.get('WORKER_PROCESSES', '1'))
+# Total number of times workers that die are restarted before the server gives up
+WORKER_MAX_RESTARTS = int(os.environ.get('WORKER_MAX_RESTARTS', '100'))
+
+# Encoder responses are serialized with, 'orjson' or 'stdlib'. orjson falls back to stdlib when it is not installed
+JSON_ENCODER = os.environ.get('JSON_ENCODER', 'orjson')
+
+# Storage backend, 'mongo' or 'memory'. The in-memory backend needs no database server
+DATABASE_TYPE = os.environ.get('DATABASE_TYPE', 'mongo')
+# Optional file the in-memory backend loads at startup and periodically saves its data to
+MEMORY_SNAPSHOT_PATH = os.environ.get('MEMORY_SNAPSHOT_PATH', '')
+MEMORY_SNAPSHOT_INTERVAL_SECONDS = float(os.environ.get('MEMORY_SNAPSHOT_INTERVAL_SECONDS', '60'))
+
+# Read-through repository cache, per process
+CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'true').lower() == 'true'
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '10000'))
+CACHE_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', '30'))
+
+# In-process Bloom filter of patient NHS numbers, so checking an appointment's patient exists rarely needs a query
+PATIENT_FILTER_ENABLED = os.environ.get('PATIENT_FILTER_ENABLED', 'true').lower() == 'true'
+PATIENT_FILTER_CAPACITY = int(os.environ.get('PATIENT_FILTER_CAPACITY', '1000000'))
+PATIENT_FILTER_ERROR_RATE = float(os.environ.get('PATIENT_FILTER_ERROR_RATE', '0.001'))
+# Seconds between reloads of the filter, so patients deleted through other processes stop being taken to exist. 0 never
+PATIENT_FILTER_RELOAD_INTERVAL_SECONDS = float(os.environ.get('PATIENT_FILTER_RELOAD_INTERVAL_SECONDS', '300'))
+
+# Background job marking active appointments missed once they have ended
+MISSED_SWEEP_ENABLED = os.environ.get('MISSED_SWEEP_ENABLED', 'true').lower() == 'true'
+MISSED_SWEEP_INTERVAL_SECONDS = float(os.environ.get('MISSED_SWEEP_INTERVAL_SECONDS', '60'))
+MISSED_SWEEP_BATCH_SIZE = int(os.environ.get('MISSED_SWEEP_BATCH_SIZE', '1000'))
+
+# Daily per-clinician and per-department appointment counters, updated as appointments are written
+ROLLUPS_ENABLED = os.environ.get('ROLLUPS_ENABLED', 'true').lower() == 'true'
+
+# Invalidate the cache from MongoDB change streams when other processes write, needs a replica set
+CHANGE_STREAMS_ENABLED = os.environ.get('CHANGE_STREAMS_ENABLED', 'false').lower() == 'true'
+# Resume tokens are stored under this name so it must be unique to, and stable for, each process
+CHANGE_STREAM_LISTENER_NAME = os.environ.get('CHANGE_STREAM_LISTENER_NAME', f'{socket.gethostname()}:{PORT}')
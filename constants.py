@@ -9,35 +9,165 @@ PUBLIC_ROOT = os.path.join(ROOT_PATH, 'static')
 MONGODB_DATABASE_NAME = 'panda'
 MONGODB_COLLECTION_APPOINTMENTS = 'appointments'
 MONGODB_COLLECTION_PATIENTS = 'patients'
+MONGODB_COLLECTION_RESUME_TOKENS = 'change_stream_resume_tokens'
+MONGODB_COLLECTION_APPOINTMENT_ROLLUPS = 'appointment_rollups'
+MONGODB_COLLECTION_VERSIONS = 'collection_versions'
 
 # Files
 PATIENTS_FILENAME = 'example_patients.json'
 APPOINTMENTS_FILENAME = 'example_appointments.json'
+SYNTHETIC_PATIENTS_FILENAME = 'patients.ndjson'
+SYNTHETIC_APPOINTMENTS_FILENAME = 'appointments.ndjson'
+
+# Bulk Loading
+LOADER_READ_CHUNK_SIZE = 64 * 1024
+DEFAULT_LOADER_BATCH_SIZE = 1000
+DEFAULT_SYNTHETIC_SEED = 0
+DEFAULT_SYNTHETIC_APPOINTMENTS_PER_PATIENT = 2
 
 # MongoDB 
 DEFAULT_MONGODB_URI = 'mongodb://localhost:27017/'
 BSON_OBJECT_ID = '_id'
 MONGODB_SET_OPERATOR = '$set'
+MONGODB_GREATER_THAN_OPERATOR = '$gt'
+MONGODB_NOT_EQUAL_OPERATOR = '$ne'
+MONGODB_IN_OPERATOR = '$in'
+MONGODB_LESS_THAN_OR_EQUAL_OPERATOR = '$lte'
+MONGODB_LESS_THAN_OPERATOR = '$lt'
+MONGODB_GREATER_THAN_OR_EQUAL_OPERATOR = '$gte'
+MONGODB_OR_OPERATOR = '$or'
+MONGODB_INCREMENT_OPERATOR = '$inc'
+MONGODB_TYPE_OPERATOR = '$type'
+BSON_TYPE_STRING = 'string'
+MONGODB_DUPLICATE_KEY_ERROR_CODE = 11000
+MONGODB_BULK_WRITE_ERRORS = 'writeErrors'
+MONGODB_BULK_UPSERTED = 'upserted'
+MONGODB_BULK_INSERTED = 'nInserted'
+MONGODB_BULK_INDEX = 'index'
+MONGODB_BULK_CODE = 'code'
+MONGODB_BULK_CHANGE_COUNTS = ('nInserted', 'nUpserted', 'nModified', 'nRemoved')
+
+# MongoDB Change Streams
+CHANGE_STREAM_FULL_DOCUMENT_UPDATE_LOOKUP = 'updateLookup'
+CHANGE_STREAM_FULL_DOCUMENT_WHEN_AVAILABLE = 'whenAvailable'
+CHANGE_STREAM_FIELD_OPERATION_TYPE = 'operationType'
+CHANGE_STREAM_FIELD_FULL_DOCUMENT = 'fullDocument'
+CHANGE_STREAM_FIELD_FULL_DOCUMENT_BEFORE_CHANGE = 'fullDocumentBeforeChange'
+CHANGE_STREAM_FIELD_UPDATE_DESCRIPTION = 'updateDescription'
+CHANGE_STREAM_FIELD_UPDATED_FIELDS = 'updatedFields'
+CHANGE_STREAM_FIELD_REMOVED_FIELDS = 'removedFields'
+CHANGE_STREAM_OPERATION_INSERT = 'insert'
+CHANGE_STREAM_OPERATION_UPDATE = 'update'
+CHANGE_STREAM_OPERATION_REPLACE = 'replace'
+CHANGE_STREAM_HISTORY_LOST_ERROR_CODE = 286
+CHANGE_STREAM_MAX_AWAIT_TIME_MS = 1000
+CHANGE_STREAM_RETRY_DELAY_SECONDS = 5
+RESUME_TOKEN_SAVE_INTERVAL_SECONDS = 5
+RESUME_TOKEN_FIELD_TOKEN = 'resume_token'
+RESUME_TOKEN_FIELD_UPDATED_AT = 'updated_at'
 MONGODB_UNKNOWN_ID = 'unknown_id'
+MONGODB_EXCLUDE_OBJECT_ID_PROJECTION = {BSON_OBJECT_ID: 0}
+
+# Pagination
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+QUERY_ARGUMENT_LIMIT = 'limit'
+QUERY_ARGUMENT_CURSOR = 'cursor'
+
+# Appointment Queries
+QUERY_ARGUMENT_CLINICIAN = 'clinician'
+QUERY_ARGUMENT_DEPARTMENT = 'department'
+QUERY_ARGUMENT_PATIENT = 'patient'
+QUERY_ARGUMENT_STATUS = 'status'
+QUERY_ARGUMENT_FROM = 'from'
+QUERY_ARGUMENT_TO = 'to'
+QUERY_ARGUMENT_SORT = 'sort'
+QUERY_SORT_TIME_ASCENDING = 'time'
+QUERY_SORT_TIME_DESCENDING = '-time'
+
+# Longest an appointment can last, so searches for appointments overlapping a time only need to look back this far
+APPOINTMENT_MAX_DURATION_HOURS = 24
+
+# Free Slot Search
+QUERY_ARGUMENT_DURATION = 'duration'
+DEFAULT_SLOT_LIMIT = 20
+MAX_SLOT_LIMIT = 500
+SLOT_SEARCH_MAX_WINDOW_DAYS = 31
+# Appointments starting this long before a window are read in case they run into it, no appointment lasts longer
+SLOT_SEARCH_LOOKBACK_HOURS = APPOINTMENT_MAX_DURATION_HOURS
+SLOT_SEARCH_MAX_APPOINTMENTS = 20000
+SLOT_FIELD_START = 'start'
+SLOT_FIELD_END = 'end'
+
+# Appointment Rollups
+ROLLUP_FIELD_DIMENSION = 'dimension'
+ROLLUP_FIELD_KEY = 'key'
+ROLLUP_FIELD_DAY = 'day'
+ROLLUP_FIELD_BOOKED = 'booked'
+ROLLUP_FIELD_ATTENDED = 'attended'
+ROLLUP_FIELD_MISSED = 'missed'
+ROLLUP_FIELD_CANCELLED = 'cancelled'
+ROLLUP_FIELD_MINUTES_LOST = 'minutes_lost'
+ROLLUP_COUNTER_FIELDS = (
+    ROLLUP_FIELD_BOOKED,
+    ROLLUP_FIELD_ATTENDED,
+    ROLLUP_FIELD_MISSED,
+    ROLLUP_FIELD_CANCELLED,
+    ROLLUP_FIELD_MINUTES_LOST,
+)
+# Stored only by the in-memory backend, which keys each rollup on its dimension, key and day in one field
+ROLLUP_FIELD_ID = '_rollup_id'
+ROLLUP_MAX_DAYS = 366
+ROLLUP_REBUILD_BATCH_SIZE = 1000
+
+# Streaming
+STREAM_BATCH_SIZE = 500
+QUERY_ARGUMENT_STREAM = 'stream'
+QUERY_ARGUMENT_TRUE_VALUE = 'true'
+
+# Partial Updates, appointments whose time, duration or clinician change are read and written back this many times
+# at most if other writes keep coming in between
+PATCH_MAX_ATTEMPTS = 3
+
+# Bulk Writes
+BULK_MAX_RECORDS = 10000
+BULK_WRITE_BATCH_SIZE = 1000
+BULK_RESULT_FIELD_INDEX = 'index'
+BULK_RESULT_FIELD_STATUS = 'status'
+BULK_RESULT_FIELD_ERRORS = 'errors'
+BULK_STATUS_ERROR = 'error'
 
 # HTTP Status Codes
 HTTP_200_OK = 200
 HTTP_201_CREATED = 201
 HTTP_204_NO_CONTENT = 204
+HTTP_304_NOT_MODIFIED = 304
 HTTP_400_BAD_REQUEST = 400
 HTTP_404_NOT_FOUND = 404
+HTTP_409_CONFLICT = 409
+HTTP_412_PRECONDITION_FAILED = 412
 HTTP_500_INTERNAL_SERVER_ERROR = 500
 
 # HTTP Header Names and Values
 HEADER_ALLOW_ORIGIN = 'Access-Control-Allow-Origin'
 HEADER_ALLOW_HEADERS = 'Access-Control-Allow-Headers'
 HEADER_ALLOW_METHODS = 'Access-Control-Allow-Methods'
+HEADER_ACCEPT = 'Accept'
+HEADER_CONTENT_TYPE = 'Content-Type'
+HEADER_ETAG = 'Etag'
+HEADER_IF_MATCH = 'If-Match'
+HEADER_EXPOSE_HEADERS = 'Access-Control-Expose-Headers'
+HEADER_EXPOSE_HEADERS_VALUE = HEADER_ETAG
+CONTENT_TYPE_JSON = 'application/json; charset=UTF-8'
+CONTENT_TYPE_NDJSON = 'application/x-ndjson'
 HEADER_ALLOW_ORIGIN_VALUE = '*'
 HEADER_ALLOW_HEADERS_VALUE = (
     'x-requested-with,'
     'access-control-allow-headers,'
     'cache-control,'
     'content-type,'
+    'if-match,'
+    'if-none-match,'
     'pragma'
 )
 HEADER_ALLOW_METHODS_VALUE = 'GET, OPTIONS'
@@ -46,6 +176,19 @@ HEADER_ALLOW_METHODS_VALUE = 'GET, OPTIONS'
 HANDLER_FIELD_DATABASE_CLIENT = 'database_client'
 HANDLER_FIELD_PATIENT_REPOSITORY = 'patient_repository'
 HANDLER_FIELD_APPOINTMENT_REPOSITORY = 'appointment_repository'
+HANDLER_FIELD_ROLLUP_REPOSITORY = 'rollup_repository'
+
+# Response Serialization
+APPLICATION_SETTING_JSON_ENCODER = 'json_encoder'
+JSON_ENCODER_ORJSON = 'orjson'
+JSON_ENCODER_STDLIB = 'stdlib'
+
+# Document Versions, stored on every patient and appointment and on each collection's entry in collection_versions
+DOCUMENT_FIELD_VERSION = 'version'
+ETAG_FORMAT = '"{}"'
+ETAG_NDJSON_FORMAT = '"{}-ndjson"'
+ETAG_WILDCARD = '*'
+ETAG_QUOTE = '"'
 
 # Patient Dict Key Names
 PATIENT_FIELD_NHS_NUMBER = 'nhs_number'
@@ -62,6 +205,13 @@ APPOINTMENT_FIELD_CLINICIAN = 'clinician'
 APPOINTMENT_FIELD_DEPARTMENT = 'department'
 APPOINTMENT_FIELD_ID = 'id'
 APPOINTMENT_FIELD_POSTCODE = 'postcode'
+# Stored only, the UTC end of the appointment derived from time and duration so that due appointments can be found
+# with an index
+APPOINTMENT_FIELD_END_TIME = 'end_time'
+# Stored only, the UTC offset in minutes the time was given with, so it is returned as it was given
+APPOINTMENT_FIELD_TIME_OFFSET = 'time_offset'
+# Stored only, the sweep that marked the appointment missed, so each sweep reports only the appointments it marked
+APPOINTMENT_FIELD_MISSED_BY = 'missed_by'
 
 # Patient Service Result Field Names
 PATIENT_SERVICE_FIELD_ERROR = 'error'
@@ -86,6 +236,11 @@ PANDA_RESPONSE_FIELD_ERRORS = 'errors'
 PANDA_RESPONSE_FIELD_MESSAGE = 'message'
 PANDA_RESPONSE_FIELD_PATIENTS = 'patients'
 PANDA_RESPONSE_FIELD_APPOINTMENTS = 'appointments'
+PANDA_RESPONSE_FIELD_NEXT_CURSOR = 'next_cursor'
+PANDA_RESPONSE_FIELD_RESULTS = 'results'
+PANDA_RESPONSE_FIELD_SLOTS = 'slots'
+PANDA_RESPONSE_FIELD_DAYS = 'days'
+PANDA_RESPONSE_FIELD_TOTALS = 'totals'
 
 
 # Status Values
@@ -93,10 +248,12 @@ STATUS_ACTIVE = 'active'
 STATUS_ATTENDED = 'attended'
 STATUS_CANCELLED = 'cancelled'
 STATUS_MISSED = 'missed'
+APPOINTMENT_STATUSES = (STATUS_ACTIVE, STATUS_ATTENDED, STATUS_CANCELLED, STATUS_MISSED)
 
 # Regex Patterns
 NHS_NUMBER_REGEX = r'^\d{10}$'
 DURATION_REGEX = r'^\d+[hm]$'
+DURATION_PARTS_REGEX = r'(?:(\d+)h)?(?:(\d+)m)?'
 DATE_FORMAT = '%Y-%m-%d'
 UK_POSTCODE_VALIDATION_REGEX = r'^([A-Z][A-HJ-Y]?\d[A-Z\d]? ?\d[A-Z]{2}|GIR ?0A{2})$'
 
@@ -105,10 +262,17 @@ UK_POSTCODE_VALIDATION_REGEX = r'^([A-Z][A-HJ-Y]?\d[A-Z\d]? ?\d[A-Z]{2}|GIR ?0A{
 # Error/Message Templates
 ERR_PATIENT_NOT_FOUND = 'patient not found'
 ERR_APPOINTMENT_NOT_FOUND = 'appointment not found'
+ERR_PATIENT_ALREADY_EXISTS = 'patient already exists'
 ERR_COULD_NOT_CREATE_PATIENT = 'could not create patient'
 ERR_COULD_NOT_CREATE_APPOINTMENT = 'could not create appointment'
 ERR_COULD_NOT_UPDATE_PATIENT = 'could not update patient'
 ERR_COULD_NOT_UPDATE_APPOINTMENT = 'could not update appointment'
+ERR_COULD_NOT_WRITE_PATIENT = 'could not write patient'
+ERR_COULD_NOT_WRITE_APPOINTMENT = 'could not write appointment'
+ERR_CLINICIAN_DOUBLE_BOOKED = 'clinician already booked at this time: {}'
+ERR_PATIENT_VERSION_CONFLICT = 'patient has changed since it was read'
+ERR_APPOINTMENT_VERSION_CONFLICT = 'appointment has changed since it was read'
+ERR_APPOINTMENT_BUSY = 'appointment is being changed by other requests, retry'
 MSG_NEW_PATIENT_ADDED = 'new patient added: {}'
 MSG_NEW_APPOINTMENT_ADDED = 'new appointment added: {}'
 MSG_PATIENT_UPDATED = 'patient updated: {}'
@@ -124,6 +288,8 @@ INVALID_DATE_FORMAT_ERROR_TEXT = f'Invalid date format for {PATIENT_FIELD_DATE_O
 INVALID_DATE_OF_BIRTH_ERROR_TEXT = f'Invalid date of birth. Cannot be in the future'
 INVALID_UK_POSTCODE_ERROR_TEXT = 'Invalid UK postcode format'
 MISSING_REQUIRED_FIELD_ERROR_TEXT = 'Missing required field: {}'
+UNKNOWN_FIELD_ERROR_TEXT = 'Unknown field: {}'
+NO_CHANGES_ERROR_TEXT = 'Invalid request body. Expected a JSON object holding the fields to change'
 INVALID_NHS_NUMBER_ERROR_TEXT = 'Invalid NHS number. Must be a 10-digit number'
 INVALID_NHS_NUMBER_CHECKSUM_ERROR_TEXT = 'Invalid NHS number checksum'
 INVALID_NHS_NUMBER_CHECKSUM_PATIENT_ERROR_TEXT = 'Invalid NHS number checksum for patient'
@@ -131,8 +297,30 @@ INVALID_NAME_ERROR_TEXT = 'Invalid name. Must be a non-empty string of at least
 INVALID_UUID_ERROR_TEXT = f'Invalid UUID format for {{}}'
 INVALID_ISO8601_TIME_ERROR_TEXT = f'Invalid ISO 8601 datetime format for {{}}'
 INVALID_DURATION_FORMAT_ERROR_TEXT = f'Invalid format for {{}} (expected formats like "1h" or "30m")'
+DURATION_TOO_LONG_ERROR_TEXT = f'Invalid {{}}. Appointments can last at most {APPOINTMENT_MAX_DURATION_HOURS} hours'
 INVALID_STATUS_ERROR_TEXT = f"Invalid '{APPOINTMENT_FIELD_STATUS}' value. Allowed: '{STATUS_ACTIVE}', '{STATUS_ATTENDED}', '{STATUS_CANCELLED}', '{STATUS_MISSED}'"
 INVALID_PATIENT_ID_ERROR_TEXT = f'Invalid {APPOINTMENT_FIELD_PATIENT!r} ID. Expected 10-digit number'
+UNKNOWN_PATIENT_ERROR_TEXT = f'Unknown {APPOINTMENT_FIELD_PATIENT!r}. No patient has this NHS number'
 INVALID_CLINICIAN_ERROR_TEXT = f'Invalid {APPOINTMENT_FIELD_CLINICIAN!r} value'
 INVALID_DEPARTMENT_ERROR_TEXT = f'Invalid {APPOINTMENT_FIELD_DEPARTMENT!r} value'
 MISSING_POSTCODE_ERROR_TEXT = f'Missing {APPOINTMENT_FIELD_POSTCODE}'
+INVALID_PAGE_LIMIT_ERROR_TEXT = f'Invalid {QUERY_ARGUMENT_LIMIT!r} value. Must be an integer between 1 and {MAX_PAGE_LIMIT}'
+INVALID_PAGE_CURSOR_ERROR_TEXT = f'Invalid {QUERY_ARGUMENT_CURSOR!r} value'
+UNINDEXED_APPOINTMENT_QUERY_ERROR_TEXT = f'Appointment filters must include {QUERY_ARGUMENT_PATIENT!r}, {QUERY_ARGUMENT_CLINICIAN!r} or {QUERY_ARGUMENT_DEPARTMENT!r}'
+INVALID_QUERY_TIME_ERROR_TEXT = 'Invalid {!r} value. Expected an ISO 8601 datetime'
+INVALID_QUERY_TIME_RANGE_ERROR_TEXT = f'Invalid time range. {QUERY_ARGUMENT_FROM!r} must be before {QUERY_ARGUMENT_TO!r}'
+INVALID_QUERY_SORT_ERROR_TEXT = f'Invalid {QUERY_ARGUMENT_SORT!r} value. Allowed: {QUERY_SORT_TIME_ASCENDING!r}, {QUERY_SORT_TIME_DESCENDING!r}'
+MISSING_QUERY_ARGUMENT_ERROR_TEXT = 'Missing required query argument: {!r}'
+SLOT_SEARCH_FILTER_ERROR_TEXT = f'Free slot searches must include {QUERY_ARGUMENT_CLINICIAN!r} or {QUERY_ARGUMENT_DEPARTMENT!r}'
+SLOT_SEARCH_WINDOW_TOO_LONG_ERROR_TEXT = f'Invalid time range. Free slot searches can cover at most {SLOT_SEARCH_MAX_WINDOW_DAYS} days'
+SLOT_SEARCH_TOO_BUSY_ERROR_TEXT = f'Too many appointments to search. At most {SLOT_SEARCH_MAX_APPOINTMENTS} can be in the time range'
+INVALID_SLOT_DURATION_ERROR_TEXT = f'Invalid {QUERY_ARGUMENT_DURATION!r} value (expected formats like "30m", "1h" or "1h30m")'
+INVALID_SLOT_LIMIT_ERROR_TEXT = f'Invalid {QUERY_ARGUMENT_LIMIT!r} value. Must be an integer between 1 and {MAX_SLOT_LIMIT}'
+ROLLUP_FILTER_ERROR_TEXT = f'Appointment rollups must be requested for one of {QUERY_ARGUMENT_CLINICIAN!r} or {QUERY_ARGUMENT_DEPARTMENT!r}'
+INVALID_QUERY_DATE_ERROR_TEXT = f'Invalid {{!r}} value. Expected a date in the format "{READABLE_DATE_FORMAT}"'
+INVALID_QUERY_DATE_RANGE_ERROR_TEXT = f'Invalid date range. {QUERY_ARGUMENT_FROM!r} must not be after {QUERY_ARGUMENT_TO!r}'
+ROLLUP_RANGE_TOO_LONG_ERROR_TEXT = f'Invalid date range. Appointment rollups can cover at most {ROLLUP_MAX_DAYS} days'
+INVALID_IF_MATCH_ERROR_TEXT = f'Invalid {HEADER_IF_MATCH} header. Expected an ETag returned by a GET'
+INVALID_BULK_BODY_ERROR_TEXT = 'Invalid request body. Expected a JSON array or newline-delimited JSON objects'
+INVALID_BULK_RECORD_ERROR_TEXT = 'Invalid record. Expected a JSON object'
+TOO_MANY_BULK_RECORDS_ERROR_TEXT = f'Too many records. At most {BULK_MAX_RECORDS} can be sent in one request'
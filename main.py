@@ -1,48 +1,262 @@
+import atexit
+import logging
+
 import pymongo
 import tornado
+import tornado.httpserver
+import tornado.netutil
+import tornado.process
 
 from src.api.appointments.appointment_handler import AppointmentHandler
 from src.api.appointments.appointments_handler import AppointmentsHandler
+from src.api.appointments.appointments_bulk_handler import AppointmentsBulkHandler
+from src.api.appointments.appointment_slots_handler import AppointmentSlotsHandler
+from src.api.analytics.appointment_rollups_handler import AppointmentRollupsHandler
 from src.api.patients.patient_handler import PatientHandler
+from src.api.patients.patient_appointments_handler import PatientAppointmentsHandler
 from src.api.patients.patients_handler import PatientsHandler
+from src.api.patients.patients_bulk_handler import PatientsBulkHandler
+from src.api.json_encoding import get_json_encoder
 from src.repository.repository_factory import RepositoryFactory, DatabaseType
+from src.db.indexes import ensure_indexes
 from constants import (
+    MONGODB_DATABASE_NAME,
+    MONGODB_COLLECTION_PATIENTS,
+    MONGODB_COLLECTION_APPOINTMENTS,
+    PATIENT_FIELD_NHS_NUMBER,
+    APPOINTMENT_FIELD_ID,
     HANDLER_FIELD_PATIENT_REPOSITORY,
-    HANDLER_FIELD_APPOINTMENT_REPOSITORY
+    HANDLER_FIELD_APPOINTMENT_REPOSITORY,
+    HANDLER_FIELD_ROLLUP_REPOSITORY,
+    APPLICATION_SETTING_JSON_ENCODER
+)
+from src.db.change_streams import ChangeStreamListener, MongoResumeTokenStore
+from src.db.memory import MemoryDatabase
+from src.service.missed_appointments import MissedAppointmentSweeper
+from config import (
+    MONGODB_URI,
+    PORT,
+    HOST,
+    WORKER_PROCESSES,
+    WORKER_MAX_RESTARTS,
+    JSON_ENCODER,
+    DATABASE_TYPE,
+    MEMORY_SNAPSHOT_PATH,
+    MEMORY_SNAPSHOT_INTERVAL_SECONDS,
+    CACHE_ENABLED,
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL_SECONDS,
+    PATIENT_FILTER_ENABLED,
+    PATIENT_FILTER_CAPACITY,
+    PATIENT_FILTER_ERROR_RATE,
+    PATIENT_FILTER_RELOAD_INTERVAL_SECONDS,
+    MISSED_SWEEP_ENABLED,
+    MISSED_SWEEP_INTERVAL_SECONDS,
+    MISSED_SWEEP_BATCH_SIZE,
+    ROLLUPS_ENABLED,
+    CHANGE_STREAMS_ENABLED,
+    CHANGE_STREAM_LISTENER_NAME
 )
-from config import MONGODB_URI, PORT, HOST
+
+
+logger = logging.getLogger(__name__)
 
 
 def start_server():
-    """Start the Tornado web server and begin listening for requests."""
-    app = start_app()
-    app.listen(PORT, address=HOST)
+    """Start the Tornado web server and begin listening for requests.
+
+    With more than one worker process the listening socket is bound first and the server forks, so every worker accepts
+    connections from the same socket. The parent only supervises, restarting workers that die. Nothing that opens a
+    database connection or an IOLoop may be created before the fork, so each worker creates its own clients and
+    repositories afterwards. Indexes are provisioned once, by the parent, with a client it closes before forking.
+    Without change streams a worker's cache would never learn of writes made through the others, so the cache is
+    turned off.
+    """
+    worker_count = WORKER_PROCESSES or tornado.process.cpu_count()
+    if worker_count == 1:
+        app = start_app()
+        app.listen(PORT, address=HOST)
+        tornado.ioloop.IOLoop.current().start()
+        return
+
+    if DatabaseType(DATABASE_TYPE) != DatabaseType.MONGODB:
+        raise ValueError(f'{DATABASE_TYPE} backend data is held in process, so it can only run one worker process')
+    cache_enabled = CACHE_ENABLED
+    if cache_enabled and not CHANGE_STREAMS_ENABLED:
+        logger.warning('The cache is turned off, as without change streams it would serve documents written through '
+                       'other worker processes stale')
+        cache_enabled = False
+    provision_indexes()
+    sockets = tornado.netutil.bind_sockets(PORT, address=HOST)
+    logger.info(f'Forking {worker_count} worker processes')
+    worker_id = tornado.process.fork_processes(worker_count, WORKER_MAX_RESTARTS)
+
+    app = start_app(worker_id, cache_enabled)
+    server = tornado.httpserver.HTTPServer(app)
+    server.add_sockets(sockets)
     tornado.ioloop.IOLoop.current().start()
 
 
-def start_app():
+def provision_indexes():
+    """ This function creates the indexes the application relies on. Index provisioning is a one-off at startup so a
+    short-lived blocking client is used for it. """
+    with pymongo.MongoClient(MONGODB_URI) as index_client:
+        ensure_indexes(index_client[MONGODB_DATABASE_NAME])
+
+
+def start_invalidation_listeners(db_client, invalidated_collections, listener_suffix='', worker_id=None):
+    """ This function starts listening to the change streams of the given (collection name, key field, repository)
+    on the IOLoop, so writes made by any process invalidate what the repositories hold in this process. Each worker
+    process stores its resume tokens under its own name. """
+    listener_name = CHANGE_STREAM_LISTENER_NAME if worker_id is None else f'{CHANGE_STREAM_LISTENER_NAME}:{worker_id}'
+    token_store = MongoResumeTokenStore(db_client)
+    for collection_name, key_field, repository in invalidated_collections:
+        listener = ChangeStreamListener(
+            db_client,
+            collection_name,
+            key_field,
+            repository.invalidate,
+            repository.invalidate_all,
+            token_store,
+            f'{listener_name}:{collection_name}{listener_suffix}'
+        )
+        tornado.ioloop.IOLoop.current().spawn_callback(listener.run)
+
+
+def start_cache_invalidation(db_client, patient_repository, appointment_repository, worker_id=None):
+    """ This function starts listening to the patients and appointments change streams on the
+    IOLoop, so writes made by any process invalidate this process's caches. """
+    start_invalidation_listeners(db_client, [
+        (MONGODB_COLLECTION_PATIENTS, PATIENT_FIELD_NHS_NUMBER, patient_repository),
+        (MONGODB_COLLECTION_APPOINTMENTS, APPOINTMENT_FIELD_ID, appointment_repository),
+    ], worker_id=worker_id)
+
+
+def start_patient_filter(db_client, patient_repository, worker_id=None):
+    """ This function wraps the patient repository in a Bloom filter of existing NHS numbers and fills the filter on
+    the IOLoop. Until it is filled, existence checks fall back to the database. With change streams the filter stops
+    trusting patients other processes delete, and it is reloaded periodically either way. """
+    patient_repository = RepositoryFactory.create_bloom_filter_patient_repository(
+        patient_repository,
+        PATIENT_FILTER_CAPACITY,
+        PATIENT_FILTER_ERROR_RATE
+    )
+    tornado.ioloop.IOLoop.current().spawn_callback(patient_repository.load)
+    if CHANGE_STREAMS_ENABLED:
+        start_invalidation_listeners(db_client, [
+            (MONGODB_COLLECTION_PATIENTS, PATIENT_FIELD_NHS_NUMBER, patient_repository),
+        ], ':filter', worker_id)
+    if PATIENT_FILTER_RELOAD_INTERVAL_SECONDS:
+        tornado.ioloop.PeriodicCallback(patient_repository.load, PATIENT_FILTER_RELOAD_INTERVAL_SECONDS * 1000).start()
+    return patient_repository
+
+
+def start_missed_appointment_sweeper(appointment_repository, rollup_repository):
+    """ This function periodically marks appointments that have ended without being attended as missed. """
+    sweeper = MissedAppointmentSweeper(
+        appointment_repository,
+        MISSED_SWEEP_BATCH_SIZE,
+        rollup_repository=rollup_repository
+    )
+    tornado.ioloop.PeriodicCallback(sweeper.sweep, MISSED_SWEEP_INTERVAL_SECONDS * 1000).start()
+    return sweeper
+
+
+def start_snapshots(memory_database):
+    """ This function saves the in-memory database to its snapshot file periodically, in a worker thread so requests
+    are not held up, and once more when the process exits. """
+    async def save_snapshot():
+        await tornado.ioloop.IOLoop.current().run_in_executor(None, memory_database.save_snapshot)
+
+    tornado.ioloop.PeriodicCallback(save_snapshot, MEMORY_SNAPSHOT_INTERVAL_SECONDS * 1000).start()
+    atexit.register(memory_database.save_snapshot)
+
+
+def create_database_client(database_type, with_indexes=True):
+    """ This function returns the client the repositories of the configured database type are created with, first
+    provisioning the indexes unless with_indexes is False. """
+    if database_type == DatabaseType.MEMORY:
+        memory_database = MemoryDatabase(MEMORY_SNAPSHOT_PATH or None)
+        if MEMORY_SNAPSHOT_PATH:
+            start_snapshots(memory_database)
+        return memory_database
+
+    if with_indexes:
+        provision_indexes()
+
+    return pymongo.AsyncMongoClient(MONGODB_URI)
+
+
+def start_app(worker_id=None, cache_enabled=CACHE_ENABLED):
     """ This function returns an Application instance loaded with the necessary request handlers
     for the app.
+
+    Args:
+        worker_id: Number of this worker process when the server forks several, None when it runs as one process.
+            Background jobs that must only run once, such as the missed appointment sweep, run in worker 0.
+        cache_enabled: Whether to cache patient and appointment lookups in process
     """
-    db_client = pymongo.MongoClient(MONGODB_URI)
+    database_type = DatabaseType(DATABASE_TYPE)
+    db_client = create_database_client(database_type, with_indexes=worker_id is None)
 
     # Create repositories using the factory
     patient_repository = RepositoryFactory.create_patient_repository(
-        DatabaseType.MONGODB,
+        database_type,
         db_client
     )
     appointment_repository = RepositoryFactory.create_appointment_repository(
-        DatabaseType.MONGODB,
+        database_type,
         db_client
     )
 
+    # The in-memory backend is already a hash lookup, caching in front of it would only add copies
+    if cache_enabled and database_type == DatabaseType.MONGODB:
+        patient_repository = RepositoryFactory.create_caching_patient_repository(
+            patient_repository,
+            CACHE_MAX_ENTRIES,
+            CACHE_TTL_SECONDS
+        )
+        appointment_repository = RepositoryFactory.create_caching_appointment_repository(
+            appointment_repository,
+            CACHE_MAX_ENTRIES,
+            CACHE_TTL_SECONDS
+        )
+        if CHANGE_STREAMS_ENABLED:
+            start_cache_invalidation(db_client, patient_repository, appointment_repository, worker_id)
+
+    # Wrapped last, so the change streams above invalidate the caching repository rather than the filter
+    if PATIENT_FILTER_ENABLED and database_type == DatabaseType.MONGODB:
+        patient_repository = start_patient_filter(db_client, patient_repository, worker_id)
+
+    rollup_repository = RepositoryFactory.create_rollup_repository(
+        database_type,
+        db_client
+    ) if ROLLUPS_ENABLED else None
+
+    # Sweeps from several workers would race to mark, and count, the same appointments
+    if MISSED_SWEEP_ENABLED and not worker_id:
+        start_missed_appointment_sweeper(appointment_repository, rollup_repository)
+
+    appointment_handler_arguments = {
+        HANDLER_FIELD_APPOINTMENT_REPOSITORY: appointment_repository,
+        HANDLER_FIELD_PATIENT_REPOSITORY: patient_repository,
+        HANDLER_FIELD_ROLLUP_REPOSITORY: rollup_repository
+    }
+    analytics_routes = [
+        (r'/api/analytics/appointments', AppointmentRollupsHandler, {HANDLER_FIELD_ROLLUP_REPOSITORY: rollup_repository}),
+    ] if ROLLUPS_ENABLED else []
+    application_settings = {APPLICATION_SETTING_JSON_ENCODER: get_json_encoder(JSON_ENCODER)}
     return tornado.web.Application([
         # TODO: Move regex to constants.py
         (r'/api/patients/([0-9]+)', PatientHandler, {HANDLER_FIELD_PATIENT_REPOSITORY: patient_repository}),
+        (r'/api/patients/([0-9]+)/appointments', PatientAppointmentsHandler, appointment_handler_arguments),
         (r'/api/patients/', PatientsHandler, {HANDLER_FIELD_PATIENT_REPOSITORY: patient_repository}),
-        (r'/api/appointments/([a-f0-9\-]{36})', AppointmentHandler, {HANDLER_FIELD_APPOINTMENT_REPOSITORY: appointment_repository}),
-        (r'/api/appointments/', AppointmentsHandler, {HANDLER_FIELD_APPOINTMENT_REPOSITORY: appointment_repository})
-    ])
+        (r'/api/patients/_bulk', PatientsBulkHandler, {HANDLER_FIELD_PATIENT_REPOSITORY: patient_repository}),
+        (r'/api/appointments/([a-f0-9\-]{36})', AppointmentHandler, appointment_handler_arguments),
+        (r'/api/appointments/', AppointmentsHandler, appointment_handler_arguments),
+        (r'/api/appointments/_bulk', AppointmentsBulkHandler, appointment_handler_arguments),
+        (r'/api/appointments/_slots', AppointmentSlotsHandler, appointment_handler_arguments)
+    ] + analytics_routes, **application_settings)
 
 
 if __name__ == '__main__':
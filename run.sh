@@ -7,6 +7,16 @@ function db() {
     python3 -m  src.db.seed
 }
 
+# Change streams only work against a replica set, so this runs a single node one for CHANGE_STREAMS_ENABLED=true
+function dbReplicaSet() {
+    docker pull mongodb/mongodb-community-server:latest
+    docker run --name mongodb -p 27017:27017 -d mongodb/mongodb-community-server:latest --replSet rs0 --bind_ip_all
+    until docker exec mongodb mongosh --quiet --eval "rs.initiate({_id: 'rs0', members: [{_id: 0, host: 'localhost:27017'}]})"; do
+        sleep 1
+    done
+    python3 -m  src.db.seed
+}
+
 function app() {
     docker build . -t panda
     docker rm -f panda
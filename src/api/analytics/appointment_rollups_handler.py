@@ -0,0 +1,39 @@
+from src.api.base_handler import BaseHandler
+from src.service.analytics_service import AnalyticsService
+from src.service.results import ResponseType
+from constants import (
+    PANDA_RESPONSE_FIELD_ERRORS,
+    QUERY_ARGUMENT_CLINICIAN,
+    QUERY_ARGUMENT_DEPARTMENT,
+    QUERY_ARGUMENT_FROM,
+    QUERY_ARGUMENT_TO,
+    HTTP_200_OK,
+    HTTP_400_BAD_REQUEST
+)
+
+
+class AppointmentRollupsHandler(BaseHandler):
+    def initialize(self, rollup_repository):
+        """Initialize handler with an injected rollup repository.
+
+        Args:
+            rollup_repository: Repository instance for daily appointment rollup access
+        """
+        self.analytics_service = AnalyticsService(rollup_repository)
+
+    async def get(self):
+        """Get the daily appointment counters of a clinician or department over a range of days."""
+        service_response = await self.analytics_service.get_appointment_rollups(
+            clinician=self.get_query_argument(QUERY_ARGUMENT_CLINICIAN, None),
+            department=self.get_query_argument(QUERY_ARGUMENT_DEPARTMENT, None),
+            day_from=self.get_query_argument(QUERY_ARGUMENT_FROM, None),
+            day_to=self.get_query_argument(QUERY_ARGUMENT_TO, None)
+        )
+
+        if service_response.response_type == ResponseType.VALIDATION_ERROR:
+            self.set_status(HTTP_400_BAD_REQUEST)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        self.set_status(HTTP_200_OK)
+        self.write(service_response.data)
@@ -6,39 +6,47 @@ from src.service.results import ResponseType
 from constants import (
     PANDA_RESPONSE_FIELD_ERRORS,
     PANDA_RESPONSE_FIELD_MESSAGE,
+    INVALID_IF_MATCH_ERROR_TEXT,
     HTTP_200_OK,
     HTTP_201_CREATED,
     HTTP_400_BAD_REQUEST,
     HTTP_404_NOT_FOUND,
+    HTTP_409_CONFLICT,
+    HTTP_412_PRECONDITION_FAILED,
     HTTP_500_INTERNAL_SERVER_ERROR
 )
 
 
 class AppointmentHandler(BaseHandler):
-    def initialize(self, appointment_repository):
-        """Initialize handler with injected appointment repository.
+    def initialize(self, appointment_repository, patient_repository, rollup_repository=None):
+        """Initialize handler with injected appointment and patient repositories.
 
         Args:
             appointment_repository: Repository instance for appointment data access
+            patient_repository: Repository instance used to check appointments refer to existing patients
+            rollup_repository: Optional repository of daily appointment rollups, kept up to date with every write
         """
-        self.appointment_service = AppointmentService(appointment_repository)
+        self.appointment_service = AppointmentService(appointment_repository, patient_repository, rollup_repository)
 
-    def get(self, appointment_id):
-        """Get an appointment by ID."""
-        service_response = self.appointment_service.get_appointment(appointment_id)
+    async def get(self, appointment_id):
+        """Get an appointment by ID, or 304 Not Modified if the client already holds its current version."""
+        service_response = await self.appointment_service.get_appointment(appointment_id)
 
         if service_response.response_type == ResponseType.NOT_FOUND:
             self.set_status(HTTP_404_NOT_FOUND)
             self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
             return
 
+        if self.not_modified(service_response.version):
+            return
+
         self.set_status(HTTP_200_OK)
         self.write(service_response.data)
 
-    def post(self, appointment_id):
+    async def post(self, appointment_id):
         """Create a new appointment with the given ID."""
         appointment = json.loads(self.request.body)
-        service_response = self.appointment_service.create_appointment(appointment, appointment_id)
+        service_response = await self.appointment_service.create_appointment(appointment, appointment_id)
 
         if service_response.response_type == ResponseType.VALIDATION_ERROR:
             self.set_status(HTTP_400_BAD_REQUEST)
@@ -58,32 +66,104 @@ class AppointmentHandler(BaseHandler):
         self.set_status(HTTP_201_CREATED)
         self.write({PANDA_RESPONSE_FIELD_MESSAGE: service_response.message})
 
-    def put(self, appointment_id):
-        """Update an existing appointment by ID."""
+    async def put(self, appointment_id):
+        """Update an existing appointment by ID. With an If-Match header the appointment is only updated if it is
+        still at that version, and 412 Precondition Failed is returned otherwise. The ETag of the updated appointment is
+        returned when its new version is known."""
+        try:
+            version = self.get_if_match_version()
+        except ValueError:
+            self.set_status(HTTP_412_PRECONDITION_FAILED)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: [INVALID_IF_MATCH_ERROR_TEXT]})
+            return
+
         appointment = json.loads(self.request.body)
-        service_response = self.appointment_service.update_appointment(appointment, appointment_id)
+        service_response = await self.appointment_service.update_appointment(appointment, appointment_id, version)
+
+        if service_response.response_type == ResponseType.VALIDATION_ERROR:
+            self.set_status(HTTP_400_BAD_REQUEST)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        if service_response.response_type == ResponseType.NOT_FOUND:
+            self.set_status(HTTP_404_NOT_FOUND)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        if service_response.response_type == ResponseType.BUSINESS_ERROR:
+            self.set_status(HTTP_400_BAD_REQUEST)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        if service_response.response_type == ResponseType.PRECONDITION_FAILED:
+            self.set_status(HTTP_412_PRECONDITION_FAILED)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        if service_response.response_type == ResponseType.DATABASE_ERROR:
+            self.set_status(HTTP_500_INTERNAL_SERVER_ERROR)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        if service_response.version is not None:
+            self.set_etag(service_response.version)
+        self.set_status(HTTP_200_OK)
+        self.write({PANDA_RESPONSE_FIELD_MESSAGE: service_response.message})
+
+    async def patch(self, appointment_id):
+        """Change some of an existing appointment's fields, given by ID, validating only the fields changed.
+        Cancelled appointments cannot be reinstated. With an If-Match header the appointment is only changed if it is
+        still at that version, and 412 Precondition Failed is returned otherwise. Without one, 409 Conflict is returned
+        if other requests kept changing the appointment while it was being changed. The ETag of the changed appointment
+        is returned."""
+        try:
+            version = self.get_if_match_version()
+        except ValueError:
+            self.set_status(HTTP_412_PRECONDITION_FAILED)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: [INVALID_IF_MATCH_ERROR_TEXT]})
+            return
+
+        changes = json.loads(self.request.body)
+        service_response = await self.appointment_service.patch_appointment(changes, appointment_id, version)
 
         if service_response.response_type == ResponseType.VALIDATION_ERROR:
             self.set_status(HTTP_400_BAD_REQUEST)
             self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
             return
 
+        if service_response.response_type == ResponseType.NOT_FOUND:
+            self.set_status(HTTP_404_NOT_FOUND)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
         if service_response.response_type == ResponseType.BUSINESS_ERROR:
             self.set_status(HTTP_400_BAD_REQUEST)
             self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
             return
 
+        if service_response.response_type == ResponseType.PRECONDITION_FAILED:
+            self.set_status(HTTP_412_PRECONDITION_FAILED)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        if service_response.response_type == ResponseType.CONFLICT:
+            self.set_status(HTTP_409_CONFLICT)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
         if service_response.response_type == ResponseType.DATABASE_ERROR:
             self.set_status(HTTP_500_INTERNAL_SERVER_ERROR)
             self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
             return
 
+        if service_response.version is not None:
+            self.set_etag(service_response.version)
         self.set_status(HTTP_200_OK)
         self.write({PANDA_RESPONSE_FIELD_MESSAGE: service_response.message})
 
-    def delete(self, appointment_id):
+    async def delete(self, appointment_id):
         """Delete (cancel) an appointment by ID."""
-        service_response = self.appointment_service.delete_appointment(appointment_id)
+        service_response = await self.appointment_service.delete_appointment(appointment_id)
 
         if service_response.response_type == ResponseType.NOT_FOUND:
             self.set_status(HTTP_404_NOT_FOUND)
@@ -0,0 +1,46 @@
+from src.api.base_handler import BaseHandler
+from src.service.appointment_service import AppointmentService
+from src.service.results import ResponseType
+from constants import (
+    PANDA_RESPONSE_FIELD_ERRORS,
+    PANDA_RESPONSE_FIELD_SLOTS,
+    QUERY_ARGUMENT_CLINICIAN,
+    QUERY_ARGUMENT_DEPARTMENT,
+    QUERY_ARGUMENT_FROM,
+    QUERY_ARGUMENT_TO,
+    QUERY_ARGUMENT_DURATION,
+    QUERY_ARGUMENT_LIMIT,
+    HTTP_200_OK,
+    HTTP_400_BAD_REQUEST
+)
+
+
+class AppointmentSlotsHandler(BaseHandler):
+    def initialize(self, appointment_repository, patient_repository, rollup_repository=None):
+        """Initialize handler with injected appointment and patient repositories.
+
+        Args:
+            appointment_repository: Repository instance for appointment data access
+            patient_repository: Repository instance used to check appointments refer to existing patients
+            rollup_repository: Optional repository of daily appointment rollups, kept up to date with every write
+        """
+        self.appointment_service = AppointmentService(appointment_repository, patient_repository, rollup_repository)
+
+    async def get(self):
+        """Get the earliest free slots of a duration for a clinician or department within a time window."""
+        service_response = await self.appointment_service.find_free_slots(
+            clinician=self.get_query_argument(QUERY_ARGUMENT_CLINICIAN, None),
+            department=self.get_query_argument(QUERY_ARGUMENT_DEPARTMENT, None),
+            time_from=self.get_query_argument(QUERY_ARGUMENT_FROM, None),
+            time_to=self.get_query_argument(QUERY_ARGUMENT_TO, None),
+            duration=self.get_query_argument(QUERY_ARGUMENT_DURATION, None),
+            limit=self.get_query_argument(QUERY_ARGUMENT_LIMIT, None)
+        )
+
+        if service_response.response_type == ResponseType.VALIDATION_ERROR:
+            self.set_status(HTTP_400_BAD_REQUEST)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        self.set_status(HTTP_200_OK)
+        self.write({PANDA_RESPONSE_FIELD_SLOTS: service_response.data})
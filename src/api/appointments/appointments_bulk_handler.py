@@ -0,0 +1,41 @@
+from src.api.base_handler import BaseHandler
+from src.service.appointment_service import AppointmentService
+from src.service.results import ResponseType
+from constants import (
+    PANDA_RESPONSE_FIELD_ERRORS,
+    PANDA_RESPONSE_FIELD_RESULTS,
+    INVALID_BULK_BODY_ERROR_TEXT,
+    HTTP_200_OK,
+    HTTP_400_BAD_REQUEST
+)
+
+
+class AppointmentsBulkHandler(BaseHandler):
+    def initialize(self, appointment_repository, patient_repository, rollup_repository=None):
+        """Initialize handler with injected appointment and patient repositories.
+
+        Args:
+            appointment_repository: Repository instance for appointment data access
+            patient_repository: Repository instance used to check appointments refer to existing patients
+            rollup_repository: Optional repository of daily appointment rollups, kept up to date with every write
+        """
+        self.appointment_service = AppointmentService(appointment_repository, patient_repository, rollup_repository)
+
+    async def post(self):
+        """Create or update many appointments from a JSON array or NDJSON body, reporting the outcome of each."""
+        try:
+            appointments = self.parse_bulk_body()
+        except ValueError:
+            self.set_status(HTTP_400_BAD_REQUEST)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: [INVALID_BULK_BODY_ERROR_TEXT]})
+            return
+
+        service_response = await self.appointment_service.bulk_upsert_appointments(appointments)
+
+        if service_response.response_type == ResponseType.VALIDATION_ERROR:
+            self.set_status(HTTP_400_BAD_REQUEST)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        self.set_status(HTTP_200_OK)
+        self.write({PANDA_RESPONSE_FIELD_RESULTS: service_response.data})
@@ -1,24 +1,83 @@
 from src.api.base_handler import BaseHandler
 from src.service.appointment_service import AppointmentService
+from src.service.results import ResponseType
 from constants import (
+    PANDA_RESPONSE_FIELD_ERRORS,
     PANDA_RESPONSE_FIELD_APPOINTMENTS,
-    HTTP_200_OK
+    PANDA_RESPONSE_FIELD_NEXT_CURSOR,
+    QUERY_ARGUMENT_LIMIT,
+    QUERY_ARGUMENT_CURSOR,
+    QUERY_ARGUMENT_PATIENT,
+    QUERY_ARGUMENT_CLINICIAN,
+    QUERY_ARGUMENT_DEPARTMENT,
+    QUERY_ARGUMENT_STATUS,
+    QUERY_ARGUMENT_FROM,
+    QUERY_ARGUMENT_TO,
+    QUERY_ARGUMENT_SORT,
+    HTTP_200_OK,
+    HTTP_400_BAD_REQUEST
+)
+
+# Query arguments that filter the appointments listed, rather than paging through all of them
+FILTER_QUERY_ARGUMENTS = (
+    QUERY_ARGUMENT_PATIENT,
+    QUERY_ARGUMENT_CLINICIAN,
+    QUERY_ARGUMENT_DEPARTMENT,
+    QUERY_ARGUMENT_STATUS,
+    QUERY_ARGUMENT_FROM,
+    QUERY_ARGUMENT_TO,
+    QUERY_ARGUMENT_SORT,
 )
 
 
 class AppointmentsHandler(BaseHandler):
-    def initialize(self, appointment_repository):
-        """Initialize handler with injected appointment repository.
+    def initialize(self, appointment_repository, patient_repository, rollup_repository=None):
+        """Initialize handler with injected appointment and patient repositories.
 
         Args:
             appointment_repository: Repository instance for appointment data access
+            patient_repository: Repository instance used to check appointments refer to existing patients
+            rollup_repository: Optional repository of daily appointment rollups, kept up to date with every write
         """
-        self.appointment_service = AppointmentService(appointment_repository)
+        self.appointment_service = AppointmentService(appointment_repository, patient_repository, rollup_repository)
 
-    def get(self):
-        """Get all appointments."""
-        service_response = self.appointment_service.get_all_appointments()
+    async def get(self):
+        """Get a page of appointments, filtered when any filter is given, or stream every appointment when the client
+        asks for a stream. The version of the appointments collection is read first, so a client already holding it
+        gets 304 Not Modified without the appointments being read at all."""
+        if self.not_modified(await self.appointment_service.get_appointments_version(), representations=True):
+            return
 
-        self.set_status(HTTP_200_OK)
-        self.write({PANDA_RESPONSE_FIELD_APPOINTMENTS: service_response.data})
+        filters = {argument: self.get_query_argument(argument, None) for argument in FILTER_QUERY_ARGUMENTS}
+        limit = self.get_query_argument(QUERY_ARGUMENT_LIMIT, None)
+        cursor = self.get_query_argument(QUERY_ARGUMENT_CURSOR, None)
 
+        if any(value is not None for value in filters.values()):
+            service_response = await self.appointment_service.find_appointments(
+                patient=filters[QUERY_ARGUMENT_PATIENT],
+                clinician=filters[QUERY_ARGUMENT_CLINICIAN],
+                department=filters[QUERY_ARGUMENT_DEPARTMENT],
+                status=filters[QUERY_ARGUMENT_STATUS],
+                time_from=filters[QUERY_ARGUMENT_FROM],
+                time_to=filters[QUERY_ARGUMENT_TO],
+                sort=filters[QUERY_ARGUMENT_SORT],
+                limit=limit,
+                cursor=cursor
+            )
+        elif self.is_stream_requested():
+            await self.stream_collection(PANDA_RESPONSE_FIELD_APPOINTMENTS, self.appointment_service.stream_appointments())
+            return
+        else:
+            service_response = await self.appointment_service.get_appointments_page(limit, cursor)
+
+        if service_response.response_type == ResponseType.VALIDATION_ERROR:
+            self.clear_etag()
+            self.set_status(HTTP_400_BAD_REQUEST)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        self.set_status(HTTP_200_OK)
+        self.write({
+            PANDA_RESPONSE_FIELD_APPOINTMENTS: service_response.data,
+            PANDA_RESPONSE_FIELD_NEXT_CURSOR: service_response.next_cursor
+        })
@@ -1,6 +1,44 @@
 """ This module holds the base handler for the application. """
+import json
+
 import tornado.web
-from constants import HEADER_ALLOW_ORIGIN, HEADER_ALLOW_HEADERS, HEADER_ALLOW_METHODS, HEADER_ALLOW_ORIGIN_VALUE, HEADER_ALLOW_HEADERS_VALUE, HEADER_ALLOW_METHODS_VALUE, HTTP_204_NO_CONTENT
+from tornado.iostream import StreamClosedError
+from src.api.json_encoding import default_json_encoder
+from constants import (
+    HEADER_ALLOW_ORIGIN,
+    HEADER_ALLOW_HEADERS,
+    HEADER_ALLOW_METHODS,
+    HEADER_ALLOW_ORIGIN_VALUE,
+    HEADER_ALLOW_HEADERS_VALUE,
+    HEADER_ALLOW_METHODS_VALUE,
+    HEADER_EXPOSE_HEADERS,
+    HEADER_EXPOSE_HEADERS_VALUE,
+    HEADER_ETAG,
+    HEADER_IF_MATCH,
+    HEADER_ACCEPT,
+    HEADER_CONTENT_TYPE,
+    CONTENT_TYPE_JSON,
+    CONTENT_TYPE_NDJSON,
+    QUERY_ARGUMENT_STREAM,
+    QUERY_ARGUMENT_TRUE_VALUE,
+    HTTP_200_OK,
+    HTTP_204_NO_CONTENT,
+    HTTP_304_NOT_MODIFIED,
+    INVALID_BULK_BODY_ERROR_TEXT,
+    APPLICATION_SETTING_JSON_ENCODER,
+    ETAG_FORMAT,
+    ETAG_NDJSON_FORMAT,
+    ETAG_WILDCARD,
+    ETAG_QUOTE
+)
+
+
+def _parse_ndjson_line(line):
+    """ This function parses one line of an NDJSON body, returning None if it is not valid JSON. """
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
 
 
 class BaseHandler(tornado.web.RequestHandler):
@@ -13,9 +51,116 @@ class BaseHandler(tornado.web.RequestHandler):
         self.set_header(HEADER_ALLOW_ORIGIN, HEADER_ALLOW_ORIGIN_VALUE)
         self.set_header(HEADER_ALLOW_HEADERS, HEADER_ALLOW_HEADERS_VALUE)
         self.set_header(HEADER_ALLOW_METHODS, HEADER_ALLOW_METHODS_VALUE)
+        self.set_header(HEADER_EXPOSE_HEADERS, HEADER_EXPOSE_HEADERS_VALUE)
 
     def options(self):
         """ This function allows the application to respond to clients sending the pre-flight
         request ahead of the vanilla request (such as GET). """
         self.set_status(HTTP_204_NO_CONTENT)
-        self.finish()
\ No newline at end of file
+        self.finish()
+
+    def encode_json(self, value):
+        """ This function encodes a JSON-serializable value to UTF-8 bytes with the application's JSON encoder, set
+        with the json_encoder application setting, or the default encoder if it has none. """
+        return self.settings.get(APPLICATION_SETTING_JSON_ENCODER, default_json_encoder)(value)
+
+    def write(self, chunk):
+        """ This function writes a chunk to the output buffer. Dictionaries are encoded with the application's JSON
+        encoder rather than Tornado's standard library one, and sent as JSON. """
+        if isinstance(chunk, dict):
+            self.write_encoded(self.encode_json(chunk))
+            return
+        super().write(chunk)
+
+    def write_encoded(self, body, content_type=CONTENT_TYPE_JSON):
+        """ This function writes a body that has already been encoded, as bytes, to the output buffer untouched, and
+        sets its content type, JSON unless given otherwise. """
+        self.set_header(HEADER_CONTENT_TYPE, content_type)
+        super().write(body)
+
+    def not_modified(self, version, representations=False):
+        """ This function sets the ETag of a response from the version of the document or collection it holds, and
+        answers 304 Not Modified, with no body, if the client already holds that version. Returns whether it did, in
+        which case the caller should return without reading or writing anything more. Set representations when the
+        same URL can also be sent as NDJSON, so the two are never mistaken for one another. """
+        if representations and self.accepts_ndjson():
+            self.set_header(HEADER_ETAG, ETAG_NDJSON_FORMAT.format(version))
+        else:
+            self.set_etag(version)
+        if not self.check_etag_header():
+            return False
+        self.set_status(HTTP_304_NOT_MODIFIED)
+        return True
+
+    def set_etag(self, version):
+        """ This function sets the ETag of a response from the version of the document it holds or has written. """
+        self.set_header(HEADER_ETAG, ETAG_FORMAT.format(version))
+
+    def get_if_match_version(self):
+        """ This function returns the document version held by the client's If-Match header, or None if it sent no
+        If-Match or sent '*', in which case the write is made whatever the version. Raises ValueError if the header is
+        not one of the ETags this application sets, such as a weak ETag, which can never match. """
+        value = self.request.headers.get(HEADER_IF_MATCH)
+        if value is None or value.strip() == ETAG_WILDCARD:
+            return None
+        value = value.strip()
+        if len(value) < 2 or not value.startswith(ETAG_QUOTE) or not value.endswith(ETAG_QUOTE):
+            raise ValueError(value)
+        return int(value[1:-1])
+
+    def clear_etag(self):
+        """ This function removes the ETag set ahead of a response that turned out not to hold the document or
+        collection, such as an error. """
+        self.clear_header(HEADER_ETAG)
+
+    def accepts_ndjson(self):
+        """ This function returns whether the client asked for newline-delimited JSON. """
+        return CONTENT_TYPE_NDJSON in self.request.headers.get(HEADER_ACCEPT, '')
+
+    def is_stream_requested(self):
+        """ This function returns whether the client asked for the whole collection to be streamed,
+        either with the stream query argument or by accepting newline-delimited JSON. """
+        stream_argument = self.get_query_argument(QUERY_ARGUMENT_STREAM, None)
+        return stream_argument == QUERY_ARGUMENT_TRUE_VALUE or self.accepts_ndjson()
+
+    def parse_bulk_body(self):
+        """ This function parses a bulk request body holding either a JSON array or, when sent
+        with the NDJSON content type, one JSON document per line. An NDJSON line that is not
+        valid JSON is returned as None so the rest of the batch can still be processed.
+        Raises ValueError if the body cannot be parsed at all. """
+        body = self.request.body.decode('utf-8')
+        if CONTENT_TYPE_NDJSON in self.request.headers.get(HEADER_CONTENT_TYPE, ''):
+            return [_parse_ndjson_line(line) for line in body.splitlines() if line.strip()]
+
+        records = json.loads(body)
+        if not isinstance(records, list):
+            raise ValueError(INVALID_BULK_BODY_ERROR_TEXT)
+        return records
+
+    async def stream_collection(self, collection_field, batches):
+        """ This function writes every batch of documents to the client as it arrives and flushes
+        it as a chunk, so neither memory use nor time-to-first-byte depend on the collection size.
+        Documents are written as NDJSON if the client accepts it, otherwise as a JSON object
+        holding a single array under collection_field. """
+        ndjson = self.accepts_ndjson()
+        self.set_status(HTTP_200_OK)
+        self.set_header(HEADER_CONTENT_TYPE, CONTENT_TYPE_NDJSON if ndjson else CONTENT_TYPE_JSON)
+        if not ndjson:
+            self.write(b'{' + self.encode_json(collection_field) + b':[')
+
+        first_document = True
+        try:
+            async for batch in batches:
+                if ndjson:
+                    self.write(b''.join(self.encode_json(document) + b'\n' for document in batch))
+                else:
+                    chunk = b','.join(self.encode_json(document) for document in batch)
+                    self.write(chunk if first_document else b',' + chunk)
+                first_document = False
+                await self.flush()
+        except StreamClosedError:
+            # The client went away, stop reading from the database
+            return
+
+        if not ndjson:
+            self.write(b']}')
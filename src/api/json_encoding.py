@@ -0,0 +1,48 @@
+""" This module holds the JSON encoders responses are serialized with. Each encoder takes a JSON-serializable value
+and returns it encoded as UTF-8 bytes. orjson encodes straight to bytes several times faster than the standard library,
+so it is the default when it is installed, and the standard library encoder is used otherwise. """
+import json
+import logging
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from constants import JSON_ENCODER_ORJSON, JSON_ENCODER_STDLIB
+
+logger = logging.getLogger(__name__)
+
+JsonEncoder = Callable[[Any], bytes]
+
+
+def encode_with_stdlib(value: Any) -> bytes:
+    """ This function encodes a value with the standard library json module, without the whitespace after separators
+    so its output matches orjson's. """
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def encode_with_orjson(value: Any) -> bytes:
+    """ This function encodes a value with orjson. The few values orjson rejects but the standard library accepts,
+    integers beyond 64 bits and strings holding lone surrogates, are encoded with the standard library instead. """
+    try:
+        return orjson.dumps(value)
+    except orjson.JSONEncodeError:
+        return encode_with_stdlib(value)
+
+
+def get_json_encoder(name: str) -> JsonEncoder:
+    """ This function returns the encoder of the given name, 'orjson' or 'stdlib'. orjson falls back to the standard
+    library when it is not installed. Raises ValueError for any other name. """
+    if name == JSON_ENCODER_ORJSON:
+        if orjson is not None:
+            return encode_with_orjson
+        logger.warning('orjson is not installed, responses are encoded with the standard library json module')
+        return encode_with_stdlib
+    if name == JSON_ENCODER_STDLIB:
+        return encode_with_stdlib
+    raise ValueError(f'Unknown JSON encoder: {name!r}')
+
+
+default_json_encoder = encode_with_orjson if orjson is not None else encode_with_stdlib
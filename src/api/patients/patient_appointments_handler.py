@@ -0,0 +1,50 @@
+from src.api.base_handler import BaseHandler
+from src.service.appointment_service import AppointmentService
+from src.service.results import ResponseType
+from constants import (
+    PANDA_RESPONSE_FIELD_ERRORS,
+    PANDA_RESPONSE_FIELD_APPOINTMENTS,
+    PANDA_RESPONSE_FIELD_NEXT_CURSOR,
+    QUERY_ARGUMENT_LIMIT,
+    QUERY_ARGUMENT_CURSOR,
+    QUERY_ARGUMENT_STATUS,
+    HTTP_200_OK,
+    HTTP_400_BAD_REQUEST
+)
+
+
+class PatientAppointmentsHandler(BaseHandler):
+    def initialize(self, appointment_repository, patient_repository, rollup_repository=None):
+        """Initialize handler with injected appointment and patient repositories.
+
+        Args:
+            appointment_repository: Repository instance for appointment data access
+            patient_repository: Repository instance used to check appointments refer to existing patients
+            rollup_repository: Optional repository of daily appointment rollups, kept up to date with every write
+        """
+        self.appointment_service = AppointmentService(appointment_repository, patient_repository, rollup_repository)
+
+    async def get(self, nhs_number):
+        """Get a page of a patient's appointments in time order, optionally only those with a given status, or 304
+        Not Modified if no appointment has changed since the client read it."""
+        if self.not_modified(await self.appointment_service.get_appointments_version()):
+            return
+
+        service_response = await self.appointment_service.get_patient_appointments(
+            nhs_number,
+            self.get_query_argument(QUERY_ARGUMENT_STATUS, None),
+            self.get_query_argument(QUERY_ARGUMENT_LIMIT, None),
+            self.get_query_argument(QUERY_ARGUMENT_CURSOR, None)
+        )
+
+        if service_response.response_type == ResponseType.VALIDATION_ERROR:
+            self.clear_etag()
+            self.set_status(HTTP_400_BAD_REQUEST)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        self.set_status(HTTP_200_OK)
+        self.write({
+            PANDA_RESPONSE_FIELD_APPOINTMENTS: service_response.data,
+            PANDA_RESPONSE_FIELD_NEXT_CURSOR: service_response.next_cursor
+        })
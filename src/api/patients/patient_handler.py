@@ -6,10 +6,12 @@ from src.service.results import ResponseType
 from constants import (
     PANDA_RESPONSE_FIELD_ERRORS,
     PANDA_RESPONSE_FIELD_MESSAGE,
+    INVALID_IF_MATCH_ERROR_TEXT,
     HTTP_200_OK,
     HTTP_201_CREATED,
     HTTP_400_BAD_REQUEST,
     HTTP_404_NOT_FOUND,
+    HTTP_412_PRECONDITION_FAILED,
     HTTP_500_INTERNAL_SERVER_ERROR
 )
 
@@ -22,28 +24,36 @@ class PatientHandler(BaseHandler):
         """
         self.patient_service = PatientService(patient_repository)
 
-    def get(self, nhs_number):
-        """Get a patient by NHS number."""
-        service_response = self.patient_service.get_patient(nhs_number)
+    async def get(self, nhs_number):
+        """Get a patient by NHS number, or 304 Not Modified if the client already holds its current version."""
+        service_response = await self.patient_service.get_patient(nhs_number)
         
         if service_response.response_type == ResponseType.NOT_FOUND:
             self.set_status(HTTP_404_NOT_FOUND)
             self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
             return
 
+        if self.not_modified(service_response.version):
+            return
+
         self.set_status(HTTP_200_OK)
         self.write(service_response.data)
 
-    def post(self, nhs_number):
+    async def post(self, nhs_number):
         """Create a new patient with the given NHS number."""
         patient = json.loads(self.request.body)
-        service_response = self.patient_service.create_patient(patient, nhs_number)
+        service_response = await self.patient_service.create_patient(patient, nhs_number)
         
         if service_response.response_type == ResponseType.VALIDATION_ERROR:
             self.set_status(HTTP_400_BAD_REQUEST)
             self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
             return
 
+        if service_response.response_type == ResponseType.BUSINESS_ERROR:
+            self.set_status(HTTP_400_BAD_REQUEST)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
         if service_response.response_type == ResponseType.DATABASE_ERROR:
             self.set_status(HTTP_500_INTERNAL_SERVER_ERROR)
             self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
@@ -52,27 +62,97 @@ class PatientHandler(BaseHandler):
         self.set_status(HTTP_201_CREATED)
         self.write({PANDA_RESPONSE_FIELD_MESSAGE: service_response.message})
 
-    def put(self, nhs_number):
-        """Update an existing patient by NHS number."""
+    async def put(self, nhs_number):
+        """Update an existing patient by NHS number. With an If-Match header the patient is only updated if it is
+        still at that version, and 412 Precondition Failed is returned otherwise. The ETag of the updated patient is
+        always returned."""
+        try:
+            version = self.get_if_match_version()
+        except ValueError:
+            self.set_status(HTTP_412_PRECONDITION_FAILED)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: [INVALID_IF_MATCH_ERROR_TEXT]})
+            return
+
         patient = json.loads(self.request.body)
-        service_response = self.patient_service.update_patient(patient, nhs_number)
+        service_response = await self.patient_service.update_patient(patient, nhs_number, version)
+
+        if service_response.response_type == ResponseType.VALIDATION_ERROR:
+            self.set_status(HTTP_400_BAD_REQUEST)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        if service_response.response_type == ResponseType.NOT_FOUND:
+            self.set_status(HTTP_404_NOT_FOUND)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        if service_response.response_type == ResponseType.BUSINESS_ERROR:
+            self.set_status(HTTP_400_BAD_REQUEST)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        if service_response.response_type == ResponseType.PRECONDITION_FAILED:
+            self.set_status(HTTP_412_PRECONDITION_FAILED)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        if service_response.response_type == ResponseType.DATABASE_ERROR:
+            self.set_status(HTTP_500_INTERNAL_SERVER_ERROR)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        if service_response.version is not None:
+            self.set_etag(service_response.version)
+        self.set_status(HTTP_200_OK)
+        self.write({PANDA_RESPONSE_FIELD_MESSAGE: service_response.message})
+
+    async def patch(self, nhs_number):
+        """Change some of an existing patient's fields, given by NHS number, validating only the fields changed.
+        With an If-Match header the patient is only changed if it is still at that version, and 412 Precondition Failed
+        is returned otherwise. The ETag of the changed patient is always returned."""
+        try:
+            version = self.get_if_match_version()
+        except ValueError:
+            self.set_status(HTTP_412_PRECONDITION_FAILED)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: [INVALID_IF_MATCH_ERROR_TEXT]})
+            return
+
+        changes = json.loads(self.request.body)
+        service_response = await self.patient_service.patch_patient(changes, nhs_number, version)
 
         if service_response.response_type == ResponseType.VALIDATION_ERROR:
             self.set_status(HTTP_400_BAD_REQUEST)
             self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
             return
 
+        if service_response.response_type == ResponseType.NOT_FOUND:
+            self.set_status(HTTP_404_NOT_FOUND)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        if service_response.response_type == ResponseType.BUSINESS_ERROR:
+            self.set_status(HTTP_400_BAD_REQUEST)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        if service_response.response_type == ResponseType.PRECONDITION_FAILED:
+            self.set_status(HTTP_412_PRECONDITION_FAILED)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
         if service_response.response_type == ResponseType.DATABASE_ERROR:
             self.set_status(HTTP_500_INTERNAL_SERVER_ERROR)
             self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
             return
 
+        if service_response.version is not None:
+            self.set_etag(service_response.version)
         self.set_status(HTTP_200_OK)
         self.write({PANDA_RESPONSE_FIELD_MESSAGE: service_response.message})
 
-    def delete(self, nhs_number):
+    async def delete(self, nhs_number):
         """Delete a patient by NHS number."""
-        service_response = self.patient_service.delete_patient(nhs_number)
+        service_response = await self.patient_service.delete_patient(nhs_number)
 
         if service_response.response_type == ResponseType.NOT_FOUND:
             self.set_status(HTTP_404_NOT_FOUND)
@@ -0,0 +1,39 @@
+from src.api.base_handler import BaseHandler
+from src.service.patient_service import PatientService
+from src.service.results import ResponseType
+from constants import (
+    PANDA_RESPONSE_FIELD_ERRORS,
+    PANDA_RESPONSE_FIELD_RESULTS,
+    INVALID_BULK_BODY_ERROR_TEXT,
+    HTTP_200_OK,
+    HTTP_400_BAD_REQUEST
+)
+
+
+class PatientsBulkHandler(BaseHandler):
+    def initialize(self, patient_repository):
+        """Initialize handler with injected patient repository.
+
+        Args:
+            patient_repository: Repository instance for patient data access
+        """
+        self.patient_service = PatientService(patient_repository)
+
+    async def post(self):
+        """Create or update many patients from a JSON array or NDJSON body, reporting the outcome of each."""
+        try:
+            patients = self.parse_bulk_body()
+        except ValueError:
+            self.set_status(HTTP_400_BAD_REQUEST)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: [INVALID_BULK_BODY_ERROR_TEXT]})
+            return
+
+        service_response = await self.patient_service.bulk_upsert_patients(patients)
+
+        if service_response.response_type == ResponseType.VALIDATION_ERROR:
+            self.set_status(HTTP_400_BAD_REQUEST)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
+
+        self.set_status(HTTP_200_OK)
+        self.write({PANDA_RESPONSE_FIELD_RESULTS: service_response.data})
@@ -1,8 +1,14 @@
 from src.api.base_handler import BaseHandler
 from src.service.patient_service import PatientService
+from src.service.results import ResponseType
 from constants import (
+    PANDA_RESPONSE_FIELD_ERRORS,
     PANDA_RESPONSE_FIELD_PATIENTS,
-    HTTP_200_OK
+    PANDA_RESPONSE_FIELD_NEXT_CURSOR,
+    QUERY_ARGUMENT_LIMIT,
+    QUERY_ARGUMENT_CURSOR,
+    HTTP_200_OK,
+    HTTP_400_BAD_REQUEST
 )
 
 
@@ -15,8 +21,30 @@ class PatientsHandler(BaseHandler):
         """
         self.patient_service = PatientService(patient_repository)
 
-    def get(self):
-        service_response = self.patient_service.get_all_patients()
+    async def get(self):
+        """Get a page of patients, or stream every patient when the client asks for a stream. The version of the
+        patients collection is read first, so a client already holding it gets 304 Not Modified without the patients
+        being read at all."""
+        if self.not_modified(await self.patient_service.get_patients_version(), representations=True):
+            return
+
+        if self.is_stream_requested():
+            await self.stream_collection(PANDA_RESPONSE_FIELD_PATIENTS, self.patient_service.stream_patients())
+            return
+
+        service_response = await self.patient_service.get_patients_page(
+            self.get_query_argument(QUERY_ARGUMENT_LIMIT, None),
+            self.get_query_argument(QUERY_ARGUMENT_CURSOR, None)
+        )
+
+        if service_response.response_type == ResponseType.VALIDATION_ERROR:
+            self.clear_etag()
+            self.set_status(HTTP_400_BAD_REQUEST)
+            self.write({PANDA_RESPONSE_FIELD_ERRORS: service_response.errors})
+            return
 
         self.set_status(HTTP_200_OK)
-        self.write({PANDA_RESPONSE_FIELD_PATIENTS: service_response.data})
+        self.write({
+            PANDA_RESPONSE_FIELD_PATIENTS: service_response.data,
+            PANDA_RESPONSE_FIELD_NEXT_CURSOR: service_response.next_cursor
+        })
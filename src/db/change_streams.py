@@ -0,0 +1,194 @@
+""" This module listens to MongoDB change streams so that in-process caches can be invalidated when another process
+writes to the database. Change streams need a replica set, a single-node one is enough (see run.sh dbReplicaSet). """
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from constants import (
+    MONGODB_DATABASE_NAME,
+    MONGODB_COLLECTION_RESUME_TOKENS,
+    BSON_OBJECT_ID,
+    MONGODB_SET_OPERATOR,
+    CHANGE_STREAM_FULL_DOCUMENT_UPDATE_LOOKUP,
+    CHANGE_STREAM_FULL_DOCUMENT_WHEN_AVAILABLE,
+    CHANGE_STREAM_FIELD_OPERATION_TYPE,
+    CHANGE_STREAM_FIELD_FULL_DOCUMENT,
+    CHANGE_STREAM_FIELD_FULL_DOCUMENT_BEFORE_CHANGE,
+    CHANGE_STREAM_FIELD_UPDATE_DESCRIPTION,
+    CHANGE_STREAM_FIELD_UPDATED_FIELDS,
+    CHANGE_STREAM_FIELD_REMOVED_FIELDS,
+    CHANGE_STREAM_OPERATION_INSERT,
+    CHANGE_STREAM_OPERATION_UPDATE,
+    CHANGE_STREAM_OPERATION_REPLACE,
+    CHANGE_STREAM_HISTORY_LOST_ERROR_CODE,
+    CHANGE_STREAM_MAX_AWAIT_TIME_MS,
+    CHANGE_STREAM_RETRY_DELAY_SECONDS,
+    RESUME_TOKEN_SAVE_INTERVAL_SECONDS,
+    RESUME_TOKEN_FIELD_TOKEN,
+    RESUME_TOKEN_FIELD_UPDATED_AT,
+)
+
+
+def keys_to_invalidate(change, key_field):
+    """Work out which cache keys a change event affects.
+
+    The key of an updated document comes from the post-image looked up for the event, and from the pre-image when the
+    collection records them. If the event changed the key itself and there is no pre-image, or the document is gone
+    (deletes only carry the _id), the old key cannot be known.
+
+    Returns:
+        set: Keys to invalidate, or None if every key must be invalidated
+    """
+    before = change.get(CHANGE_STREAM_FIELD_FULL_DOCUMENT_BEFORE_CHANGE)
+    after = change.get(CHANGE_STREAM_FIELD_FULL_DOCUMENT)
+    keys = {image[key_field] for image in (before, after) if image and key_field in image}
+    operation_type = change.get(CHANGE_STREAM_FIELD_OPERATION_TYPE)
+
+    if operation_type == CHANGE_STREAM_OPERATION_INSERT:
+        return keys or None
+
+    if operation_type == CHANGE_STREAM_OPERATION_UPDATE:
+        update_description = change.get(CHANGE_STREAM_FIELD_UPDATE_DESCRIPTION, {})
+        key_changed = (
+            key_field in update_description.get(CHANGE_STREAM_FIELD_UPDATED_FIELDS, {})
+            or key_field in update_description.get(CHANGE_STREAM_FIELD_REMOVED_FIELDS, [])
+        )
+        if keys and (before or not key_changed):
+            return keys
+
+    if operation_type == CHANGE_STREAM_OPERATION_REPLACE and keys and before:
+        return keys
+
+    return None
+
+
+class MongoResumeTokenStore:
+    """Persists change stream resume tokens so a listener can carry on where it left off after a restart."""
+
+    def __init__(self, client):
+        """Initialize the store.
+
+        Args:
+            client: pymongo.AsyncMongoClient instance
+        """
+        self.collection = client[MONGODB_DATABASE_NAME][MONGODB_COLLECTION_RESUME_TOKENS]
+
+    async def load(self, listener_name):
+        """Return the last resume token saved by a listener, or None."""
+        document = await self.collection.find_one({BSON_OBJECT_ID: listener_name})
+        return document.get(RESUME_TOKEN_FIELD_TOKEN) if document else None
+
+    async def save(self, listener_name, resume_token):
+        """Save a listener's latest resume token."""
+        await self.collection.update_one(
+            {BSON_OBJECT_ID: listener_name},
+            {MONGODB_SET_OPERATOR: {
+                RESUME_TOKEN_FIELD_TOKEN: resume_token,
+                RESUME_TOKEN_FIELD_UPDATED_AT: datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+
+
+class ChangeStreamListener:
+    """Watches one collection and reports the keys of changed documents.
+
+    The listener runs until stopped, reconnecting after errors and resuming from its last resume token, which is also
+    persisted every few seconds so a restarted process resumes where the previous one stopped.
+    """
+
+    def __init__(self, client, collection_name, key_field, invalidate, invalidate_all, token_store, listener_name,
+                 clock=time.monotonic):
+        """Initialize the listener.
+
+        Args:
+            client: pymongo.AsyncMongoClient instance
+            collection_name: Collection to watch
+            key_field: Field holding the cache key of each document
+            invalidate: Called with each key that changed
+            invalidate_all: Called when a change cannot be attributed to a key, or changes may have been missed
+            token_store: MongoResumeTokenStore for persisting resume tokens
+            listener_name: Name the resume token is stored under, unique per process
+            clock: Monotonic time source, injectable for tests
+        """
+        self.collection = client[MONGODB_DATABASE_NAME][collection_name]
+        self.key_field = key_field
+        self.invalidate = invalidate
+        self.invalidate_all = invalidate_all
+        self.token_store = token_store
+        self.listener_name = listener_name
+        self._clock = clock
+        self._stopped = False
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+
+    def stop(self):
+        """Ask the listener to stop after the current wait for changes."""
+        self._stopped = True
+
+    def apply_change(self, change):
+        """Invalidate the cache entries affected by one change event."""
+        keys = keys_to_invalidate(change, self.key_field)
+        if keys is None:
+            self.invalidate_all()
+            return
+        for key in keys:
+            self.invalidate(key)
+
+    async def run(self):
+        """Listen for changes until stopped."""
+        resume_token = await self._load_resume_token()
+        while not self._stopped:
+            try:
+                resume_token = await self._watch(resume_token)
+            except OperationFailure as error:
+                if error.code != CHANGE_STREAM_HISTORY_LOST_ERROR_CODE:
+                    raise
+                # The oplog no longer holds the resume point, so changes were missed
+                self.logger.warning(f"Change stream history lost for {self.listener_name}, starting afresh")
+                resume_token = None
+                self.invalidate_all()
+            except PyMongoError as error:
+                self.logger.error(f"Change stream {self.listener_name} failed, retrying: {error}")
+                await asyncio.sleep(CHANGE_STREAM_RETRY_DELAY_SECONDS)
+
+    async def _load_resume_token(self):
+        """Load the stored resume token, retrying until the database is reachable."""
+        while not self._stopped:
+            try:
+                return await self.token_store.load(self.listener_name)
+            except PyMongoError as error:
+                self.logger.error(f"Could not load resume token for {self.listener_name}, retrying: {error}")
+                await asyncio.sleep(CHANGE_STREAM_RETRY_DELAY_SECONDS)
+        return None
+
+    async def _watch(self, resume_token):
+        """Apply changes from one change stream until it closes or the listener is stopped.
+
+        Returns:
+            The latest resume token
+        """
+        self.logger.info(f"Watching {self.collection.name} for {self.listener_name}, resuming after: {resume_token}")
+        stream = await self.collection.watch(
+            full_document=CHANGE_STREAM_FULL_DOCUMENT_UPDATE_LOOKUP,
+            full_document_before_change=CHANGE_STREAM_FULL_DOCUMENT_WHEN_AVAILABLE,
+            resume_after=resume_token,
+            max_await_time_ms=CHANGE_STREAM_MAX_AWAIT_TIME_MS
+        )
+        async with stream:
+            saved_at = self._clock()
+            while stream.alive and not self._stopped:
+                change = await stream.try_next()
+                if change is not None:
+                    self.apply_change(change)
+                # The resume token advances even while no changes arrive
+                if stream.resume_token is not None:
+                    resume_token = stream.resume_token
+                if resume_token is not None and self._clock() - saved_at >= RESUME_TOKEN_SAVE_INTERVAL_SECONDS:
+                    await self.token_store.save(self.listener_name, resume_token)
+                    saved_at = self._clock()
+            if resume_token is not None:
+                await self.token_store.save(self.listener_name, resume_token)
+        return resume_token
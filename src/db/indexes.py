@@ -0,0 +1,101 @@
+""" This module declares the indexes the application's queries rely on and provisions them. """
+import logging
+
+import pymongo
+from pymongo import IndexModel
+
+from constants import (
+    MONGODB_COLLECTION_PATIENTS,
+    MONGODB_COLLECTION_APPOINTMENTS,
+    MONGODB_COLLECTION_APPOINTMENT_ROLLUPS,
+    PATIENT_FIELD_NHS_NUMBER,
+    APPOINTMENT_FIELD_ID,
+    APPOINTMENT_FIELD_PATIENT,
+    APPOINTMENT_FIELD_CLINICIAN,
+    APPOINTMENT_FIELD_DEPARTMENT,
+    APPOINTMENT_FIELD_TIME,
+    APPOINTMENT_FIELD_STATUS,
+    APPOINTMENT_FIELD_END_TIME,
+    STATUS_ACTIVE,
+    ROLLUP_FIELD_DIMENSION,
+    ROLLUP_FIELD_KEY,
+    ROLLUP_FIELD_DAY,
+)
+
+logger = logging.getLogger(__name__)
+
+# Keys of the indexes that support filtered appointment queries, by the field filtered on
+APPOINTMENT_QUERY_INDEX_KEYS = {
+    field: [
+        (field, pymongo.ASCENDING),
+        (APPOINTMENT_FIELD_TIME, pymongo.ASCENDING),
+        (APPOINTMENT_FIELD_ID, pymongo.ASCENDING),
+    ]
+    for field in (APPOINTMENT_FIELD_PATIENT, APPOINTMENT_FIELD_CLINICIAN, APPOINTMENT_FIELD_DEPARTMENT)
+}
+
+COLLECTION_INDEXES = {
+    MONGODB_COLLECTION_PATIENTS: [
+        IndexModel([(PATIENT_FIELD_NHS_NUMBER, pymongo.ASCENDING)], name='nhs_number_unique', unique=True),
+    ],
+    MONGODB_COLLECTION_APPOINTMENTS: [
+        IndexModel([(APPOINTMENT_FIELD_ID, pymongo.ASCENDING)], name='id_unique', unique=True),
+        # Filtered appointment queries are sorted by time then id, so each filter field's index ends with both
+        IndexModel(APPOINTMENT_QUERY_INDEX_KEYS[APPOINTMENT_FIELD_PATIENT], name='patient_time_id'),
+        IndexModel(APPOINTMENT_QUERY_INDEX_KEYS[APPOINTMENT_FIELD_CLINICIAN], name='clinician_time_id'),
+        IndexModel(APPOINTMENT_QUERY_INDEX_KEYS[APPOINTMENT_FIELD_DEPARTMENT], name='department_time_id'),
+        # Only active appointments can become missed, so only they are indexed by end time
+        IndexModel(
+            [(APPOINTMENT_FIELD_END_TIME, pymongo.ASCENDING)],
+            name='active_end_time',
+            partialFilterExpression={APPOINTMENT_FIELD_STATUS: STATUS_ACTIVE}
+        ),
+    ],
+    MONGODB_COLLECTION_APPOINTMENT_ROLLUPS: [
+        # Identifies each rollup for upserts, and answers reads of a range of days of a clinician or department
+        IndexModel(
+            [
+                (ROLLUP_FIELD_DIMENSION, pymongo.ASCENDING),
+                (ROLLUP_FIELD_KEY, pymongo.ASCENDING),
+                (ROLLUP_FIELD_DAY, pymongo.ASCENDING),
+            ],
+            name='dimension_key_day_unique',
+            unique=True
+        ),
+    ],
+}
+
+# Indexes that earlier versions created and a declared index now covers
+SUPERSEDED_INDEXES = {
+    MONGODB_COLLECTION_APPOINTMENTS: ['patient', 'clinician_time', 'department_time'],
+}
+
+
+def ensure_indexes(database):
+    """Create any declared index that does not exist yet, and drop superseded ones. Safe to run on every startup.
+
+    Args:
+        database: pymongo Database to provision
+
+    Returns:
+        dict: Names of the indexes created, keyed by collection name
+    """
+    created_indexes = {}
+    for collection_name, index_models in COLLECTION_INDEXES.items():
+        collection = database[collection_name]
+        existing_index_names = collection.index_information().keys()
+        missing_indexes = [index for index in index_models if index.document['name'] not in existing_index_names]
+
+        created_indexes[collection_name] = collection.create_indexes(missing_indexes) if missing_indexes else []
+        if created_indexes[collection_name]:
+            logger.info(f"Created indexes on {collection_name}: {', '.join(created_indexes[collection_name])}")
+        else:
+            logger.info(f"All indexes on {collection_name} already exist")
+
+        # Superseded indexes are only dropped once the indexes replacing them exist
+        for index_name in SUPERSEDED_INDEXES.get(collection_name, []):
+            if index_name in existing_index_names:
+                collection.drop_index(index_name)
+                logger.info(f"Dropped superseded index {index_name} on {collection_name}")
+
+    return created_indexes
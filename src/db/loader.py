@@ -0,0 +1,134 @@
+""" This module loads large JSON or NDJSON datasets into MongoDB without holding them in memory. """
+import json
+import time
+from dataclasses import dataclass
+from itertools import islice
+
+from pymongo.errors import BulkWriteError
+
+from constants import (
+    BSON_OBJECT_ID,
+    MONGODB_BULK_WRITE_ERRORS,
+    MONGODB_BULK_INSERTED,
+    MONGODB_COLLECTION_VERSIONS,
+    MONGODB_INCREMENT_OPERATOR,
+    DOCUMENT_FIELD_VERSION,
+    LOADER_READ_CHUNK_SIZE
+)
+
+_JSON_ARRAY_START = '['
+_JSON_ARRAY_END = ']'
+_JSON_SEPARATORS = ', \t\r\n'
+
+
+@dataclass
+class LoadStats:
+    inserted: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def records_per_second(self):
+        return (self.inserted + self.failed) / self.seconds if self.seconds else 0.0
+
+
+def iter_json_records(file, chunk_size=LOADER_READ_CHUNK_SIZE):
+    """Yield each record from a file holding either a JSON array of objects or one JSON object per line (NDJSON).
+
+    The file is read in chunks of chunk_size characters, so memory use depends on the largest record rather than on
+    the size of the file.
+
+    Raises:
+        ValueError: If the file is not a JSON array or NDJSON
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith(_JSON_ARRAY_START):
+        # NDJSON, put back what has been read and parse line by line
+        for line in _iter_lines(buffer, file, chunk_size):
+            if line.strip():
+                yield json.loads(line)
+        return
+
+    buffer = buffer[1:]
+    position = 0
+    end_of_file = False
+    while True:
+        while position < len(buffer) and buffer[position] in _JSON_SEPARATORS:
+            position += 1
+        if buffer.startswith(_JSON_ARRAY_END, position):
+            return
+        try:
+            record, position_after_record = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The next record is incomplete, read more of the file and drop what has already been parsed
+            if end_of_file:
+                raise
+            chunk = file.read(chunk_size)
+            end_of_file = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield record
+        position = position_after_record
+
+
+def _iter_lines(buffer, file, chunk_size):
+    """Yield complete lines from an already-read buffer followed by the rest of the file."""
+    while True:
+        *lines, buffer = buffer.split('\n')
+        yield from lines
+        chunk = file.read(chunk_size)
+        if not chunk:
+            yield buffer
+            return
+        buffer += chunk
+
+
+def batched(records, batch_size):
+    """Yield lists of at most batch_size records."""
+    iterator = iter(records)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def load_records(collection, records, batch_size, label=None):
+    """Insert records into a collection in unordered batches, printing progress and throughput after each batch.
+
+    Unordered inserts carry on past individual failures (such as duplicate keys), which are counted and skipped.
+    Once anything has been inserted the collection's version is bumped, so clients holding an ETag for it read it again.
+
+    Args:
+        collection: pymongo Collection to insert into
+        records: Iterable of documents, consumed lazily
+        batch_size: Number of documents per insert_many
+        label: Name printed with progress, defaults to the collection name
+
+    Returns:
+        LoadStats: Totals for the load
+    """
+    label = label or collection.name
+    stats = LoadStats()
+    start = time.perf_counter()
+    for batch in batched(records, batch_size):
+        try:
+            result = collection.insert_many(batch, ordered=False)
+            stats.inserted += len(result.inserted_ids)
+        except BulkWriteError as error:
+            stats.inserted += error.details.get(MONGODB_BULK_INSERTED, 0)
+            stats.failed += len(error.details.get(MONGODB_BULK_WRITE_ERRORS, []))
+
+        stats.seconds = time.perf_counter() - start
+        print(f'{label}: {stats.inserted:,} inserted, {stats.failed:,} failed ({stats.records_per_second:,.0f} records/s)')
+
+    stats.seconds = time.perf_counter() - start
+    if stats.inserted:
+        increment_collection_version(collection)
+    return stats
+
+
+def increment_collection_version(collection):
+    """Increment the collection's version in collection_versions after a write that changed it, as the API does."""
+    collection.database.get_collection(MONGODB_COLLECTION_VERSIONS).update_one(
+        {BSON_OBJECT_ID: collection.name}, {MONGODB_INCREMENT_OPERATOR: {DOCUMENT_FIELD_VERSION: 1}}, upsert=True
+    )
@@ -0,0 +1,461 @@
+""" This module holds collections in process memory for the in-memory repository backend. Documents are kept in a hash
+index on their key field, with optional secondary indexes, and can be snapshotted to a JSON file so that data survives
+a restart. """
+import bisect
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from src.repository.errors import DuplicateRecordError
+from src.repository.results import WriteStatus
+from src.repository.appointment_storage import to_stored
+from constants import (
+    MONGODB_COLLECTION_PATIENTS,
+    MONGODB_COLLECTION_APPOINTMENTS,
+    MONGODB_COLLECTION_APPOINTMENT_ROLLUPS,
+    PATIENT_FIELD_NHS_NUMBER,
+    APPOINTMENT_FIELD_ID,
+    APPOINTMENT_FIELD_PATIENT,
+    APPOINTMENT_FIELD_CLINICIAN,
+    APPOINTMENT_FIELD_DEPARTMENT,
+    APPOINTMENT_FIELD_STATUS,
+    APPOINTMENT_FIELD_TIME,
+    APPOINTMENT_FIELD_END_TIME,
+    STATUS_ACTIVE,
+    ROLLUP_FIELD_ID,
+    ROLLUP_FIELD_DIMENSION,
+    ROLLUP_FIELD_KEY,
+    ROLLUP_FIELD_DAY,
+    DOCUMENT_FIELD_VERSION,
+    MONGODB_COLLECTION_VERSIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Datetimes are written to snapshots as {"$date": "<ISO 8601>"}, as in MongoDB Extended JSON
+_SNAPSHOT_DATETIME_KEY = '$date'
+
+
+def _encode_snapshot_value(value):
+    if isinstance(value, datetime):
+        return {_SNAPSHOT_DATETIME_KEY: value.isoformat()}
+    raise TypeError(f'{type(value).__name__} cannot be written to a snapshot')
+
+
+def _decode_snapshot_object(document):
+    if len(document) == 1 and _SNAPSHOT_DATETIME_KEY in document:
+        return datetime.fromisoformat(document[_SNAPSHOT_DATETIME_KEY])
+    return document
+
+
+class _Top:
+    """Compares greater than every other value, to bound a range of sorted index entries from above."""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return other is not self
+
+
+_TOP = _Top()
+
+# A sorted index is on a single field, or on several fields whose values are held as a tuple
+SortedIndexFields = Union[str, Tuple[str, ...]]
+
+
+def _is_active(document: Dict[str, Any]) -> bool:
+    return document.get(APPOINTMENT_FIELD_STATUS) == STATUS_ACTIVE
+
+
+def _has_typed_time(document: Dict[str, Any]) -> bool:
+    # Like a MongoDB range query on datetimes, the time indexes skip times that are not datetimes
+    return isinstance(document.get(APPOINTMENT_FIELD_TIME), datetime)
+
+
+def _upgrade_appointment(document: Dict[str, Any]) -> Dict[str, Any]:
+    # Snapshots saved before appointment times were typed hold them as strings
+    return to_stored(document) if isinstance(document.get(APPOINTMENT_FIELD_TIME), str) else document
+
+
+class MemoryCollection:
+    """A collection of documents unique on a key field.
+
+    Stored documents are never mutated, a write replaces the whole document, so a reader holding a document (or a
+    snapshot holding the list of documents) never sees a half applied write. Writes take a lock, so the collection can
+    also be written from threads other than the event loop's.
+
+    Like a versioned MongoDB collection, a versioned collection keeps a version on every document, incremented by each
+    write to it. Every collection has a version, incremented by every write that changes a document.
+    """
+
+    def __init__(self, key_field: str, indexed_fields: Iterable[str] = (),
+                 sorted_fields: Optional[Dict[SortedIndexFields, Optional[Callable[[Dict[str, Any]], bool]]]] = None,
+                 hidden_fields: Iterable[str] = (), versioned: bool = False):
+        """Initialize an empty collection.
+
+        Args:
+            key_field: Field that uniquely identifies each document
+            indexed_fields: Fields to keep secondary indexes on, for find
+            sorted_fields: Fields, or tuples of fields, to keep sorted indexes on, for range_keys and scan, each with an
+                optional predicate a document must satisfy to be indexed, like a MongoDB partial index. Entries are
+                ordered by value and then key.
+            hidden_fields: Fields that are stored but left out of the copies of documents returned
+            versioned: Whether to keep a version on every document. It is only returned by get, when asked for.
+        """
+        self.key_field = key_field
+        self._documents: Dict[Any, Dict[str, Any]] = {}
+        self._indexes: Dict[str, Dict[Any, Set[Any]]] = {field: {} for field in indexed_fields}
+        self._sorted_index_predicates = dict(sorted_fields or {})
+        self._sorted_indexes: Dict[SortedIndexFields, List[Tuple[Any, Any]]] = {
+            fields: [] for fields in self._sorted_index_predicates
+        }
+        self.versioned = versioned
+        self.version = 0
+        self._document_hidden_fields = frozenset(hidden_fields)
+        self._hidden_fields = self._document_hidden_fields | ({DOCUMENT_FIELD_VERSION} if versioned else set())
+        self._sorted_keys: Optional[List[Any]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def get(self, key: Any, with_version: bool = False) -> Optional[Dict[str, Any]]:
+        """Return a copy of the document with the given key, or None. Its version is only included if with_version."""
+        document = self._documents.get(key)
+        if document is None:
+            return None
+        return self._copy(document, self._document_hidden_fields if with_version else None)
+
+    def find(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        """Return copies of the documents whose field equals value, in key order."""
+        index = self._indexes.get(field)
+        if index is None:
+            return [document for document in self.all() if document.get(field) == value]
+        with self._lock:
+            return [self._copy(self._documents[key]) for key in sorted(index.get(value, ()))]
+
+    def existing(self, keys: Iterable[Any]) -> Set[Any]:
+        """Return the set of the given keys that a document has."""
+        documents = self._documents
+        return {key for key in keys if key in documents}
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Return copies of every document, in key order."""
+        with self._lock:
+            return [self._copy(self._documents[key]) for key in self._keys()]
+
+    def page(self, limit: int, after: Optional[Any] = None) -> List[Dict[str, Any]]:
+        """Return copies of up to limit documents in key order, starting after the given key."""
+        with self._lock:
+            keys = self._keys()
+            start = bisect.bisect_right(keys, after) if after is not None else 0
+            return [self._copy(self._documents[key]) for key in keys[start:start + limit]]
+
+    def range_keys(self, field: str, upper: Any, limit: int) -> List[Any]:
+        """Return the keys of up to limit documents in the sorted index on field whose value is at most upper, in
+        value order."""
+        with self._lock:
+            keys = []
+            for value, key in islice(self._sorted_indexes[field], limit):
+                if value > upper:
+                    break
+                keys.append(key)
+            return keys
+
+    def scan(self, fields: Tuple[str, ...], prefix: Tuple[Any, ...], lower: Any, upper: Any, limit: int,
+             after: Optional[Tuple[Tuple[Any, ...], Any]] = None, reverse: bool = False,
+             matches: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
+        """Return copies of up to limit documents from the sorted index on a tuple of fields, in index order.
+
+        Only entries whose leading values equal prefix, and whose next value is at least lower and less than upper, are
+        read, so the work done depends on the size of that range rather than of the collection.
+
+        Args:
+            fields: Fields of the sorted index
+            prefix: Values of the leading fields
+            lower: Inclusive lower bound on the next field, or None
+            upper: Exclusive upper bound on the next field, or None
+            limit: Maximum number of documents to return
+            after: (values, key) entry of the last document returned before, to continue from
+            reverse: Whether to read the range in descending order
+            matches: Optional predicate documents must satisfy to be returned
+        """
+        with self._lock:
+            entries = self._sorted_indexes[fields]
+            start = bisect.bisect_left(entries, (prefix + (lower,),) if lower is not None else (prefix,))
+            end = bisect.bisect_left(entries, (prefix + (upper if upper is not None else _TOP,),))
+            if after is not None and reverse:
+                end = min(end, bisect.bisect_left(entries, after))
+            elif after is not None:
+                start = max(start, bisect.bisect_right(entries, after))
+
+            positions = range(end - 1, start - 1, -1) if reverse else range(start, end)
+            documents = []
+            for position in positions:
+                if len(documents) >= limit:
+                    break
+                document = self._documents[entries[position][1]]
+                if matches is None or matches(document):
+                    documents.append(self._copy(document))
+            return documents
+
+    def batches(self, batch_size: int) -> Iterable[List[Dict[str, Any]]]:
+        """Yield copies of every document in key order, batch_size at a time.
+
+        The keys are fixed when iteration starts. Documents deleted since are skipped and updates made since are seen.
+        """
+        keys = self._keys()
+        for start in range(0, len(keys), batch_size):
+            with self._lock:
+                batch = [self._documents.get(key) for key in keys[start:start + batch_size]]
+            yield [self._copy(document) for document in batch if document is not None]
+
+    def insert(self, document: Dict[str, Any]):
+        """Insert a new document.
+
+        Raises:
+            DuplicateRecordError: If a document with the same key exists
+        """
+        key = document.get(self.key_field)
+        with self._lock:
+            if key in self._documents:
+                raise DuplicateRecordError(key)
+            self._store(key, dict(document))
+
+    def update(self, key: Any, values: Dict[str, Any],
+               matches: Optional[Callable[[Dict[str, Any]], bool]] = None) -> WriteStatus:
+        """Set the given fields on the document with the given key, which may itself be changed.
+
+        Args:
+            key: Key of the document to update
+            values: Fields to set
+            matches: Optional predicate the document must satisfy to be updated
+        Returns:
+            WriteStatus.UPDATED, WriteStatus.CONFLICT if the document did not satisfy matches, or WriteStatus.NOT_FOUND
+        Raises:
+            DuplicateRecordError: If the key is changed to one that another document has
+        """
+        with self._lock:
+            existing = self._documents.get(key)
+            if existing is None:
+                return WriteStatus.NOT_FOUND
+            if matches is not None and not matches(existing):
+                return WriteStatus.CONFLICT
+            updated = {**existing, **values}
+            new_key = updated.get(self.key_field)
+            if new_key != key and new_key in self._documents:
+                raise DuplicateRecordError(new_key)
+            self._replace(key, new_key, updated)
+            return WriteStatus.UPDATED
+
+    def upsert(self, document: Dict[str, Any], matches: Optional[Callable[[Dict[str, Any]], bool]] = None) -> WriteStatus:
+        """Set the document's fields on the document with the same key, or insert it if there is none.
+
+        Args:
+            document: Document to write, including its key
+            matches: Optional predicate an existing document must satisfy to be updated. Documents that do not are left
+                alone and reported as a conflict, as a unique index would report the attempted insert.
+        """
+        key = document.get(self.key_field)
+        with self._lock:
+            existing = self._documents.get(key)
+            if existing is None:
+                self._store(key, dict(document))
+                return WriteStatus.CREATED
+            if matches is not None and not matches(existing):
+                return WriteStatus.CONFLICT
+            self._replace(key, key, {**existing, **document})
+            return WriteStatus.UPDATED
+
+    def delete(self, key: Any) -> bool:
+        """Delete the document with the given key, returning whether there was one."""
+        with self._lock:
+            if key not in self._documents:
+                return False
+            self._remove(key)
+            return True
+
+    def load(self, documents: Iterable[Dict[str, Any]]):
+        """Replace the contents of the collection."""
+        with self._lock:
+            self._documents = {}
+            self._indexes = {field: {} for field in self._indexes}
+            self._sorted_indexes = {field: [] for field in self._sorted_indexes}
+            self._sorted_keys = None
+            self.version += 1
+            for document in documents:
+                key = document.get(self.key_field)
+                self._documents[key] = dict(document)
+                self._index(key, self._documents[key], sorted_indexes=False)
+            # Sorting once is much cheaper than inserting every document into the sorted indexes in turn
+            for field in self._sorted_indexes:
+                entries = (self._sorted_index_entry(field, key, document) for key, document in self._documents.items())
+                self._sorted_indexes[field] = sorted(entry for entry in entries if entry is not None)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Return the stored documents as they are at this moment, without copying them."""
+        with self._lock:
+            return list(self._documents.values())
+
+    def versioned_snapshot(self) -> Tuple[int, List[Dict[str, Any]]]:
+        """Return the collection version and the stored documents at that version, without copying them."""
+        with self._lock:
+            return self.version, list(self._documents.values())
+
+    def _keys(self) -> List[Any]:
+        """Return the keys in order, sorting them only after inserts or deletes."""
+        with self._lock:
+            if self._sorted_keys is None:
+                self._sorted_keys = sorted(self._documents)
+            return self._sorted_keys
+
+    def _store(self, key: Any, document: Dict[str, Any]):
+        if self.versioned:
+            document[DOCUMENT_FIELD_VERSION] = 1
+        self.version += 1
+        self._sorted_keys = None
+        self._documents[key] = document
+        self._index(key, document)
+
+    def _replace(self, key: Any, new_key: Any, document: Dict[str, Any]):
+        if self.versioned:
+            document[DOCUMENT_FIELD_VERSION] = self._documents[key].get(DOCUMENT_FIELD_VERSION, 0) + 1
+        self.version += 1
+        self._unindex(key, self._documents[key])
+        if new_key != key:
+            del self._documents[key]
+            self._sorted_keys = None
+        self._documents[new_key] = document
+        self._index(new_key, document)
+
+    def _remove(self, key: Any):
+        self._unindex(key, self._documents.pop(key))
+        self._sorted_keys = None
+        self.version += 1
+
+    def _copy(self, document: Dict[str, Any], hidden_fields: Optional[frozenset] = None) -> Dict[str, Any]:
+        hidden_fields = self._hidden_fields if hidden_fields is None else hidden_fields
+        if not hidden_fields:
+            return dict(document)
+        return {field: value for field, value in document.items() if field not in hidden_fields}
+
+    def _sorted_index_entry(self, fields: SortedIndexFields, key: Any,
+                            document: Dict[str, Any]) -> Optional[Tuple[Any, Any]]:
+        if isinstance(fields, tuple):
+            value = tuple(document.get(field) for field in fields)
+            if any(item is None for item in value):
+                return None
+        else:
+            value = document.get(fields)
+            if value is None:
+                return None
+        predicate = self._sorted_index_predicates[fields]
+        if predicate is not None and not predicate(document):
+            return None
+        return value, key
+
+    def _index(self, key: Any, document: Dict[str, Any], sorted_indexes: bool = True):
+        for field, index in self._indexes.items():
+            if field in document:
+                index.setdefault(document[field], set()).add(key)
+        if sorted_indexes:
+            for field, entries in self._sorted_indexes.items():
+                entry = self._sorted_index_entry(field, key, document)
+                if entry is not None:
+                    bisect.insort(entries, entry)
+
+    def _unindex(self, key: Any, document: Dict[str, Any]):
+        for field, index in self._indexes.items():
+            keys = index.get(document.get(field))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[document[field]]
+        for field, entries in self._sorted_indexes.items():
+            entry = self._sorted_index_entry(field, key, document)
+            if entry is not None:
+                position = bisect.bisect_left(entries, entry)
+                if position < len(entries) and entries[position] == entry:
+                    del entries[position]
+
+
+class MemoryDatabase:
+    """The application's collections, held in memory and optionally snapshotted to a JSON file."""
+
+    def __init__(self, snapshot_path: Optional[str] = None):
+        """Initialize the database, loading the snapshot if one exists.
+
+        Args:
+            snapshot_path: File to load from and save snapshots to, or None to keep data in memory only
+        """
+        self.snapshot_path = snapshot_path
+        self.collections = {
+            MONGODB_COLLECTION_PATIENTS: MemoryCollection(PATIENT_FIELD_NHS_NUMBER, versioned=True),
+            MONGODB_COLLECTION_APPOINTMENTS: MemoryCollection(
+                APPOINTMENT_FIELD_ID,
+                (APPOINTMENT_FIELD_PATIENT, APPOINTMENT_FIELD_CLINICIAN, APPOINTMENT_FIELD_DEPARTMENT),
+                {
+                    APPOINTMENT_FIELD_END_TIME: _is_active,
+                    (APPOINTMENT_FIELD_PATIENT, APPOINTMENT_FIELD_TIME): _has_typed_time,
+                    (APPOINTMENT_FIELD_CLINICIAN, APPOINTMENT_FIELD_TIME): _has_typed_time,
+                    (APPOINTMENT_FIELD_DEPARTMENT, APPOINTMENT_FIELD_TIME): _has_typed_time,
+                },
+                (APPOINTMENT_FIELD_END_TIME,),
+                versioned=True
+            ),
+            MONGODB_COLLECTION_APPOINTMENT_ROLLUPS: MemoryCollection(
+                ROLLUP_FIELD_ID,
+                sorted_fields={(ROLLUP_FIELD_DIMENSION, ROLLUP_FIELD_KEY, ROLLUP_FIELD_DAY): None},
+                hidden_fields=(ROLLUP_FIELD_ID,)
+            ),
+        }
+        self._snapshot_lock = threading.Lock()
+        if snapshot_path and os.path.exists(snapshot_path):
+            self.load_snapshot()
+
+    def __getitem__(self, collection_name: str) -> MemoryCollection:
+        return self.collections[collection_name]
+
+    def load_snapshot(self):
+        """Replace every collection with the contents of the snapshot file."""
+        with open(self.snapshot_path, 'r', encoding='utf-8') as infile:
+            data = json.load(infile, object_hook=_decode_snapshot_object)
+        for name, collection in self.collections.items():
+            documents = data.get(name, [])
+            if name == MONGODB_COLLECTION_APPOINTMENTS:
+                documents = map(_upgrade_appointment, documents)
+            collection.load(documents)
+        # The collection versions are saved too, so clients are not told a copy from before the restart is current
+        for name, version in data.get(MONGODB_COLLECTION_VERSIONS, {}).items():
+            if name in self.collections:
+                self.collections[name].version = version
+        logger.info(f"Loaded snapshot {self.snapshot_path}")
+
+    def save_snapshot(self):
+        """Write every collection to the snapshot file.
+
+        The documents are captured under each collection's lock but serialised outside it, so this can run in a worker
+        thread while requests carry on. The file is replaced atomically, a crash mid-write leaves the previous snapshot.
+        """
+        if not self.snapshot_path:
+            return
+        with self._snapshot_lock:
+            data = {MONGODB_COLLECTION_VERSIONS: {}}
+            for name, collection in self.collections.items():
+                data[MONGODB_COLLECTION_VERSIONS][name], data[name] = collection.versioned_snapshot()
+            directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+            file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(file_descriptor, 'w', encoding='utf-8') as outfile:
+                    json.dump(data, outfile, ensure_ascii=False, default=_encode_snapshot_value)
+                os.replace(temporary_path, self.snapshot_path)
+            except BaseException:
+                os.unlink(temporary_path)
+                raise
+
@@ -0,0 +1,76 @@
+""" This module holds data migrations, run from the seed command line tool. Each converts documents in batches while
+the API keeps serving, and is safe to run again or to stop part way. """
+import logging
+import time
+
+from pymongo import UpdateOne
+
+from src.db.loader import batched, increment_collection_version
+from src.db.mongo import versioned_update
+from src.repository.appointment_storage import to_stored
+from constants import (
+    BSON_OBJECT_ID,
+    BSON_TYPE_STRING,
+    APPOINTMENT_FIELD_TIME,
+    APPOINTMENT_FIELD_DURATION,
+    APPOINTMENT_FIELD_END_TIME,
+    APPOINTMENT_FIELD_TIME_OFFSET,
+    MONGODB_TYPE_OPERATOR,
+)
+
+logger = logging.getLogger(__name__)
+
+TYPED_APPOINTMENT_FIELDS = (
+    APPOINTMENT_FIELD_TIME,
+    APPOINTMENT_FIELD_TIME_OFFSET,
+    APPOINTMENT_FIELD_DURATION,
+    APPOINTMENT_FIELD_END_TIME,
+)
+
+
+def migrate_appointment_times(collection, batch_size, pause_seconds=0.0):
+    """Convert appointments stored with string times and durations to the typed form, in unordered bulk writes.
+
+    Each update only applies if the appointment's time and duration are unchanged since they were read, so an
+    appointment written through the API in the meantime, which is already typed, is left alone. Like a write through
+    the API, each update increments the appointment's version, and every batch that converted any increments the
+    collection's, so no ETag or cached copy taken before the conversion is still taken to be current.
+
+    Args:
+        collection: pymongo Collection of appointments
+        batch_size: Number of appointments per bulk write
+        pause_seconds: Seconds to wait between bulk writes, to leave the database capacity for the API
+
+    Returns:
+        tuple: Number of appointments converted, and number skipped because their time or duration is invalid
+    """
+    cursor = collection.find(
+        {APPOINTMENT_FIELD_TIME: {MONGODB_TYPE_OPERATOR: BSON_TYPE_STRING}},
+        {APPOINTMENT_FIELD_TIME: 1, APPOINTMENT_FIELD_DURATION: 1}
+    ).batch_size(batch_size)
+    converted = 0
+    skipped = 0
+    for batch in batched(cursor, batch_size):
+        operations = []
+        for appointment in batch:
+            original = {
+                APPOINTMENT_FIELD_TIME: appointment.get(APPOINTMENT_FIELD_TIME),
+                APPOINTMENT_FIELD_DURATION: appointment.get(APPOINTMENT_FIELD_DURATION),
+            }
+            stored = to_stored(original)
+            if APPOINTMENT_FIELD_END_TIME not in stored:
+                skipped += 1
+                continue
+            operations.append(UpdateOne(
+                {BSON_OBJECT_ID: appointment[BSON_OBJECT_ID], **original},
+                versioned_update({field: stored[field] for field in TYPED_APPOINTMENT_FIELDS})
+            ))
+        if operations:
+            modified_count = collection.bulk_write(operations, ordered=False).modified_count
+            if modified_count:
+                increment_collection_version(collection)
+            converted += modified_count
+        logger.info(f'{collection.name}: {converted:,} converted, {skipped:,} skipped')
+        if pause_seconds:
+            time.sleep(pause_seconds)
+    return converted, skipped
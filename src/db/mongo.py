@@ -1,22 +1,94 @@
-import json
 import logging
 import pymongo
-from bson.json_util import dumps as bson_dumps
-from constants import MONGODB_DATABASE_NAME, BSON_OBJECT_ID, MONGODB_SET_OPERATOR, MONGODB_UNKNOWN_ID
+from pymongo import ReturnDocument
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from constants import (
+    MONGODB_DATABASE_NAME,
+    BSON_OBJECT_ID,
+    MONGODB_SET_OPERATOR,
+    MONGODB_GREATER_THAN_OPERATOR,
+    MONGODB_IN_OPERATOR,
+    MONGODB_INCREMENT_OPERATOR,
+    MONGODB_BULK_WRITE_ERRORS,
+    MONGODB_BULK_CHANGE_COUNTS,
+    MONGODB_EXCLUDE_OBJECT_ID_PROJECTION,
+    MONGODB_COLLECTION_VERSIONS,
+    DOCUMENT_FIELD_VERSION,
+)
+
+# Values of these types are already JSON-serializable and are passed through untouched
+_JSON_NATIVE_TYPES = (str, int, float, bool, type(None))
+
+
+def _convert_bson_value(value):
+    """Convert a single BSON value into its JSON-serializable equivalent.
+
+    Only the BSON types the application actually stores need mapping: datetimes are rendered as timezone-aware
+    ISO 8601 strings (MongoDB always stores UTC) and ObjectIds as their hex string.
+    """
+    if isinstance(value, _JSON_NATIVE_TYPES):
+        return value
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: _convert_bson_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_convert_bson_value(item) for item in value]
+    return value
+
+
+def versioned_update(updated_values):
+    """Return the update document that sets the given values and increments the document's version.
+
+    A version in the values is left out, only the increment may change it. A document without a version is given
+    version 1, as is a document inserted by an upsert.
+    """
+    if DOCUMENT_FIELD_VERSION in updated_values:
+        updated_values = {field: value for field, value in updated_values.items() if field != DOCUMENT_FIELD_VERSION}
+    update = {MONGODB_INCREMENT_OPERATOR: {DOCUMENT_FIELD_VERSION: 1}}
+    if updated_values:
+        update[MONGODB_SET_OPERATOR] = updated_values
+    return update
+
+
+def version_query(version):
+    """Return the query that matches a document at the given version, a document without one being at version 0."""
+    return {DOCUMENT_FIELD_VERSION: version if version else None}
 
 
 class MongoDB:
 
-    def __init__(self, client, collection_name):
-        """Initialize MongoDB connection with client and collection name."""
+    def __init__(self, client, collection_name, hidden_fields=(), decode=None, versioned=False):
+        """Initialize MongoDB connection with client and collection name.
+
+        The client is expected to be a pymongo.AsyncMongoClient so that every database round-trip can be
+        awaited from the Tornado IOLoop without blocking other requests. Hidden fields are stored but projected out of
+        every document read. An optional decode function converts each document read from its stored form before it
+        is made JSON-serializable.
+
+        In a versioned collection every document carries a version that each write through this class increments
+        atomically, and the collection itself has a version, kept in collection_versions, that is incremented after
+        every write that changes a document. The document version is only read by get, when asked for.
+        """
         # Connect to the MongoDB instance
         self.client = client
         self.db = self.client[MONGODB_DATABASE_NAME]
         self.collection = self.db[collection_name]
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
         self.collection_name = collection_name
+        self.versioned = versioned
+        self.document_projection = {**MONGODB_EXCLUDE_OBJECT_ID_PROJECTION, **{field: 0 for field in hidden_fields}}
+        self.projection = {**self.document_projection, **({DOCUMENT_FIELD_VERSION: 0} if versioned else {})}
+        self.decode = decode
 
-    def _convert_bson_to_json(self, bson_data):
+    @staticmethod
+    def _convert_bson_to_json(bson_data):
         """Convert BSON objects to JSON-serializable dictionaries.
         
         Args:
@@ -27,61 +99,191 @@ class MongoDB:
         """
         if bson_data is None:
             return None
-        
-        # Convert BSON to JSON string then back to dict to handle ObjectId and other BSON types
-        bson_string = bson_dumps(bson_data)
-        json_data = json.loads(bson_string)
 
-        if BSON_OBJECT_ID in json_data:
-            del json_data[BSON_OBJECT_ID]
+        # Map values directly rather than round-tripping through a JSON string. _id is normally excluded by the
+        # query projection but is dropped here too in case a document was fetched without it.
+        return {
+            key: value if isinstance(value, _JSON_NATIVE_TYPES) else _convert_bson_value(value)
+            for key, value in bson_data.items()
+            if key != BSON_OBJECT_ID
+        }
+
+    def _to_json(self, document):
+        """Decode a document read from the collection and convert it to a JSON-serializable dictionary."""
+        if document is not None and self.decode is not None:
+            document = self.decode(document)
+        return self._convert_bson_to_json(document)
+
+    def _update(self, updated_values):
+        if self.versioned:
+            return versioned_update(updated_values)
+        return {MONGODB_SET_OPERATOR: updated_values}
 
-        return json_data
+    async def _changed(self):
+        """Increment the version of a versioned collection after a write that changed it.
 
-    def get(self, query):
-        """Retrieve a single document from the collection based on query."""
+        The write has already been applied, so a failure is logged rather than raised. Until the next write changes the
+        collection, clients may then be told their copy of it is current when it is not.
+        """
+        if not self.versioned:
+            return
+        try:
+            await self.db[MONGODB_COLLECTION_VERSIONS].update_one(
+                {BSON_OBJECT_ID: self.collection_name},
+                {MONGODB_INCREMENT_OPERATOR: {DOCUMENT_FIELD_VERSION: 1}},
+                upsert=True
+            )
+        except Exception:
+            self.logger.exception(f"Could not increment the version of {self.collection_name}")
+
+    async def get_collection_version(self):
+        """Return the version of the collection, 0 if it has never been changed through this class."""
+        document = await self.db[MONGODB_COLLECTION_VERSIONS].find_one({BSON_OBJECT_ID: self.collection_name})
+        return document.get(DOCUMENT_FIELD_VERSION, 0) if document else 0
+
+    async def get(self, query, with_version=False):
+        """Retrieve a single document from the collection based on query, with its version if with_version."""
         self.logger.debug(f"Querying {self.collection_name} with: {query}")
-        result = self.collection.find_one(query)
+        result = await self.collection.find_one(query, self.document_projection if with_version else self.projection)
         
         if result:
-            self.logger.debug(f"Found document in {self.collection_name}: {result.get(BSON_OBJECT_ID, MONGODB_UNKNOWN_ID)}")
+            self.logger.debug(f"Found document in {self.collection_name} matching query: {query}")
         else:
             self.logger.debug(f"No document found in {self.collection_name} matching query: {query}")
             
-        return self._convert_bson_to_json(result)
+        return self._to_json(result)
 
-    def getAll(self):
+    async def getAll(self):
         """Retrieve all documents from the collection."""
         self.logger.debug(f"Retrieving all documents from {self.collection_name}")
-        cursor = self.collection.find()
+        cursor = self.collection.find({}, self.projection)
         collection_documents = []
-        for document in cursor:
-            collection_documents.append(self._convert_bson_to_json(document))
+        async for document in cursor:
+            collection_documents.append(self._to_json(document))
 
         self.logger.info(f"Retrieved {len(collection_documents)} documents from {self.collection_name}")
         return collection_documents
 
-    def create(self, document):
-        """Create a new document in the collection."""
+    async def get_page(self, key_field, limit, after=None):
+        """Retrieve up to limit documents ordered by key_field, starting after the given key value.
+
+        Keyset pagination keeps every page an indexed range scan, unlike skip() which walks all preceding documents.
+        """
+        self.logger.debug(f"Retrieving page of {limit} documents from {self.collection_name} after {key_field}: {after}")
+        query = {key_field: {MONGODB_GREATER_THAN_OPERATOR: after}} if after is not None else {}
+        cursor = self.collection.find(query, self.projection)
+        cursor = cursor.sort(key_field, pymongo.ASCENDING).limit(limit)
+        return [self._to_json(document) async for document in cursor]
+
+    async def find(self, query, sort, limit, hint=None):
+        """Retrieve up to limit documents matching query in the given sort order.
+
+        An index hint makes the query use that index rather than leaving the choice to the planner, and makes it fail
+        rather than scan the collection if the index does not exist.
+        """
+        self.logger.debug(f"Finding up to {limit} documents in {self.collection_name} with: {query}")
+        cursor = self.collection.find(query, self.projection).sort(sort).limit(limit)
+        if hint is not None:
+            cursor = cursor.hint(hint)
+        return [self._to_json(document) async for document in cursor]
+
+    async def find_fields(self, query, fields, sort, limit, hint=None):
+        """Return the given fields, as stored, of up to limit documents matching query in the given sort order. A limit
+        of 0 returns every document matching."""
+        self.logger.debug(f"Finding {fields} of up to {limit} documents in {self.collection_name} with: {query}")
+        projection = {BSON_OBJECT_ID: 0, **{field: 1 for field in fields}}
+        cursor = self.collection.find(query, projection).sort(sort).limit(limit)
+        if hint is not None:
+            cursor = cursor.hint(hint)
+        return [document async for document in cursor]
+
+    async def stream(self, batch_size):
+        """Yield every document in the collection in lists of at most batch_size documents.
+
+        The cursor fetches batch_size documents per round-trip, so memory use is bounded by the batch size rather than
+        the size of the collection.
+        """
+        self.logger.debug(f"Streaming documents from {self.collection_name} in batches of {batch_size}")
+        cursor = self.collection.find({}, self.projection).batch_size(batch_size)
+        batch = []
+        try:
+            async for document in cursor:
+                batch.append(self._to_json(document))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            await cursor.close()
+
+    async def find_existing(self, key_field, values):
+        """Return the set of the given key_field values that some document has, in one round-trip.
+
+        distinct over an $in query on an indexed field is answered from the index without fetching any documents.
+        """
+        values = list(values)
+        self.logger.debug(f"Checking {len(values)} {key_field} values exist in {self.collection_name}")
+        if not values:
+            return set()
+        return set(await self.collection.distinct(key_field, {key_field: {MONGODB_IN_OPERATOR: values}}))
+
+    async def find_keys(self, key_field, query, sort_field, limit):
+        """Return the key_field values of up to limit documents matching query, ordered by sort_field."""
+        self.logger.debug(f"Finding up to {limit} {key_field} values in {self.collection_name} with: {query}")
+        cursor = self.collection.find(query, {BSON_OBJECT_ID: 0, key_field: 1})
+        cursor = cursor.sort(sort_field, pymongo.ASCENDING).limit(limit)
+        return [document[key_field] async for document in cursor]
+
+    async def create(self, document):
+        """Create a new document in the collection, at version 1 if the collection is versioned."""
         self.logger.debug(f"Creating document in {self.collection_name}")
-        result = self.collection.insert_one(document)
+        if self.versioned:
+            document = {**document, DOCUMENT_FIELD_VERSION: 1}
+        result = await self.collection.insert_one(document)
 
         if result.acknowledged:
             self.logger.info(f"Successfully created document in {self.collection_name} with id: {result.inserted_id}")
+            await self._changed()
         else:
             self.logger.error(f"Failed to create document in {self.collection_name}")
             
         return result
 
-    def update(self, query, updated_values):
-        """Update an existing document in the collection."""
-        self.logger.debug(f"Updating document in {self.collection_name} with query: {query}")
-        new_values = {MONGODB_SET_OPERATOR: updated_values}
+    async def bulk_write(self, operations):
+        """Apply write operations as a single unordered bulk write.
+
+        Unordered writes carry on past individual failures, so the outcome of every operation is reported. The
+        operations of a versioned collection should increment the versions of the documents they write, see
+        versioned_update.
 
-        result = self.collection.update_one(query, new_values)
+        Returns:
+            dict: The raw bulk write result, including any per-operation writeErrors
+        """
+        self.logger.debug(f"Bulk writing {len(operations)} operations to {self.collection_name}")
+        try:
+            result = await self.collection.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as error:
+            details = error.details
+
+        if any(details.get(count) for count in MONGODB_BULK_CHANGE_COUNTS):
+            await self._changed()
+        write_errors = details.get(MONGODB_BULK_WRITE_ERRORS, [])
+        if write_errors:
+            self.logger.warning(f"{len(write_errors)} of {len(operations)} bulk operations failed in {self.collection_name}")
+        self.logger.info(f"Bulk wrote {len(operations) - len(write_errors)} document(s) to {self.collection_name}")
+        return details
+
+    async def update(self, query, updated_values):
+        """Update an existing document in the collection, incrementing its version if the collection is versioned."""
+        self.logger.debug(f"Updating document in {self.collection_name} with query: {query}")
+        result = await self.collection.update_one(query, self._update(updated_values))
 
         if result.acknowledged:
             if result.modified_count > 0:
                 self.logger.info(f"Successfully updated {result.modified_count} document(s) in {self.collection_name}")
+                await self._changed()
             else:
                 self.logger.warning(f"Update query matched {result.matched_count} document(s) in {self.collection_name} but no changes were made")
         else:
@@ -89,17 +291,68 @@ class MongoDB:
             
         return result
 
-    def delete(self, query):
+    async def find_one_and_update(self, query, updated_values, with_version=False):
+        """Update a document in the collection and return it as it was before the update, with its version if
+        with_version, or None if none matched.
+
+        The document is read and written in one atomic step, so no other write can come in between.
+        """
+        self.logger.debug(f"Finding and updating document in {self.collection_name} with query: {query}")
+        previous = await self.collection.find_one_and_update(
+            query,
+            self._update(updated_values),
+            self.document_projection if with_version else self.projection,
+            return_document=ReturnDocument.BEFORE
+        )
+
+        if previous is not None:
+            self.logger.info(f"Successfully updated 1 document(s) in {self.collection_name}")
+            await self._changed()
+        else:
+            self.logger.warning(f"No documents found to update in {self.collection_name} matching query: {query}")
+
+        return self._to_json(previous)
+
+    async def update_many(self, query, updated_values):
+        """Update every document in the collection matching query."""
+        self.logger.debug(f"Updating documents in {self.collection_name} with query: {query}")
+        result = await self.collection.update_many(query, self._update(updated_values))
+
+        if result.acknowledged:
+            self.logger.info(f"Updated {result.modified_count} of {result.matched_count} matching document(s) in {self.collection_name}")
+            if result.modified_count > 0:
+                await self._changed()
+        else:
+            self.logger.error(f"Failed to update documents in {self.collection_name}")
+
+        return result
+
+    async def delete(self, query):
         """Delete a document from the collection based on query."""
         self.logger.debug(f"Deleting document from {self.collection_name} with query: {query}")
-        result = self.collection.delete_one(query)
+        result = await self.collection.delete_one(query)
 
         if result.acknowledged:
             if result.deleted_count > 0:
                 self.logger.info(f"Successfully deleted {result.deleted_count} document(s) from {self.collection_name}")
+                await self._changed()
             else:
                 self.logger.warning(f"No documents found to delete in {self.collection_name} matching query: {query}")
         else:
             self.logger.error(f"Failed to delete document from {self.collection_name}")
             
         return result
+
+    async def delete_many(self, query):
+        """Delete every document from the collection matching query."""
+        self.logger.debug(f"Deleting documents from {self.collection_name} with query: {query}")
+        result = await self.collection.delete_many(query)
+
+        if result.acknowledged:
+            self.logger.info(f"Deleted {result.deleted_count} document(s) from {self.collection_name}")
+            if result.deleted_count > 0:
+                await self._changed()
+        else:
+            self.logger.error(f"Failed to delete documents from {self.collection_name}")
+
+        return result
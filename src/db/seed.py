@@ -1,36 +1,169 @@
-import pymongo
+""" Command line tool for populating the database, either with the example data, with a JSON or NDJSON file of any
+size, or with a synthetic dataset:
+
+    python3 -m src.db.seed
+    python3 -m src.db.seed load appointments appointments.ndjson --batch-size 5000
+    python3 -m src.db.seed generate --patients 1000000 --appointments-per-patient 3 --seed 42
+    python3 -m src.db.seed generate --patients 1000000 --output-dir /tmp/panda
+    python3 -m src.db.seed migrate-appointment-times --batch-size 1000 --pause-seconds 0.1
+    python3 -m src.db.seed rebuild-rollups --batch-size 5000
+"""
+import argparse
+import asyncio
 import json
 import os
+
+import pymongo
+
 import constants
+from src.db.indexes import ensure_indexes
+from src.db.loader import iter_json_records, load_records
+from src.db.migrations import migrate_appointment_times
+from src.db.synthetic import generate_patients, generate_appointments
+from src.repository.appointment_storage import to_stored
+from src.repository.mongo.appointment import MongoAppointmentRepository
+from src.repository.mongo.rollup import MongoRollupRepository
+from src.service.rollups import rebuild_rollups
+
 ROOT_PATH = os.path.dirname(os.path.abspath(__file__)) + "/"
 MONGODB_URI = os.environ.get('MONGO_URI', constants.DEFAULT_MONGODB_URI)
 
-client = pymongo.MongoClient(MONGODB_URI)
-mongo_database = client[constants.MONGODB_DATABASE_NAME]
+COLLECTIONS = {
+    'patients': constants.MONGODB_COLLECTION_PATIENTS,
+    'appointments': constants.MONGODB_COLLECTION_APPOINTMENTS,
+}
 
 
-def seed_appointments():
-    """Populate the database with example appointment data."""
-    collection = mongo_database[constants.MONGODB_COLLECTION_APPOINTMENTS]
-    with open(ROOT_PATH + constants.APPOINTMENTS_FILENAME, 'r') as outfile:
-        appointments = json.load(outfile)
+def load_file(mongo_database, collection_name, path, batch_size):
+    """Stream a JSON array or NDJSON file into a collection."""
+    with open(path, 'r', encoding='utf-8') as infile:
+        records = iter_json_records(infile)
+        if collection_name == constants.MONGODB_COLLECTION_APPOINTMENTS:
+            records = map(to_stored, records)
+        stats = load_records(mongo_database[collection_name], records, batch_size)
+    print(f'Loaded {path} into {collection_name} in {stats.seconds:.1f}s')
+    return stats
+
 
-    result = collection.insert_many(appointments)
-    print(result)
+def seed_appointments(mongo_database, batch_size=constants.DEFAULT_LOADER_BATCH_SIZE):
+    """Populate the database with example appointment data."""
+    return load_file(
+        mongo_database,
+        constants.MONGODB_COLLECTION_APPOINTMENTS,
+        ROOT_PATH + constants.APPOINTMENTS_FILENAME,
+        batch_size
+    )
 
 
-def seed_patients():
+def seed_patients(mongo_database, batch_size=constants.DEFAULT_LOADER_BATCH_SIZE):
     """Populate the database with example patient data."""
-    collection = mongo_database[constants.MONGODB_COLLECTION_PATIENTS]
+    return load_file(
+        mongo_database,
+        constants.MONGODB_COLLECTION_PATIENTS,
+        ROOT_PATH + constants.PATIENTS_FILENAME,
+        batch_size
+    )
+
+
+def seed_synthetic(mongo_database, patient_count, appointments_per_patient, seed, batch_size):
+    """Populate the database with a synthetic dataset."""
+    load_records(
+        mongo_database[constants.MONGODB_COLLECTION_PATIENTS],
+        generate_patients(patient_count, seed),
+        batch_size
+    )
+    load_records(
+        mongo_database[constants.MONGODB_COLLECTION_APPOINTMENTS],
+        map(to_stored, generate_appointments(patient_count, appointments_per_patient, seed)),
+        batch_size
+    )
+
+
+def write_synthetic(output_dir, patient_count, appointments_per_patient, seed):
+    """Write a synthetic dataset to NDJSON files that can later be loaded with the load command."""
+    os.makedirs(output_dir, exist_ok=True)
+    datasets = [
+        (constants.SYNTHETIC_PATIENTS_FILENAME, generate_patients(patient_count, seed)),
+        (constants.SYNTHETIC_APPOINTMENTS_FILENAME, generate_appointments(patient_count, appointments_per_patient, seed)),
+    ]
+    for filename, records in datasets:
+        path = os.path.join(output_dir, filename)
+        with open(path, 'w', encoding='utf-8') as outfile:
+            for record in records:
+                outfile.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f'Wrote {path}')
+
+
+async def rebuild_appointment_rollups(batch_size):
+    """Recompute the daily appointment rollups from every appointment, streamed batch_size at a time."""
+    client = pymongo.AsyncMongoClient(MONGODB_URI)
+    try:
+        appointment_count, rollup_count = await rebuild_rollups(
+            MongoAppointmentRepository(client),
+            MongoRollupRepository(client),
+            batch_size
+        )
+    finally:
+        await client.close()
+    print(f'Rebuilt {rollup_count:,} rollups from {appointment_count:,} appointments')
+
+
+def parse_args(argv=None):
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description='Populate the PANDA database.')
+    parser.add_argument('--batch-size', type=int, default=constants.DEFAULT_LOADER_BATCH_SIZE,
+                        help='documents per unordered insert_many')
+    commands = parser.add_subparsers(dest='command')
+
+    load_parser = commands.add_parser('load', help='load a JSON array or NDJSON file')
+    load_parser.add_argument('collection', choices=COLLECTIONS)
+    load_parser.add_argument('path')
+
+    generate_parser = commands.add_parser('generate', help='generate a synthetic dataset')
+    generate_parser.add_argument('--patients', type=int, required=True)
+    generate_parser.add_argument('--appointments-per-patient', type=int,
+                                 default=constants.DEFAULT_SYNTHETIC_APPOINTMENTS_PER_PATIENT)
+    generate_parser.add_argument('--seed', type=int, default=constants.DEFAULT_SYNTHETIC_SEED)
+    generate_parser.add_argument('--output-dir', help='write NDJSON files here instead of inserting into the database')
+
+    migrate_parser = commands.add_parser('migrate-appointment-times',
+                                         help='convert appointments stored with string times to typed times')
+    migrate_parser.add_argument('--pause-seconds', type=float, default=0.0, help='wait between bulk writes')
+
+    commands.add_parser('rebuild-rollups', help='recompute the daily appointment rollups from the appointments')
+
+    return parser.parse_args(argv)
+
 
-    with open(ROOT_PATH + constants.PATIENTS_FILENAME, 'r') as outfile:
-        patients = json.load(outfile)
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'generate' and args.output_dir:
+        write_synthetic(args.output_dir, args.patients, args.appointments_per_patient, args.seed)
+        return
 
-    result = collection.insert_many(patients)
-    print(result)
+    client = pymongo.MongoClient(MONGODB_URI)
+    try:
+        mongo_database = client[constants.MONGODB_DATABASE_NAME]
+        print(ensure_indexes(mongo_database))
+        if args.command == 'load':
+            load_file(mongo_database, COLLECTIONS[args.collection], args.path, args.batch_size)
+        elif args.command == 'migrate-appointment-times':
+            converted, skipped = migrate_appointment_times(
+                mongo_database[constants.MONGODB_COLLECTION_APPOINTMENTS],
+                args.batch_size,
+                args.pause_seconds
+            )
+            print(f'Converted {converted:,} appointments, skipped {skipped:,} with an invalid time or duration')
+        elif args.command == 'rebuild-rollups':
+            asyncio.run(rebuild_appointment_rollups(args.batch_size))
+        elif args.command == 'generate':
+            seed_synthetic(mongo_database, args.patients, args.appointments_per_patient, args.seed, args.batch_size)
+        else:
+            seed_patients(mongo_database, args.batch_size)
+            seed_appointments(mongo_database, args.batch_size)
+    finally:
+        client.close()
 
 
 if __name__ == '__main__':
-    seed_patients()
-    seed_appointments()
-    client.close()
\ No newline at end of file
+    main()
@@ -0,0 +1,116 @@
+""" This module generates deterministic synthetic patients and appointments for capacity testing. Every patient has a
+checksum-valid NHS number and every appointment belongs to a generated patient. The same seed always produces the
+same dataset. """
+import random
+import string
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from constants import (
+    PATIENT_FIELD_NHS_NUMBER,
+    PATIENT_FIELD_NAME,
+    PATIENT_FIELD_DATE_OF_BIRTH,
+    PATIENT_FIELD_POSTCODE,
+    APPOINTMENT_FIELD_PATIENT,
+    APPOINTMENT_FIELD_STATUS,
+    APPOINTMENT_FIELD_TIME,
+    APPOINTMENT_FIELD_DURATION,
+    APPOINTMENT_FIELD_CLINICIAN,
+    APPOINTMENT_FIELD_DEPARTMENT,
+    APPOINTMENT_FIELD_POSTCODE,
+    APPOINTMENT_FIELD_ID,
+    STATUS_ACTIVE,
+    STATUS_ATTENDED,
+    STATUS_CANCELLED,
+    STATUS_MISSED,
+    DATE_FORMAT,
+)
+
+FIRST_NAMES = ['Glenn', 'Bethany', 'Jason', 'Amira', 'Chloé', 'Oluwaseun', 'Siobhán', 'Matthew', 'Priya', 'Zoë']
+LAST_NAMES = ['Clark', 'Rice-Hammond', 'Holloway', 'Puzey', 'Nowak', "O'Connor", 'Okafor', 'Patel', 'Müller', 'Palmer']
+CLINICIANS = [f'{first} {last}' for first in FIRST_NAMES for last in LAST_NAMES[:5]]
+DEPARTMENTS = ['orthopaedics', 'oncology', 'gastroentology', 'paediatrics', 'cardiology', 'neurology']
+DURATIONS = ['15m', '30m', '45m', '1h', '2h']
+STATUSES = [STATUS_ACTIVE, STATUS_ATTENDED, STATUS_MISSED, STATUS_CANCELLED]
+STATUS_WEIGHTS = [40, 35, 15, 10]
+
+_NHS_NUMBER_WEIGHTS = [10, 9, 8, 7, 6, 5, 4, 3, 2]
+_FIRST_NHS_NUMBER_PREFIX = 100_000_000
+_NHS_NUMBER_PREFIX_LIMIT = 1_000_000_000
+_EARLIEST_DATE_OF_BIRTH = date(1920, 1, 1)
+_DATE_OF_BIRTH_RANGE_DAYS = 100 * 365
+_EARLIEST_APPOINTMENT = datetime(2018, 1, 1, 8, tzinfo=timezone.utc)
+_APPOINTMENT_RANGE_DAYS = 8 * 365
+_APPOINTMENT_SLOT_MINUTES = 15
+_APPOINTMENT_SLOTS_PER_DAY = 40
+# Letters allowed in the second position of a postcode area, see UK_POSTCODE_VALIDATION_REGEX
+_POSTCODE_SECOND_LETTERS = 'ABCDEFGHJKLMNOPQRSTUVWXY'
+
+
+def nhs_number_check_digit(prefix):
+    """Return the Modulus 11 check digit for the first nine digits of an NHS number, or None if no digit is valid.
+
+    See validation_utils.validate_nhs_number_checksum for the algorithm.
+    """
+    remainder = sum(int(digit) * weight for digit, weight in zip(prefix, _NHS_NUMBER_WEIGHTS)) % 11
+    check_digit = 11 - remainder
+    if check_digit == 11:
+        return 0
+    if check_digit == 10:
+        return None
+    return check_digit
+
+
+def synthetic_nhs_numbers(count, seed):
+    """Yield count distinct checksum-valid NHS numbers, counting up from a starting point chosen by the seed."""
+    prefix = random.Random(seed).randrange(_FIRST_NHS_NUMBER_PREFIX, _NHS_NUMBER_PREFIX_LIMIT - 2 * count)
+    generated = 0
+    while generated < count:
+        digits = str(prefix)
+        check_digit = nhs_number_check_digit(digits)
+        prefix += 1
+        if check_digit is None:
+            continue
+        generated += 1
+        yield f'{digits}{check_digit}'
+
+
+def synthetic_postcode(rng):
+    """Return a random postcode matching UK_POSTCODE_VALIDATION_REGEX."""
+    area = rng.choice(string.ascii_uppercase) + rng.choice(_POSTCODE_SECOND_LETTERS)
+    return f'{area}{rng.randrange(1, 10)} {rng.randrange(10)}{rng.choice(string.ascii_uppercase)}{rng.choice(string.ascii_uppercase)}'
+
+
+def generate_patients(count, seed):
+    """Yield count synthetic patients."""
+    rng = random.Random(f'{seed}:patients')
+    for nhs_number in synthetic_nhs_numbers(count, seed):
+        date_of_birth = _EARLIEST_DATE_OF_BIRTH + timedelta(days=rng.randrange(_DATE_OF_BIRTH_RANGE_DAYS))
+        yield {
+            PATIENT_FIELD_NHS_NUMBER: nhs_number,
+            PATIENT_FIELD_NAME: f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            PATIENT_FIELD_DATE_OF_BIRTH: date_of_birth.strftime(DATE_FORMAT),
+            PATIENT_FIELD_POSTCODE: synthetic_postcode(rng),
+        }
+
+
+def generate_appointments(patient_count, appointments_per_patient, seed):
+    """Yield appointments_per_patient synthetic appointments for each of the patients generate_patients yields for the
+    same patient_count and seed."""
+    rng = random.Random(f'{seed}:appointments')
+    for nhs_number in synthetic_nhs_numbers(patient_count, seed):
+        for _ in range(appointments_per_patient):
+            slot = timedelta(
+                days=rng.randrange(_APPOINTMENT_RANGE_DAYS),
+                minutes=rng.randrange(_APPOINTMENT_SLOTS_PER_DAY) * _APPOINTMENT_SLOT_MINUTES
+            )
+            yield {
+                APPOINTMENT_FIELD_PATIENT: nhs_number,
+                APPOINTMENT_FIELD_STATUS: rng.choices(STATUSES, STATUS_WEIGHTS)[0],
+                APPOINTMENT_FIELD_TIME: (_EARLIEST_APPOINTMENT + slot).isoformat(),
+                APPOINTMENT_FIELD_DURATION: rng.choice(DURATIONS),
+                APPOINTMENT_FIELD_CLINICIAN: rng.choice(CLINICIANS),
+                APPOINTMENT_FIELD_DEPARTMENT: rng.choice(DEPARTMENTS),
+                APPOINTMENT_FIELD_POSTCODE: synthetic_postcode(rng),
+                APPOINTMENT_FIELD_ID: str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            }
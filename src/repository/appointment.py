@@ -1,12 +1,39 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List, Dict, Any
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
+from src.repository.results import WriteStatus
+from constants import APPOINTMENT_FIELD_PATIENT, APPOINTMENT_FIELD_CLINICIAN, APPOINTMENT_FIELD_DEPARTMENT
+
+
+@dataclass(frozen=True)
+class AppointmentQuery:
+    """Filters for finding appointments, which are returned in time order.
+
+    Appointments are indexed on patient, clinician and department, each followed by time and ID, so a query must filter
+    on at least one of them. The time window includes time_from and excludes time_to.
+    """
+    patient: Optional[str] = None
+    clinician: Optional[str] = None
+    department: Optional[str] = None
+    status: Optional[str] = None
+    time_from: Optional[datetime] = None
+    time_to: Optional[datetime] = None
+    descending: bool = False
+
+    def index_field(self) -> Optional[str]:
+        """Return the field whose index answers the query, the most selective one filtered on, or None if none is."""
+        for field in (APPOINTMENT_FIELD_PATIENT, APPOINTMENT_FIELD_CLINICIAN, APPOINTMENT_FIELD_DEPARTMENT):
+            if getattr(self, field) is not None:
+                return field
+        return None
 
 
 class AppointmentRepository(ABC):
-    """Abstract repository interface for appointment data access operations."""
+    """Abstract asynchronous repository interface for appointment data access operations."""
 
     @abstractmethod
-    def create(self, appointment: Dict[str, Any]) -> bool:
+    async def create(self, appointment: Dict[str, Any]) -> bool:
         """Create a new appointment record.
         
         Args:
@@ -14,23 +41,47 @@ class AppointmentRepository(ABC):
             
         Returns:
             bool: True if creation was successful, False otherwise
+        
+        Raises:
+            DuplicateRecordError: If an appointment with the same ID already exists
         """
         pass
 
     @abstractmethod
-    def get_by_id(self, appointment_id: str) -> Optional[Dict[str, Any]]:
+    async def get_by_id(self, appointment_id: str) -> Optional[Dict[str, Any]]:
         """Get an appointment by ID.
         
         Args:
             appointment_id: The appointment ID
             
         Returns:
-            Appointment data dictionary if found, None otherwise
+            Appointment data dictionary, including its version, if found, None otherwise
+        """
+        pass
+
+    @abstractmethod
+    async def get_collection_version(self) -> int:
+        """Get the version of the appointments collection, which increases with every write that changes it.
+
+        Returns:
+            int: The collection version, 0 if it has never been changed
+        """
+        pass
+
+    @abstractmethod
+    async def get_many(self, appointment_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get many appointments by ID in one round-trip.
+
+        Args:
+            appointment_ids: The appointment IDs
+
+        Returns:
+            Appointment data dictionaries keyed by ID, leaving out IDs no appointment has
         """
         pass
 
     @abstractmethod
-    def update_by_id(self, appointment_id: str, appointment_data: Dict[str, Any]) -> bool:
+    async def update_by_id(self, appointment_id: str, appointment_data: Dict[str, Any]) -> bool:
         """Update an appointment by ID.
         
         Args:
@@ -39,11 +90,34 @@ class AppointmentRepository(ABC):
             
         Returns:
             bool: True if update was successful, False otherwise
+        
+        Raises:
+            DuplicateRecordError: If the update would give the appointment the ID of another appointment
+        """
+        pass
+
+    @abstractmethod
+    async def update_unless_cancelled(self, appointment_id: str, appointment_data: Dict[str, Any],
+                                      version: Optional[int] = None) -> Tuple[WriteStatus, Optional[Dict[str, Any]]]:
+        """Update an appointment by ID unless it is cancelled, checking and writing in one atomic step.
+
+        Args:
+            appointment_id: The appointment ID
+            appointment_data: Updated appointment data
+            version: Optional version the appointment must be at to be updated, for compare-and-set writes
+
+        Returns:
+            tuple: WriteStatus.UPDATED if the appointment was updated, WriteStatus.STALE if it is not at the given
+            version, WriteStatus.CONFLICT if it is cancelled, WriteStatus.NOT_FOUND if there is no appointment with the
+            ID, and the appointment, including its version, as it was before the update, or None if there is none
+
+        Raises:
+            DuplicateRecordError: If the update would give the appointment the ID of another appointment
         """
         pass
 
     @abstractmethod
-    def delete_by_id(self, appointment_id: str) -> bool:
+    async def delete_by_id(self, appointment_id: str) -> bool:
         """Delete an appointment by ID.
         
         Args:
@@ -55,10 +129,142 @@ class AppointmentRepository(ABC):
         pass
 
     @abstractmethod
-    def get_all(self) -> List[Dict[str, Any]]:
+    async def get_all(self) -> List[Dict[str, Any]]:
         """Get all appointments.
         
         Returns:
             List of appointment data dictionaries
         """
-        pass 
\ No newline at end of file
+        pass 
+
+    @abstractmethod
+    async def get_page(self, limit: int, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get a page of appointments ordered by ID.
+
+        Args:
+            limit: Maximum number of appointments to return
+            after: ID of the last appointment on the previous page, None for the first page
+
+        Returns:
+            List of appointment data dictionaries
+        """
+        pass
+
+    @abstractmethod
+    def stream(self, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream every appointment in batches without loading the whole collection into memory.
+
+        Args:
+            batch_size: Number of appointments in each batch
+
+        Returns:
+            Asynchronous iterator of lists of appointment data dictionaries
+        """
+        pass
+
+    @abstractmethod
+    async def upsert_many(self, appointments: List[Dict[str, Any]]) -> List[WriteStatus]:
+        """Create or update many appointments, keyed by ID, in as few round-trips as possible.
+
+        Cancelled appointments are never overwritten and are reported as WriteStatus.CONFLICT. An appointment that
+        cannot be written does not prevent the others being written.
+
+        Args:
+            appointments: Appointment data dictionaries
+
+        Returns:
+            List of WriteStatus, one per appointment in the order given
+        """
+        pass
+
+    @abstractmethod
+    async def mark_missed(self, now: datetime, limit: int) -> List[str]:
+        """Mark active appointments that ended at or before now as missed, earliest ending first.
+
+        Only appointments with a stored end time are considered, found through an index so the work done depends on
+        limit rather than on the size of the collection.
+
+        Args:
+            now: Time appointments must have ended by
+            limit: Maximum number of appointments to mark
+
+        Returns:
+            IDs of the appointments marked missed
+        """
+        pass
+
+    @abstractmethod
+    async def find_overlapping(self, clinician: str, start: datetime, end: datetime,
+                               exclude_id: Optional[str] = None) -> Optional[str]:
+        """Find an appointment of the clinician that is not cancelled and overlaps the time from start to end.
+
+        Every such appointment starting between APPOINTMENT_MAX_DURATION_HOURS before start and end is considered,
+        through the index on clinician and time, so an overlap is found even among appointments that already overlap
+        each other, and the work done depends on how many appointments the clinician has in that range alone. An
+        appointment without an end time is taken to overlap.
+
+        Args:
+            clinician: The clinician
+            start: Start of the time to check
+            end: End of the time to check
+            exclude_id: ID of an appointment to leave out, the one being updated
+
+        Returns:
+            ID of the overlapping appointment, or None if there is none
+        """
+        pass
+
+    @abstractmethod
+    async def find_bookings(self, clinician: str, start: datetime,
+                            end: datetime) -> List[Tuple[datetime, Optional[datetime], str]]:
+        """Return every appointment of the clinician that is not cancelled and starts between
+        APPOINTMENT_MAX_DURATION_HOURS before start and end, so could overlap the time from start to end, in start time
+        order. Only the times and id are read, through the index on clinician and time.
+
+        Args:
+            clinician: The clinician
+            start: Start of the time to cover
+            end: End of the time to cover
+
+        Returns:
+            List of (start, end, id), with UTC datetimes and an end of None when it is not known
+        """
+        pass
+
+    @abstractmethod
+    async def find_busy_times(self, query: AppointmentQuery, limit: int) -> List[Tuple[datetime, datetime]]:
+        """Return the start and end times of the appointments matching a query that are not cancelled, in start time
+        order, reading only those two fields through the index on the query's index_field.
+
+        The query's status and sort order are ignored.
+
+        Args:
+            query: Filters to apply
+            limit: Maximum number of appointments to read
+
+        Returns:
+            List of (start, end) UTC datetimes
+
+        Raises:
+            UnindexedQueryError: If the query filters on none of the indexed fields
+        """
+        pass
+
+    @abstractmethod
+    async def find(self, query: AppointmentQuery, limit: int,
+                   after: Optional[Tuple[datetime, str]] = None) -> List[Dict[str, Any]]:
+        """Find appointments matching a query, ordered by time and then ID, through the index on the query's
+        index_field.
+
+        Args:
+            query: Filters to apply
+            limit: Maximum number of appointments to return
+            after: (time, ID) of the last appointment on the previous page, None for the first page
+
+        Returns:
+            List of appointment data dictionaries
+
+        Raises:
+            UnindexedQueryError: If the query filters on none of the indexed fields
+        """
+        pass
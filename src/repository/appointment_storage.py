@@ -0,0 +1,87 @@
+""" Appointments are stored with typed times so that they can be range queried and sorted with indexes: the time as a
+UTC datetime along with the offset it was given in, the duration as whole minutes, and the end time derived from the
+two. Repositories convert appointment data to this form to write it, and back to the API's string form to return it. """
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from constants import (
+    APPOINTMENT_FIELD_TIME,
+    APPOINTMENT_FIELD_DURATION,
+    APPOINTMENT_FIELD_END_TIME,
+    APPOINTMENT_FIELD_TIME_OFFSET,
+    DURATION_PARTS_REGEX,
+)
+
+_duration_parts = re.compile(DURATION_PARTS_REGEX).fullmatch
+
+
+def parse_duration(duration: Any) -> Optional[timedelta]:
+    """Parse a duration such as "1h", "30m" or "1h30m", returning None if it is not one."""
+    match = _duration_parts(duration) if isinstance(duration, str) and duration else None
+    if match is None:
+        return None
+    hours, minutes = match.groups()
+    return timedelta(hours=int(hours or 0), minutes=int(minutes or 0))
+
+
+def format_duration(minutes: int) -> str:
+    """Format whole minutes as a duration, in hours when they are whole hours, such as "2h" or "90m"."""
+    if minutes and minutes % 60 == 0:
+        return f'{minutes // 60}h'
+    return f'{minutes}m'
+
+
+def parse_time(time: Any) -> Optional[datetime]:
+    """Parse an ISO 8601 datetime, returning None if it is not one."""
+    try:
+        return datetime.fromisoformat(time)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_stored(appointment: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of appointment data in the form it is stored in.
+
+    Only the fields present are converted, so partial updates can be converted too. The end time is set when the data
+    sets both the time and duration. Times without an offset are taken to be UTC. Values that cannot be parsed are left
+    as they are.
+    """
+    stored = dict(appointment)
+    start = parse_time(appointment[APPOINTMENT_FIELD_TIME]) if APPOINTMENT_FIELD_TIME in appointment else None
+    if start is not None:
+        offset = start.utcoffset()
+        stored[APPOINTMENT_FIELD_TIME] = start.astimezone(timezone.utc) if offset is not None else \
+            start.replace(tzinfo=timezone.utc)
+        stored[APPOINTMENT_FIELD_TIME_OFFSET] = int(offset.total_seconds()) // 60 if offset is not None else None
+
+    duration = parse_duration(appointment.get(APPOINTMENT_FIELD_DURATION))
+    if duration is not None:
+        stored[APPOINTMENT_FIELD_DURATION] = int(duration.total_seconds()) // 60
+
+    if start is not None and duration is not None:
+        stored[APPOINTMENT_FIELD_END_TIME] = stored[APPOINTMENT_FIELD_TIME] + duration
+    return stored
+
+
+def from_stored(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a stored appointment back to the form the API returns, in place, and return it.
+
+    Datetimes read from MongoDB are naive UTC. Appointments stored before times were typed are returned as they are.
+    """
+    offset = document.pop(APPOINTMENT_FIELD_TIME_OFFSET, None)
+    document.pop(APPOINTMENT_FIELD_END_TIME, None)
+
+    start = document.get(APPOINTMENT_FIELD_TIME)
+    if isinstance(start, datetime):
+        if offset is None:
+            document[APPOINTMENT_FIELD_TIME] = start.replace(tzinfo=None).isoformat()
+        else:
+            if start.tzinfo is None:
+                start = start.replace(tzinfo=timezone.utc)
+            document[APPOINTMENT_FIELD_TIME] = start.astimezone(timezone(timedelta(minutes=offset))).isoformat()
+
+    duration = document.get(APPOINTMENT_FIELD_DURATION)
+    if isinstance(duration, int):
+        document[APPOINTMENT_FIELD_DURATION] = format_duration(duration)
+    return document
@@ -0,0 +1,132 @@
+from datetime import datetime
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
+from src.repository.appointment import AppointmentRepository, AppointmentQuery
+from src.repository.results import WriteStatus
+from src.repository.caching.lru_cache import LRUCache
+from constants import APPOINTMENT_FIELD_ID
+
+
+class CachingAppointmentRepository(AppointmentRepository):
+    """Read-through caching decorator for any AppointmentRepository.
+
+    Lookups by ID, including misses, are served from a bounded LRU cache with a time-to-live. Every write through this
+    repository invalidates the IDs it touches. Collection reads are passed straight through.
+    """
+
+    def __init__(self, repository: AppointmentRepository, cache: LRUCache):
+        """Initialize the decorator.
+
+        Args:
+            repository: Repository that owns the data
+            cache: Cache of appointments keyed by ID
+        """
+        self.repository = repository
+        self.cache = cache
+
+    def invalidate(self, appointment_id: str):
+        """Drop an appointment from the cache."""
+        self.cache.invalidate(appointment_id)
+
+    def invalidate_all(self):
+        """Drop every appointment from the cache."""
+        self.cache.clear()
+
+    async def create(self, appointment: Dict[str, Any]) -> bool:
+        """Create a new appointment record, invalidating any cached miss for it."""
+        try:
+            return await self.repository.create(appointment)
+        finally:
+            self.invalidate(appointment.get(APPOINTMENT_FIELD_ID))
+
+    async def get_by_id(self, appointment_id: str) -> Optional[Dict[str, Any]]:
+        """Get an appointment by ID, from the cache when possible."""
+        found, appointment = self.cache.get(appointment_id)
+        if not found:
+            generation = self.cache.generation
+            appointment = await self.repository.get_by_id(appointment_id)
+            self.cache.put(appointment_id, appointment, generation)
+        # Callers must not be able to mutate the cached appointment
+        return dict(appointment) if appointment is not None else None
+
+    async def get_collection_version(self) -> int:
+        """Get the version of the appointments collection, never from the cache."""
+        return await self.repository.get_collection_version()
+
+    async def get_many(self, appointment_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get many appointments by ID, from the repository so they are current for the write that follows."""
+        return await self.repository.get_many(appointment_ids)
+
+    async def update_by_id(self, appointment_id: str, appointment_data: Dict[str, Any]) -> bool:
+        """Update an appointment by ID, invalidating the old and any new ID."""
+        try:
+            return await self.repository.update_by_id(appointment_id, appointment_data)
+        finally:
+            self.invalidate(appointment_id)
+            if appointment_data.get(APPOINTMENT_FIELD_ID, appointment_id) != appointment_id:
+                self.invalidate(appointment_data[APPOINTMENT_FIELD_ID])
+
+    async def update_unless_cancelled(self, appointment_id: str, appointment_data: Dict[str, Any],
+                                      version: Optional[int] = None) -> Tuple[WriteStatus, Optional[Dict[str, Any]]]:
+        """Update an appointment by ID unless it is cancelled or not at the given version, invalidating the old and any
+        new ID."""
+        try:
+            return await self.repository.update_unless_cancelled(appointment_id, appointment_data, version)
+        finally:
+            self.invalidate(appointment_id)
+            if appointment_data.get(APPOINTMENT_FIELD_ID, appointment_id) != appointment_id:
+                self.invalidate(appointment_data[APPOINTMENT_FIELD_ID])
+
+    async def delete_by_id(self, appointment_id: str) -> bool:
+        """Delete an appointment by ID, invalidating it."""
+        try:
+            return await self.repository.delete_by_id(appointment_id)
+        finally:
+            self.invalidate(appointment_id)
+
+    async def get_all(self) -> List[Dict[str, Any]]:
+        """Get all appointments."""
+        return await self.repository.get_all()
+
+    async def get_page(self, limit: int, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get a page of appointments ordered by ID."""
+        return await self.repository.get_page(limit, after)
+
+    async def find_overlapping(self, clinician: str, start: datetime, end: datetime,
+                               exclude_id: Optional[str] = None) -> Optional[str]:
+        """Find an appointment of the clinician that is not cancelled and overlaps the time from start to end."""
+        return await self.repository.find_overlapping(clinician, start, end, exclude_id)
+
+    async def find_bookings(self, clinician: str, start: datetime,
+                            end: datetime) -> List[Tuple[datetime, Optional[datetime], str]]:
+        """Return every appointment of the clinician that is not cancelled and could overlap the time from start to
+        end."""
+        return await self.repository.find_bookings(clinician, start, end)
+
+    async def find_busy_times(self, query: AppointmentQuery, limit: int) -> List[Tuple[datetime, datetime]]:
+        """Return the start and end times of the appointments matching a query that are not cancelled."""
+        return await self.repository.find_busy_times(query, limit)
+
+    async def find(self, query: AppointmentQuery, limit: int,
+                   after: Optional[Tuple[datetime, str]] = None) -> List[Dict[str, Any]]:
+        """Find appointments matching a query, ordered by time and then ID."""
+        return await self.repository.find(query, limit, after)
+
+    async def stream(self, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream every appointment in batches."""
+        async for batch in self.repository.stream(batch_size):
+            yield batch
+
+    async def upsert_many(self, appointments: List[Dict[str, Any]]) -> List[WriteStatus]:
+        """Create or update many appointments, invalidating each of them."""
+        try:
+            return await self.repository.upsert_many(appointments)
+        finally:
+            for appointment in appointments:
+                self.invalidate(appointment.get(APPOINTMENT_FIELD_ID))
+
+    async def mark_missed(self, now: datetime, limit: int) -> List[str]:
+        """Mark appointments that have ended as missed, invalidating each of them."""
+        appointment_ids = await self.repository.mark_missed(now, limit)
+        for appointment_id in appointment_ids:
+            self.invalidate(appointment_id)
+        return appointment_ids
@@ -0,0 +1,55 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """Fixed-size probabilistic set of strings.
+
+    Membership tests never give false negatives. False positives happen at about error_rate once capacity items have
+    been added, and more often beyond that. Items cannot be removed. The filter is not locked, it relies on being used
+    from a single IOLoop thread.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        """Initialize an empty filter sized for capacity items at the given false positive rate.
+
+        Args:
+            capacity: Number of items the filter is sized for
+            error_rate: False positive rate once capacity items have been added, between 0 and 1
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bit_count = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self._bits = bytearray((self.bit_count + 7) // 8)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, item: str):
+        """Add an item to the filter."""
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def clear(self):
+        """Remove every item from the filter."""
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Double hashing: the two halves of one digest generate all hash_count bit positions
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        bit_count = self.bit_count
+        return [(first + index * second) % bit_count for index in range(self.hash_count)]
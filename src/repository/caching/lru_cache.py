@@ -0,0 +1,93 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """Bounded least-recently-used cache whose entries expire after a time-to-live.
+
+    None is a valid cached value, which lets repositories cache misses (negative caching). The cache is not locked, it
+    relies on being used from a single IOLoop thread.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock=time.monotonic):
+        """Initialize an empty cache.
+
+        Args:
+            max_entries: Maximum number of entries held before the least recently used is evicted
+            ttl_seconds: Seconds an entry stays valid after it is stored
+            clock: Monotonic time source, injectable for tests
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict = OrderedDict()
+        # Bumped on every invalidation so a read that raced with a write does not store what it read
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Look up a key.
+
+        Returns:
+            tuple: (True, cached value) on a hit, (False, None) on a miss or an expired entry
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return False, None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, value
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        """Store a value, evicting the least recently used entries if the cache is full.
+
+        Args:
+            key: Cache key
+            value: Value to cache, None caches a miss
+            generation: The cache generation read before the value was fetched. If there has been an invalidation
+                since, the value may be stale and is not stored.
+        """
+        if generation is not None and generation != self.generation:
+            return
+
+        self._entries[key] = (self._clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Drop a key so the next read goes to the underlying repository."""
+        self.generation += 1
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        self.generation += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the cache counters."""
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
@@ -0,0 +1,103 @@
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterable, Set, Tuple
+from src.repository.patient import PatientRepository
+from src.repository.results import WriteStatus
+from src.repository.caching.lru_cache import LRUCache
+from constants import PATIENT_FIELD_NHS_NUMBER
+
+
+class CachingPatientRepository(PatientRepository):
+    """Read-through caching decorator for any PatientRepository.
+
+    Lookups by NHS number, including misses, are served from a bounded LRU cache with a time-to-live. Every write
+    through this repository invalidates the NHS numbers it touches. Collection reads are passed straight through.
+    """
+
+    def __init__(self, repository: PatientRepository, cache: LRUCache):
+        """Initialize the decorator.
+
+        Args:
+            repository: Repository that owns the data
+            cache: Cache of patients keyed by NHS number
+        """
+        self.repository = repository
+        self.cache = cache
+
+    def invalidate(self, nhs_number: str):
+        """Drop a patient from the cache."""
+        self.cache.invalidate(nhs_number)
+
+    def invalidate_all(self):
+        """Drop every patient from the cache."""
+        self.cache.clear()
+
+    async def create(self, patient: Dict[str, Any]) -> bool:
+        """Create a new patient record, invalidating any cached miss for it."""
+        try:
+            return await self.repository.create(patient)
+        finally:
+            self.invalidate(patient.get(PATIENT_FIELD_NHS_NUMBER))
+
+    async def get_by_nhs_number(self, nhs_number: str) -> Optional[Dict[str, Any]]:
+        """Get a patient by NHS number, from the cache when possible."""
+        found, patient = self.cache.get(nhs_number)
+        if not found:
+            generation = self.cache.generation
+            patient = await self.repository.get_by_nhs_number(nhs_number)
+            self.cache.put(nhs_number, patient, generation)
+        # Callers must not be able to mutate the cached patient
+        return dict(patient) if patient is not None else None
+
+    async def get_collection_version(self) -> int:
+        """Get the version of the patients collection, never from the cache."""
+        return await self.repository.get_collection_version()
+
+    async def update_by_nhs_number(self, nhs_number: str, patient_data: Dict[str, Any]) -> bool:
+        """Update a patient by NHS number, invalidating the old and any new NHS number."""
+        try:
+            return await self.repository.update_by_nhs_number(nhs_number, patient_data)
+        finally:
+            self.invalidate(nhs_number)
+            if patient_data.get(PATIENT_FIELD_NHS_NUMBER, nhs_number) != nhs_number:
+                self.invalidate(patient_data[PATIENT_FIELD_NHS_NUMBER])
+
+    async def update_at_version(self, nhs_number: str, patient_data: Dict[str, Any],
+                                version: Optional[int]) -> Tuple[WriteStatus, Optional[int]]:
+        """Update a patient by NHS number if it is at the given version, invalidating the old and any new NHS number."""
+        try:
+            return await self.repository.update_at_version(nhs_number, patient_data, version)
+        finally:
+            self.invalidate(nhs_number)
+            if patient_data.get(PATIENT_FIELD_NHS_NUMBER, nhs_number) != nhs_number:
+                self.invalidate(patient_data[PATIENT_FIELD_NHS_NUMBER])
+
+    async def delete_by_nhs_number(self, nhs_number: str) -> bool:
+        """Delete a patient by NHS number, invalidating it."""
+        try:
+            return await self.repository.delete_by_nhs_number(nhs_number)
+        finally:
+            self.invalidate(nhs_number)
+
+    async def get_all(self) -> List[Dict[str, Any]]:
+        """Get all patients."""
+        return await self.repository.get_all()
+
+    async def get_page(self, limit: int, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get a page of patients ordered by NHS number."""
+        return await self.repository.get_page(limit, after)
+
+    async def stream(self, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream every patient in batches."""
+        async for batch in self.repository.stream(batch_size):
+            yield batch
+
+    async def existing_nhs_numbers(self, nhs_numbers: Iterable[str]) -> Set[str]:
+        """Find which of the given NHS numbers belong to a patient."""
+        return await self.repository.existing_nhs_numbers(nhs_numbers)
+
+    async def upsert_many(self, patients: List[Dict[str, Any]]) -> List[WriteStatus]:
+        """Create or update many patients, invalidating each of them."""
+        try:
+            return await self.repository.upsert_many(patients)
+        finally:
+            for patient in patients:
+                self.invalidate(patient.get(PATIENT_FIELD_NHS_NUMBER))
@@ -0,0 +1,153 @@
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterable, Set, Tuple
+from src.repository.patient import PatientRepository
+from src.repository.results import WriteStatus
+from src.repository.caching.bloom_filter import BloomFilter
+from constants import PATIENT_FIELD_NHS_NUMBER, STREAM_BATCH_SIZE
+
+
+class BloomFilterPatientRepository(PatientRepository):
+    """Decorator answering patient existence checks from an in-process Bloom filter for any PatientRepository.
+
+    NHS numbers in the filter are taken to belong to a patient without a database round-trip. Only the others are
+    looked up, and those found are added. The filter is loaded with every NHS number by load() and learns of every
+    patient written through this repository. Patients deleted through this repository are remembered so they are no
+    longer taken to exist. Writes made by other processes are followed through invalidate() and invalidate_all(), fed
+    from the patients change stream, otherwise a patient deleted by another process, like a false positive, is taken
+    to exist until the filter is next loaded. All other operations are passed straight through.
+    """
+
+    def __init__(self, repository: PatientRepository, bloom_filter: BloomFilter):
+        """Initialize the decorator.
+
+        Args:
+            repository: Repository that owns the data
+            bloom_filter: Filter of NHS numbers known to belong to a patient
+        """
+        self.repository = repository
+        self.bloom_filter = bloom_filter
+        self._deleted: Set[str] = set()
+        # Deletes made while a load is running, which the loaded filter may still hold
+        self._deleted_while_loading: Optional[Set[str]] = None
+        # Bumped by invalidate_all(), so a load that was running then is not swapped in
+        self._generation = 0
+
+    async def load(self) -> int:
+        """Fill a new filter with the NHS number of every patient and swap it in, returning how many were added.
+
+        The current filter answers existence checks until the load completes. A load overtaken by invalidate_all()
+        is discarded, as it may hold patients deleted since it started.
+        """
+        generation = self._generation
+        bloom_filter = BloomFilter(self.bloom_filter.capacity, self.bloom_filter.error_rate)
+        deleted = self._deleted_while_loading = set()
+        try:
+            async for batch in self.repository.stream(STREAM_BATCH_SIZE):
+                for patient in batch:
+                    bloom_filter.add(patient[PATIENT_FIELD_NHS_NUMBER])
+        finally:
+            if self._deleted_while_loading is deleted:
+                self._deleted_while_loading = None
+        if generation == self._generation:
+            self.bloom_filter = bloom_filter
+            self._deleted = deleted
+        return len(bloom_filter)
+
+    def invalidate(self, nhs_number: str):
+        """Stop taking a patient another process may have deleted to exist, until it is looked up again."""
+        self._forget(nhs_number)
+
+    def invalidate_all(self):
+        """Stop taking any patient to exist until it is looked up again, when writes by another process are unknown."""
+        self.bloom_filter.clear()
+        self._deleted.clear()
+        self._generation += 1
+
+    def _remember(self, nhs_number: str):
+        self.bloom_filter.add(nhs_number)
+        self._deleted.discard(nhs_number)
+        if self._deleted_while_loading is not None:
+            self._deleted_while_loading.discard(nhs_number)
+
+    def _forget(self, nhs_number: str):
+        self._deleted.add(nhs_number)
+        if self._deleted_while_loading is not None:
+            self._deleted_while_loading.add(nhs_number)
+
+    async def existing_nhs_numbers(self, nhs_numbers: Iterable[str]) -> Set[str]:
+        """Find which of the given NHS numbers belong to a patient, only looking up those not in the filter."""
+        known = set()
+        unknown = set()
+        for nhs_number in nhs_numbers:
+            if nhs_number in self.bloom_filter and nhs_number not in self._deleted:
+                known.add(nhs_number)
+            else:
+                unknown.add(nhs_number)
+        if unknown:
+            found = await self.repository.existing_nhs_numbers(unknown)
+            for nhs_number in found:
+                self._remember(nhs_number)
+            known |= found
+        return known
+
+    async def create(self, patient: Dict[str, Any]) -> bool:
+        """Create a new patient record, adding it to the filter."""
+        success = await self.repository.create(patient)
+        if success:
+            self._remember(patient[PATIENT_FIELD_NHS_NUMBER])
+        return success
+
+    async def get_by_nhs_number(self, nhs_number: str) -> Optional[Dict[str, Any]]:
+        """Get a patient by NHS number."""
+        return await self.repository.get_by_nhs_number(nhs_number)
+
+    async def get_collection_version(self) -> int:
+        """Get the version of the patients collection."""
+        return await self.repository.get_collection_version()
+
+    async def update_by_nhs_number(self, nhs_number: str, patient_data: Dict[str, Any]) -> bool:
+        """Update a patient by NHS number, following any change of NHS number in the filter.
+
+        An accepted write does not mean a patient matched, so the update is made through update_at_version, which
+        tells the two apart, and the filter only follows it when a patient was updated.
+        """
+        status, _ = await self.update_at_version(nhs_number, patient_data, None)
+        return status in (WriteStatus.UPDATED, WriteStatus.NOT_FOUND)
+
+    async def update_at_version(self, nhs_number: str, patient_data: Dict[str, Any],
+                                version: Optional[int]) -> Tuple[WriteStatus, Optional[int]]:
+        """Update a patient by NHS number if it is at the given version, following any change of NHS number in the
+        filter."""
+        status, new_version = await self.repository.update_at_version(nhs_number, patient_data, version)
+        new_nhs_number = patient_data.get(PATIENT_FIELD_NHS_NUMBER, nhs_number)
+        if status == WriteStatus.UPDATED and new_nhs_number != nhs_number:
+            self._forget(nhs_number)
+            self._remember(new_nhs_number)
+        return status, new_version
+
+    async def delete_by_nhs_number(self, nhs_number: str) -> bool:
+        """Delete a patient by NHS number, no longer taking it to exist."""
+        try:
+            return await self.repository.delete_by_nhs_number(nhs_number)
+        finally:
+            self._forget(nhs_number)
+
+    async def get_all(self) -> List[Dict[str, Any]]:
+        """Get all patients."""
+        return await self.repository.get_all()
+
+    async def get_page(self, limit: int, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get a page of patients ordered by NHS number."""
+        return await self.repository.get_page(limit, after)
+
+    async def stream(self, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream every patient in batches."""
+        async for batch in self.repository.stream(batch_size):
+            yield batch
+
+    async def upsert_many(self, patients: List[Dict[str, Any]]) -> List[WriteStatus]:
+        """Create or update many patients, adding those written to the filter."""
+        statuses = await self.repository.upsert_many(patients)
+        for patient, status in zip(patients, statuses):
+            if status in (WriteStatus.CREATED, WriteStatus.UPDATED):
+                self._remember(patient[PATIENT_FIELD_NHS_NUMBER])
+        return statuses
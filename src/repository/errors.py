@@ -0,0 +1,6 @@
+class DuplicateRecordError(Exception):
+    """Raised by a repository when a write would duplicate the unique key of an existing record."""
+
+
+class UnindexedQueryError(Exception):
+    """Raised by a repository when a query has no index to support it and would have to scan the collection."""
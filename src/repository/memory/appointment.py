@@ -0,0 +1,232 @@
+import dataclasses
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
+from src.repository.appointment import AppointmentRepository, AppointmentQuery
+from src.repository.errors import UnindexedQueryError
+from src.repository.results import WriteStatus
+from src.repository.appointment_storage import to_stored, from_stored
+from src.db.memory import MemoryDatabase
+from constants import (
+    MONGODB_COLLECTION_APPOINTMENTS,
+    DOCUMENT_FIELD_VERSION,
+    APPOINTMENT_FIELD_ID,
+    APPOINTMENT_FIELD_PATIENT,
+    APPOINTMENT_FIELD_CLINICIAN,
+    APPOINTMENT_FIELD_DEPARTMENT,
+    APPOINTMENT_FIELD_STATUS,
+    APPOINTMENT_FIELD_TIME,
+    APPOINTMENT_FIELD_DURATION,
+    APPOINTMENT_FIELD_END_TIME,
+    STATUS_ACTIVE,
+    STATUS_CANCELLED,
+    STATUS_MISSED,
+    APPOINTMENT_MAX_DURATION_HOURS,
+)
+
+
+def _is_not_cancelled(appointment: Dict[str, Any]) -> bool:
+    return appointment.get(APPOINTMENT_FIELD_STATUS) != STATUS_CANCELLED
+
+
+def _is_active(appointment: Dict[str, Any]) -> bool:
+    return appointment.get(APPOINTMENT_FIELD_STATUS) == STATUS_ACTIVE
+
+
+def _end_time(appointment: Dict[str, Any]) -> Optional[datetime]:
+    # The copies the collection returns leave out the stored end time, so it is worked out again
+    if not isinstance(appointment.get(APPOINTMENT_FIELD_DURATION), int):
+        return None
+    return appointment[APPOINTMENT_FIELD_TIME] + timedelta(minutes=appointment[APPOINTMENT_FIELD_DURATION])
+
+
+def _other_filters(query: AppointmentQuery, index_field: str) -> List[Tuple[str, Any]]:
+    """Return the equality filters of a query that its index does not answer."""
+    return [
+        (field, value)
+        for field, value in (
+            (APPOINTMENT_FIELD_PATIENT, query.patient),
+            (APPOINTMENT_FIELD_CLINICIAN, query.clinician),
+            (APPOINTMENT_FIELD_DEPARTMENT, query.department),
+            (APPOINTMENT_FIELD_STATUS, query.status),
+        )
+        if value is not None and field != index_field
+    ]
+
+
+class MemoryAppointmentRepository(AppointmentRepository):
+    """In-memory implementation of the AppointmentRepository interface.
+
+    Appointments are stored in the same typed form as in MongoDB, see appointment_storage.
+    """
+
+    def __init__(self, memory_database: MemoryDatabase):
+        """Initialize the repository with an in-memory database.
+
+        Args:
+            memory_database: MemoryDatabase instance
+        """
+        self.collection = memory_database[MONGODB_COLLECTION_APPOINTMENTS]
+
+    async def create(self, appointment: Dict[str, Any]) -> bool:
+        """Create a new appointment record."""
+        self.collection.insert(to_stored(appointment))
+        return True
+
+    async def get_by_id(self, appointment_id: str) -> Optional[Dict[str, Any]]:
+        """Get an appointment by ID, with its version."""
+        appointment = self.collection.get(appointment_id, with_version=True)
+        return from_stored(appointment) if appointment is not None else None
+
+    async def get_collection_version(self) -> int:
+        """Get the version of the appointments collection."""
+        return self.collection.version
+
+    async def get_many(self, appointment_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get many appointments by ID."""
+        appointments = {}
+        for appointment_id in appointment_ids:
+            appointment = self.collection.get(appointment_id)
+            if appointment is not None:
+                appointments[appointment_id] = from_stored(appointment)
+        return appointments
+
+    async def update_by_id(self, appointment_id: str, appointment_data: Dict[str, Any]) -> bool:
+        """Update an appointment by ID.
+
+        Like the MongoDB repository this reports an accepted write whether or not an appointment matched.
+        """
+        self.collection.update(appointment_id, to_stored(appointment_data))
+        return True
+
+    async def update_unless_cancelled(self, appointment_id: str, appointment_data: Dict[str, Any],
+                                      version: Optional[int] = None) -> Tuple[WriteStatus, Optional[Dict[str, Any]]]:
+        """Update an appointment by ID unless it is cancelled, or unless it is not at the given version.
+
+        Nothing is awaited between reading the appointment and writing it, so no other request can write in between.
+        """
+        previous = self.collection.get(appointment_id, with_version=True)
+        if previous is not None and version is not None and previous.get(DOCUMENT_FIELD_VERSION, 0) != version:
+            return WriteStatus.STALE, from_stored(previous)
+        status = self.collection.update(appointment_id, to_stored(appointment_data), _is_not_cancelled)
+        return status, from_stored(previous) if previous is not None else None
+
+    async def delete_by_id(self, appointment_id: str) -> bool:
+        """Delete an appointment by ID."""
+        return self.collection.delete(appointment_id)
+
+    async def get_all(self) -> List[Dict[str, Any]]:
+        """Get all appointments."""
+        return [from_stored(appointment) for appointment in self.collection.all()]
+
+    async def get_page(self, limit: int, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get a page of appointments ordered by ID."""
+        return [from_stored(appointment) for appointment in self.collection.page(limit, after)]
+
+    async def find_overlapping(self, clinician: str, start: datetime, end: datetime,
+                               exclude_id: Optional[str] = None) -> Optional[str]:
+        """Find an appointment of the clinician that is not cancelled and overlaps the time from start to end.
+
+        The sorted index on clinician and time is read backwards from end, no further than the longest an appointment
+        can last before start, for the first appointment that is not cancelled and ends after start, or has no end time.
+        """
+        def matches(appointment: Dict[str, Any]) -> bool:
+            end_time = appointment.get(APPOINTMENT_FIELD_END_TIME)
+            return (
+                _is_not_cancelled(appointment)
+                and appointment.get(APPOINTMENT_FIELD_ID) != exclude_id
+                and (end_time is None or end_time > start)
+            )
+
+        overlapping = self.collection.scan(
+            (APPOINTMENT_FIELD_CLINICIAN, APPOINTMENT_FIELD_TIME), (clinician,),
+            start - timedelta(hours=APPOINTMENT_MAX_DURATION_HOURS), end, 1, reverse=True, matches=matches
+        )
+        return overlapping[0][APPOINTMENT_FIELD_ID] if overlapping else None
+
+    async def find(self, query: AppointmentQuery, limit: int,
+                   after: Optional[Tuple[datetime, str]] = None) -> List[Dict[str, Any]]:
+        """Find appointments matching a query, ordered by time and then ID.
+
+        The time window is read from the sorted index on the query's index_field and time, and the other filters are
+        checked against each appointment in it.
+        """
+        index_field = query.index_field()
+        if index_field is None:
+            raise UnindexedQueryError(query)
+
+        index_value = getattr(query, index_field)
+        other_filters = _other_filters(query, index_field)
+
+        def matches(appointment: Dict[str, Any]) -> bool:
+            return all(appointment.get(field) == value for field, value in other_filters)
+
+        appointments = self.collection.scan(
+            (index_field, APPOINTMENT_FIELD_TIME),
+            (index_value,),
+            query.time_from,
+            query.time_to,
+            limit,
+            ((index_value, after[0]), after[1]) if after is not None else None,
+            query.descending,
+            matches if other_filters else None
+        )
+        return [from_stored(appointment) for appointment in appointments]
+
+    async def find_bookings(self, clinician: str, start: datetime,
+                            end: datetime) -> List[Tuple[datetime, Optional[datetime], str]]:
+        """Return every appointment of the clinician that is not cancelled and could overlap the time from start to
+        end, in start time order, read from the sorted index on clinician and time."""
+        appointments = self.collection.scan(
+            (APPOINTMENT_FIELD_CLINICIAN, APPOINTMENT_FIELD_TIME), (clinician,),
+            start - timedelta(hours=APPOINTMENT_MAX_DURATION_HOURS), end, len(self.collection),
+            matches=_is_not_cancelled
+        )
+        return [
+            (appointment[APPOINTMENT_FIELD_TIME], _end_time(appointment), appointment[APPOINTMENT_FIELD_ID])
+            for appointment in appointments
+        ]
+
+    async def find_busy_times(self, query: AppointmentQuery, limit: int) -> List[Tuple[datetime, datetime]]:
+        """Return the start and end times of the appointments matching a query that are not cancelled, in start time
+        order, read from the sorted index on the query's index_field and time."""
+        index_field = query.index_field()
+        if index_field is None:
+            raise UnindexedQueryError(query)
+
+        other_filters = _other_filters(dataclasses.replace(query, status=None), index_field)
+
+        def matches(appointment: Dict[str, Any]) -> bool:
+            return _is_not_cancelled(appointment) and \
+                all(appointment.get(field) == value for field, value in other_filters)
+
+        appointments = self.collection.scan(
+            (index_field, APPOINTMENT_FIELD_TIME), (getattr(query, index_field),), query.time_from, query.time_to, limit,
+            matches=matches
+        )
+        busy_times = []
+        for appointment in appointments:
+            end_time = _end_time(appointment)
+            if end_time is not None:
+                busy_times.append((appointment[APPOINTMENT_FIELD_TIME], end_time))
+        return busy_times
+
+    async def stream(self, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream every appointment in batches."""
+        for batch in self.collection.batches(batch_size):
+            yield [from_stored(appointment) for appointment in batch]
+
+    async def upsert_many(self, appointments: List[Dict[str, Any]]) -> List[WriteStatus]:
+        """Create or update many appointments, leaving cancelled appointments alone as conflicts."""
+        return [self.collection.upsert(to_stored(appointment), _is_not_cancelled) for appointment in appointments]
+
+    async def mark_missed(self, now: datetime, limit: int) -> List[str]:
+        """Mark active appointments that ended at or before now as missed, earliest ending first.
+
+        The due appointments are read from the sorted index on end_time, which only holds active appointments.
+        """
+        missed_appointment = {APPOINTMENT_FIELD_STATUS: STATUS_MISSED}
+        return [
+            appointment_id
+            for appointment_id in self.collection.range_keys(APPOINTMENT_FIELD_END_TIME, now, limit)
+            if self.collection.update(appointment_id, missed_appointment, _is_active) == WriteStatus.UPDATED
+        ]
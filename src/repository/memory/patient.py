@@ -0,0 +1,79 @@
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterable, Set, Tuple
+from src.repository.patient import PatientRepository
+from src.repository.results import WriteStatus
+from src.db.memory import MemoryDatabase
+from constants import MONGODB_COLLECTION_PATIENTS, DOCUMENT_FIELD_VERSION
+
+
+class MemoryPatientRepository(PatientRepository):
+    """In-memory implementation of the PatientRepository interface."""
+
+    def __init__(self, memory_database: MemoryDatabase):
+        """Initialize the repository with an in-memory database.
+
+        Args:
+            memory_database: MemoryDatabase instance
+        """
+        self.collection = memory_database[MONGODB_COLLECTION_PATIENTS]
+
+    async def create(self, patient: Dict[str, Any]) -> bool:
+        """Create a new patient record."""
+        self.collection.insert(patient)
+        return True
+
+    async def get_by_nhs_number(self, nhs_number: str) -> Optional[Dict[str, Any]]:
+        """Get a patient by NHS number, with its version."""
+        return self.collection.get(nhs_number, with_version=True)
+
+    async def get_collection_version(self) -> int:
+        """Get the version of the patients collection."""
+        return self.collection.version
+
+    async def update_by_nhs_number(self, nhs_number: str, patient_data: Dict[str, Any]) -> bool:
+        """Update a patient by NHS number.
+
+        Like the MongoDB repository this reports an accepted write whether or not a patient matched.
+        """
+        self.collection.update(nhs_number, patient_data)
+        return True
+
+    async def update_at_version(self, nhs_number: str, patient_data: Dict[str, Any],
+                                version: Optional[int]) -> Tuple[WriteStatus, Optional[int]]:
+        """Update a patient by NHS number only if it is at the given version.
+
+        Nothing is awaited between reading the patient's version and writing it, so no other request can write in
+        between.
+        """
+        previous = self.collection.get(nhs_number, with_version=True)
+        if previous is None:
+            return WriteStatus.NOT_FOUND, None
+        previous_version = previous.get(DOCUMENT_FIELD_VERSION, 0)
+        if version is not None and previous_version != version:
+            return WriteStatus.STALE, None
+        self.collection.update(nhs_number, patient_data)
+        return WriteStatus.UPDATED, previous_version + 1
+
+    async def delete_by_nhs_number(self, nhs_number: str) -> bool:
+        """Delete a patient by NHS number."""
+        return self.collection.delete(nhs_number)
+
+    async def get_all(self) -> List[Dict[str, Any]]:
+        """Get all patients."""
+        return self.collection.all()
+
+    async def get_page(self, limit: int, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get a page of patients ordered by NHS number."""
+        return self.collection.page(limit, after)
+
+    async def stream(self, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream every patient in batches."""
+        for batch in self.collection.batches(batch_size):
+            yield batch
+
+    async def existing_nhs_numbers(self, nhs_numbers: Iterable[str]) -> Set[str]:
+        """Find which of the given NHS numbers belong to a patient."""
+        return self.collection.existing(nhs_numbers)
+
+    async def upsert_many(self, patients: List[Dict[str, Any]]) -> List[WriteStatus]:
+        """Create or update many patients."""
+        return [self.collection.upsert(patient) for patient in patients]
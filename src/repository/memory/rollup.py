@@ -0,0 +1,65 @@
+import json
+from datetime import date, timedelta
+from typing import List, Dict, Any
+from src.repository.rollup import RollupRepository, RollupKey
+from src.db.memory import MemoryDatabase
+from constants import (
+    MONGODB_COLLECTION_APPOINTMENT_ROLLUPS,
+    ROLLUP_FIELD_ID,
+    ROLLUP_FIELD_DIMENSION,
+    ROLLUP_FIELD_KEY,
+    ROLLUP_FIELD_DAY,
+)
+
+
+def _rollup_id(rollup_key: RollupKey) -> str:
+    # Stored as a string so it survives a round-trip through a JSON snapshot
+    return json.dumps(rollup_key)
+
+
+def _rollup_document(rollup_key: RollupKey, counters: Dict[str, int]) -> Dict[str, Any]:
+    dimension, key, day = rollup_key
+    return {
+        ROLLUP_FIELD_ID: _rollup_id(rollup_key),
+        ROLLUP_FIELD_DIMENSION: dimension,
+        ROLLUP_FIELD_KEY: key,
+        ROLLUP_FIELD_DAY: day,
+        **counters
+    }
+
+
+class MemoryRollupRepository(RollupRepository):
+    """In-memory implementation of the RollupRepository interface."""
+
+    def __init__(self, memory_database: MemoryDatabase):
+        """Initialize the repository with an in-memory database.
+
+        Args:
+            memory_database: MemoryDatabase instance
+        """
+        self.collection = memory_database[MONGODB_COLLECTION_APPOINTMENT_ROLLUPS]
+
+    async def increment(self, deltas: Dict[RollupKey, Dict[str, int]]) -> None:
+        """Add to the counters of many rollups, creating the rollups that do not exist yet."""
+        for rollup_key, counters in deltas.items():
+            existing = self.collection.get(_rollup_id(rollup_key)) or {}
+            self.collection.upsert(_rollup_document(
+                rollup_key,
+                {field: existing.get(field, 0) + value for field, value in counters.items()}
+            ))
+
+    async def get_range(self, dimension: str, key: str, day_from: date, day_to: date) -> List[Dict[str, Any]]:
+        """Get the rollups of a clinician or department from day_from to day_to inclusive, in day order, read from the
+        sorted index on dimension, key and day."""
+        return self.collection.scan(
+            (ROLLUP_FIELD_DIMENSION, ROLLUP_FIELD_KEY, ROLLUP_FIELD_DAY),
+            (dimension, key),
+            day_from.isoformat(),
+            (day_to + timedelta(days=1)).isoformat(),
+            (day_to - day_from).days + 1
+        )
+
+    async def replace_all(self, rollups: Dict[RollupKey, Dict[str, int]]) -> int:
+        """Replace every rollup."""
+        self.collection.load(_rollup_document(rollup_key, counters) for rollup_key, counters in rollups.items())
+        return len(rollups)
@@ -1,12 +1,63 @@
-from typing import Optional, List, Dict, Any
-from src.repository.appointment import AppointmentRepository
-from src.db.mongo import MongoDB
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
+import pymongo
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from src.repository.errors import DuplicateRecordError, UnindexedQueryError
+from src.repository.appointment import AppointmentRepository, AppointmentQuery
+from src.repository.results import WriteStatus
+from src.repository.mongo.bulk import write_statuses_from_bulk_result
+from src.repository.appointment_storage import to_stored, from_stored
+from src.db.mongo import MongoDB, versioned_update, version_query
+from src.db.indexes import APPOINTMENT_QUERY_INDEX_KEYS
 from constants import (
     MONGODB_COLLECTION_APPOINTMENTS,
-    APPOINTMENT_FIELD_ID
+    DOCUMENT_FIELD_VERSION,
+    APPOINTMENT_FIELD_ID,
+    APPOINTMENT_FIELD_PATIENT,
+    APPOINTMENT_FIELD_CLINICIAN,
+    APPOINTMENT_FIELD_DEPARTMENT,
+    APPOINTMENT_FIELD_STATUS,
+    APPOINTMENT_FIELD_TIME,
+    APPOINTMENT_FIELD_END_TIME,
+    APPOINTMENT_FIELD_MISSED_BY,
+    STATUS_ACTIVE,
+    STATUS_CANCELLED,
+    STATUS_MISSED,
+    MONGODB_NOT_EQUAL_OPERATOR,
+    MONGODB_IN_OPERATOR,
+    MONGODB_LESS_THAN_OR_EQUAL_OPERATOR,
+    MONGODB_LESS_THAN_OPERATOR,
+    MONGODB_GREATER_THAN_OPERATOR,
+    MONGODB_GREATER_THAN_OR_EQUAL_OPERATOR,
+    MONGODB_OR_OPERATOR,
+    APPOINTMENT_MAX_DURATION_HOURS,
 )
 
 
+def _equality_filters(query: AppointmentQuery) -> Dict[str, Any]:
+    return {
+        field: value
+        for field, value in (
+            (APPOINTMENT_FIELD_PATIENT, query.patient),
+            (APPOINTMENT_FIELD_CLINICIAN, query.clinician),
+            (APPOINTMENT_FIELD_DEPARTMENT, query.department),
+            (APPOINTMENT_FIELD_STATUS, query.status),
+        )
+        if value is not None
+    }
+
+
+def _time_range(query: AppointmentQuery) -> Dict[str, datetime]:
+    time_range = {}
+    if query.time_from is not None:
+        time_range[MONGODB_GREATER_THAN_OR_EQUAL_OPERATOR] = query.time_from
+    if query.time_to is not None:
+        time_range[MONGODB_LESS_THAN_OPERATOR] = query.time_to
+    return time_range
+
+
 class MongoAppointmentRepository(AppointmentRepository):
     """MongoDB implementation of the AppointmentRepository interface."""
 
@@ -14,29 +65,272 @@ class MongoAppointmentRepository(AppointmentRepository):
         """Initialize the repository with a MongoDB client.
         
         Args:
-            mongo_client: MongoDB client instance
+            mongo_client: pymongo.AsyncMongoClient instance
         """
-        self.mongo_db = MongoDB(mongo_client, MONGODB_COLLECTION_APPOINTMENTS)
+        self.mongo_db = MongoDB(
+            mongo_client,
+            MONGODB_COLLECTION_APPOINTMENTS,
+            (APPOINTMENT_FIELD_END_TIME, APPOINTMENT_FIELD_MISSED_BY),
+            from_stored,
+            versioned=True
+        )
 
-    def create(self, appointment: Dict[str, Any]) -> bool:
+    async def create(self, appointment: Dict[str, Any]) -> bool:
         """Create a new appointment record."""
-        result = self.mongo_db.create(appointment)
+        try:
+            result = await self.mongo_db.create(to_stored(appointment))
+        except DuplicateKeyError as error:
+            raise DuplicateRecordError(appointment.get(APPOINTMENT_FIELD_ID)) from error
         return result.acknowledged if result else False
 
-    def get_by_id(self, appointment_id: str) -> Optional[Dict[str, Any]]:
-        """Get an appointment by ID."""
-        return self.mongo_db.get({APPOINTMENT_FIELD_ID: appointment_id})
+    async def get_by_id(self, appointment_id: str) -> Optional[Dict[str, Any]]:
+        """Get an appointment by ID, with its version."""
+        return await self.mongo_db.get({APPOINTMENT_FIELD_ID: appointment_id}, with_version=True)
 
-    def update_by_id(self, appointment_id: str, appointment_data: Dict[str, Any]) -> bool:
+    async def get_collection_version(self) -> int:
+        """Get the version of the appointments collection from collection_versions."""
+        return await self.mongo_db.get_collection_version()
+
+    async def get_many(self, appointment_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get many appointments by ID with one $in query on the unique index on id."""
+        if not appointment_ids:
+            return {}
+        appointments = await self.mongo_db.find(
+            {APPOINTMENT_FIELD_ID: {MONGODB_IN_OPERATOR: list(appointment_ids)}},
+            [(APPOINTMENT_FIELD_ID, pymongo.ASCENDING)],
+            len(appointment_ids)
+        )
+        return {appointment[APPOINTMENT_FIELD_ID]: appointment for appointment in appointments}
+
+    async def update_by_id(self, appointment_id: str, appointment_data: Dict[str, Any]) -> bool:
         """Update an appointment by ID."""
-        result = self.mongo_db.update({APPOINTMENT_FIELD_ID: appointment_id}, appointment_data)
+        try:
+            result = await self.mongo_db.update({APPOINTMENT_FIELD_ID: appointment_id}, to_stored(appointment_data))
+        except DuplicateKeyError as error:
+            raise DuplicateRecordError(appointment_data.get(APPOINTMENT_FIELD_ID)) from error
         return result.acknowledged if result else False
 
-    def delete_by_id(self, appointment_id: str) -> bool:
+    async def update_unless_cancelled(self, appointment_id: str, appointment_data: Dict[str, Any],
+                                      version: Optional[int] = None) -> Tuple[WriteStatus, Optional[Dict[str, Any]]]:
+        """Update an appointment by ID unless it is cancelled, or unless it is not at the given version.
+
+        The status and any version are part of the filter of a find_one_and_update, so a cancelled appointment cannot
+        be reinstated, nor a newer one overwritten, between a check and the write, and the appointment is returned as
+        the write found it. Only when nothing matched is the appointment read, to report why.
+        """
+        query = {
+            APPOINTMENT_FIELD_ID: appointment_id,
+            APPOINTMENT_FIELD_STATUS: {MONGODB_NOT_EQUAL_OPERATOR: STATUS_CANCELLED}
+        }
+        if version is not None:
+            query.update(version_query(version))
+        try:
+            previous = await self.mongo_db.find_one_and_update(query, to_stored(appointment_data), with_version=True)
+        except DuplicateKeyError as error:
+            raise DuplicateRecordError(appointment_data.get(APPOINTMENT_FIELD_ID)) from error
+        if previous is not None:
+            return WriteStatus.UPDATED, previous
+        existing = await self.mongo_db.get({APPOINTMENT_FIELD_ID: appointment_id}, with_version=True)
+        if not existing:
+            return WriteStatus.NOT_FOUND, None
+        if version is not None and existing.get(DOCUMENT_FIELD_VERSION, 0) != version:
+            return WriteStatus.STALE, existing
+        return WriteStatus.CONFLICT, existing
+
+    async def delete_by_id(self, appointment_id: str) -> bool:
         """Delete an appointment by ID."""
-        result = self.mongo_db.delete({APPOINTMENT_FIELD_ID: appointment_id})
+        result = await self.mongo_db.delete({APPOINTMENT_FIELD_ID: appointment_id})
         return result.deleted_count > 0 if result else False
 
-    def get_all(self) -> List[Dict[str, Any]]:
+    async def get_all(self) -> List[Dict[str, Any]]:
         """Get all appointments."""
-        return self.mongo_db.getAll() 
\ No newline at end of file
+        return await self.mongo_db.getAll() 
+
+    async def get_page(self, limit: int, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get a page of appointments ordered by ID."""
+        return await self.mongo_db.get_page(APPOINTMENT_FIELD_ID, limit, after)
+
+    async def find_overlapping(self, clinician: str, start: datetime, end: datetime,
+                               exclude_id: Optional[str] = None) -> Optional[str]:
+        """Find an appointment of the clinician that is not cancelled and overlaps the time from start to end.
+
+        The index on clinician, time and id is read backwards from end, no further than the longest an appointment can
+        last before start, for the first appointment that is not cancelled and ends after start, or has no end time,
+        and only its id is fetched.
+        """
+        query = {
+            APPOINTMENT_FIELD_CLINICIAN: clinician,
+            APPOINTMENT_FIELD_TIME: {
+                MONGODB_GREATER_THAN_OPERATOR: start - timedelta(hours=APPOINTMENT_MAX_DURATION_HOURS),
+                MONGODB_LESS_THAN_OPERATOR: end,
+            },
+            APPOINTMENT_FIELD_STATUS: {MONGODB_NOT_EQUAL_OPERATOR: STATUS_CANCELLED},
+            MONGODB_OR_OPERATOR: [
+                {APPOINTMENT_FIELD_END_TIME: {MONGODB_GREATER_THAN_OPERATOR: start}},
+                {APPOINTMENT_FIELD_END_TIME: None},
+            ],
+        }
+        if exclude_id is not None:
+            query[APPOINTMENT_FIELD_ID] = {MONGODB_NOT_EQUAL_OPERATOR: exclude_id}
+        overlapping = await self.mongo_db.find_fields(
+            query,
+            (APPOINTMENT_FIELD_ID,),
+            [(APPOINTMENT_FIELD_TIME, pymongo.DESCENDING), (APPOINTMENT_FIELD_ID, pymongo.DESCENDING)],
+            1,
+            APPOINTMENT_QUERY_INDEX_KEYS[APPOINTMENT_FIELD_CLINICIAN]
+        )
+        return overlapping[0][APPOINTMENT_FIELD_ID] if overlapping else None
+
+    async def find_bookings(self, clinician: str, start: datetime,
+                            end: datetime) -> List[Tuple[datetime, Optional[datetime], str]]:
+        """Return every appointment of the clinician that is not cancelled and could overlap the time from start to
+        end, in start time order, reading the time, end time and id through the index on clinician, time and id."""
+        documents = await self.mongo_db.find_fields(
+            {
+                APPOINTMENT_FIELD_CLINICIAN: clinician,
+                APPOINTMENT_FIELD_TIME: {
+                    MONGODB_GREATER_THAN_OPERATOR: start - timedelta(hours=APPOINTMENT_MAX_DURATION_HOURS),
+                    MONGODB_LESS_THAN_OPERATOR: end,
+                },
+                APPOINTMENT_FIELD_STATUS: {MONGODB_NOT_EQUAL_OPERATOR: STATUS_CANCELLED},
+            },
+            (APPOINTMENT_FIELD_ID, APPOINTMENT_FIELD_TIME, APPOINTMENT_FIELD_END_TIME),
+            [(APPOINTMENT_FIELD_TIME, pymongo.ASCENDING), (APPOINTMENT_FIELD_ID, pymongo.ASCENDING)],
+            0,
+            APPOINTMENT_QUERY_INDEX_KEYS[APPOINTMENT_FIELD_CLINICIAN]
+        )
+        # Datetimes read from MongoDB are naive UTC
+        return [
+            (document[APPOINTMENT_FIELD_TIME].replace(tzinfo=timezone.utc),
+             document[APPOINTMENT_FIELD_END_TIME].replace(tzinfo=timezone.utc)
+             if document.get(APPOINTMENT_FIELD_END_TIME) is not None else None,
+             document[APPOINTMENT_FIELD_ID])
+            for document in documents
+        ]
+
+    async def find_busy_times(self, query: AppointmentQuery, limit: int) -> List[Tuple[datetime, datetime]]:
+        """Return the start and end times of the appointments matching a query that are not cancelled, in start time
+        order.
+
+        Only the two times are fetched, through the index on the query's index_field, time and id.
+        """
+        index_field = query.index_field()
+        if index_field is None:
+            raise UnindexedQueryError(query)
+
+        filters = {
+            **_equality_filters(query),
+            APPOINTMENT_FIELD_STATUS: {MONGODB_NOT_EQUAL_OPERATOR: STATUS_CANCELLED},
+        }
+        time_range = _time_range(query)
+        if time_range:
+            filters[APPOINTMENT_FIELD_TIME] = time_range
+        documents = await self.mongo_db.find_fields(
+            filters,
+            (APPOINTMENT_FIELD_TIME, APPOINTMENT_FIELD_END_TIME),
+            [(APPOINTMENT_FIELD_TIME, pymongo.ASCENDING), (APPOINTMENT_FIELD_ID, pymongo.ASCENDING)],
+            limit,
+            APPOINTMENT_QUERY_INDEX_KEYS[index_field]
+        )
+        # Datetimes read from MongoDB are naive UTC
+        return [
+            (document[APPOINTMENT_FIELD_TIME].replace(tzinfo=timezone.utc),
+             document[APPOINTMENT_FIELD_END_TIME].replace(tzinfo=timezone.utc))
+            for document in documents
+            if document.get(APPOINTMENT_FIELD_END_TIME) is not None
+        ]
+
+    async def find(self, query: AppointmentQuery, limit: int,
+                   after: Optional[Tuple[datetime, str]] = None) -> List[Dict[str, Any]]:
+        """Find appointments matching a query, ordered by time and then ID.
+
+        The query is hinted to the index on its index_field, time and id, which answers the equality filter, the time
+        window and the sort. Pages continue from after with a keyset condition on (time, id) rather than a skip.
+        """
+        index_field = query.index_field()
+        if index_field is None:
+            raise UnindexedQueryError(query)
+
+        filters = _equality_filters(query)
+        time_range = _time_range(query)
+        if after is not None:
+            after_time, after_id = after
+            if query.descending:
+                time_range[MONGODB_LESS_THAN_OR_EQUAL_OPERATOR] = after_time
+                beyond = MONGODB_LESS_THAN_OPERATOR
+            else:
+                time_from = time_range.get(MONGODB_GREATER_THAN_OR_EQUAL_OPERATOR)
+                time_range[MONGODB_GREATER_THAN_OR_EQUAL_OPERATOR] = \
+                    after_time if time_from is None else max(time_from, after_time)
+                beyond = MONGODB_GREATER_THAN_OPERATOR
+            # The time bound keeps the index scan tight, the $or skips what the previous page returned at after_time
+            filters[MONGODB_OR_OPERATOR] = [
+                {APPOINTMENT_FIELD_TIME: {beyond: after_time}},
+                {APPOINTMENT_FIELD_ID: {beyond: after_id}},
+            ]
+        if time_range:
+            filters[APPOINTMENT_FIELD_TIME] = time_range
+
+        direction = pymongo.DESCENDING if query.descending else pymongo.ASCENDING
+        return await self.mongo_db.find(
+            filters,
+            [(APPOINTMENT_FIELD_TIME, direction), (APPOINTMENT_FIELD_ID, direction)],
+            limit,
+            APPOINTMENT_QUERY_INDEX_KEYS[index_field]
+        )
+
+    async def stream(self, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream every appointment in batches."""
+        async for batch in self.mongo_db.stream(batch_size):
+            yield batch
+
+    async def upsert_many(self, appointments: List[Dict[str, Any]]) -> List[WriteStatus]:
+        """Create or update many appointments in one unordered bulk write.
+
+        A cancelled appointment does not match the filter, so its upsert attempts an insert that the unique index on id
+        rejects as a duplicate key. That keeps the no-reinstatement rule atomic without reading the appointment first.
+        """
+        operations = [
+            UpdateOne(
+                {
+                    APPOINTMENT_FIELD_ID: appointment[APPOINTMENT_FIELD_ID],
+                    APPOINTMENT_FIELD_STATUS: {MONGODB_NOT_EQUAL_OPERATOR: STATUS_CANCELLED}
+                },
+                versioned_update(to_stored(appointment)),
+                upsert=True
+            )
+            for appointment in appointments
+        ]
+        details = await self.mongo_db.bulk_write(operations)
+        return write_statuses_from_bulk_result(details, len(operations))
+
+    async def mark_missed(self, now: datetime, limit: int) -> List[str]:
+        """Mark active appointments that ended at or before now as missed, earliest ending first.
+
+        The due appointments are read from the partial index on end_time, which only holds active appointments, and
+        marked with a single update_many that repeats the filter, so an appointment attended or cancelled in between is
+        left alone. The update also stamps the appointments with an id of this call, so if some were changed in
+        between, including by a sweep in another process, the ones this call marked can still be told apart.
+        """
+        due = {
+            APPOINTMENT_FIELD_STATUS: STATUS_ACTIVE,
+            APPOINTMENT_FIELD_END_TIME: {MONGODB_LESS_THAN_OR_EQUAL_OPERATOR: now}
+        }
+        appointment_ids = await self.mongo_db.find_keys(APPOINTMENT_FIELD_ID, due, APPOINTMENT_FIELD_END_TIME, limit)
+        if not appointment_ids:
+            return []
+
+        sweep_id = str(uuid.uuid4())
+        result = await self.mongo_db.update_many(
+            {APPOINTMENT_FIELD_ID: {MONGODB_IN_OPERATOR: appointment_ids}, **due},
+            {APPOINTMENT_FIELD_STATUS: STATUS_MISSED, APPOINTMENT_FIELD_MISSED_BY: sweep_id}
+        )
+        if result.modified_count == len(appointment_ids):
+            return appointment_ids
+        # Some changed in between, so only report those this call marked missed
+        return await self.mongo_db.find_keys(
+            APPOINTMENT_FIELD_ID,
+            {APPOINTMENT_FIELD_ID: {MONGODB_IN_OPERATOR: appointment_ids}, APPOINTMENT_FIELD_MISSED_BY: sweep_id},
+            APPOINTMENT_FIELD_ID,
+            len(appointment_ids)
+        )
@@ -0,0 +1,24 @@
+from typing import List, Dict, Any
+from src.repository.results import WriteStatus
+from constants import (
+    MONGODB_DUPLICATE_KEY_ERROR_CODE,
+    MONGODB_BULK_WRITE_ERRORS,
+    MONGODB_BULK_UPSERTED,
+    MONGODB_BULK_INDEX,
+    MONGODB_BULK_CODE,
+)
+
+
+def write_statuses_from_bulk_result(details: Dict[str, Any], operation_count: int) -> List[WriteStatus]:
+    """Translate a raw bulk upsert result into one WriteStatus per operation.
+
+    Operations that upserted a document created it, those that failed on a unique index conflicted with an existing
+    document, and every other operation matched and updated an existing document.
+    """
+    statuses = [WriteStatus.UPDATED] * operation_count
+    for upserted in details.get(MONGODB_BULK_UPSERTED, []):
+        statuses[upserted[MONGODB_BULK_INDEX]] = WriteStatus.CREATED
+    for write_error in details.get(MONGODB_BULK_WRITE_ERRORS, []):
+        is_conflict = write_error.get(MONGODB_BULK_CODE) == MONGODB_DUPLICATE_KEY_ERROR_CODE
+        statuses[write_error[MONGODB_BULK_INDEX]] = WriteStatus.CONFLICT if is_conflict else WriteStatus.FAILED
+    return statuses
@@ -1,9 +1,15 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterable, Set, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from src.repository.errors import DuplicateRecordError
 from src.repository.patient import PatientRepository
-from src.db.mongo import MongoDB
+from src.repository.results import WriteStatus
+from src.repository.mongo.bulk import write_statuses_from_bulk_result
+from src.db.mongo import MongoDB, versioned_update, version_query
 from constants import (
     MONGODB_COLLECTION_PATIENTS,
     PATIENT_FIELD_NHS_NUMBER,
+    DOCUMENT_FIELD_VERSION,
 )
 
 
@@ -14,29 +20,86 @@ class MongoPatientRepository(PatientRepository):
         """Initialize the repository with a MongoDB client.
 
         Args:
-            mongo_client: MongoDB client instance
+            mongo_client: pymongo.AsyncMongoClient instance
         """
-        self.mongo_db = MongoDB(mongo_client, MONGODB_COLLECTION_PATIENTS)
+        self.mongo_db = MongoDB(mongo_client, MONGODB_COLLECTION_PATIENTS, versioned=True)
 
-    def create(self, patient: Dict[str, Any]) -> bool:
+    async def create(self, patient: Dict[str, Any]) -> bool:
         """Create a new patient record."""
-        result = self.mongo_db.create(patient)
+        try:
+            result = await self.mongo_db.create(patient)
+        except DuplicateKeyError as error:
+            raise DuplicateRecordError(patient.get(PATIENT_FIELD_NHS_NUMBER)) from error
         return result.acknowledged if result else False
 
-    def get_by_nhs_number(self, nhs_number: str) -> Optional[Dict[str, Any]]:
-        """Get a patient by NHS number."""
-        return self.mongo_db.get({PATIENT_FIELD_NHS_NUMBER: nhs_number})
+    async def get_by_nhs_number(self, nhs_number: str) -> Optional[Dict[str, Any]]:
+        """Get a patient by NHS number, with its version."""
+        return await self.mongo_db.get({PATIENT_FIELD_NHS_NUMBER: nhs_number}, with_version=True)
 
-    def update_by_nhs_number(self, nhs_number: str, patient_data: Dict[str, Any]) -> bool:
+    async def get_collection_version(self) -> int:
+        """Get the version of the patients collection from collection_versions."""
+        return await self.mongo_db.get_collection_version()
+
+    async def update_by_nhs_number(self, nhs_number: str, patient_data: Dict[str, Any]) -> bool:
         """Update a patient by NHS number."""
-        result = self.mongo_db.update({PATIENT_FIELD_NHS_NUMBER: nhs_number}, patient_data)
+        try:
+            result = await self.mongo_db.update({PATIENT_FIELD_NHS_NUMBER: nhs_number}, patient_data)
+        except DuplicateKeyError as error:
+            raise DuplicateRecordError(patient_data.get(PATIENT_FIELD_NHS_NUMBER)) from error
         return result.acknowledged if result else False
 
-    def delete_by_nhs_number(self, nhs_number: str) -> bool:
+    async def update_at_version(self, nhs_number: str, patient_data: Dict[str, Any],
+                                version: Optional[int]) -> Tuple[WriteStatus, Optional[int]]:
+        """Update a patient by NHS number only if it is at the given version.
+
+        The version is part of the filter of the update, so a successful write takes a single round-trip, which also
+        returns the version the patient was at. Only when nothing matched a version is the patient read, to report
+        whether it is at another version or missing.
+        """
+        query = {PATIENT_FIELD_NHS_NUMBER: nhs_number}
+        if version is not None:
+            query.update(version_query(version))
+        try:
+            previous = await self.mongo_db.find_one_and_update(query, patient_data, with_version=True)
+        except DuplicateKeyError as error:
+            raise DuplicateRecordError(patient_data.get(PATIENT_FIELD_NHS_NUMBER)) from error
+        if previous is not None:
+            return WriteStatus.UPDATED, previous.get(DOCUMENT_FIELD_VERSION, 0) + 1
+        if version is not None and await self.mongo_db.get({PATIENT_FIELD_NHS_NUMBER: nhs_number}):
+            return WriteStatus.STALE, None
+        return WriteStatus.NOT_FOUND, None
+
+    async def delete_by_nhs_number(self, nhs_number: str) -> bool:
         """Delete a patient by NHS number."""
-        result = self.mongo_db.delete({PATIENT_FIELD_NHS_NUMBER: nhs_number})
+        result = await self.mongo_db.delete({PATIENT_FIELD_NHS_NUMBER: nhs_number})
         return result.deleted_count > 0 if result else False
 
-    def get_all(self) -> List[Dict[str, Any]]:
+    async def get_all(self) -> List[Dict[str, Any]]:
         """Get all patients."""
-        return self.mongo_db.getAll()
\ No newline at end of file
+        return await self.mongo_db.getAll()
+
+    async def get_page(self, limit: int, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get a page of patients ordered by NHS number."""
+        return await self.mongo_db.get_page(PATIENT_FIELD_NHS_NUMBER, limit, after)
+
+    async def stream(self, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream every patient in batches."""
+        async for batch in self.mongo_db.stream(batch_size):
+            yield batch
+
+    async def existing_nhs_numbers(self, nhs_numbers: Iterable[str]) -> Set[str]:
+        """Find which of the given NHS numbers belong to a patient with a single $in query."""
+        return await self.mongo_db.find_existing(PATIENT_FIELD_NHS_NUMBER, nhs_numbers)
+
+    async def upsert_many(self, patients: List[Dict[str, Any]]) -> List[WriteStatus]:
+        """Create or update many patients in one unordered bulk write."""
+        operations = [
+            UpdateOne(
+                {PATIENT_FIELD_NHS_NUMBER: patient[PATIENT_FIELD_NHS_NUMBER]},
+                versioned_update(patient),
+                upsert=True
+            )
+            for patient in patients
+        ]
+        details = await self.mongo_db.bulk_write(operations)
+        return write_statuses_from_bulk_result(details, len(operations))
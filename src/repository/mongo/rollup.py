@@ -0,0 +1,73 @@
+from datetime import date
+from typing import List, Dict, Any
+import pymongo
+from pymongo import InsertOne, UpdateOne
+from src.repository.rollup import RollupRepository, RollupKey
+from src.db.mongo import MongoDB
+from constants import (
+    MONGODB_COLLECTION_APPOINTMENT_ROLLUPS,
+    ROLLUP_FIELD_DIMENSION,
+    ROLLUP_FIELD_KEY,
+    ROLLUP_FIELD_DAY,
+    ROLLUP_REBUILD_BATCH_SIZE,
+    MONGODB_INCREMENT_OPERATOR,
+    MONGODB_GREATER_THAN_OR_EQUAL_OPERATOR,
+    MONGODB_LESS_THAN_OR_EQUAL_OPERATOR,
+)
+
+
+def _rollup_filter(rollup_key: RollupKey) -> Dict[str, str]:
+    dimension, key, day = rollup_key
+    return {ROLLUP_FIELD_DIMENSION: dimension, ROLLUP_FIELD_KEY: key, ROLLUP_FIELD_DAY: day}
+
+
+class MongoRollupRepository(RollupRepository):
+    """MongoDB implementation of the RollupRepository interface."""
+
+    def __init__(self, mongo_client):
+        """Initialize the repository with a MongoDB client.
+
+        Args:
+            mongo_client: pymongo.AsyncMongoClient instance
+        """
+        self.mongo_db = MongoDB(mongo_client, MONGODB_COLLECTION_APPOINTMENT_ROLLUPS)
+
+    async def increment(self, deltas: Dict[RollupKey, Dict[str, int]]) -> None:
+        """Add to the counters of many rollups in one unordered bulk write of upserted $inc updates.
+
+        $inc is applied atomically by the server, so concurrent writers never lose each other's counts.
+        """
+        operations = [
+            UpdateOne(_rollup_filter(rollup_key), {MONGODB_INCREMENT_OPERATOR: counters}, upsert=True)
+            for rollup_key, counters in deltas.items()
+        ]
+        if operations:
+            await self.mongo_db.bulk_write(operations)
+
+    async def get_range(self, dimension: str, key: str, day_from: date, day_to: date) -> List[Dict[str, Any]]:
+        """Get the rollups of a clinician or department from day_from to day_to inclusive, in day order, with a range
+        read of the unique index on dimension, key and day."""
+        return await self.mongo_db.find(
+            {
+                ROLLUP_FIELD_DIMENSION: dimension,
+                ROLLUP_FIELD_KEY: key,
+                ROLLUP_FIELD_DAY: {
+                    MONGODB_GREATER_THAN_OR_EQUAL_OPERATOR: day_from.isoformat(),
+                    MONGODB_LESS_THAN_OR_EQUAL_OPERATOR: day_to.isoformat()
+                }
+            },
+            [(ROLLUP_FIELD_DAY, pymongo.ASCENDING)],
+            (day_to - day_from).days + 1
+        )
+
+    async def replace_all(self, rollups: Dict[RollupKey, Dict[str, int]]) -> int:
+        """Replace every rollup, deleting the existing ones and inserting the new ones in unordered bulk writes.
+
+        Increments applied while the rollups are replaced may be lost, so rebuilds are best run while appointments are
+        not being written.
+        """
+        await self.mongo_db.delete_many({})
+        operations = [InsertOne({**_rollup_filter(rollup_key), **counters}) for rollup_key, counters in rollups.items()]
+        for start in range(0, len(operations), ROLLUP_REBUILD_BATCH_SIZE):
+            await self.mongo_db.bulk_write(operations[start:start + ROLLUP_REBUILD_BATCH_SIZE])
+        return len(operations)
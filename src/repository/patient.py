@@ -1,12 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterable, Set, Tuple
+from src.repository.results import WriteStatus
 
 
 class PatientRepository(ABC):
-    """Abstract repository interface for patient data access operations."""
+    """Abstract asynchronous repository interface for patient data access operations."""
 
     @abstractmethod
-    def create(self, patient: Dict[str, Any]) -> bool:
+    async def create(self, patient: Dict[str, Any]) -> bool:
         """Create a new patient record.
 
         Args:
@@ -14,23 +15,35 @@ class PatientRepository(ABC):
 
         Returns:
             bool: True if creation was successful, False otherwise
+
+        Raises:
+            DuplicateRecordError: If a patient with the same NHS number already exists
         """
         pass
 
     @abstractmethod
-    def get_by_nhs_number(self, nhs_number: str) -> Optional[Dict[str, Any]]:
+    async def get_by_nhs_number(self, nhs_number: str) -> Optional[Dict[str, Any]]:
         """Get a patient by NHS number.
 
         Args:
             nhs_number: The patient's NHS number
 
         Returns:
-            Patient data dictionary if found, None otherwise
+            Patient data dictionary, including its version, if found, None otherwise
+        """
+        pass
+
+    @abstractmethod
+    async def get_collection_version(self) -> int:
+        """Get the version of the patients collection, which increases with every write that changes it.
+
+        Returns:
+            int: The collection version, 0 if it has never been changed
         """
         pass
 
     @abstractmethod
-    def update_by_nhs_number(self, nhs_number: str, patient_data: Dict[str, Any]) -> bool:
+    async def update_by_nhs_number(self, nhs_number: str, patient_data: Dict[str, Any]) -> bool:
         """Update a patient by NHS number.
 
         Args:
@@ -39,11 +52,34 @@ class PatientRepository(ABC):
 
         Returns:
             bool: True if update was successful, False otherwise
+
+        Raises:
+            DuplicateRecordError: If the update would give the patient the NHS number of another patient
         """
         pass
 
     @abstractmethod
-    def delete_by_nhs_number(self, nhs_number: str) -> bool:
+    async def update_at_version(self, nhs_number: str, patient_data: Dict[str, Any],
+                                version: Optional[int]) -> Tuple[WriteStatus, Optional[int]]:
+        """Update a patient by NHS number only if it is at the given version, checking and writing in one atomic step.
+
+        Args:
+            nhs_number: The patient's NHS number
+            patient_data: Updated patient data
+            version: Version the patient must be at to be updated, or None to update it at any version
+
+        Returns:
+            WriteStatus.UPDATED if the patient was updated, and is now at the next version, WriteStatus.STALE if it is
+            at another version, or WriteStatus.NOT_FOUND if there is no patient with the NHS number, and the version
+            the update took the patient to, or None if it was not updated
+
+        Raises:
+            DuplicateRecordError: If the update would give the patient the NHS number of another patient
+        """
+        pass
+
+    @abstractmethod
+    async def delete_by_nhs_number(self, nhs_number: str) -> bool:
         """Delete a patient by NHS number.
 
         Args:
@@ -55,10 +91,61 @@ class PatientRepository(ABC):
         pass
 
     @abstractmethod
-    def get_all(self) -> List[Dict[str, Any]]:
+    async def get_all(self) -> List[Dict[str, Any]]:
         """Get all patients.
 
         Returns:
             List of patient data dictionaries
         """
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def get_page(self, limit: int, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get a page of patients ordered by NHS number.
+
+        Args:
+            limit: Maximum number of patients to return
+            after: NHS number of the last patient on the previous page, None for the first page
+
+        Returns:
+            List of patient data dictionaries
+        """
+        pass
+
+    @abstractmethod
+    def stream(self, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream every patient in batches without loading the whole collection into memory.
+
+        Args:
+            batch_size: Number of patients in each batch
+
+        Returns:
+            Asynchronous iterator of lists of patient data dictionaries
+        """
+        pass
+
+    @abstractmethod
+    async def existing_nhs_numbers(self, nhs_numbers: Iterable[str]) -> Set[str]:
+        """Find which of the given NHS numbers belong to a patient, looking them all up at once.
+
+        Args:
+            nhs_numbers: NHS numbers to look up
+
+        Returns:
+            The NHS numbers that belong to a patient
+        """
+        pass
+
+    @abstractmethod
+    async def upsert_many(self, patients: List[Dict[str, Any]]) -> List[WriteStatus]:
+        """Create or update many patients, keyed by NHS number, in as few round-trips as possible.
+
+        A patient that cannot be written does not prevent the others being written.
+
+        Args:
+            patients: Patient data dictionaries
+
+        Returns:
+            List of WriteStatus, one per patient in the order given
+        """
+        pass
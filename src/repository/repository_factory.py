@@ -2,13 +2,24 @@ from enum import Enum
 from typing import Protocol
 from src.repository.appointment import AppointmentRepository
 from src.repository.patient import PatientRepository
+from src.repository.rollup import RollupRepository
 from src.repository.mongo.appointment import MongoAppointmentRepository
 from src.repository.mongo.patient import MongoPatientRepository
+from src.repository.mongo.rollup import MongoRollupRepository
+from src.repository.memory.appointment import MemoryAppointmentRepository
+from src.repository.memory.patient import MemoryPatientRepository
+from src.repository.memory.rollup import MemoryRollupRepository
+from src.repository.caching.lru_cache import LRUCache
+from src.repository.caching.appointment import CachingAppointmentRepository
+from src.repository.caching.patient import CachingPatientRepository
+from src.repository.caching.bloom_filter import BloomFilter
+from src.repository.caching.patient_existence import BloomFilterPatientRepository
 
 
 class DatabaseType(Enum):
     """Enumeration of supported database types."""
     MONGODB = "mongo"
+    MEMORY = "memory"
     # Future database types can be added here
     # POSTGRESQL = "postgresql"
     # MYSQL = "mysql"
@@ -41,6 +52,8 @@ class RepositoryFactory:
         """
         if database_type == DatabaseType.MONGODB:
             return MongoPatientRepository(database_client)
+        if database_type == DatabaseType.MEMORY:
+            return MemoryPatientRepository(database_client)
         
         # Future database implementations can be added here
         # elif database_type == DatabaseType.POSTGRESQL:
@@ -67,6 +80,8 @@ class RepositoryFactory:
         """
         if database_type == DatabaseType.MONGODB:
             return MongoAppointmentRepository(database_client)
+        if database_type == DatabaseType.MEMORY:
+            return MemoryAppointmentRepository(database_client)
         
         # Future database implementations can be added here
         # elif database_type == DatabaseType.POSTGRESQL:
@@ -74,6 +89,84 @@ class RepositoryFactory:
         
         raise ValueError(f"Unsupported database type: {database_type}")
 
+    @staticmethod
+    def create_rollup_repository(
+        database_type: DatabaseType,
+        database_client: DatabaseClient
+    ) -> RollupRepository:
+        """Create a daily appointment rollup repository instance.
+
+        Args:
+            database_type: The type of database to create repository for
+            database_client: The database client instance
+
+        Returns:
+            RollupRepository: Repository instance for appointment rollup access
+
+        Raises:
+            ValueError: If database type is not supported
+        """
+        if database_type == DatabaseType.MONGODB:
+            return MongoRollupRepository(database_client)
+        if database_type == DatabaseType.MEMORY:
+            return MemoryRollupRepository(database_client)
+
+        raise ValueError(f"Unsupported database type: {database_type}")
+
+    @staticmethod
+    def create_caching_patient_repository(
+        patient_repository: PatientRepository,
+        max_entries: int,
+        ttl_seconds: float
+    ) -> PatientRepository:
+        """Layer a read-through cache over a patient repository of any database type.
+
+        Args:
+            patient_repository: The repository to cache
+            max_entries: Maximum number of patients held in the cache
+            ttl_seconds: Seconds a cached patient stays valid
+
+        Returns:
+            PatientRepository: Caching repository delegating to patient_repository
+        """
+        return CachingPatientRepository(patient_repository, LRUCache(max_entries, ttl_seconds))
+
+    @staticmethod
+    def create_caching_appointment_repository(
+        appointment_repository: AppointmentRepository,
+        max_entries: int,
+        ttl_seconds: float
+    ) -> AppointmentRepository:
+        """Layer a read-through cache over an appointment repository of any database type.
+
+        Args:
+            appointment_repository: The repository to cache
+            max_entries: Maximum number of appointments held in the cache
+            ttl_seconds: Seconds a cached appointment stays valid
+
+        Returns:
+            AppointmentRepository: Caching repository delegating to appointment_repository
+        """
+        return CachingAppointmentRepository(appointment_repository, LRUCache(max_entries, ttl_seconds))
+
+    @staticmethod
+    def create_bloom_filter_patient_repository(
+        patient_repository: PatientRepository,
+        capacity: int,
+        error_rate: float
+    ) -> BloomFilterPatientRepository:
+        """Layer a Bloom filter of existing NHS numbers over a patient repository of any database type.
+
+        Args:
+            patient_repository: The repository whose existence checks to speed up
+            capacity: Number of patients the filter is sized for
+            error_rate: False positive rate of the filter once it holds capacity patients
+
+        Returns:
+            BloomFilterPatientRepository: Repository delegating to patient_repository, to be loaded before use
+        """
+        return BloomFilterPatientRepository(patient_repository, BloomFilter(capacity, error_rate))
+
     @classmethod
     def create_repositories(
         cls, 
@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class WriteStatus(Enum):
+    """Outcome of a single record write reported by a repository."""
+    CREATED = 'created'
+    UPDATED = 'updated'
+    CONFLICT = 'conflict'
+    FAILED = 'failed'
+    NOT_FOUND = 'not_found'
+    STALE = 'stale'
@@ -0,0 +1,53 @@
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import List, Dict, Any, Tuple
+
+# A rollup is identified by its dimension, such as clinician, the key within it, such as the clinician's name, and the
+# day as an ISO 8601 date
+RollupKey = Tuple[str, str, str]
+
+
+class RollupRepository(ABC):
+    """Abstract asynchronous repository interface for daily appointment rollups.
+
+    Each rollup holds the counters of one day of one clinician or department. Counters are only ever added to, so
+    writes from any number of processes can be applied in any order.
+    """
+
+    @abstractmethod
+    async def increment(self, deltas: Dict[RollupKey, Dict[str, int]]) -> None:
+        """Add to the counters of many rollups in one write, creating the rollups that do not exist yet.
+
+        Args:
+            deltas: Amounts to add to each counter, negative to subtract, keyed by rollup
+        """
+        pass
+
+    @abstractmethod
+    async def get_range(self, dimension: str, key: str, day_from: date, day_to: date) -> List[Dict[str, Any]]:
+        """Get the rollups of a clinician or department from day_from to day_to inclusive, in day order.
+
+        Days without a rollup had no appointments and are left out.
+
+        Args:
+            dimension: The dimension, clinician or department
+            key: The clinician or department
+            day_from: First day to get
+            day_to: Last day to get
+
+        Returns:
+            List of rollup dictionaries
+        """
+        pass
+
+    @abstractmethod
+    async def replace_all(self, rollups: Dict[RollupKey, Dict[str, int]]) -> int:
+        """Replace every rollup, for rebuilding them from the appointments.
+
+        Args:
+            rollups: Counters of each rollup, keyed by rollup
+
+        Returns:
+            Number of rollups written
+        """
+        pass
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from src.repository.rollup import RollupRepository
+from src.service.results import ServiceResponse, ResponseType
+
+from constants import (
+    APPOINTMENT_FIELD_CLINICIAN,
+    APPOINTMENT_FIELD_DEPARTMENT,
+    DATE_FORMAT,
+    QUERY_ARGUMENT_FROM,
+    QUERY_ARGUMENT_TO,
+    ROLLUP_FIELD_DAY,
+    ROLLUP_COUNTER_FIELDS,
+    ROLLUP_MAX_DAYS,
+    PANDA_RESPONSE_FIELD_DAYS,
+    PANDA_RESPONSE_FIELD_TOTALS,
+    ROLLUP_FILTER_ERROR_TEXT,
+    MISSING_QUERY_ARGUMENT_ERROR_TEXT,
+    INVALID_QUERY_DATE_ERROR_TEXT,
+    INVALID_QUERY_DATE_RANGE_ERROR_TEXT,
+    ROLLUP_RANGE_TOO_LONG_ERROR_TEXT,
+)
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, DATE_FORMAT).date()
+    except (TypeError, ValueError):
+        return None
+
+
+class AnalyticsService:
+
+    def __init__(self, rollup_repository: RollupRepository):
+        """Initialize AnalyticsService with a rollup repository.
+
+        Args:
+            rollup_repository: Repository instance for daily appointment rollup access
+        """
+        self.rollup_repository = rollup_repository
+
+    async def get_appointment_rollups(self, clinician=None, department=None, day_from=None, day_to=None):
+        """Get the daily appointment counters of a clinician or department over a range of days, and their totals.
+
+        The counters are read from rollups kept up to date as appointments are written, so the cost depends on the
+        number of days rather than of appointments. Days without appointments are left out.
+        """
+        errors = []
+        if (clinician is None) == (department is None):
+            errors.append(ROLLUP_FILTER_ERROR_TEXT)
+
+        days = {}
+        for argument, value in ((QUERY_ARGUMENT_FROM, day_from), (QUERY_ARGUMENT_TO, day_to)):
+            days[argument] = _parse_date(value)
+            if value is None:
+                errors.append(MISSING_QUERY_ARGUMENT_ERROR_TEXT.format(argument))
+            elif days[argument] is None:
+                errors.append(INVALID_QUERY_DATE_ERROR_TEXT.format(argument))
+        first_day, last_day = days[QUERY_ARGUMENT_FROM], days[QUERY_ARGUMENT_TO]
+        if first_day and last_day and first_day > last_day:
+            errors.append(INVALID_QUERY_DATE_RANGE_ERROR_TEXT)
+        elif first_day and last_day and (last_day - first_day).days >= ROLLUP_MAX_DAYS:
+            errors.append(ROLLUP_RANGE_TOO_LONG_ERROR_TEXT)
+        if errors:
+            return ServiceResponse(ResponseType.VALIDATION_ERROR, errors=errors)
+
+        dimension, key = (APPOINTMENT_FIELD_CLINICIAN, clinician) if clinician is not None else \
+            (APPOINTMENT_FIELD_DEPARTMENT, department)
+        rollups = await self.rollup_repository.get_range(dimension, key, first_day, last_day)
+        daily_counters = [
+            {
+                ROLLUP_FIELD_DAY: rollup[ROLLUP_FIELD_DAY],
+                **{field: rollup.get(field, 0) for field in ROLLUP_COUNTER_FIELDS}
+            }
+            for rollup in rollups
+        ]
+        totals = {field: sum(counters[field] for counters in daily_counters) for field in ROLLUP_COUNTER_FIELDS}
+        return ServiceResponse(
+            ResponseType.SUCCESS,
+            data={PANDA_RESPONSE_FIELD_DAYS: daily_counters, PANDA_RESPONSE_FIELD_TOTALS: totals}
+        )
@@ -1,103 +1,559 @@
-from src.repository.appointment import AppointmentRepository
+import json
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import timedelta, timezone
+from typing import Optional
+
+from src.repository.appointment import AppointmentRepository, AppointmentQuery
+from src.repository.patient import PatientRepository
+from src.repository.rollup import RollupRepository
+from src.repository.errors import DuplicateRecordError
+from src.repository.results import WriteStatus
+from src.repository.appointment_storage import parse_time, parse_duration, to_stored
 from src.service.results import ServiceResponse, ResponseType
 
 from constants import (
+    APPOINTMENT_FIELD_ID,
     APPOINTMENT_FIELD_STATUS,
+    APPOINTMENT_FIELD_PATIENT,
+    APPOINTMENT_FIELD_TIME,
+    APPOINTMENT_FIELD_DURATION,
+    APPOINTMENT_FIELD_END_TIME,
+    APPOINTMENT_FIELD_CLINICIAN,
+    APPOINTMENT_STATUSES,
+    DOCUMENT_FIELD_VERSION,
+    STREAM_BATCH_SIZE,
+    APPOINTMENT_MAX_DURATION_HOURS,
+    PATCH_MAX_ATTEMPTS,
+    QUERY_ARGUMENT_FROM,
+    QUERY_ARGUMENT_TO,
+    QUERY_SORT_TIME_ASCENDING,
+    QUERY_SORT_TIME_DESCENDING,
+    QUERY_ARGUMENT_DURATION,
+    DEFAULT_SLOT_LIMIT,
+    MAX_SLOT_LIMIT,
+    SLOT_SEARCH_MAX_WINDOW_DAYS,
+    SLOT_SEARCH_LOOKBACK_HOURS,
+    SLOT_SEARCH_MAX_APPOINTMENTS,
+    SLOT_FIELD_START,
+    SLOT_FIELD_END,
     ERR_COULD_NOT_CREATE_APPOINTMENT,
     ERR_COULD_NOT_UPDATE_APPOINTMENT,
+    ERR_COULD_NOT_WRITE_APPOINTMENT,
     ERR_APPOINTMENT_NOT_FOUND,
+    ERR_CLINICIAN_DOUBLE_BOOKED,
+    ERR_APPOINTMENT_VERSION_CONFLICT,
+    ERR_APPOINTMENT_BUSY,
     MSG_NEW_APPOINTMENT_ADDED,
     MSG_APPOINTMENT_UPDATED,
     MSG_APPOINTMENT_CANCELLED,
     STATUS_CANCELLED,
+    UNKNOWN_PATIENT_ERROR_TEXT,
+    INVALID_STATUS_ERROR_TEXT,
+    INVALID_QUERY_TIME_ERROR_TEXT,
+    INVALID_QUERY_TIME_RANGE_ERROR_TEXT,
+    INVALID_QUERY_SORT_ERROR_TEXT,
+    INVALID_PAGE_CURSOR_ERROR_TEXT,
+    UNINDEXED_APPOINTMENT_QUERY_ERROR_TEXT,
+    MISSING_QUERY_ARGUMENT_ERROR_TEXT,
+    SLOT_SEARCH_FILTER_ERROR_TEXT,
+    SLOT_SEARCH_WINDOW_TOO_LONG_ERROR_TEXT,
+    SLOT_SEARCH_TOO_BUSY_ERROR_TEXT,
+    INVALID_SLOT_DURATION_ERROR_TEXT,
+    INVALID_SLOT_LIMIT_ERROR_TEXT,
 )
-from src.service.appointment_validation import validate
+from src.service.appointment_validation import validate, validate_many, validate_changes
+from src.service.pagination import parse_page_request, build_page, build_keyset_page
+from src.service.bulk import check_bulk_size, bulk_upsert
+from src.service.slots import free_slots
+from src.service.rollups import record_changes
+
+# Fields that decide when an appointment is and whether it overlaps another of its clinician's
+SCHEDULE_FIELDS = (APPOINTMENT_FIELD_TIME, APPOINTMENT_FIELD_DURATION, APPOINTMENT_FIELD_CLINICIAN)
+
+
+def _utc_time(time):
+    """Parse an ISO 8601 datetime as a UTC datetime, taking times without an offset to be UTC, or return None."""
+    parsed_time = parse_time(time)
+    if parsed_time is None:
+        return None
+    if parsed_time.tzinfo is None:
+        return parsed_time.replace(tzinfo=timezone.utc)
+    return parsed_time.astimezone(timezone.utc)
+
+
+def _time_and_id(appointment):
+    """Return the keyset an appointment query page continues after."""
+    return [_utc_time(appointment[APPOINTMENT_FIELD_TIME]).isoformat(), appointment[APPOINTMENT_FIELD_ID]]
+
+
+def _parse_time_and_id(key):
+    """Parse the keyset _time_and_id returned, raising ValueError if it is not one."""
+    try:
+        time, appointment_id = json.loads(key)
+    except (TypeError, ValueError) as error:
+        raise ValueError(key) from error
+    after_time = _utc_time(time)
+    if after_time is None or not isinstance(appointment_id, str):
+        raise ValueError(key)
+    return after_time, appointment_id
+
+
+def _find_overlap(bookings, starts, start, end, appointment_id):
+    """Return the id of a booking other than appointment_id overlapping the time from start to end, or None.
+
+    Args:
+        bookings: (start, end, id) tuples in start order, with ends known
+        starts: The start of each of the bookings
+    """
+    first = bisect_right(starts, start - timedelta(hours=APPOINTMENT_MAX_DURATION_HOURS))
+    for other_start, other_end, other_id in bookings[first:bisect_left(starts, end)]:
+        if other_end > start and other_id != appointment_id:
+            return other_id
+    return None
+
+
+def _check_double_bookings(stored_bookings, bookings):
+    """Add a double booking error to each of a clinician's bookings that overlaps one of its stored appointments, or
+    another booking of the batch, sweeping the bookings in start order.
+
+    As no appointment lasts longer than APPOINTMENT_MAX_DURATION_HOURS, only the bookings starting that long before
+    each one are compared with it. A stored appointment whose end is not known is taken to last that long.
+
+    Args:
+        stored_bookings: (start, end, id) of the clinician's stored appointments in start order, the end None when
+            unknown
+        bookings: (start, end, id, errors) of the batch's appointments of the clinician, errors being the list to add to
+    """
+    max_duration = timedelta(hours=APPOINTMENT_MAX_DURATION_HOURS)
+    stored_bookings = [
+        (start, end if end is not None else start + max_duration, appointment_id)
+        for start, end, appointment_id in stored_bookings
+    ]
+    stored_starts = [start for start, _, _ in stored_bookings]
+    accepted_bookings = []
+    accepted_starts = []
+    for start, end, appointment_id, errors in sorted(bookings, key=lambda booking: booking[:2]):
+        overlapping_id = _find_overlap(stored_bookings, stored_starts, start, end, appointment_id) or \
+            _find_overlap(accepted_bookings, accepted_starts, start, end, appointment_id)
+        if overlapping_id is not None:
+            errors.append(ERR_CLINICIAN_DOUBLE_BOOKED.format(overlapping_id))
+            continue
+        accepted_bookings.append((start, end, appointment_id))
+        accepted_starts.append(start)
 
 
 class AppointmentService:
 
-    def __init__(self, appointment_repository: AppointmentRepository):
-        """Initialize AppointmentService with an appointment repository.
+    def __init__(self, appointment_repository: AppointmentRepository, patient_repository: PatientRepository,
+                 rollup_repository: Optional[RollupRepository] = None):
+        """Initialize AppointmentService with appointment and patient repositories.
 
         Args:
             appointment_repository: Repository instance for appointment data access
+            patient_repository: Repository instance used to check appointments refer to existing patients
+            rollup_repository: Optional repository of daily appointment rollups, kept up to date with every write
         """
         self.appointment_repository = appointment_repository
+        self.patient_repository = patient_repository
+        self.rollup_repository = rollup_repository
+
+    async def record_rollup_changes(self, changes):
+        """Update the daily appointment rollups for appointments that have been written, if rollups are kept."""
+        if self.rollup_repository is not None:
+            await record_changes(self.rollup_repository, changes)
+
+    async def check_patients_exist(self, appointments):
+        """Check the patient of each appointment exists, looking every patient up in a single query.
+
+        Returns:
+            List of error lists, one per appointment in the order given
+        """
+        existing = await self.patient_repository.existing_nhs_numbers(
+            {appointment[APPOINTMENT_FIELD_PATIENT] for appointment in appointments}
+        )
+        return [
+            [] if appointment[APPOINTMENT_FIELD_PATIENT] in existing else [UNKNOWN_PATIENT_ERROR_TEXT]
+            for appointment in appointments
+        ]
+
+    async def check_clinician_available(self, appointment, appointment_id):
+        """Check the appointment's clinician has no other appointment that overlaps it, unless it is cancelled.
+
+        Args:
+            appointment: A valid appointment
+            appointment_id: ID of the appointment being written, which is not counted as an overlap
 
-    def create_appointment(self, appointment, appointment_id):
-        """Create a new appointment with validation."""
-        errors = validate(appointment)
+        Returns:
+            List of errors, empty if the clinician is available
+        """
+        if appointment[APPOINTMENT_FIELD_STATUS] == STATUS_CANCELLED:
+            return []
+        stored = to_stored(appointment)
+        overlapping_id = await self.appointment_repository.find_overlapping(
+            appointment[APPOINTMENT_FIELD_CLINICIAN],
+            stored[APPOINTMENT_FIELD_TIME],
+            stored[APPOINTMENT_FIELD_END_TIME],
+            appointment_id
+        )
+        return [ERR_CLINICIAN_DOUBLE_BOOKED.format(overlapping_id)] if overlapping_id is not None else []
+
+    async def check_bulk_references(self, appointments):
+        """Check valid appointments written in bulk refer to patients that exist and are not double booked, either by
+        appointments already stored or by others in the batch.
+
+        Each clinician's stored appointments across the time the batch covers are read in one query, and the batch's
+        appointments checked against them and each other by sorting and sweeping, so the number of queries depends on
+        the number of clinicians rather than appointments. Where two appointments of the batch overlap, the later one
+        is reported.
+
+        Args:
+            appointments: Valid appointments, in request order
+
+        Returns:
+            List of error lists, one per appointment in the order given
+        """
+        errors = await self.check_patients_exist(appointments)
+        bookings_by_clinician = defaultdict(list)
+        for appointment, appointment_errors in zip(appointments, errors):
+            if appointment_errors or appointment[APPOINTMENT_FIELD_STATUS] == STATUS_CANCELLED:
+                continue
+            stored = to_stored(appointment)
+            bookings_by_clinician[appointment[APPOINTMENT_FIELD_CLINICIAN]].append((
+                stored[APPOINTMENT_FIELD_TIME], stored[APPOINTMENT_FIELD_END_TIME], appointment[APPOINTMENT_FIELD_ID],
+                appointment_errors
+            ))
+
+        for clinician, bookings in bookings_by_clinician.items():
+            stored_bookings = await self.appointment_repository.find_bookings(
+                clinician, min(booking[0] for booking in bookings), max(booking[1] for booking in bookings)
+            )
+            _check_double_bookings(stored_bookings, bookings)
+        return errors
+
+    async def create_appointment(self, appointment, appointment_id):
+        """Create a new appointment with validation.
+
+        The insert relies on the unique index on id to reject existing appointments, so only a rejected create reads
+        the appointment, to report whether it was cancelled.
+        """
+        errors = validate(appointment) or (await self.check_patients_exist([appointment]))[0]
         if errors:
             return ServiceResponse(ResponseType.VALIDATION_ERROR, errors=errors)
+        errors = await self.check_clinician_available(appointment, appointment[APPOINTMENT_FIELD_ID])
+        if errors:
+            return ServiceResponse(ResponseType.BUSINESS_ERROR, errors=errors)
 
-        # Check if appointment already exists
-        existing_appointment = self.get_appointment(appointment_id)
-        if existing_appointment.response_type == ResponseType.SUCCESS:
-            # Appointment exists, check if it's cancelled
-            status = existing_appointment.data.get(APPOINTMENT_FIELD_STATUS)
-            if status == STATUS_CANCELLED:
+        try:
+            success = await self.appointment_repository.create(appointment)
+        except DuplicateRecordError:
+            existing_appointment = await self.appointment_repository.get_by_id(appointment[APPOINTMENT_FIELD_ID])
+            if existing_appointment and existing_appointment.get(APPOINTMENT_FIELD_STATUS) == STATUS_CANCELLED:
                 return ServiceResponse(ResponseType.BUSINESS_ERROR, errors=[ERR_COULD_NOT_UPDATE_APPOINTMENT])
-            else:
-                return ServiceResponse(ResponseType.BUSINESS_ERROR, errors=[ERR_COULD_NOT_CREATE_APPOINTMENT])
-
-        success = self.appointment_repository.create(appointment)
+            return ServiceResponse(ResponseType.BUSINESS_ERROR, errors=[ERR_COULD_NOT_CREATE_APPOINTMENT])
         if not success:
             return ServiceResponse(ResponseType.DATABASE_ERROR, errors=[ERR_COULD_NOT_CREATE_APPOINTMENT])
+        await self.record_rollup_changes([(None, appointment)])
 
         return ServiceResponse(
             ResponseType.SUCCESS,
             message=MSG_NEW_APPOINTMENT_ADDED.format(appointment_id)
         )
 
-    def update_appointment(self, appointment, appointment_id):
-        """Update an existing appointment with validation."""
-        errors = validate(appointment)
+    async def update_appointment(self, appointment, appointment_id, version=None):
+        """Update an existing appointment with validation. Cancelled appointments cannot be reinstated, and an
+        appointment cannot be moved to overlap another of its clinician's. Given a version, the appointment is only
+        updated if it is still at that version. The response holds the appointment's new version."""
+        errors = validate(appointment) or (await self.check_patients_exist([appointment]))[0]
         if errors:
             return ServiceResponse(ResponseType.VALIDATION_ERROR, errors=errors)
+        errors = await self.check_clinician_available(appointment, appointment_id)
+        if errors:
+            return ServiceResponse(ResponseType.BUSINESS_ERROR, errors=errors)
 
-        get_service_response = self.prevent_cancelled_appointment_from_being_updated(appointment_id)
-        if get_service_response.response_type == ResponseType.BUSINESS_ERROR:
-            return get_service_response
+        return await self.write_update(appointment_id, appointment, version)
 
-        success = self.appointment_repository.update_by_id(appointment_id, appointment)
-        if not success:
-            return ServiceResponse(ResponseType.DATABASE_ERROR, errors=[ERR_COULD_NOT_UPDATE_APPOINTMENT])
+    async def patch_appointment(self, changes, appointment_id, version=None):
+        """Change some of an existing appointment's fields, validating only the fields changed. Given a version, the
+        appointment is only changed if it is still at that version. The response holds the appointment's new version.
+
+        Changes that leave the time, duration and clinician alone, such as a change of status, are set in a single
+        write, in which cancelled appointments still cannot be reinstated. Changes to any of them are checked against
+        the clinician's other appointments and written with the time and duration together, so the end time is kept in
+        step. That takes reading the appointment first, and the write only goes ahead if the appointment is still at the
+        version read, otherwise it is read again. Without a version, an appointment that keeps changing between reading
+        and writing it is reported as a conflict once the attempts run out.
+        """
+        errors = validate_changes(changes)
+        if not errors and APPOINTMENT_FIELD_PATIENT in changes:
+            errors = (await self.check_patients_exist([changes]))[0]
+        if errors:
+            return ServiceResponse(ResponseType.VALIDATION_ERROR, errors=errors)
+        if not any(field in changes for field in SCHEDULE_FIELDS):
+            return await self.write_update(appointment_id, changes, version)
+
+        for _ in range(PATCH_MAX_ATTEMPTS):
+            current = await self.appointment_repository.get_by_id(appointment_id)
+            if current is None:
+                return await self.write_update(appointment_id, changes, version)
+            current_version = current.pop(DOCUMENT_FIELD_VERSION, 0)
+            if version is not None and current_version != version:
+                return ServiceResponse(ResponseType.PRECONDITION_FAILED, errors=[ERR_APPOINTMENT_VERSION_CONFLICT])
+            appointment = {**current, **changes}
+            errors = await self.check_clinician_available(appointment, appointment_id)
+            if errors:
+                return ServiceResponse(ResponseType.BUSINESS_ERROR, errors=errors)
+
+            schedule = {
+                APPOINTMENT_FIELD_TIME: appointment[APPOINTMENT_FIELD_TIME],
+                APPOINTMENT_FIELD_DURATION: appointment[APPOINTMENT_FIELD_DURATION],
+            }
+            response = await self.write_update(appointment_id, {**schedule, **changes}, current_version)
+            if response.response_type != ResponseType.PRECONDITION_FAILED or version is not None:
+                return response
+        return ServiceResponse(ResponseType.CONFLICT, errors=[ERR_APPOINTMENT_BUSY])
+
+    async def write_update(self, appointment_id, appointment, version):
+        """Write an update to an appointment unless it is cancelled, or not at the given version, record it in the
+        rollups and build the response, which holds the appointment's new version."""
+        try:
+            status, previous = await self.appointment_repository.update_unless_cancelled(
+                appointment_id, appointment, version
+            )
+        except DuplicateRecordError:
+            # The update would have given the appointment the ID of another appointment
+            return ServiceResponse(ResponseType.BUSINESS_ERROR, errors=[ERR_COULD_NOT_UPDATE_APPOINTMENT])
+        if status == WriteStatus.NOT_FOUND:
+            # Given a version, there is no version of the appointment to match
+            response_type = ResponseType.NOT_FOUND if version is None else ResponseType.PRECONDITION_FAILED
+            return ServiceResponse(response_type, errors=[ERR_APPOINTMENT_NOT_FOUND])
+        if status == WriteStatus.STALE:
+            return ServiceResponse(ResponseType.PRECONDITION_FAILED, errors=[ERR_APPOINTMENT_VERSION_CONFLICT])
+        if status == WriteStatus.CONFLICT:
+            return ServiceResponse(ResponseType.BUSINESS_ERROR, errors=[ERR_COULD_NOT_UPDATE_APPOINTMENT])
+        previous_version = previous.pop(DOCUMENT_FIELD_VERSION, 0)
+        await self.record_rollup_changes([(previous, {**previous, **appointment})])
 
         return ServiceResponse(
             ResponseType.SUCCESS,
-            message=MSG_APPOINTMENT_UPDATED.format(appointment_id)
+            message=MSG_APPOINTMENT_UPDATED.format(appointment_id),
+            version=previous_version + 1
         )
 
-    def get_appointment(self, appointment_id):
-        """Get an appointment by ID."""
-        appointment_data = self.appointment_repository.get_by_id(appointment_id)
+    async def get_appointment(self, appointment_id):
+        """Get an appointment by ID, and its version. Appointments written before versions were kept are at version
+        0."""
+        appointment_data = await self.appointment_repository.get_by_id(appointment_id)
         if not appointment_data:
             return ServiceResponse(ResponseType.NOT_FOUND, errors=[ERR_APPOINTMENT_NOT_FOUND])
 
-        return ServiceResponse(ResponseType.SUCCESS, data=appointment_data)
+        version = appointment_data.pop(DOCUMENT_FIELD_VERSION, 0)
+        return ServiceResponse(ResponseType.SUCCESS, data=appointment_data, version=version)
 
-    def delete_appointment(self, appointment_id):
-        """Delete an appointment by ID."""
+    async def get_appointments_version(self):
+        """Get the version of the appointments collection, which changes with every write to any appointment."""
+        return await self.appointment_repository.get_collection_version()
+
+    async def delete_appointment(self, appointment_id):
+        """Delete an appointment by ID. Appointments are cancelled rather than removed, cancelling twice is allowed."""
         cancelled_appointment = {APPOINTMENT_FIELD_STATUS: STATUS_CANCELLED}
-        success = self.appointment_repository.update_by_id(appointment_id, cancelled_appointment)
-        if not success:
+        status, previous = await self.appointment_repository.update_unless_cancelled(
+            appointment_id, cancelled_appointment
+        )
+        if status == WriteStatus.NOT_FOUND:
             return ServiceResponse(ResponseType.NOT_FOUND, errors=[ERR_APPOINTMENT_NOT_FOUND])
+        if status == WriteStatus.UPDATED:
+            previous.pop(DOCUMENT_FIELD_VERSION, None)
+            await self.record_rollup_changes([(previous, {**previous, **cancelled_appointment})])
 
         return ServiceResponse(
             ResponseType.SUCCESS,
             message=MSG_APPOINTMENT_CANCELLED.format(appointment_id)
         )
 
-    def get_all_appointments(self):
+    async def get_all_appointments(self):
         """Get all appointments."""
-        appointments = self.appointment_repository.get_all()
+        appointments = await self.appointment_repository.get_all()
         return ServiceResponse(ResponseType.SUCCESS, data=appointments)
 
-    def prevent_cancelled_appointment_from_being_updated(self, appointment_id):
-        """Prevent a cancelled appointment from being updated."""
-        get_response = self.get_appointment(appointment_id)
-        if get_response.response_type == ResponseType.SUCCESS:
-            status = get_response.data.get(APPOINTMENT_FIELD_STATUS)
-            if status == STATUS_CANCELLED:
-                return ServiceResponse(ResponseType.BUSINESS_ERROR, errors=[ERR_COULD_NOT_UPDATE_APPOINTMENT])
-        return ServiceResponse(ResponseType.SUCCESS)
+    def stream_appointments(self):
+        """Stream every appointment in batches, for exporting the whole collection."""
+        return self.appointment_repository.stream(STREAM_BATCH_SIZE)
+
+    async def get_appointments_page(self, limit=None, cursor=None):
+        """Get a page of appointments ordered by ID, continuing from an optional cursor."""
+        page_limit, after, errors = parse_page_request(limit, cursor)
+        if errors:
+            return ServiceResponse(ResponseType.VALIDATION_ERROR, errors=errors)
+
+        # Fetch one extra appointment to find out whether another page follows
+        appointments = await self.appointment_repository.get_page(page_limit + 1, after)
+        page, next_cursor = build_page(appointments, page_limit, APPOINTMENT_FIELD_ID)
+        return ServiceResponse(ResponseType.SUCCESS, data=page, next_cursor=next_cursor)
+
+    async def find_appointments(self, patient=None, clinician=None, department=None, status=None, time_from=None,
+                                time_to=None, sort=None, limit=None, cursor=None):
+        """Find a page of appointments by patient, clinician or department, optionally within a time window, in time
+        order and continuing from an optional cursor.
+
+        Every query is answered from an index on patient, clinician or department and time, so a query that filters on
+        none of those is rejected rather than left to scan every appointment.
+        """
+        page_limit, after_key, errors = parse_page_request(limit, cursor)
+
+        after = None
+        if after_key is not None:
+            try:
+                after = _parse_time_and_id(after_key)
+            except ValueError:
+                errors.append(INVALID_PAGE_CURSOR_ERROR_TEXT)
+
+        window = {}
+        for argument, value in ((QUERY_ARGUMENT_FROM, time_from), (QUERY_ARGUMENT_TO, time_to)):
+            window[argument] = _utc_time(value) if value is not None else None
+            if value is not None and window[argument] is None:
+                errors.append(INVALID_QUERY_TIME_ERROR_TEXT.format(argument))
+        if window[QUERY_ARGUMENT_FROM] and window[QUERY_ARGUMENT_TO] and \
+                window[QUERY_ARGUMENT_FROM] >= window[QUERY_ARGUMENT_TO]:
+            errors.append(INVALID_QUERY_TIME_RANGE_ERROR_TEXT)
+
+        if status is not None and status not in APPOINTMENT_STATUSES:
+            errors.append(INVALID_STATUS_ERROR_TEXT)
+        if sort not in (None, QUERY_SORT_TIME_ASCENDING, QUERY_SORT_TIME_DESCENDING):
+            errors.append(INVALID_QUERY_SORT_ERROR_TEXT)
+
+        query = AppointmentQuery(
+            patient=patient,
+            clinician=clinician,
+            department=department,
+            status=status,
+            time_from=window[QUERY_ARGUMENT_FROM],
+            time_to=window[QUERY_ARGUMENT_TO],
+            descending=sort == QUERY_SORT_TIME_DESCENDING
+        )
+        if query.index_field() is None:
+            errors.append(UNINDEXED_APPOINTMENT_QUERY_ERROR_TEXT)
+        if errors:
+            return ServiceResponse(ResponseType.VALIDATION_ERROR, errors=errors)
+
+        # Fetch one extra appointment to find out whether another page follows
+        appointments = await self.appointment_repository.find(query, page_limit + 1, after)
+        page, next_cursor = build_keyset_page(appointments, page_limit, _time_and_id)
+        return ServiceResponse(ResponseType.SUCCESS, data=page, next_cursor=next_cursor)
+
+    async def find_free_slots(self, clinician=None, department=None, time_from=None, time_to=None, duration=None,
+                              limit=None):
+        """Find the earliest free slots of a duration for a clinician or department within a time window.
+
+        A slot is free when no appointment of the clinician or department that is not cancelled overlaps it. Only the
+        start and end times of the appointments in the window are read, from the index on clinician or department and
+        time, and the gaps between them are found in a single sweep. Slots are returned in the offset time_from is
+        given in.
+        """
+        errors = []
+        if clinician is None and department is None:
+            errors.append(SLOT_SEARCH_FILTER_ERROR_TEXT)
+
+        window = {}
+        for argument, value in ((QUERY_ARGUMENT_FROM, time_from), (QUERY_ARGUMENT_TO, time_to)):
+            window[argument] = _utc_time(value) if value is not None else None
+            if value is None:
+                errors.append(MISSING_QUERY_ARGUMENT_ERROR_TEXT.format(argument))
+            elif window[argument] is None:
+                errors.append(INVALID_QUERY_TIME_ERROR_TEXT.format(argument))
+        start, end = window[QUERY_ARGUMENT_FROM], window[QUERY_ARGUMENT_TO]
+        if start and end and start >= end:
+            errors.append(INVALID_QUERY_TIME_RANGE_ERROR_TEXT)
+        elif start and end and end - start > timedelta(days=SLOT_SEARCH_MAX_WINDOW_DAYS):
+            errors.append(SLOT_SEARCH_WINDOW_TOO_LONG_ERROR_TEXT)
+
+        slot_duration = parse_duration(duration)
+        if duration is None:
+            errors.append(MISSING_QUERY_ARGUMENT_ERROR_TEXT.format(QUERY_ARGUMENT_DURATION))
+        elif not slot_duration:
+            errors.append(INVALID_SLOT_DURATION_ERROR_TEXT)
+
+        slot_limit = DEFAULT_SLOT_LIMIT
+        if limit is not None:
+            try:
+                slot_limit = int(limit)
+            except (TypeError, ValueError):
+                slot_limit = 0
+            if not 1 <= slot_limit <= MAX_SLOT_LIMIT:
+                errors.append(INVALID_SLOT_LIMIT_ERROR_TEXT)
+        if errors:
+            return ServiceResponse(ResponseType.VALIDATION_ERROR, errors=errors)
+
+        query = AppointmentQuery(
+            clinician=clinician,
+            department=department,
+            time_from=start - timedelta(hours=SLOT_SEARCH_LOOKBACK_HOURS),
+            time_to=end
+        )
+        # Read one more than the maximum to find out whether the window holds too many appointments
+        busy_times = await self.appointment_repository.find_busy_times(query, SLOT_SEARCH_MAX_APPOINTMENTS + 1)
+        if len(busy_times) > SLOT_SEARCH_MAX_APPOINTMENTS:
+            return ServiceResponse(ResponseType.VALIDATION_ERROR, errors=[SLOT_SEARCH_TOO_BUSY_ERROR_TEXT])
+
+        offset = parse_time(time_from).tzinfo or timezone.utc
+        slots = [
+            {
+                SLOT_FIELD_START: slot_start.astimezone(offset).isoformat(),
+                SLOT_FIELD_END: slot_end.astimezone(offset).isoformat()
+            }
+            for slot_start, slot_end in free_slots(busy_times, start, end, slot_duration, slot_limit)
+        ]
+        return ServiceResponse(ResponseType.SUCCESS, data=slots)
+
+    async def get_patient_appointments(self, nhs_number, status=None, limit=None, cursor=None):
+        """Get a page of a patient's appointments in time order, continuing from an optional cursor.
+
+        Each page is a single range read of the index on patient, time and ID. A patient with no appointments, or an
+        NHS number no patient has, gets an empty page.
+        """
+        return await self.find_appointments(patient=nhs_number, status=status, limit=limit, cursor=cursor)
+
+    async def bulk_upsert_appointments(self, appointments):
+        """Validate and create or update many appointments, reporting the outcome of each one.
+
+        Cancelled appointments, appointments for patients that do not exist, and appointments whose clinician is
+        already booked at the time, are reported as errors.
+        """
+        errors = check_bulk_size(appointments)
+        if errors:
+            return ServiceResponse(ResponseType.VALIDATION_ERROR, errors=errors)
+
+        results = await bulk_upsert(
+            appointments,
+            validate_many,
+            self.upsert_appointments,
+            APPOINTMENT_FIELD_ID,
+            ERR_COULD_NOT_UPDATE_APPOINTMENT,
+            ERR_COULD_NOT_WRITE_APPOINTMENT,
+            self.check_bulk_references
+        )
+        return ServiceResponse(ResponseType.SUCCESS, data=results)
+
+    async def upsert_appointments(self, appointments):
+        """Create or update a batch of valid appointments, updating the daily appointment rollups for those written.
+
+        The appointments are read before the write, to take their previous contribution out of the rollups. An
+        appointment written by another request in between is counted as it was read.
+        """
+        if self.rollup_repository is None:
+            return await self.appointment_repository.upsert_many(appointments)
+
+        previous_appointments = await self.appointment_repository.get_many(
+            [appointment[APPOINTMENT_FIELD_ID] for appointment in appointments]
+        )
+        statuses = await self.appointment_repository.upsert_many(appointments)
+        changes = []
+        for appointment, status in zip(appointments, statuses):
+            if status in (WriteStatus.CREATED, WriteStatus.UPDATED):
+                # An appointment repeated in the batch is counted as written in request order
+                previous = previous_appointments.get(appointment[APPOINTMENT_FIELD_ID])
+                current = {**(previous or {}), **appointment}
+                previous_appointments[appointment[APPOINTMENT_FIELD_ID]] = current
+                changes.append((previous, current))
+        await self.record_rollup_changes(changes)
+        return statuses
@@ -0,0 +1,94 @@
+from src.repository.results import WriteStatus
+from constants import (
+    BULK_MAX_RECORDS,
+    BULK_WRITE_BATCH_SIZE,
+    BULK_RESULT_FIELD_INDEX,
+    BULK_RESULT_FIELD_STATUS,
+    BULK_RESULT_FIELD_ERRORS,
+    BULK_STATUS_ERROR,
+    INVALID_BULK_RECORD_ERROR_TEXT,
+    TOO_MANY_BULK_RECORDS_ERROR_TEXT,
+)
+
+
+def check_bulk_size(records):
+    """Check a bulk request does not exceed the maximum number of records."""
+    if len(records) > BULK_MAX_RECORDS:
+        return [TOO_MANY_BULK_RECORDS_ERROR_TEXT]
+    return []
+
+
+async def bulk_upsert(records, validate_many, upsert_many, key_field, conflict_error, failure_error,
+                      check_references=None):
+    """Validate every record and upsert the valid ones in batches, reporting the outcome of each record.
+
+    An invalid record or a record rejected by the database does not stop the rest of the batch being written.
+
+    Args:
+        records: Records to write, in request order
+        validate_many: Validation function returning a list of errors for each of a list of records
+        upsert_many: Repository coroutine writing a batch of records and returning a WriteStatus per record
+        key_field: Name of the field identifying a record, echoed back in its result
+        conflict_error: Error reported for records the repository refused to overwrite
+        failure_error: Error reported for records the repository failed to write
+        check_references: Optional coroutine given the valid records and returning a list of errors for each, for
+            checks that need the database, such as records referring to other records that must exist
+
+    Returns:
+        List of result dictionaries, one per record in request order
+    """
+    results = []
+    candidate_records = []
+    candidate_results = []
+    for index, record in enumerate(records):
+        result = {BULK_RESULT_FIELD_INDEX: index}
+        results.append(result)
+        if not isinstance(record, dict):
+            result[BULK_RESULT_FIELD_STATUS] = BULK_STATUS_ERROR
+            result[BULK_RESULT_FIELD_ERRORS] = [INVALID_BULK_RECORD_ERROR_TEXT]
+            continue
+
+        if key_field in record:
+            result[key_field] = record[key_field]
+        candidate_records.append(record)
+        candidate_results.append(result)
+
+    valid_records = []
+    valid_record_results = []
+    for record, result, errors in zip(candidate_records, candidate_results, validate_many(candidate_records)):
+        if errors:
+            result[BULK_RESULT_FIELD_STATUS] = BULK_STATUS_ERROR
+            result[BULK_RESULT_FIELD_ERRORS] = errors
+            continue
+
+        valid_records.append(record)
+        valid_record_results.append(result)
+
+    if check_references is not None and valid_records:
+        checked_records = valid_records
+        checked_results = valid_record_results
+        valid_records = []
+        valid_record_results = []
+        for record, result, errors in zip(checked_records, checked_results, await check_references(checked_records)):
+            if errors:
+                result[BULK_RESULT_FIELD_STATUS] = BULK_STATUS_ERROR
+                result[BULK_RESULT_FIELD_ERRORS] = errors
+                continue
+
+            valid_records.append(record)
+            valid_record_results.append(result)
+
+    for start in range(0, len(valid_records), BULK_WRITE_BATCH_SIZE):
+        batch = valid_records[start:start + BULK_WRITE_BATCH_SIZE]
+        statuses = await upsert_many(batch)
+        for result, status in zip(valid_record_results[start:start + BULK_WRITE_BATCH_SIZE], statuses):
+            if status == WriteStatus.CONFLICT:
+                result[BULK_RESULT_FIELD_STATUS] = BULK_STATUS_ERROR
+                result[BULK_RESULT_FIELD_ERRORS] = [conflict_error]
+            elif status == WriteStatus.FAILED:
+                result[BULK_RESULT_FIELD_STATUS] = BULK_STATUS_ERROR
+                result[BULK_RESULT_FIELD_ERRORS] = [failure_error]
+            else:
+                result[BULK_RESULT_FIELD_STATUS] = status.value
+
+    return results
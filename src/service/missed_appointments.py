@@ -0,0 +1,67 @@
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from src.repository.appointment import AppointmentRepository
+from src.repository.rollup import RollupRepository
+from src.service.rollups import record_changes
+from constants import APPOINTMENT_FIELD_STATUS, STATUS_ACTIVE, STATUS_MISSED
+
+logger = logging.getLogger(__name__)
+
+
+def _utc_now():
+    return datetime.now(timezone.utc)
+
+
+class MissedAppointmentSweeper:
+    """Marks active appointments as missed once they have ended without being attended.
+
+    Each sweep marks at most batch_size appointments, the earliest ending first, so a backlog, for example after the
+    service has been down, is worked through over several sweeps rather than in one unbounded write.
+    """
+
+    def __init__(self, appointment_repository: AppointmentRepository, batch_size: int, clock=_utc_now,
+                 rollup_repository: Optional[RollupRepository] = None):
+        """Initialize the sweeper.
+
+        Args:
+            appointment_repository: Repository instance for appointment data access
+            batch_size: Maximum number of appointments marked by each sweep
+            clock: Function returning the current time as an aware datetime
+            rollup_repository: Optional repository of daily appointment rollups, to count the appointments marked
+        """
+        self.appointment_repository = appointment_repository
+        self.rollup_repository = rollup_repository
+        self.batch_size = batch_size
+        self.clock = clock
+        self.last_marked = 0
+        self.total_marked = 0
+
+    async def sweep(self):
+        """Mark up to batch_size ended appointments as missed, returning how many were marked."""
+        appointment_ids = await self.appointment_repository.mark_missed(self.clock(), self.batch_size)
+        self.last_marked = len(appointment_ids)
+        self.total_marked += self.last_marked
+        if appointment_ids and self.rollup_repository is not None:
+            await self.record_rollup_changes(appointment_ids)
+        if appointment_ids:
+            logger.info(f'Marked {self.last_marked} appointment(s) missed, {self.total_marked} since startup')
+        if self.last_marked >= self.batch_size:
+            logger.warning('Missed appointment sweep was full, the rest will be marked by the following sweeps')
+        return self.last_marked
+
+    async def record_rollup_changes(self, appointment_ids):
+        """Count the appointments marked as missed in the daily appointment rollups.
+
+        The appointments are read after they were marked, and counted as going from active to missed whatever their
+        status is now, since any later write takes its own status change into account.
+        """
+        appointments = await self.appointment_repository.get_many(appointment_ids)
+        await record_changes(self.rollup_repository, [
+            (
+                {**appointment, APPOINTMENT_FIELD_STATUS: STATUS_ACTIVE},
+                {**appointment, APPOINTMENT_FIELD_STATUS: STATUS_MISSED}
+            )
+            for appointment in appointments.values()
+        ])
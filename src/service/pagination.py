@@ -0,0 +1,83 @@
+import base64
+import binascii
+import json
+
+from constants import (
+    DEFAULT_PAGE_LIMIT,
+    MAX_PAGE_LIMIT,
+    INVALID_PAGE_LIMIT_ERROR_TEXT,
+    INVALID_PAGE_CURSOR_ERROR_TEXT,
+)
+
+
+def encode_cursor(key):
+    """Encode the key of the last document on a page as an opaque continuation token."""
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decode a continuation token back into the key the next page starts after.
+
+    Raises:
+        ValueError: If the token was not produced by encode_cursor
+    """
+    try:
+        return base64.b64decode(cursor.encode('ascii'), altchars=b'-_', validate=True).decode('utf-8')
+    except (binascii.Error, UnicodeError) as error:
+        raise ValueError(cursor) from error
+
+
+def parse_page_request(limit, cursor):
+    """Parse the raw limit and cursor request arguments.
+
+    Returns:
+        tuple: (page limit, key to start after or None, list of validation errors)
+    """
+    errors = []
+    page_limit = DEFAULT_PAGE_LIMIT
+    if limit is not None:
+        try:
+            page_limit = int(limit)
+        except (TypeError, ValueError):
+            page_limit = 0
+        if not 1 <= page_limit <= MAX_PAGE_LIMIT:
+            errors.append(INVALID_PAGE_LIMIT_ERROR_TEXT)
+
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            errors.append(INVALID_PAGE_CURSOR_ERROR_TEXT)
+
+    return page_limit, after, errors
+
+
+def build_page(documents, limit, key_field):
+    """Trim a result fetched with limit + 1 documents down to a page and its continuation token.
+
+    Returns:
+        tuple: (documents on the page, next cursor or None when this is the last page)
+    """
+    if len(documents) <= limit:
+        return documents, None
+
+    page = documents[:limit]
+    return page, encode_cursor(page[-1][key_field])
+
+
+def build_keyset_page(documents, limit, key):
+    """Trim a result fetched with limit + 1 documents down to a page and its continuation token, for pages ordered on
+    more than one field.
+
+    Args:
+        key: Function returning the list of values the next page starts after from the last document on the page
+
+    Returns:
+        tuple: (documents on the page, next cursor or None when this is the last page)
+    """
+    if len(documents) <= limit:
+        return documents, None
+
+    page = documents[:limit]
+    return page, encode_cursor(json.dumps(key(page[-1])))
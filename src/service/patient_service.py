@@ -1,15 +1,25 @@
 from src.repository.patient import PatientRepository
+from src.repository.errors import DuplicateRecordError
+from src.repository.results import WriteStatus
 from src.service.results import ServiceResponse, ResponseType
 
 from constants import (
+    PATIENT_FIELD_NHS_NUMBER,
+    DOCUMENT_FIELD_VERSION,
+    STREAM_BATCH_SIZE,
     ERR_COULD_NOT_CREATE_PATIENT,
     ERR_COULD_NOT_UPDATE_PATIENT,
+    ERR_COULD_NOT_WRITE_PATIENT,
     ERR_PATIENT_NOT_FOUND,
+    ERR_PATIENT_ALREADY_EXISTS,
+    ERR_PATIENT_VERSION_CONFLICT,
     MSG_NEW_PATIENT_ADDED,
     MSG_PATIENT_UPDATED,
     MSG_PATIENT_DELETED,
 )
-from src.service.patient_validation import validate
+from src.service.patient_validation import validate, validate_many, validate_changes
+from src.service.pagination import parse_page_request, build_page
+from src.service.bulk import check_bulk_size, bulk_upsert
 
 
 class PatientService:
@@ -22,13 +32,16 @@ class PatientService:
         """
         self.patient_repository = patient_repository
 
-    def create_patient(self, patient, nhs_number):
+    async def create_patient(self, patient, nhs_number):
         """Create a new patient with validation."""
         errors = validate(patient)
         if errors:
             return ServiceResponse(ResponseType.VALIDATION_ERROR, errors=errors)
 
-        success = self.patient_repository.create(patient)
+        try:
+            success = await self.patient_repository.create(patient)
+        except DuplicateRecordError:
+            return ServiceResponse(ResponseType.BUSINESS_ERROR, errors=[ERR_PATIENT_ALREADY_EXISTS])
         if not success:
             return ServiceResponse(ResponseType.DATABASE_ERROR, errors=[ERR_COULD_NOT_CREATE_PATIENT])
 
@@ -37,32 +50,68 @@ class PatientService:
             message=MSG_NEW_PATIENT_ADDED.format(nhs_number)
         )
 
-    def update_patient(self, patient, nhs_number):
-        """Update an existing patient with validation."""
+    async def update_patient(self, patient, nhs_number, version=None):
+        """Update an existing patient with validation. Given a version, the patient is only updated if it is still at
+        that version. The response holds the patient's new version."""
         errors = validate(patient)
         if errors:
             return ServiceResponse(ResponseType.VALIDATION_ERROR, errors=errors)
 
-        success = self.patient_repository.update_by_nhs_number(nhs_number, patient)
-        if not success:
+        try:
+            status, new_version = await self.patient_repository.update_at_version(nhs_number, patient, version)
+        except DuplicateRecordError:
+            return ServiceResponse(ResponseType.BUSINESS_ERROR, errors=[ERR_PATIENT_ALREADY_EXISTS])
+        return self.update_response(status, nhs_number, version, new_version)
+
+    async def patch_patient(self, changes, nhs_number, version=None):
+        """Change some of an existing patient's fields, validating only the fields changed, which are set in a single
+        write. Given a version, the patient is only changed if it is still at that version. The response holds the
+        patient's new version."""
+        errors = validate_changes(changes)
+        if errors:
+            return ServiceResponse(ResponseType.VALIDATION_ERROR, errors=errors)
+
+        try:
+            status, new_version = await self.patient_repository.update_at_version(nhs_number, changes, version)
+        except DuplicateRecordError:
+            return ServiceResponse(ResponseType.BUSINESS_ERROR, errors=[ERR_PATIENT_ALREADY_EXISTS])
+        return self.update_response(status, nhs_number, version, new_version)
+
+    @staticmethod
+    def update_response(status, nhs_number, version, new_version):
+        """Build the response to a patient update from its write status and the version it took the patient to, given
+        the version it had to be at if any."""
+        if status == WriteStatus.STALE:
+            return ServiceResponse(ResponseType.PRECONDITION_FAILED, errors=[ERR_PATIENT_VERSION_CONFLICT])
+        if status == WriteStatus.NOT_FOUND:
+            # Given a version, there is no version of the patient to match
+            response_type = ResponseType.NOT_FOUND if version is None else ResponseType.PRECONDITION_FAILED
+            return ServiceResponse(response_type, errors=[ERR_PATIENT_NOT_FOUND])
+        if status != WriteStatus.UPDATED:
             return ServiceResponse(ResponseType.DATABASE_ERROR, errors=[ERR_COULD_NOT_UPDATE_PATIENT])
 
         return ServiceResponse(
             ResponseType.SUCCESS,
-            message=MSG_PATIENT_UPDATED.format(nhs_number)
+            message=MSG_PATIENT_UPDATED.format(nhs_number),
+            version=new_version
         )
 
-    def get_patient(self, nhs_number):
-        """Get a patient by NHS number."""
-        patient_data = self.patient_repository.get_by_nhs_number(nhs_number)
+    async def get_patient(self, nhs_number):
+        """Get a patient by NHS number, and its version. Patients written before versions were kept are at version 0."""
+        patient_data = await self.patient_repository.get_by_nhs_number(nhs_number)
         if not patient_data:
             return ServiceResponse(ResponseType.NOT_FOUND, errors=[ERR_PATIENT_NOT_FOUND])
 
-        return ServiceResponse(ResponseType.SUCCESS, data=patient_data)
+        version = patient_data.pop(DOCUMENT_FIELD_VERSION, 0)
+        return ServiceResponse(ResponseType.SUCCESS, data=patient_data, version=version)
 
-    def delete_patient(self, nhs_number):
+    async def get_patients_version(self):
+        """Get the version of the patients collection, which changes with every write to any patient."""
+        return await self.patient_repository.get_collection_version()
+
+    async def delete_patient(self, nhs_number):
         """Delete a patient by NHS number."""
-        success = self.patient_repository.delete_by_nhs_number(nhs_number)
+        success = await self.patient_repository.delete_by_nhs_number(nhs_number)
         if not success:
             return ServiceResponse(ResponseType.NOT_FOUND, errors=[ERR_PATIENT_NOT_FOUND])
 
@@ -71,7 +120,38 @@ class PatientService:
             message=MSG_PATIENT_DELETED.format(nhs_number)
         )
 
-    def get_all_patients(self):
+    async def get_all_patients(self):
         """Get all patients."""
-        patients = self.patient_repository.get_all()
+        patients = await self.patient_repository.get_all()
         return ServiceResponse(ResponseType.SUCCESS, data=patients)
+
+    def stream_patients(self):
+        """Stream every patient in batches, for exporting the whole collection."""
+        return self.patient_repository.stream(STREAM_BATCH_SIZE)
+
+    async def get_patients_page(self, limit=None, cursor=None):
+        """Get a page of patients ordered by NHS number, continuing from an optional cursor."""
+        page_limit, after, errors = parse_page_request(limit, cursor)
+        if errors:
+            return ServiceResponse(ResponseType.VALIDATION_ERROR, errors=errors)
+
+        # Fetch one extra patient to find out whether another page follows
+        patients = await self.patient_repository.get_page(page_limit + 1, after)
+        page, next_cursor = build_page(patients, page_limit, PATIENT_FIELD_NHS_NUMBER)
+        return ServiceResponse(ResponseType.SUCCESS, data=page, next_cursor=next_cursor)
+
+    async def bulk_upsert_patients(self, patients):
+        """Validate and create or update many patients, reporting the outcome of each one."""
+        errors = check_bulk_size(patients)
+        if errors:
+            return ServiceResponse(ResponseType.VALIDATION_ERROR, errors=errors)
+
+        results = await bulk_upsert(
+            patients,
+            validate_many,
+            self.patient_repository.upsert_many,
+            PATIENT_FIELD_NHS_NUMBER,
+            ERR_PATIENT_ALREADY_EXISTS,
+            ERR_COULD_NOT_WRITE_PATIENT
+        )
+        return ServiceResponse(ResponseType.SUCCESS, data=results)
@@ -8,6 +8,8 @@ class ResponseType(Enum):
     VALIDATION_ERROR = 'validation_error'
     DATABASE_ERROR = 'database_error'
     BUSINESS_ERROR = 'business_error'
+    PRECONDITION_FAILED = 'precondition_failed'
+    CONFLICT = 'conflict'
 
 
 @dataclass
@@ -15,4 +17,6 @@ class ServiceResponse:
     response_type: ResponseType
     data: Optional[Any] = None
     errors: Optional[List[str]] = None
-    message: Optional[str] = None
\ No newline at end of file
+    message: Optional[str] = None
+    next_cursor: Optional[str] = None
+    version: Optional[int] = None
\ No newline at end of file
@@ -0,0 +1,119 @@
+""" Daily appointment rollups of each clinician and department: how many appointments were booked, attended, missed and
+cancelled on a day, and the minutes of missed appointments. A rollup is a sum over the appointments of its day, so when
+an appointment is written its old contribution is taken away and its new one added, and the rollups can be rebuilt from
+scratch by adding up every appointment. """
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from src.repository.appointment import AppointmentRepository
+from src.repository.rollup import RollupRepository, RollupKey
+from src.repository.appointment_storage import parse_time, parse_duration
+from constants import (
+    APPOINTMENT_FIELD_CLINICIAN,
+    APPOINTMENT_FIELD_DEPARTMENT,
+    APPOINTMENT_FIELD_STATUS,
+    APPOINTMENT_FIELD_TIME,
+    APPOINTMENT_FIELD_DURATION,
+    STATUS_ATTENDED,
+    STATUS_MISSED,
+    STATUS_CANCELLED,
+    ROLLUP_FIELD_BOOKED,
+    ROLLUP_FIELD_ATTENDED,
+    ROLLUP_FIELD_MISSED,
+    ROLLUP_FIELD_CANCELLED,
+    ROLLUP_FIELD_MINUTES_LOST,
+)
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_DIMENSIONS = (APPOINTMENT_FIELD_CLINICIAN, APPOINTMENT_FIELD_DEPARTMENT)
+STATUS_COUNTER_FIELDS = {
+    STATUS_ATTENDED: ROLLUP_FIELD_ATTENDED,
+    STATUS_MISSED: ROLLUP_FIELD_MISSED,
+    STATUS_CANCELLED: ROLLUP_FIELD_CANCELLED,
+}
+
+# The appointment as it was before a write, None if it was created, and as it is after the write
+AppointmentChange = Tuple[Optional[Dict[str, Any]], Dict[str, Any]]
+
+
+def add_contribution(rollups: Dict[RollupKey, Dict[str, int]], appointment: Dict[str, Any], sign: int = 1):
+    """Add an appointment's contribution to the counters of its rollups, or take it away if sign is -1.
+
+    An appointment counts towards the day it is on in the offset its time was given in, the clinic's own day. Every
+    appointment counts as booked, and also towards the counter of its status. A missed appointment adds its duration to
+    the minutes lost. Appointments whose time cannot be parsed do not count towards any rollup.
+    """
+    start = parse_time(appointment.get(APPOINTMENT_FIELD_TIME))
+    if start is None:
+        return
+    day = start.date().isoformat()
+
+    counters = {ROLLUP_FIELD_BOOKED: 1}
+    status = appointment.get(APPOINTMENT_FIELD_STATUS)
+    if status in STATUS_COUNTER_FIELDS:
+        counters[STATUS_COUNTER_FIELDS[status]] = 1
+    if status == STATUS_MISSED:
+        duration = parse_duration(appointment.get(APPOINTMENT_FIELD_DURATION))
+        if duration:
+            counters[ROLLUP_FIELD_MINUTES_LOST] = int(duration.total_seconds()) // 60
+
+    for dimension in ROLLUP_DIMENSIONS:
+        key = appointment.get(dimension)
+        if not isinstance(key, str) or not key:
+            continue
+        rollup = rollups[(dimension, key, day)]
+        for field, value in counters.items():
+            rollup[field] = rollup.get(field, 0) + sign * value
+
+
+def rollup_deltas(changes: Iterable[AppointmentChange]) -> Dict[RollupKey, Dict[str, int]]:
+    """Return the amounts to add to each rollup's counters for a set of appointment changes, leaving out the counters,
+    and rollups, that the changes leave as they were."""
+    deltas = defaultdict(dict)
+    for previous, current in changes:
+        if previous is not None:
+            add_contribution(deltas, previous, -1)
+        add_contribution(deltas, current)
+    changed = {}
+    for rollup_key, counters in deltas.items():
+        changed_counters = {field: value for field, value in counters.items() if value}
+        if changed_counters:
+            changed[rollup_key] = changed_counters
+    return changed
+
+
+async def record_changes(rollup_repository: RollupRepository, changes: Iterable[AppointmentChange]):
+    """Apply a set of appointment changes to the rollups in one write.
+
+    The appointments have already been written by then, so a failure to update the rollups is logged rather than
+    raised. The rollups stay off by the changes until they are next rebuilt.
+    """
+    deltas = rollup_deltas(changes)
+    if not deltas:
+        return
+    try:
+        await rollup_repository.increment(deltas)
+    except Exception:
+        logger.exception(f'Could not update {len(deltas)} appointment rollup(s), rebuild them to correct the counts')
+
+
+async def rebuild_rollups(appointment_repository: AppointmentRepository, rollup_repository: RollupRepository,
+                          batch_size: int) -> Tuple[int, int]:
+    """Recompute every rollup from the appointments in one streaming pass, and replace the stored rollups with them.
+
+    Only the rollups are held in memory, one per clinician or department and day, never the appointments.
+
+    Returns:
+        tuple: Number of appointments read, and number of rollups written
+    """
+    rollups = defaultdict(dict)
+    appointment_count = 0
+    async for batch in appointment_repository.stream(batch_size):
+        for appointment in batch:
+            add_contribution(rollups, appointment)
+        appointment_count += len(batch)
+    rollup_count = await rollup_repository.replace_all(dict(rollups))
+    logger.info(f'Rebuilt {rollup_count} appointment rollup(s) from {appointment_count} appointment(s)')
+    return appointment_count, rollup_count
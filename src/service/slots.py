@@ -0,0 +1,38 @@
+""" Free slots are the gaps left between busy times, found with a single sweep over busy times sorted by start. """
+from datetime import datetime, timedelta
+from typing import Iterable, List, Tuple
+
+
+def free_slots(busy_times: Iterable[Tuple[datetime, datetime]], start: datetime, end: datetime, duration: timedelta,
+               limit: int) -> List[Tuple[datetime, datetime]]:
+    """Return up to limit free slots of the given duration between start and end, earliest first.
+
+    Busy times may overlap, they are merged as the sweep passes them. Each gap long enough is split into consecutive
+    slots from its start.
+
+    Args:
+        busy_times: (start, end) pairs in start order
+        start: Start of the time to search
+        end: End of the time to search
+        duration: Length of each slot
+        limit: Maximum number of slots to return
+
+    Returns:
+        List of (start, end) pairs
+    """
+    slots = []
+    free_from = start
+    for busy_start, busy_end in busy_times:
+        if busy_start >= end:
+            break
+        while free_from + duration <= busy_start and len(slots) < limit:
+            slots.append((free_from, free_from + duration))
+            free_from += duration
+        if len(slots) >= limit:
+            return slots
+        free_from = max(free_from, busy_end)
+
+    while free_from + duration <= end and len(slots) < limit:
+        slots.append((free_from, free_from + duration))
+        free_from += duration
+    return slots
@@ -1,47 +1,223 @@
+""" Validation rules shared by the record schemas, and the Validator that compiles a schema into a flat list of rules
+once, so validating a record is a single pass over precompiled checks. """
+import logging
 import re
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
+from operator import mul
+from uuid import UUID
 
+from constants import MISSING_REQUIRED_FIELD_ERROR_TEXT, UNKNOWN_FIELD_ERROR_TEXT, NO_CHANGES_ERROR_TEXT
 
-def check_required_fields(data, required_fields):
-    """Check if all required fields are present and not empty in the data."""
-    errors = []
-    for field in required_fields:
-        data_field_value = data.get(field)
-        if not data_field_value:
-            errors.append(f'Missing required field: {field}')
-    return errors
+logger = logging.getLogger(__name__)
 
+NHS_NUMBER_WEIGHTS = (10, 9, 8, 7, 6, 5, 4, 3, 2)
+ASCII_ZERO = ord('0')
+NHS_NUMBER_WEIGHTED_ZEROS = ASCII_ZERO * sum(NHS_NUMBER_WEIGHTS)
+CANONICAL_UUID_REGEX = re.compile(
+    r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'
+)
+# Dates of birth repeat a lot across a large import, so parsed dates are cached rather than parsed each time
+PARSED_DATE_CACHE_SIZE = 65536
 
-def check_regex(value, regex, error_msg):
-    """Validate a value against a regular expression pattern."""
-    if not re.fullmatch(regex, str(value)):
-        return [error_msg]
-    return []
 
+class Validator:
+    """Validates records against a schema of required fields and one rule per field.
+
+    A rule takes a field's value and returns an error message, or None if the value is valid. Required fields are
+    checked first and, if any are missing, the rules are not run. Errors are reported in the order the rules are given.
+    Changes to a record, such as the body of a PATCH, are validated field by field, running only the rules of the
+    fields they hold.
+    """
+
+    def __init__(self, record_name, required_fields, rules):
+        """Compile a schema.
+
+        Args:
+            record_name: Name of the record type, used when logging invalid records
+            required_fields: Fields that must be present and not empty
+            rules: (field, rule) pairs, the fields should all be required
+        """
+        self.record_name = record_name
+        self._required_fields = tuple(
+            (field, MISSING_REQUIRED_FIELD_ERROR_TEXT.format(field)) for field in required_fields
+        )
+        self._rules = tuple(rules)
+        self._required_field_names = frozenset(required_fields)
+        self._rules_by_field = {field: [] for field in required_fields}
+        for field, rule in self._rules:
+            self._rules_by_field.setdefault(field, []).append(rule)
+
+    def validate(self, record):
+        """Validate one record, returning a list of errors that is empty if the record is valid."""
+        errors = self._validate(record)
+        if errors:
+            logger.debug(f'Invalid {self.record_name}: {errors}')
+        return errors
+
+    def validate_many(self, records):
+        """Validate many records in one call.
+
+        Returns:
+            List of error lists, one per record in the order given
+        """
+        validate = self._validate
+        results = [validate(record) for record in records]
+        if logger.isEnabledFor(logging.DEBUG):
+            invalid_count = sum(1 for errors in results if errors)
+            logger.debug(f'{invalid_count} of {len(results)} {self.record_name} records invalid')
+        return results
+
+    def validate_changes(self, changes):
+        """Validate changes to some of a record's fields, returning a list of errors that is empty if they are valid.
+
+        Only the rules of the fields changed are run. Fields outside the schema cannot be changed, and required fields
+        cannot be emptied.
+        """
+        if not isinstance(changes, dict) or not changes:
+            return [NO_CHANGES_ERROR_TEXT]
+        errors = []
+        for field, value in changes.items():
+            rules = self._rules_by_field.get(field)
+            if rules is None:
+                errors.append(UNKNOWN_FIELD_ERROR_TEXT.format(field))
+            elif not value and field in self._required_field_names:
+                errors.append(MISSING_REQUIRED_FIELD_ERROR_TEXT.format(field))
+            else:
+                errors.extend(error for error in (rule(value) for rule in rules) if error is not None)
+        if errors:
+            logger.debug(f'Invalid {self.record_name} changes: {errors}')
+        return errors
+
+    def _validate(self, record):
+        errors = [error for field, error in self._required_fields if not record.get(field)]
+        if errors:
+            return errors
+        for field, rule in self._rules:
+            error = rule(record[field])
+            if error is not None:
+                errors.append(error)
+        return errors
+
+
+def regex_rule(pattern, error_msg, flags=0, strip=False):
+    """Rule checking a string matches a regular expression in full."""
+    fullmatch = re.compile(pattern, flags).fullmatch
+
+    def rule(value):
+        if not isinstance(value, str) or not fullmatch(value.strip() if strip else value):
+            return error_msg
+        return None
+    return rule
+
+
+def duration_rule(pattern, max_minutes, format_error_msg, too_long_error_msg):
+    """Rule checking a string is a duration of whole hours or minutes, such as "1h" or "30m", and is no longer than
+    max_minutes."""
+    fullmatch = re.compile(pattern).fullmatch
+
+    def rule(value):
+        if not isinstance(value, str) or not fullmatch(value):
+            return format_error_msg
+        minutes = int(value[:-1]) * (60 if value[-1] == 'h' else 1)
+        if minutes > max_minutes:
+            return too_long_error_msg
+        return None
+    return rule
+
+
+def min_length_rule(min_length, error_msg):
+    """Rule checking a string meets the minimum length requirement."""
+    def rule(value):
+        if not isinstance(value, str) or len(value) < min_length:
+            return error_msg
+        return None
+    return rule
 
-def check_min_length(value, min_length, error_msg):
-    """Check if a string value meets the minimum length requirement."""
-    if not isinstance(value, str) or len(value) < min_length:
-        return [error_msg]
-    return []
 
+def non_empty_string_rule(error_msg):
+    """Rule checking a value is a non-empty string."""
+    def rule(value):
+        if not isinstance(value, str) or not value:
+            return error_msg
+        return None
+    return rule
 
-def check_date_format(value, date_format, error_msg, future_error_msg=None):
-    """Validate a date string against the specified format and check if it's not in the future."""
-    try:
-        dob = datetime.strptime(value, date_format).date()
-        if future_error_msg and dob > datetime.today().date():
-            return [future_error_msg]
-        return []
-    except (ValueError, TypeError):
-        return [error_msg]
+
+def choice_rule(choices, error_msg):
+    """Rule checking a string is one of a fixed set of values."""
+    choices = frozenset(choices)
+
+    def rule(value):
+        if not isinstance(value, str) or value not in choices:
+            return error_msg
+        return None
+    return rule
+
+
+def date_rule(date_format, error_msg, future_error_msg=None):
+    """Rule checking a date string has the specified format and, optionally, is not in the future."""
+    @lru_cache(maxsize=PARSED_DATE_CACHE_SIZE)
+    def parse(value):
+        return datetime.strptime(value, date_format).date()
+
+    def rule(value):
+        if not isinstance(value, str):
+            return error_msg
+        try:
+            parsed_date = parse(value)
+        except ValueError:
+            return error_msg
+        if future_error_msg and parsed_date > date.today():
+            return future_error_msg
+        return None
+    return rule
+
+
+def iso_datetime_rule(error_msg):
+    """Rule checking a string is an ISO 8601 datetime."""
+    def rule(value):
+        try:
+            datetime.fromisoformat(value)
+        except (ValueError, TypeError):
+            return error_msg
+        return None
+    return rule
+
+
+def uuid_rule(error_msg):
+    """Rule checking a string is a UUID."""
+    def rule(value):
+        # The canonical hyphenated form is checked with a regular expression, the other forms UUID accepts fall back
+        # to parsing
+        if isinstance(value, str) and CANONICAL_UUID_REGEX.fullmatch(value):
+            return None
+        try:
+            UUID(value)
+        except (ValueError, TypeError, AttributeError):
+            return error_msg
+        return None
+    return rule
+
+
+def nhs_number_rule(pattern, format_error_msg, checksum_error_msg):
+    """Rule checking an NHS number matches its format and has a valid check digit."""
+    fullmatch = re.compile(pattern).fullmatch
+
+    def rule(value):
+        if not isinstance(value, str) or not fullmatch(value):
+            return format_error_msg
+        if not validate_nhs_number_checksum(value):
+            return checksum_error_msg
+        return None
+    return rule
 
 
 def validate_nhs_number_checksum(nhs_number):
     """
     Validate NHS number using Modulus 11 algorithm as per NHS Data Dictionary.
     https://www.datadictionary.nhs.uk/attributes/nhs_number.html
-    
+
     Steps:
     1. Multiply each of the first nine digits by weighting factors (10,9,8,7,6,5,4,3,2)
     2. Add the results together
@@ -50,31 +226,27 @@ def validate_nhs_number_checksum(nhs_number):
     5. If result is 11, check digit is 0. If result is 10, NHS number is invalid
     6. Compare calculated check digit with the 10th digit
     """
-    if not isinstance(nhs_number, str) or len(nhs_number) != 10 or not nhs_number.isdigit():
+    if not isinstance(nhs_number, str) or len(nhs_number) != 10 or not nhs_number.isascii() or not nhs_number.isdigit():
         return False
-    
-    # Step 1: Multiply each of first 9 digits by weighting factors
-    weights = [10, 9, 8, 7, 6, 5, 4, 3, 2]
-    multiplications = []
-    for digit, weight in zip(nhs_number[:9], weights):
-        multiplications.append(int(digit) * weight)
 
-    # Step 2: Add the results together
-    total = sum(multiplications)
+    # Steps 1 and 2: Multiply each of first 9 digits by weighting factors and add the results together. The digits are
+    # taken as ASCII codes, so the weighted sum of the code for '0' is subtracted
+    digits = nhs_number.encode('ascii')
+    total = sum(map(mul, digits[:9], NHS_NUMBER_WEIGHTS)) - NHS_NUMBER_WEIGHTED_ZEROS
 
     # Step 3: Divide by 11 and get remainder
     remainder = total % 11
-    
+
     # Step 4: Subtract remainder from 11 to get check digit
     calculated_check_digit = 11 - remainder
-    
+
     # Step 5: Handle special cases
     if calculated_check_digit == 11:
         calculated_check_digit = 0
     elif calculated_check_digit == 10:
         return False  # Invalid NHS number
-    
+
     # Step 6: Compare with actual 10th digit
-    actual_check_digit = int(nhs_number[9])
-    
+    actual_check_digit = digits[9] - ASCII_ZERO
+
     return calculated_check_digit == actual_check_digit
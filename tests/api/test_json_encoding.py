@@ -0,0 +1,96 @@
+import json
+import unittest
+import tornado.web
+from tornado.testing import AsyncHTTPTestCase
+from src.api.base_handler import BaseHandler
+from src.api.json_encoding import encode_with_orjson, encode_with_stdlib, get_json_encoder, orjson
+from constants import APPLICATION_SETTING_JSON_ENCODER, CONTENT_TYPE_JSON
+
+
+APPOINTMENT = {
+    'patient': '1953262716',
+    'status': 'active',
+    'time': '2025-06-04T16:30:00+01:00',
+    'duration': '1h',
+    'clinician': 'Bethany Rice-Hammond',
+    'department': 'oncology',
+    'postcode': 'IM2N 4LG',
+    'id': '01542f70-929f-4c9a-b4fa-e672310d7e78',
+}
+
+
+class TestJsonEncoding(unittest.TestCase):
+    @unittest.skipIf(orjson is None, 'orjson is not installed')
+    def test_encoders_agree(self):
+        value = {'appointments': [APPOINTMENT], 'next_cursor': None, 'count': 1, 'ratio': 0.5, 'flag': True}
+
+        self.assertEqual(encode_with_orjson(value), encode_with_stdlib(value))
+
+    @unittest.skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson_falls_back_for_values_it_rejects(self):
+        for value in ({'count': 2 ** 70}, {'name': 'Jason \ud800'}):
+            with self.subTest(value=value):
+                self.assertEqual(json.loads(encode_with_orjson(value)), value)
+
+    def test_get_json_encoder(self):
+        self.assertIs(get_json_encoder('stdlib'), encode_with_stdlib)
+        self.assertIs(get_json_encoder('orjson'), encode_with_orjson if orjson is not None else encode_with_stdlib)
+        with self.assertRaises(ValueError):
+            get_json_encoder('simplejson')
+
+
+class DictHandler(BaseHandler):
+    def get(self):
+        self.write(APPOINTMENT)
+
+
+class EncodedHandler(BaseHandler):
+    def get(self):
+        self.write_encoded(b'{"pre":"encoded"}')
+
+
+class StreamHandler(BaseHandler):
+    async def get(self):
+        async def batches():
+            yield [APPOINTMENT, APPOINTMENT]
+            yield [APPOINTMENT]
+        await self.stream_collection('appointments', batches())
+
+
+class TestBaseHandlerSerialization(AsyncHTTPTestCase):
+    def get_app(self):
+        self.encoded_values = []
+
+        def recording_encoder(value):
+            self.encoded_values.append(value)
+            return encode_with_stdlib(value)
+
+        return tornado.web.Application([
+            (r'/dict', DictHandler),
+            (r'/encoded', EncodedHandler),
+            (r'/stream', StreamHandler),
+        ], **{APPLICATION_SETTING_JSON_ENCODER: recording_encoder})
+
+    def test_dicts_are_written_with_the_application_encoder(self):
+        response = self.fetch('/dict')
+
+        self.assertEqual(response.headers['Content-Type'], CONTENT_TYPE_JSON)
+        self.assertEqual(json.loads(response.body), APPOINTMENT)
+        self.assertEqual(self.encoded_values, [APPOINTMENT])
+
+    def test_encoded_bodies_are_passed_through(self):
+        response = self.fetch('/encoded')
+
+        self.assertEqual(response.headers['Content-Type'], CONTENT_TYPE_JSON)
+        self.assertEqual(response.body, b'{"pre":"encoded"}')
+        self.assertEqual(self.encoded_values, [])
+
+    def test_streamed_collections_are_written_with_the_application_encoder(self):
+        response = self.fetch('/stream')
+
+        self.assertEqual(json.loads(response.body), {'appointments': [APPOINTMENT] * 3})
+
+        response = self.fetch('/stream', headers={'Accept': 'application/x-ndjson'})
+
+        self.assertEqual([json.loads(line) for line in response.body.splitlines()], [APPOINTMENT] * 3)
+        self.assertEqual(len(self.encoded_values), 7)
@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import Mock
+from src.db.change_streams import keys_to_invalidate, ChangeStreamListener
+
+
+class TestKeysToInvalidate(unittest.TestCase):
+    def test_insert(self):
+        change = {'operationType': 'insert', 'fullDocument': {'nhs_number': '1373645350'}}
+
+        self.assertEqual(keys_to_invalidate(change, 'nhs_number'), {'1373645350'})
+
+    def test_update_without_key_change(self):
+        change = {
+            'operationType': 'update',
+            'fullDocument': {'nhs_number': '1373645350', 'postcode': 'N6 2FA'},
+            'updateDescription': {'updatedFields': {'postcode': 'N6 2FA'}, 'removedFields': []}
+        }
+
+        self.assertEqual(keys_to_invalidate(change, 'nhs_number'), {'1373645350'})
+
+    def test_update_changing_key_without_pre_image_invalidates_all(self):
+        change = {
+            'operationType': 'update',
+            'fullDocument': {'nhs_number': '1953262716'},
+            'updateDescription': {'updatedFields': {'nhs_number': '1953262716'}, 'removedFields': []}
+        }
+
+        self.assertIsNone(keys_to_invalidate(change, 'nhs_number'))
+
+    def test_update_changing_key_with_pre_image(self):
+        change = {
+            'operationType': 'update',
+            'fullDocumentBeforeChange': {'nhs_number': '1373645350'},
+            'fullDocument': {'nhs_number': '1953262716'},
+            'updateDescription': {'updatedFields': {'nhs_number': '1953262716'}, 'removedFields': []}
+        }
+
+        self.assertEqual(keys_to_invalidate(change, 'nhs_number'), {'1373645350', '1953262716'})
+
+    def test_update_of_deleted_document_invalidates_all(self):
+        change = {
+            'operationType': 'update',
+            'fullDocument': None,
+            'updateDescription': {'updatedFields': {'postcode': 'N6 2FA'}, 'removedFields': []}
+        }
+
+        self.assertIsNone(keys_to_invalidate(change, 'nhs_number'))
+
+    def test_delete_invalidates_all(self):
+        change = {'operationType': 'delete', 'documentKey': {'_id': 'abc'}}
+
+        self.assertIsNone(keys_to_invalidate(change, 'nhs_number'))
+
+    def test_replace_without_pre_image_invalidates_all(self):
+        change = {'operationType': 'replace', 'fullDocument': {'nhs_number': '1373645350'}}
+
+        self.assertIsNone(keys_to_invalidate(change, 'nhs_number'))
+
+    def test_replace_with_pre_image(self):
+        change = {
+            'operationType': 'replace',
+            'fullDocumentBeforeChange': {'nhs_number': '1373645350'},
+            'fullDocument': {'nhs_number': '1373645350'}
+        }
+
+        self.assertEqual(keys_to_invalidate(change, 'nhs_number'), {'1373645350'})
+
+
+class TestChangeStreamListener(unittest.TestCase):
+    def setUp(self):
+        self.invalidate = Mock()
+        self.invalidate_all = Mock()
+        self.listener = ChangeStreamListener(
+            {'panda': {'patients': Mock()}},
+            'patients',
+            'nhs_number',
+            self.invalidate,
+            self.invalidate_all,
+            Mock(),
+            'test'
+        )
+
+    def test_apply_change_invalidates_key(self):
+        self.listener.apply_change({'operationType': 'insert', 'fullDocument': {'nhs_number': '1373645350'}})
+
+        self.invalidate.assert_called_once_with('1373645350')
+        self.invalidate_all.assert_not_called()
+
+    def test_apply_change_invalidates_all_on_delete(self):
+        self.listener.apply_change({'operationType': 'delete', 'documentKey': {'_id': 'abc'}})
+
+        self.invalidate.assert_not_called()
+        self.invalidate_all.assert_called_once_with()
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import MagicMock
+from src.db.indexes import ensure_indexes, COLLECTION_INDEXES
+from constants import (
+    MONGODB_COLLECTION_PATIENTS,
+    MONGODB_COLLECTION_APPOINTMENTS,
+    MONGODB_COLLECTION_APPOINTMENT_ROLLUPS,
+)
+
+
+class TestEnsureIndexes(unittest.TestCase):
+
+    def setUp(self):
+        self.collections = {name: MagicMock() for name in COLLECTION_INDEXES}
+        self.database = MagicMock()
+        self.database.__getitem__.side_effect = self.collections.__getitem__
+        for collection in self.collections.values():
+            collection.create_indexes.side_effect = lambda indexes: [index.document['name'] for index in indexes]
+
+    def test_creates_every_index_on_empty_database(self):
+        for collection in self.collections.values():
+            collection.index_information.return_value = {'_id_': {}}
+
+        created = ensure_indexes(self.database)
+
+        self.assertEqual(created[MONGODB_COLLECTION_PATIENTS], ['nhs_number_unique'])
+        self.assertEqual(
+            created[MONGODB_COLLECTION_APPOINTMENTS],
+            ['id_unique', 'patient_time_id', 'clinician_time_id', 'department_time_id', 'active_end_time']
+        )
+        self.assertEqual(created[MONGODB_COLLECTION_APPOINTMENT_ROLLUPS], ['dimension_key_day_unique'])
+        for collection in self.collections.values():
+            collection.drop_index.assert_not_called()
+
+    def test_is_idempotent(self):
+        for name, collection in self.collections.items():
+            collection.index_information.return_value = {index.document['name']: {} for index in COLLECTION_INDEXES[name]}
+
+        created = ensure_indexes(self.database)
+
+        self.assertEqual(created, {
+            MONGODB_COLLECTION_PATIENTS: [],
+            MONGODB_COLLECTION_APPOINTMENTS: [],
+            MONGODB_COLLECTION_APPOINTMENT_ROLLUPS: []
+        })
+        for collection in self.collections.values():
+            collection.create_indexes.assert_not_called()
+
+    def test_only_creates_missing_indexes(self):
+        self.collections[MONGODB_COLLECTION_PATIENTS].index_information.return_value = {'nhs_number_unique': {}}
+        self.collections[MONGODB_COLLECTION_APPOINTMENTS].index_information.return_value = {
+            'id_unique': {}, 'patient_time_id': {}
+        }
+
+        created = ensure_indexes(self.database)
+
+        self.assertEqual(created[MONGODB_COLLECTION_PATIENTS], [])
+        self.assertEqual(created[MONGODB_COLLECTION_APPOINTMENTS], ['clinician_time_id', 'department_time_id', 'active_end_time'])
+
+    def test_drops_superseded_indexes(self):
+        self.collections[MONGODB_COLLECTION_PATIENTS].index_information.return_value = {'nhs_number_unique': {}}
+        self.collections[MONGODB_COLLECTION_APPOINTMENTS].index_information.return_value = {
+            'id_unique': {}, 'patient': {}, 'clinician_time': {}, 'department_time': {}, 'active_end_time': {}
+        }
+
+        created = ensure_indexes(self.database)
+
+        appointments = self.collections[MONGODB_COLLECTION_APPOINTMENTS]
+        self.assertEqual(created[MONGODB_COLLECTION_APPOINTMENTS],
+                         ['patient_time_id', 'clinician_time_id', 'department_time_id'])
+        self.assertEqual([call.args[0] for call in appointments.drop_index.call_args_list],
+                         ['patient', 'clinician_time', 'department_time'])
+        self.collections[MONGODB_COLLECTION_PATIENTS].drop_index.assert_not_called()
+
+    def test_end_time_index_only_holds_active_appointments(self):
+        index = next(index for index in COLLECTION_INDEXES[MONGODB_COLLECTION_APPOINTMENTS]
+                     if index.document['name'] == 'active_end_time')
+
+        self.assertEqual(index.document['partialFilterExpression'], {'status': 'active'})
+
+
+if __name__ == '__main__':
+    unittest.main()
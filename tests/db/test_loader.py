@@ -0,0 +1,62 @@
+import io
+import json
+import unittest
+from unittest.mock import Mock
+from pymongo.errors import BulkWriteError
+from src.db.loader import iter_json_records, batched, load_records
+
+
+class TestIterJsonRecords(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [{'id': index, 'name': 'Zoë ' * (index % 7)} for index in range(200)]
+
+    def test_json_array(self):
+        for text in [json.dumps(self.records), json.dumps(self.records, indent=2)]:
+            with self.subTest(text=text[:20]):
+                self.assertEqual(list(iter_json_records(io.StringIO(text), chunk_size=16)), self.records)
+
+    def test_ndjson(self):
+        text = '\n'.join(json.dumps(record) for record in self.records) + '\n\n'
+
+        self.assertEqual(list(iter_json_records(io.StringIO(text), chunk_size=16)), self.records)
+
+    def test_empty_inputs(self):
+        for text in ['', '[]', ' [ ] ']:
+            with self.subTest(text=text):
+                self.assertEqual(list(iter_json_records(io.StringIO(text))), [])
+
+    def test_truncated_array_raises(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_records(io.StringIO('[{"id": 1}, {"id": '), chunk_size=4))
+
+
+class TestLoadRecords(unittest.TestCase):
+
+    def test_batched(self):
+        self.assertEqual(list(batched(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+    def test_inserts_in_unordered_batches(self):
+        collection = Mock()
+        collection.insert_many.side_effect = lambda batch, ordered: Mock(inserted_ids=list(range(len(batch))))
+
+        stats = load_records(collection, ({'id': index} for index in range(5)), 2, label='test')
+
+        self.assertEqual(collection.insert_many.call_count, 3)
+        self.assertFalse(collection.insert_many.call_args.kwargs['ordered'])
+        self.assertEqual((stats.inserted, stats.failed), (5, 0))
+
+    def test_counts_failed_documents_and_carries_on(self):
+        collection = Mock()
+        collection.insert_many.side_effect = [
+            BulkWriteError({'nInserted': 1, 'writeErrors': [{'index': 1, 'code': 11000}]}),
+            Mock(inserted_ids=[0]),
+        ]
+
+        stats = load_records(collection, [{'id': 1}, {'id': 1}, {'id': 2}], 2, label='test')
+
+        self.assertEqual((stats.inserted, stats.failed), (2, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
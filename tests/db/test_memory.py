@@ -0,0 +1,160 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from src.db.memory import MemoryCollection, MemoryDatabase
+from src.repository.errors import DuplicateRecordError
+from src.repository.results import WriteStatus
+
+
+class TestMemoryCollection(unittest.TestCase):
+    def setUp(self):
+        self.collection = MemoryCollection('id', ('clinician',))
+        for key, clinician in [('b', 'Jason Holloway'), ('a', 'Bethany Rice'), ('c', 'Jason Holloway')]:
+            self.collection.insert({'id': key, 'clinician': clinician})
+
+    def test_get_returns_a_copy(self):
+        self.collection.get('a')['clinician'] = 'changed'
+
+        self.assertEqual(self.collection.get('a'), {'id': 'a', 'clinician': 'Bethany Rice'})
+        self.assertIsNone(self.collection.get('z'))
+
+    def test_insert_rejects_duplicate_key(self):
+        with self.assertRaises(DuplicateRecordError):
+            self.collection.insert({'id': 'a'})
+
+    def test_page_in_key_order(self):
+        self.assertEqual([document['id'] for document in self.collection.page(2)], ['a', 'b'])
+        self.assertEqual([document['id'] for document in self.collection.page(2, 'b')], ['c'])
+        self.collection.insert({'id': 'ab'})
+        self.assertEqual([document['id'] for document in self.collection.page(2, 'a')], ['ab', 'b'])
+
+    def test_find_uses_secondary_index(self):
+        self.assertEqual([document['id'] for document in self.collection.find('clinician', 'Jason Holloway')], ['b', 'c'])
+
+        self.collection.update('b', {'clinician': 'Bethany Rice'})
+
+        self.assertEqual([document['id'] for document in self.collection.find('clinician', 'Jason Holloway')], ['c'])
+        self.assertEqual([document['id'] for document in self.collection.find('clinician', 'Bethany Rice')], ['a', 'b'])
+
+    def test_update_merges_and_can_change_key(self):
+        self.assertEqual(self.collection.update('a', {'id': 'd'}), WriteStatus.UPDATED)
+
+        self.assertIsNone(self.collection.get('a'))
+        self.assertEqual(self.collection.get('d'), {'id': 'd', 'clinician': 'Bethany Rice'})
+        self.assertEqual(self.collection.update('a', {'clinician': 'x'}), WriteStatus.NOT_FOUND)
+        self.assertEqual(self.collection.update('d', {'clinician': 'x'}, lambda existing: False), WriteStatus.CONFLICT)
+        with self.assertRaises(DuplicateRecordError):
+            self.collection.update('d', {'id': 'b'})
+
+    def test_upsert(self):
+        self.assertEqual(self.collection.upsert({'id': 'e'}), WriteStatus.CREATED)
+        self.assertEqual(self.collection.upsert({'id': 'a', 'status': 'active'}), WriteStatus.UPDATED)
+        self.assertEqual(self.collection.get('a'), {'id': 'a', 'clinician': 'Bethany Rice', 'status': 'active'})
+        self.assertEqual(self.collection.upsert({'id': 'a'}, lambda existing: False), WriteStatus.CONFLICT)
+
+    def test_delete(self):
+        self.assertTrue(self.collection.delete('b'))
+        self.assertFalse(self.collection.delete('b'))
+        self.assertEqual([document['id'] for document in self.collection.all()], ['a', 'c'])
+        self.assertEqual([document['id'] for document in self.collection.find('clinician', 'Jason Holloway')], ['c'])
+
+    def test_existing(self):
+        self.assertEqual(self.collection.existing(['a', 'c', 'z']), {'a', 'c'})
+        self.assertEqual(self.collection.existing([]), set())
+
+    def test_versions(self):
+        collection = MemoryCollection('id', versioned=True)
+        collection.insert({'id': 'a'})
+        collection.update('a', {'status': 'active'})
+        collection.update('z', {'status': 'active'})
+
+        self.assertEqual(collection.get('a', with_version=True), {'id': 'a', 'status': 'active', 'version': 2})
+        self.assertEqual(collection.get('a'), {'id': 'a', 'status': 'active'})
+        self.assertEqual(list(collection.all()), [{'id': 'a', 'status': 'active'}])
+        self.assertEqual(collection.version, 2)
+        collection.delete('a')
+        self.assertEqual(collection.version, 3)
+
+    def test_batches(self):
+        batches = [[document['id'] for document in batch] for batch in self.collection.batches(2)]
+
+        self.assertEqual(batches, [['a', 'b'], ['c']])
+
+    def test_range_keys_uses_partial_sorted_index(self):
+        collection = MemoryCollection('id', sorted_fields={'end': lambda document: document['status'] == 'active'},
+                                      hidden_fields=('end',))
+        collection.insert({'id': 'a', 'status': 'active', 'end': 3})
+        collection.insert({'id': 'b', 'status': 'active', 'end': 1})
+        collection.insert({'id': 'c', 'status': 'attended', 'end': 2})
+        collection.insert({'id': 'd', 'status': 'active', 'end': 5})
+
+        self.assertEqual(collection.range_keys('end', 4, 10), ['b', 'a'])
+        self.assertEqual(collection.range_keys('end', 4, 1), ['b'])
+
+        collection.update('b', {'status': 'missed'})
+        collection.delete('a')
+        self.assertEqual(collection.range_keys('end', 5, 10), ['d'])
+        self.assertEqual(collection.get('d'), {'id': 'd', 'status': 'active'})
+
+        collection.load([{'id': 'e', 'status': 'active', 'end': 2}, {'id': 'f', 'status': 'active', 'end': 1}])
+        self.assertEqual(collection.range_keys('end', 5, 10), ['f', 'e'])
+
+    def test_scan_reads_a_range_of_a_compound_sorted_index(self):
+        collection = MemoryCollection('id', sorted_fields={('clinician', 'time'): None})
+        for key, clinician, time in [('a', 'Rice', 3), ('b', 'Rice', 1), ('c', 'Holloway', 2), ('d', 'Rice', 2),
+                                     ('e', 'Rice', 2), ('f', 'Rice', 5)]:
+            collection.insert({'id': key, 'clinician': clinician, 'time': time})
+
+        def scan(*args, **kwargs):
+            return [document['id'] for document in collection.scan(('clinician', 'time'), ('Rice',), *args, **kwargs)]
+
+        self.assertEqual(scan(None, None, 10), ['b', 'd', 'e', 'a', 'f'])
+        self.assertEqual(scan(2, 5, 10), ['d', 'e', 'a'])
+        self.assertEqual(scan(2, None, 2), ['d', 'e'])
+        self.assertEqual(scan(2, None, 10, after=(('Rice', 2), 'd')), ['e', 'a', 'f'])
+        self.assertEqual(scan(None, 5, 10, reverse=True), ['a', 'e', 'd', 'b'])
+        self.assertEqual(scan(None, 5, 10, after=(('Rice', 2), 'e'), reverse=True), ['d', 'b'])
+        self.assertEqual(scan(None, None, 10, matches=lambda document: document['time'] == 2), ['d', 'e'])
+
+        collection.update('d', {'clinician': 'Holloway'})
+        self.assertEqual(scan(2, 3, 10), ['e'])
+
+
+class TestMemoryDatabase(unittest.TestCase):
+    def test_snapshot_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'panda.json')
+            database = MemoryDatabase(path)
+            database['patients'].insert({'nhs_number': '1373645350', 'name': 'Zoë Clark'})
+            database['appointments'].insert({'id': 'a', 'patient': '1373645350'})
+            database.save_snapshot()
+
+            restored = MemoryDatabase(path)
+
+            self.assertEqual(restored['patients'].get('1373645350'), {'nhs_number': '1373645350', 'name': 'Zoë Clark'})
+            self.assertEqual(restored['patients'].get('1373645350', with_version=True)['version'], 1)
+            self.assertEqual(restored['patients'].version, 1)
+            self.assertEqual(restored['appointments'].find('patient', '1373645350'), [{'id': 'a', 'patient': '1373645350'}])
+            self.assertEqual(os.listdir(directory), ['panda.json'])
+
+    def test_snapshot_keeps_datetimes(self):
+        end_time = datetime(2025, 6, 4, 15, 30, tzinfo=timezone.utc)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'panda.json')
+            database = MemoryDatabase(path)
+            database['appointments'].insert({'id': 'a', 'status': 'active', 'end_time': end_time})
+            database.save_snapshot()
+
+            restored = MemoryDatabase(path)
+
+            self.assertEqual(
+                restored['appointments'].snapshot(), [{'id': 'a', 'status': 'active', 'end_time': end_time, 'version': 1}]
+            )
+            self.assertEqual(restored['appointments'].range_keys('end_time', end_time, 10), ['a'])
+
+    def test_no_snapshot_path(self):
+        database = MemoryDatabase()
+        database['patients'].insert({'nhs_number': '1373645350'})
+
+        database.save_snapshot()
@@ -0,0 +1,54 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from src.db.migrations import migrate_appointment_times
+
+
+class TestMigrateAppointmentTimes(unittest.TestCase):
+
+    def setUp(self):
+        self.collection = MagicMock()
+        self.collection.name = 'appointments'
+        self.collection.bulk_write.side_effect = lambda operations, ordered: MagicMock(modified_count=len(operations))
+
+    def test_converts_string_times_in_batches(self):
+        self.collection.find.return_value.batch_size.return_value = iter([
+            {'_id': 1, 'time': '2025-06-04T16:30:00+01:00', 'duration': '1h30m'},
+            {'_id': 2, 'time': '2025-06-05T09:00:00+01:00', 'duration': '15m'},
+            {'_id': 3, 'time': 'not a time', 'duration': '15m'},
+        ])
+
+        self.assertEqual(migrate_appointment_times(self.collection, 2), (2, 1))
+
+        self.assertEqual(self.collection.find.call_args.args[0], {'time': {'$type': 'string'}})
+        self.assertEqual(self.collection.bulk_write.call_count, 1)
+        first_update = self.collection.bulk_write.call_args.args[0][0]
+        self.assertEqual(first_update._filter, {'_id': 1, 'time': '2025-06-04T16:30:00+01:00', 'duration': '1h30m'})
+        self.assertEqual(first_update._doc, {'$inc': {'version': 1}, '$set': {
+            'time': datetime(2025, 6, 4, 15, 30, tzinfo=timezone.utc),
+            'time_offset': 60,
+            'duration': 90,
+            'end_time': datetime(2025, 6, 4, 17, 0, tzinfo=timezone.utc),
+        }})
+
+    def test_increments_the_collection_version_after_each_batch_that_converted(self):
+        self.collection.find.return_value.batch_size.return_value = iter([
+            {'_id': 1, 'time': '2025-06-04T16:30:00+01:00', 'duration': '1h30m'},
+            {'_id': 2, 'time': '2025-06-05T09:00:00+01:00', 'duration': '15m'},
+            {'_id': 3, 'time': '2025-06-06T09:00:00+01:00', 'duration': '15m'},
+        ])
+        # The second batch was written through the API in the meantime, so nothing in it is converted
+        self.collection.bulk_write.side_effect = [MagicMock(modified_count=2), MagicMock(modified_count=0)]
+        versions = self.collection.database.get_collection.return_value
+
+        self.assertEqual(migrate_appointment_times(self.collection, 2), (2, 0))
+
+        self.collection.database.get_collection.assert_called_once_with('collection_versions')
+        versions.update_one.assert_called_once_with({'_id': 'appointments'}, {'$inc': {'version': 1}}, upsert=True)
+
+    def test_nothing_to_convert(self):
+        self.collection.find.return_value.batch_size.return_value = iter([])
+
+        self.assertEqual(migrate_appointment_times(self.collection, 2), (0, 0))
+        self.collection.bulk_write.assert_not_called()
+        self.collection.database.get_collection.assert_not_called()
@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from bson import ObjectId
+from src.db.mongo import MongoDB, versioned_update
+from src.repository.appointment_storage import from_stored
+
+
+class TestConvertBsonToJson(unittest.TestCase):
+
+    def test_none_returns_none(self):
+        self.assertIsNone(MongoDB._convert_bson_to_json(None))
+
+    def test_object_id_is_dropped(self):
+        document = {'_id': ObjectId(), 'nhs_number': '1373645350', 'name': 'Dr Glenn Clark'}
+
+        self.assertEqual(MongoDB._convert_bson_to_json(document), {'nhs_number': '1373645350', 'name': 'Dr Glenn Clark'})
+
+    def test_native_values_pass_through(self):
+        document = {'name': 'Dr Glenn Clark', 'minutes': 15, 'ratio': 0.5, 'flag': True, 'empty': None}
+
+        self.assertEqual(MongoDB._convert_bson_to_json(document), document)
+
+    def test_datetime_is_rendered_as_timezone_aware_iso_string(self):
+        """MongoDB returns naive UTC datetimes, these must come back timezone-aware."""
+        document = {'time': datetime(2024, 8, 30, 10, 30)}
+
+        self.assertEqual(MongoDB._convert_bson_to_json(document), {'time': '2024-08-30T10:30:00+00:00'})
+
+    def test_aware_datetime_keeps_its_offset(self):
+        document = {'time': datetime(2024, 8, 30, 10, 30, tzinfo=timezone.utc)}
+
+        self.assertEqual(MongoDB._convert_bson_to_json(document), {'time': '2024-08-30T10:30:00+00:00'})
+
+    def test_nested_values_are_converted(self):
+        object_id = ObjectId()
+        document = {'refs': [object_id], 'meta': {'created': datetime(2024, 1, 1)}}
+
+        self.assertEqual(
+            MongoDB._convert_bson_to_json(document),
+            {'refs': [str(object_id)], 'meta': {'created': '2024-01-01T00:00:00+00:00'}}
+        )
+
+
+class TestMongoDBDecode(unittest.TestCase):
+
+    def test_documents_are_decoded_before_conversion(self):
+        mongo_db = MongoDB(MagicMock(), 'appointments', ('end_time',), from_stored)
+        document = {'_id': ObjectId(), 'id': 'a', 'time': datetime(2025, 6, 4, 15, 30), 'time_offset': 60, 'duration': 90}
+
+        self.assertEqual(mongo_db._to_json(document), {'id': 'a', 'time': '2025-06-04T16:30:00+01:00', 'duration': '90m'})
+        self.assertEqual(mongo_db.projection, {'_id': 0, 'end_time': 0})
+        self.assertIsNone(mongo_db._to_json(None))
+
+
+class TestMongoDBVersions(unittest.TestCase):
+
+    def test_versioned_update_increments_the_version(self):
+        self.assertEqual(versioned_update({'status': 'cancelled', 'version': 7}),
+                         {'$inc': {'version': 1}, '$set': {'status': 'cancelled'}})
+        self.assertEqual(versioned_update({}), {'$inc': {'version': 1}})
+
+    def test_version_is_hidden_from_collection_reads(self):
+        mongo_db = MongoDB(MagicMock(), 'patients', versioned=True)
+
+        self.assertEqual(mongo_db.projection, {'_id': 0, 'version': 0})
+        self.assertEqual(mongo_db.document_projection, {'_id': 0})
+        self.assertEqual(mongo_db._update({'name': 'Dr Glenn Clark'}),
+                         {'$inc': {'version': 1}, '$set': {'name': 'Dr Glenn Clark'}})
+        self.assertEqual(MongoDB(MagicMock(), 'patients')._update({'name': 'Dr Glenn Clark'}),
+                         {'$set': {'name': 'Dr Glenn Clark'}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from src.db.synthetic import generate_patients, generate_appointments, nhs_number_check_digit
+from src.service import patient_validation, appointment_validation
+from src.service.validation_utils import validate_nhs_number_checksum
+
+
+class TestSyntheticData(unittest.TestCase):
+
+    def test_check_digit_matches_validation(self):
+        for nhs_number in ['9434765919', '9876543210', '1234567881', '4505577104']:
+            with self.subTest(nhs_number=nhs_number):
+                self.assertEqual(nhs_number_check_digit(nhs_number[:9]), int(nhs_number[9]))
+
+    def test_patients_are_valid_and_unique(self):
+        patients = list(generate_patients(500, seed=7))
+
+        self.assertEqual(len({patient['nhs_number'] for patient in patients}), 500)
+        for patient in patients:
+            self.assertTrue(validate_nhs_number_checksum(patient['nhs_number']))
+            self.assertEqual(patient_validation.validate(patient), [])
+
+    def test_appointments_are_valid_and_linked_to_patients(self):
+        nhs_numbers = {patient['nhs_number'] for patient in generate_patients(100, seed=7)}
+        appointments = list(generate_appointments(100, 3, seed=7))
+
+        self.assertEqual(len(appointments), 300)
+        self.assertEqual(len({appointment['id'] for appointment in appointments}), 300)
+        for appointment in appointments:
+            self.assertIn(appointment['patient'], nhs_numbers)
+            self.assertEqual(appointment_validation.validate(appointment), [])
+
+    def test_same_seed_gives_same_dataset(self):
+        self.assertEqual(list(generate_patients(50, seed=1)), list(generate_patients(50, seed=1)))
+        self.assertEqual(list(generate_appointments(50, 2, seed=1)), list(generate_appointments(50, 2, seed=1)))
+        self.assertNotEqual(list(generate_patients(50, seed=1)), list(generate_patients(50, seed=2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
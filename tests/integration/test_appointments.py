@@ -1,11 +1,16 @@
 import json
 import uuid
+from urllib.parse import urlencode
 import tornado.testing
 from tornado.testing import AsyncHTTPTestCase
 from main import start_app
 from pymongo import MongoClient
-from config import MONGODB_URI
-from constants import MONGODB_DATABASE_NAME, MONGODB_COLLECTION_APPOINTMENTS
+from config import MONGODB_URI, DATABASE_TYPE
+from constants import MONGODB_DATABASE_NAME, MONGODB_COLLECTION_APPOINTMENTS, MONGODB_COLLECTION_PATIENTS, \
+    MONGODB_COLLECTION_APPOINTMENT_ROLLUPS, UNKNOWN_PATIENT_ERROR_TEXT, UNINDEXED_APPOINTMENT_QUERY_ERROR_TEXT, ERR_CLINICIAN_DOUBLE_BOOKED
+
+# Valid NHS numbers with correct checksums, appointments can only be made for patients that exist
+TEST_PATIENT_NHS_NUMBERS = ['9434765919', '9876543210', '1234567881', '4505577104']
 
 
 class AppointmentHandlerTests(AsyncHTTPTestCase):
@@ -15,17 +20,249 @@ class AppointmentHandlerTests(AsyncHTTPTestCase):
     def setUp(self):
         super().setUp()
         self.test_appointment_ids = []
+        self.test_patient_nhs_numbers = []
+        self.test_rollup_keys = []
+        for nhs_number in TEST_PATIENT_NHS_NUMBERS:
+            self.create_patient(nhs_number)
 
     def tearDown(self):
-        # Hard delete test appointments directly from the DB
-        client = MongoClient(MONGODB_URI)
-        db = client[MONGODB_DATABASE_NAME]
-        collection = db[MONGODB_COLLECTION_APPOINTMENTS]
-        for appointment_id in self.test_appointment_ids:
-            collection.delete_one({'id': appointment_id})
-        client.close()
+        # Hard delete test appointments directly from the DB, the in-memory database starts empty for each test
+        if DATABASE_TYPE == 'mongo':
+            client = MongoClient(MONGODB_URI)
+            db = client[MONGODB_DATABASE_NAME]
+            collection = db[MONGODB_COLLECTION_APPOINTMENTS]
+            for appointment_id in self.test_appointment_ids:
+                collection.delete_one({'id': appointment_id})
+            for nhs_number in self.test_patient_nhs_numbers:
+                db[MONGODB_COLLECTION_PATIENTS].delete_one({'nhs_number': nhs_number})
+            for key in self.test_rollup_keys:
+                db[MONGODB_COLLECTION_APPOINTMENT_ROLLUPS].delete_many({'key': key})
+            client.close()
         super().tearDown()
 
+    def create_patient(self, nhs_number):
+        """Create a patient for appointments to refer to, only removing it afterwards if it did not already exist."""
+        response = self.fetch(
+            f'/api/patients/{nhs_number}',
+            method='POST',
+            body=json.dumps({
+                'nhs_number': nhs_number,
+                'name': 'Test Patient',
+                'date_of_birth': '1980-01-01',
+                'postcode': 'N6 2FA'
+            }),
+            headers={'Content-Type': 'application/json'}
+        )
+        if response.code == 201:
+            self.test_patient_nhs_numbers.append(nhs_number)
+
+    def test_post_appointment_unknown_patient(self):
+        appointment_id = str(uuid.uuid4())
+        self.test_appointment_ids.append(appointment_id)
+        appointment = {
+            'id': appointment_id,
+            'patient': '2000000002',  # Valid NHS number with correct checksum, but no patient
+            'status': 'active',
+            'time': '2024-08-30T11:30:00+01:00',
+            'duration': '1h',
+            'clinician': 'Glenn Palmer',
+            'department': 'oncology',
+            'postcode': 'HD36 0HQ'
+        }
+        response = self.fetch(
+            f"/api/appointments/{appointment_id}",
+            method="POST",
+            body=json.dumps(appointment),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(response.code, 400)
+        self.assertEqual(json.loads(response.body)['errors'], [UNKNOWN_PATIENT_ERROR_TEXT])
+
+    def test_post_appointment_clinician_double_booked(self):
+        clinician = f'Test Clinician {uuid.uuid4()}'
+        appointment_ids = [str(uuid.uuid4()), str(uuid.uuid4())]
+        self.test_appointment_ids.extend(appointment_ids)
+        responses = [
+            self.fetch(
+                f'/api/appointments/{appointment_id}',
+                method='POST',
+                body=json.dumps({
+                    'id': appointment_id,
+                    'patient': '9434765919',
+                    'status': 'active',
+                    'time': time,
+                    'duration': '1h',
+                    'clinician': clinician,
+                    'department': 'oncology',
+                    'postcode': 'HD36 0HQ'
+                }),
+                headers={'Content-Type': 'application/json'}
+            )
+            for appointment_id, time in zip(appointment_ids, ['2024-09-02T09:00:00+01:00', '2024-09-02T08:30:00+00:00'])
+        ]
+
+        self.assertEqual(responses[0].code, 201)
+        self.assertEqual(responses[1].code, 400)
+        self.assertEqual(json.loads(responses[1].body)['errors'], [ERR_CLINICIAN_DOUBLE_BOOKED.format(appointment_ids[0])])
+
+    def test_get_appointments_filtered_by_clinician_and_time(self):
+        clinician = f'Test Clinician {uuid.uuid4()}'  # Unique, so no other appointments match
+        for time in ['2024-09-02T09:00:00+01:00', '2024-09-03T09:00:00+01:00', '2024-09-01T09:00:00+01:00',
+                     '2024-09-09T09:00:00+01:00']:
+            appointment_id = str(uuid.uuid4())
+            self.test_appointment_ids.append(appointment_id)
+            response = self.fetch(
+                f'/api/appointments/{appointment_id}',
+                method='POST',
+                body=json.dumps({
+                    'id': appointment_id,
+                    'patient': '9434765919',
+                    'status': 'active',
+                    'time': time,
+                    'duration': '30m',
+                    'clinician': clinician,
+                    'department': 'oncology',
+                    'postcode': 'HD36 0HQ'
+                }),
+                headers={'Content-Type': 'application/json'}
+            )
+            self.assertEqual(response.code, 201)
+
+        arguments = {'clinician': clinician, 'from': '2024-09-01T00:00:00+00:00', 'to': '2024-09-08T00:00:00+00:00'}
+        response = self.fetch('/api/appointments/?' + urlencode(dict(arguments, limit=2)))
+        self.assertEqual(response.code, 200)
+        first_page = json.loads(response.body)
+        response = self.fetch('/api/appointments/?' + urlencode(dict(arguments, limit=2,
+                                                                     cursor=first_page['next_cursor'])))
+        second_page = json.loads(response.body)
+
+        self.assertEqual([appointment['time'] for appointment in first_page['appointments'] + second_page['appointments']],
+                         ['2024-09-01T09:00:00+01:00', '2024-09-02T09:00:00+01:00', '2024-09-03T09:00:00+01:00'])
+        self.assertIsNone(second_page['next_cursor'])
+
+        response = self.fetch('/api/appointments/?' + urlencode(dict(arguments, sort='-time')))
+        self.assertEqual([appointment['time'] for appointment in json.loads(response.body)['appointments']],
+                         ['2024-09-03T09:00:00+01:00', '2024-09-02T09:00:00+01:00', '2024-09-01T09:00:00+01:00'])
+
+    def test_get_patient_appointments(self):
+        for status, time in [('active', '2024-09-02T09:00:00+01:00'), ('cancelled', '2024-09-01T09:00:00+01:00'),
+                             ('active', '2024-09-03T09:00:00+01:00')]:
+            appointment_id = str(uuid.uuid4())
+            self.test_appointment_ids.append(appointment_id)
+            response = self.fetch(
+                f'/api/appointments/{appointment_id}',
+                method='POST',
+                body=json.dumps({
+                    'id': appointment_id,
+                    'patient': '4505577104',
+                    'status': status,
+                    'time': time,
+                    'duration': '30m',
+                    'clinician': 'Glenn Palmer',
+                    'department': 'oncology',
+                    'postcode': 'HD36 0HQ'
+                }),
+                headers={'Content-Type': 'application/json'}
+            )
+            self.assertEqual(response.code, 201)
+
+        # Filter on the times created here, the patient may have appointments from seed data
+        response = self.fetch('/api/patients/4505577104/appointments?status=active&limit=1000')
+        self.assertEqual(response.code, 200)
+        times = [appointment['time'] for appointment in json.loads(response.body)['appointments']
+                 if appointment['time'].startswith('2024-09-0')]
+        self.assertEqual(times, ['2024-09-02T09:00:00+01:00', '2024-09-03T09:00:00+01:00'])
+
+        response = self.fetch('/api/patients/4505577104/appointments?status=late')
+        self.assertEqual(response.code, 400)
+
+    def test_get_free_slots(self):
+        clinician = f'Test Clinician {uuid.uuid4()}'
+        appointment_id = str(uuid.uuid4())
+        self.test_appointment_ids.append(appointment_id)
+        response = self.fetch(
+            f'/api/appointments/{appointment_id}',
+            method='POST',
+            body=json.dumps({
+                'id': appointment_id,
+                'patient': '9434765919',
+                'status': 'active',
+                'time': '2024-09-02T09:30:00+01:00',
+                'duration': '1h',
+                'clinician': clinician,
+                'department': 'oncology',
+                'postcode': 'HD36 0HQ'
+            }),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(response.code, 201)
+
+        response = self.fetch('/api/appointments/_slots?' + urlencode({
+            'clinician': clinician, 'from': '2024-09-02T09:00:00+01:00', 'to': '2024-09-02T12:00:00+01:00',
+            'duration': '1h'
+        }))
+
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(response.body)['slots'], [
+            {'start': '2024-09-02T10:30:00+01:00', 'end': '2024-09-02T11:30:00+01:00'},
+        ])
+
+        response = self.fetch('/api/appointments/_slots?duration=1h')
+        self.assertEqual(response.code, 400)
+
+    def test_get_appointment_rollups(self):
+        clinician = f'Test Clinician {uuid.uuid4()}'
+        self.test_rollup_keys.append(clinician)
+        appointment = {
+            'patient': '9434765919',
+            'status': 'active',
+            'time': '2024-09-03T09:30:00+01:00',
+            'duration': '45m',
+            'clinician': clinician,
+            'department': 'oncology',
+            'postcode': 'HD36 0HQ'
+        }
+        appointment_ids = [str(uuid.uuid4()), str(uuid.uuid4())]
+        self.test_appointment_ids.extend(appointment_ids)
+        for appointment_id, time in zip(appointment_ids, ['2024-09-03T09:30:00+01:00', '2024-09-04T09:30:00+01:00']):
+            response = self.fetch(
+                f'/api/appointments/{appointment_id}',
+                method='POST',
+                body=json.dumps(dict(appointment, id=appointment_id, time=time)),
+                headers={'Content-Type': 'application/json'}
+            )
+            self.assertEqual(response.code, 201)
+        response = self.fetch(
+            f'/api/appointments/{appointment_ids[0]}',
+            method='PUT',
+            body=json.dumps(dict(appointment, id=appointment_ids[0], status='missed')),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(response.code, 200)
+        self.assertEqual(self.fetch(f'/api/appointments/{appointment_ids[1]}', method='DELETE').code, 200)
+
+        response = self.fetch('/api/analytics/appointments?' + urlencode({
+            'clinician': clinician, 'from': '2024-09-01', 'to': '2024-09-30'
+        }))
+
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(response.body), {
+            'days': [
+                {'day': '2024-09-03', 'booked': 1, 'attended': 0, 'missed': 1, 'cancelled': 0, 'minutes_lost': 45},
+                {'day': '2024-09-04', 'booked': 1, 'attended': 0, 'missed': 0, 'cancelled': 1, 'minutes_lost': 0},
+            ],
+            'totals': {'booked': 2, 'attended': 0, 'missed': 1, 'cancelled': 1, 'minutes_lost': 45},
+        })
+
+        response = self.fetch('/api/analytics/appointments?from=2024-09-01&to=2024-09-30')
+        self.assertEqual(response.code, 400)
+
+    def test_get_appointments_rejects_unindexed_filters(self):
+        response = self.fetch('/api/appointments/?status=active')
+
+        self.assertEqual(response.code, 400)
+        self.assertEqual(json.loads(response.body)['errors'], [UNINDEXED_APPOINTMENT_QUERY_ERROR_TEXT])
+
     def test_get_appointment_valid_appointment_id(self):
         valid_uuid = "ac9729b5-5e11-42b4-87e2-6396b4faf1c9"  # Changed to avoid conflict with seed data
         self.test_appointment_ids.append(valid_uuid)
@@ -106,6 +343,14 @@ class AppointmentHandlerTests(AsyncHTTPTestCase):
         }
         self.test_appointment_ids.append(new_appointment['id'])
 
+        create_response = self.fetch(
+            f'/api/appointments/ac9729b5-5e11-42b4-87e2-6396b4faf1e1',
+            method='POST',
+            body=json.dumps(dict(new_appointment, clinician='Glenn Palmer')),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(create_response.code, 201)
+
         response = self.fetch(
             f'/api/appointments/ac9729b5-5e11-42b4-87e2-6396b4faf1e1',
             method='PUT',
@@ -119,6 +364,28 @@ class AppointmentHandlerTests(AsyncHTTPTestCase):
         expected_body = {'message': 'appointment updated: ac9729b5-5e11-42b4-87e2-6396b4faf1e1'}
         self.assertEqual(body, expected_body)
 
+    def test_put_appointment_unregistered_uuid(self):
+        appointment_id = 'ac9729b5-5e11-42b4-87e2-6396b4faf1e2'
+        appointment = {
+            'id': appointment_id,
+            'patient': '9876543210',
+            'status': 'active',
+            'time': '2024-08-30T11:30:00+01:00',
+            'duration': '2h',
+            'clinician': 'Glenn Close',
+            'department': 'oncology',
+            'postcode': 'HD36 0HQ'
+        }
+
+        response = self.fetch(
+            f'/api/appointments/{appointment_id}',
+            method='PUT',
+            body=json.dumps(appointment),
+            headers={'Content-Type': 'application/json'}
+        )
+
+        self.assertEqual(response.code, 404)
+
     def test_delete_appointment_cancels_appointment(self):
         """Test that DELETE request cancels an appointment."""
         appointment_id = 'ac9729b5-5e11-42b4-87e2-6396b4faf1f2'  # Changed to avoid conflict with seed data
@@ -265,6 +532,182 @@ class AppointmentHandlerTests(AsyncHTTPTestCase):
         body = json.loads(update_response.body)
         assert 'could not update appointment' in body['errors']
 
+    def test_get_appointment_not_modified(self):
+        appointment_id = str(uuid.uuid4())
+        self.test_appointment_ids.append(appointment_id)
+        appointment = {
+            'id': appointment_id,
+            'patient': '1234567881',
+            'status': 'active',
+            'time': '2024-09-02T09:00:00+01:00',
+            'duration': '30m',
+            'clinician': 'Jason Holloway',
+            'department': 'oncology',
+            'postcode': 'HD36 0HQ'
+        }
+        create_response = self.fetch(
+            f'/api/appointments/{appointment_id}',
+            method='POST',
+            body=json.dumps(appointment),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(create_response.code, 201)
+        patient_appointments = self.fetch('/api/patients/1234567881/appointments')
+        self.assertEqual(patient_appointments.code, 200)
+
+        response = self.fetch(f'/api/appointments/{appointment_id}', headers={'If-None-Match': '"1"'})
+        self.assertEqual(response.code, 304)
+        response = self.fetch('/api/patients/1234567881/appointments',
+                              headers={'If-None-Match': patient_appointments.headers['Etag']})
+        self.assertEqual(response.code, 304)
+
+        delete_response = self.fetch(f'/api/appointments/{appointment_id}', method='DELETE')
+        self.assertEqual(delete_response.code, 200)
+
+        response = self.fetch(f'/api/appointments/{appointment_id}', headers={'If-None-Match': '"1"'})
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers['Etag'], '"2"')
+        self.assertEqual(json.loads(response.body)['status'], 'cancelled')
+        response = self.fetch('/api/patients/1234567881/appointments',
+                              headers={'If-None-Match': patient_appointments.headers['Etag']})
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(response.body)['appointments'][0]['status'], 'cancelled')
+
+    def test_put_appointment_if_match(self):
+        appointment_id = str(uuid.uuid4())
+        self.test_appointment_ids.append(appointment_id)
+        appointment = {
+            'id': appointment_id,
+            'patient': '4505577104',
+            'status': 'active',
+            'time': '2024-09-03T09:00:00+01:00',
+            'duration': '30m',
+            'clinician': 'Bethany Rice',
+            'department': 'oncology',
+            'postcode': 'HD36 0HQ'
+        }
+        create_response = self.fetch(
+            f'/api/appointments/{appointment_id}',
+            method='POST',
+            body=json.dumps(appointment),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(create_response.code, 201)
+
+        response = self.fetch(
+            f'/api/appointments/{appointment_id}',
+            method='PUT',
+            body=json.dumps(dict(appointment, status='attended')),
+            headers={'Content-Type': 'application/json', 'If-Match': '"1"'}
+        )
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers['Etag'], '"2"')
+
+        response = self.fetch(
+            f'/api/appointments/{appointment_id}',
+            method='PUT',
+            body=json.dumps(dict(appointment, status='missed')),
+            headers={'Content-Type': 'application/json', 'If-Match': '"1"'}
+        )
+        self.assertEqual(response.code, 412)
+        get_response = self.fetch(f'/api/appointments/{appointment_id}')
+        self.assertEqual(json.loads(get_response.body)['status'], 'attended')
+        self.assertEqual(get_response.headers['Etag'], '"2"')
+
+    def test_patch_appointment(self):
+        appointment_id = str(uuid.uuid4())
+        other_appointment_id = str(uuid.uuid4())
+        self.test_appointment_ids.extend([appointment_id, other_appointment_id])
+        appointment = {
+            'id': appointment_id,
+            'patient': '4505577104',
+            'status': 'active',
+            'time': '2024-09-05T09:00:00+01:00',
+            'duration': '30m',
+            'clinician': 'Bethany Rice',
+            'department': 'oncology',
+            'postcode': 'HD36 0HQ'
+        }
+        create_response = self.fetch(
+            f'/api/appointments/{appointment_id}',
+            method='POST',
+            body=json.dumps(appointment),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(create_response.code, 201)
+
+        response = self.fetch(
+            f'/api/appointments/{appointment_id}',
+            method='PATCH',
+            body=json.dumps({'time': '2024-09-05T11:00:00+01:00'}),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers['Etag'], '"2"')
+
+        # The moved appointment no longer holds its old slot, so the clinician can be booked into it
+        create_response = self.fetch(
+            f'/api/appointments/{other_appointment_id}',
+            method='POST',
+            body=json.dumps(dict(appointment, id=other_appointment_id)),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(create_response.code, 201)
+        response = self.fetch(
+            f'/api/appointments/{appointment_id}',
+            method='PATCH',
+            body=json.dumps({'duration': '3h'}),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(response.code, 200)
+        response = self.fetch(
+            f'/api/appointments/{other_appointment_id}',
+            method='PATCH',
+            body=json.dumps({'duration': '2h30m'}),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(response.code, 400)
+
+        response = self.fetch(
+            f'/api/appointments/{appointment_id}',
+            method='PATCH',
+            body=json.dumps({'status': 'cancelled'}),
+            headers={'Content-Type': 'application/json', 'If-Match': '"2"'}
+        )
+        self.assertEqual(response.code, 412)
+        response = self.fetch(
+            f'/api/appointments/{appointment_id}',
+            method='PATCH',
+            body=json.dumps({'status': 'cancelled'}),
+            headers={'Content-Type': 'application/json', 'If-Match': '"3"'}
+        )
+        self.assertEqual(response.code, 200)
+        response = self.fetch(
+            f'/api/appointments/{appointment_id}',
+            method='PATCH',
+            body=json.dumps({'status': 'active'}),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(response.code, 400)
+
+        response = self.fetch(
+            f'/api/appointments/{appointment_id}',
+            method='PATCH',
+            body=json.dumps({'end_time': '2024-09-05T09:00:00+00:00'}),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(response.code, 400)
+        self.assertEqual(json.loads(response.body)['errors'], ['Unknown field: end_time'])
+        self.assertEqual(json.loads(self.fetch(f'/api/appointments/{appointment_id}').body), dict(
+            appointment, time='2024-09-05T11:00:00+01:00', duration='3h', status='cancelled'
+        ))
+
+    def test_get_appointments_invalid_query_has_no_etag(self):
+        response = self.fetch('/api/appointments/?limit=0')
+
+        self.assertEqual(response.code, 400)
+        self.assertNotIn('Etag', response.headers)
+
 
 if __name__ == '__main__':
     tornado.testing.main()
@@ -3,7 +3,7 @@ import tornado.testing
 from tornado.testing import AsyncHTTPTestCase
 from main import start_app
 from pymongo import MongoClient
-from config import MONGODB_URI
+from config import MONGODB_URI, DATABASE_TYPE
 from constants import MONGODB_DATABASE_NAME, MONGODB_COLLECTION_PATIENTS
 
 
@@ -16,12 +16,14 @@ class PatientHandlerTests(AsyncHTTPTestCase):
         self.test_patient_nhs_numbers = []
 
     def tearDown(self):
-        client = MongoClient(MONGODB_URI)
-        db = client[MONGODB_DATABASE_NAME]
-        collection = db[MONGODB_COLLECTION_PATIENTS]
-        for nhs_number in self.test_patient_nhs_numbers:
-            collection.delete_one({'nhs_number': nhs_number})
-        client.close()
+        # The in-memory database starts empty for each test
+        if DATABASE_TYPE == 'mongo':
+            client = MongoClient(MONGODB_URI)
+            db = client[MONGODB_DATABASE_NAME]
+            collection = db[MONGODB_COLLECTION_PATIENTS]
+            for nhs_number in self.test_patient_nhs_numbers:
+                collection.delete_one({'nhs_number': nhs_number})
+            client.close()
         super().tearDown()
 
     def test_get_patient_valid_nhs_number(self):
@@ -179,6 +181,206 @@ class PatientHandlerTests(AsyncHTTPTestCase):
         self.assertEqual(retrieved_data['name'], 'María José Fernández-Röñez',
                         "Updated Unicode name must be preserved exactly (GDPR compliance)")
 
+    def test_get_patient_not_modified(self):
+        nhs_number = '4505577104'  # Valid NHS number with correct checksum
+        self.test_patient_nhs_numbers.append(nhs_number)
+        patient = {
+            'nhs_number': nhs_number,
+            'name': 'Dr Glenn Clark',
+            'date_of_birth': '1996-02-01',
+            'postcode': 'N6 2FA'
+        }
+        create_response = self.fetch(
+            f'/api/patients/{nhs_number}',
+            method='POST',
+            body=json.dumps(patient),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(create_response.code, 201)
+
+        response = self.fetch(f'/api/patients/{nhs_number}')
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers['Etag'], '"1"')
+
+        response = self.fetch(f'/api/patients/{nhs_number}', headers={'If-None-Match': '"1"'})
+        self.assertEqual(response.code, 304)
+        self.assertEqual(response.body, b'')
+
+        update_response = self.fetch(
+            f'/api/patients/{nhs_number}',
+            method='PUT',
+            body=json.dumps(dict(patient, name='Dr Glenn Tipton')),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(update_response.code, 200)
+        self.assertEqual(update_response.headers['Etag'], '"2"')
+
+        response = self.fetch(f'/api/patients/{nhs_number}', headers={'If-None-Match': '"1"'})
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers['Etag'], '"2"')
+        self.assertEqual(json.loads(response.body)['name'], 'Dr Glenn Tipton')
+
+    def test_put_patient_if_match(self):
+        nhs_number = '9434765919'  # Valid NHS number with correct checksum
+        self.test_patient_nhs_numbers.append(nhs_number)
+        patient = {
+            'nhs_number': nhs_number,
+            'name': 'Dr Glenn Clark',
+            'date_of_birth': '1996-02-01',
+            'postcode': 'N6 2FA'
+        }
+        create_response = self.fetch(
+            f'/api/patients/{nhs_number}',
+            method='POST',
+            body=json.dumps(patient),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(create_response.code, 201)
+        etag = self.fetch(f'/api/patients/{nhs_number}').headers['Etag']
+
+        response = self.fetch(
+            f'/api/patients/{nhs_number}',
+            method='PUT',
+            body=json.dumps(dict(patient, name='Dr Glenn Tipton')),
+            headers={'Content-Type': 'application/json', 'If-Match': etag}
+        )
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers['Etag'], '"2"')
+
+        # A second editor still holding the first version is refused rather than overwriting the first edit
+        response = self.fetch(
+            f'/api/patients/{nhs_number}',
+            method='PUT',
+            body=json.dumps(dict(patient, name='Dr Glenn Hughes')),
+            headers={'Content-Type': 'application/json', 'If-Match': etag}
+        )
+        self.assertEqual(response.code, 412)
+        self.assertEqual(json.loads(response.body)['errors'], ['patient has changed since it was read'])
+
+        response = self.fetch(
+            f'/api/patients/{nhs_number}',
+            method='PUT',
+            body=json.dumps(dict(patient, name='Dr Glenn Hughes')),
+            headers={'Content-Type': 'application/json', 'If-Match': 'W/"2"'}
+        )
+        self.assertEqual(response.code, 412)
+        self.assertEqual(json.loads(self.fetch(f'/api/patients/{nhs_number}').body)['name'], 'Dr Glenn Tipton')
+
+    def test_put_missing_patient(self):
+        nhs_number = '4505577104'  # Valid NHS number with correct checksum
+        patient = {
+            'nhs_number': nhs_number,
+            'name': 'Dr Glenn Clark',
+            'date_of_birth': '1996-02-01',
+            'postcode': 'N6 2FA'
+        }
+        response = self.fetch(
+            f'/api/patients/{nhs_number}',
+            method='PUT',
+            body=json.dumps(patient),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(response.code, 404)
+        self.assertEqual(self.fetch(f'/api/patients/{nhs_number}').code, 404)
+
+    def test_patch_patient(self):
+        nhs_number = '9434765919'  # Valid NHS number with correct checksum
+        self.test_patient_nhs_numbers.append(nhs_number)
+        patient = {
+            'nhs_number': nhs_number,
+            'name': 'Dr Glenn Clark',
+            'date_of_birth': '1996-02-01',
+            'postcode': 'N6 2FA'
+        }
+        create_response = self.fetch(
+            f'/api/patients/{nhs_number}',
+            method='POST',
+            body=json.dumps(patient),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(create_response.code, 201)
+
+        response = self.fetch(
+            f'/api/patients/{nhs_number}',
+            method='PATCH',
+            body=json.dumps({'postcode': 'M1 1AA'}),
+            headers={'Content-Type': 'application/json', 'If-Match': '"1"'}
+        )
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers['Etag'], '"2"')
+        self.assertEqual(json.loads(self.fetch(f'/api/patients/{nhs_number}').body), dict(patient, postcode='M1 1AA'))
+
+        response = self.fetch(
+            f'/api/patients/{nhs_number}',
+            method='PATCH',
+            body=json.dumps({'name': 'Dr Glenn Hughes'}),
+            headers={'Content-Type': 'application/json', 'If-Match': '"1"'}
+        )
+        self.assertEqual(response.code, 412)
+
+        for changes, error in [
+            ({'postcode': 'M1 1AA', 'version': 7}, 'Unknown field: version'),
+            ({'name': ''}, 'Missing required field: name'),
+            ({}, 'Invalid request body. Expected a JSON object holding the fields to change'),
+        ]:
+            with self.subTest(changes=changes):
+                response = self.fetch(
+                    f'/api/patients/{nhs_number}',
+                    method='PATCH',
+                    body=json.dumps(changes),
+                    headers={'Content-Type': 'application/json'}
+                )
+                self.assertEqual(response.code, 400)
+                self.assertEqual(json.loads(response.body)['errors'], [error])
+
+        response = self.fetch(
+            f'/api/patients/{nhs_number}',
+            method='PATCH',
+            body=json.dumps({'name': 'Dr Glenn Hughes'}),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers['Etag'], '"3"')
+
+        response = self.fetch(
+            '/api/patients/9876543210',
+            method='PATCH',
+            body=json.dumps({'postcode': 'M1 1AA'}),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(response.code, 404)
+
+    def test_get_patients_not_modified(self):
+        response = self.fetch('/api/patients/?limit=5')
+        self.assertEqual(response.code, 200)
+        etag = response.headers['Etag']
+
+        response = self.fetch('/api/patients/?limit=5', headers={'If-None-Match': etag})
+        self.assertEqual(response.code, 304)
+
+        ndjson_response = self.fetch('/api/patients/', headers={'If-None-Match': etag, 'Accept': 'application/x-ndjson'})
+        self.assertEqual(ndjson_response.code, 200)
+        self.assertNotEqual(ndjson_response.headers['Etag'], etag)
+
+        nhs_number = '9876543210'  # Valid NHS number with correct checksum
+        self.test_patient_nhs_numbers.append(nhs_number)
+        create_response = self.fetch(
+            f'/api/patients/{nhs_number}',
+            method='POST',
+            body=json.dumps({
+                'nhs_number': nhs_number,
+                'name': 'Dr Glenn Clark',
+                'date_of_birth': '1996-02-01',
+                'postcode': 'N6 2FA'
+            }),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(create_response.code, 201)
+
+        response = self.fetch('/api/patients/?limit=5', headers={'If-None-Match': etag})
+        self.assertEqual(response.code, 200)
+        self.assertNotEqual(response.headers['Etag'], etag)
+
 
 
 if __name__ == '__main__':
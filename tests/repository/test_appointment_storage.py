@@ -0,0 +1,55 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from src.repository.appointment_storage import parse_duration, format_duration, to_stored, from_stored
+
+
+class TestAppointmentStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.appointment = {'id': 'a', 'time': '2025-06-04T16:30:00+01:00', 'duration': '1h30m', 'status': 'active'}
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration('15m'), timedelta(minutes=15))
+        self.assertEqual(parse_duration('2h'), timedelta(hours=2))
+        self.assertEqual(parse_duration('1h30m'), timedelta(hours=1, minutes=30))
+        for invalid_duration in ['', 'h', '30', '30m1h', '1.5h', None, 90]:
+            self.assertIsNone(parse_duration(invalid_duration), invalid_duration)
+
+    def test_format_duration(self):
+        self.assertEqual(format_duration(15), '15m')
+        self.assertEqual(format_duration(120), '2h')
+        self.assertEqual(format_duration(90), '90m')
+        self.assertEqual(format_duration(0), '0m')
+
+    def test_to_stored_types_time_and_duration(self):
+        stored = to_stored(self.appointment)
+
+        self.assertEqual(stored, {
+            'id': 'a',
+            'time': datetime(2025, 6, 4, 15, 30, tzinfo=timezone.utc),
+            'time_offset': 60,
+            'duration': 90,
+            'end_time': datetime(2025, 6, 4, 17, 0, tzinfo=timezone.utc),
+            'status': 'active',
+        })
+        self.assertEqual(self.appointment['time'], '2025-06-04T16:30:00+01:00')
+
+    def test_to_stored_partial_and_invalid_data(self):
+        self.assertEqual(to_stored({'status': 'cancelled'}), {'status': 'cancelled'})
+        self.assertEqual(to_stored({'duration': '2h'}), {'duration': 120})
+        self.assertEqual(to_stored({'time': 'tomorrow', 'duration': '1h'}), {'time': 'tomorrow', 'duration': 60})
+
+    def test_round_trip_keeps_the_given_offset(self):
+        for time in ['2025-06-04T16:30:00+01:00', '2025-01-04T16:30:00+00:00', '2025-06-04T16:30:00-05:30',
+                     '2025-06-04T16:30:00']:
+            appointment = dict(self.appointment, time=time, duration='2h')
+
+            self.assertEqual(from_stored(to_stored(appointment)), appointment, time)
+
+    def test_from_stored_naive_mongodb_datetimes_are_utc(self):
+        document = {'time': datetime(2025, 6, 4, 15, 30), 'time_offset': 60, 'duration': 15}
+
+        self.assertEqual(from_stored(document), {'time': '2025-06-04T16:30:00+01:00', 'duration': '15m'})
+
+    def test_from_stored_leaves_untyped_appointments_alone(self):
+        self.assertEqual(from_stored(dict(self.appointment)), self.appointment)
@@ -0,0 +1,31 @@
+import unittest
+from src.repository.caching.bloom_filter import BloomFilter
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_no_false_negatives(self):
+        bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+        items = [f'{number:010d}' for number in range(1000)]
+        for item in items:
+            bloom_filter.add(item)
+
+        self.assertTrue(all(item in bloom_filter for item in items))
+        self.assertEqual(len(bloom_filter), 1000)
+
+    def test_false_positive_rate_at_capacity(self):
+        bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+        for number in range(1000):
+            bloom_filter.add(f'{number:010d}')
+
+        false_positives = sum(1 for number in range(1000, 11000) if f'{number:010d}' in bloom_filter)
+
+        self.assertLess(false_positives / 10000, 0.03)
+
+    def test_clear(self):
+        bloom_filter = BloomFilter(capacity=10, error_rate=0.01)
+        bloom_filter.add('9434765919')
+
+        bloom_filter.clear()
+
+        self.assertNotIn('9434765919', bloom_filter)
+        self.assertEqual(len(bloom_filter), 0)
@@ -0,0 +1,127 @@
+import unittest
+from unittest.mock import AsyncMock
+from src.repository.caching.lru_cache import LRUCache
+from src.repository.results import WriteStatus
+from src.repository.caching.patient import CachingPatientRepository
+from src.repository.caching.appointment import CachingAppointmentRepository
+
+
+class TestCachingPatientRepository(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.patient = {'nhs_number': '1373645350', 'name': 'Dr Glenn Clark', 'date_of_birth': '1996-02-01', 'postcode': 'N6 2FA'}
+        self.mock_patient_repository = AsyncMock()
+        self.cache = LRUCache(max_entries=10, ttl_seconds=60)
+        self.repository = CachingPatientRepository(self.mock_patient_repository, self.cache)
+
+    async def test_reads_through_once(self):
+        self.mock_patient_repository.get_by_nhs_number.return_value = self.patient
+
+        first = await self.repository.get_by_nhs_number('1373645350')
+        second = await self.repository.get_by_nhs_number('1373645350')
+
+        self.assertEqual(first, self.patient)
+        self.assertEqual(second, self.patient)
+        self.mock_patient_repository.get_by_nhs_number.assert_awaited_once_with('1373645350')
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    async def test_returned_patient_cannot_mutate_cache(self):
+        self.mock_patient_repository.get_by_nhs_number.return_value = self.patient
+
+        (await self.repository.get_by_nhs_number('1373645350'))['name'] = 'changed'
+
+        self.assertEqual((await self.repository.get_by_nhs_number('1373645350'))['name'], 'Dr Glenn Clark')
+
+    async def test_caches_misses_until_created(self):
+        self.mock_patient_repository.get_by_nhs_number.return_value = None
+
+        self.assertIsNone(await self.repository.get_by_nhs_number('1373645350'))
+        self.assertIsNone(await self.repository.get_by_nhs_number('1373645350'))
+        self.mock_patient_repository.get_by_nhs_number.assert_awaited_once()
+
+        await self.repository.create(self.patient)
+        self.mock_patient_repository.get_by_nhs_number.return_value = self.patient
+
+        self.assertEqual(await self.repository.get_by_nhs_number('1373645350'), self.patient)
+
+    async def test_writes_invalidate(self):
+        writes = [
+            lambda: self.repository.update_by_nhs_number('1373645350', self.patient),
+            lambda: self.repository.delete_by_nhs_number('1373645350'),
+            lambda: self.repository.upsert_many([self.patient]),
+        ]
+        for write in writes:
+            with self.subTest(write=write):
+                self.cache.put('1373645350', self.patient)
+                await write()
+                self.assertEqual(self.cache.get('1373645350'), (False, None))
+
+    async def test_update_invalidates_new_nhs_number(self):
+        self.cache.put('9434765919', None)
+
+        await self.repository.update_by_nhs_number('1373645350', dict(self.patient, nhs_number='9434765919'))
+
+        self.assertEqual(self.cache.get('9434765919'), (False, None))
+
+    async def test_failed_write_still_invalidates(self):
+        self.cache.put('1373645350', None)
+        self.mock_patient_repository.create.side_effect = RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            await self.repository.create(self.patient)
+
+        self.assertEqual(self.cache.get('1373645350'), (False, None))
+
+    async def test_invalidate_all(self):
+        self.cache.put('1373645350', self.patient)
+
+        self.repository.invalidate_all()
+
+        self.assertEqual(self.cache.get('1373645350'), (False, None))
+
+
+class TestCachingAppointmentRepository(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.appointment = {'id': '01542f70-929f-4c9a-b4fa-e672310d7e78', 'status': 'active'}
+        self.mock_appointment_repository = AsyncMock()
+        self.cache = LRUCache(max_entries=10, ttl_seconds=60)
+        self.repository = CachingAppointmentRepository(self.mock_appointment_repository, self.cache)
+
+    async def test_reads_through_once_and_update_invalidates(self):
+        self.mock_appointment_repository.get_by_id.return_value = self.appointment
+
+        await self.repository.get_by_id(self.appointment['id'])
+        await self.repository.get_by_id(self.appointment['id'])
+        await self.repository.update_by_id(self.appointment['id'], {'status': 'cancelled'})
+        await self.repository.get_by_id(self.appointment['id'])
+
+        self.assertEqual(self.mock_appointment_repository.get_by_id.await_count, 2)
+
+    async def test_update_unless_cancelled_invalidates(self):
+        self.cache.put(self.appointment['id'], self.appointment)
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (WriteStatus.UPDATED, self.appointment)
+
+        status, previous = await self.repository.update_unless_cancelled(self.appointment['id'], {'status': 'cancelled'})
+
+        self.assertEqual(status, WriteStatus.UPDATED)
+        self.assertEqual(previous, self.appointment)
+        self.assertEqual(self.cache.get(self.appointment['id']), (False, None))
+
+    async def test_mark_missed_invalidates(self):
+        self.mock_appointment_repository.get_by_id.return_value = self.appointment
+        self.mock_appointment_repository.mark_missed.return_value = [self.appointment['id']]
+        await self.repository.get_by_id(self.appointment['id'])
+
+        self.assertEqual(await self.repository.mark_missed('now', 10), [self.appointment['id']])
+        await self.repository.get_by_id(self.appointment['id'])
+
+        self.assertEqual(self.mock_appointment_repository.get_by_id.await_count, 2)
+
+    async def test_collection_reads_pass_through(self):
+        self.mock_appointment_repository.get_page.return_value = [self.appointment]
+
+        self.assertEqual(await self.repository.get_page(10, None), [self.appointment])
+        self.mock_appointment_repository.get_page.assert_awaited_once_with(10, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
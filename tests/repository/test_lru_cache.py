@@ -0,0 +1,70 @@
+import unittest
+from src.repository.caching.lru_cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = LRUCache(max_entries=2, ttl_seconds=10, clock=self.clock)
+
+    def test_hit_and_miss(self):
+        self.assertEqual(self.cache.get('a'), (False, None))
+        self.cache.put('a', 1)
+
+        self.assertEqual(self.cache.get('a'), (True, 1))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_caches_none_as_a_miss(self):
+        self.cache.put('a', None)
+
+        self.assertEqual(self.cache.get('a'), (True, None))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.put('a', 1)
+        self.cache.put('b', 2)
+        self.cache.get('a')
+        self.cache.put('c', 3)
+
+        self.assertEqual(self.cache.get('b'), (False, None))
+        self.assertEqual(self.cache.get('a'), (True, 1))
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_entries_expire(self):
+        self.cache.put('a', 1)
+        self.clock.now = 10
+
+        self.assertEqual(self.cache.get('a'), (False, None))
+        self.assertEqual(self.cache.expirations, 1)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidate(self):
+        self.cache.put('a', 1)
+        self.cache.invalidate('a')
+
+        self.assertEqual(self.cache.get('a'), (False, None))
+
+    def test_put_after_invalidation_is_ignored(self):
+        """A value read before a concurrent write must not be cached after it."""
+        generation = self.cache.generation
+        self.cache.invalidate('a')
+        self.cache.put('a', 'stale', generation)
+
+        self.assertEqual(self.cache.get('a'), (False, None))
+
+    def test_stats(self):
+        self.cache.put('a', 1)
+        self.cache.get('a')
+
+        self.assertEqual(self.cache.stats(), {'entries': 1, 'hits': 1, 'misses': 0, 'evictions': 0, 'expirations': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
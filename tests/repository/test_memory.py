@@ -0,0 +1,290 @@
+import json
+import unittest
+from unittest import mock
+from datetime import date, datetime, timezone
+from src.db.memory import MemoryDatabase
+from src.repository.errors import DuplicateRecordError, UnindexedQueryError
+from src.repository.appointment import AppointmentQuery
+from src.repository.results import WriteStatus
+from src.repository.memory.patient import MemoryPatientRepository
+from src.repository.memory.appointment import MemoryAppointmentRepository, _is_not_cancelled
+from src.repository.memory.rollup import MemoryRollupRepository
+
+
+class TestMemoryPatientRepository(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.patient = {'nhs_number': '1373645350', 'name': 'Dr Glenn Clark', 'date_of_birth': '1996-02-01', 'postcode': 'N6 2FA'}
+        self.repository = MemoryPatientRepository(MemoryDatabase())
+
+    async def test_create_get_update_delete(self):
+        self.assertTrue(await self.repository.create(self.patient))
+        self.assertTrue(await self.repository.update_by_nhs_number('1373645350', {'postcode': 'M1 1AA'}))
+
+        self.assertEqual(
+            await self.repository.get_by_nhs_number('1373645350'), dict(self.patient, postcode='M1 1AA', version=2)
+        )
+        self.assertTrue(await self.repository.delete_by_nhs_number('1373645350'))
+        self.assertIsNone(await self.repository.get_by_nhs_number('1373645350'))
+
+    async def test_update_at_version(self):
+        await self.repository.create(self.patient)
+
+        self.assertEqual(await self.repository.update_at_version('1373645350', {'postcode': 'M1 1AA'}, 1),
+                         (WriteStatus.UPDATED, 2))
+        self.assertEqual(await self.repository.update_at_version('1373645350', {'postcode': 'N6 2FA'}, 1),
+                         (WriteStatus.STALE, None))
+        self.assertEqual(await self.repository.update_at_version('9434765919', {'postcode': 'N6 2FA'}, 1),
+                         (WriteStatus.NOT_FOUND, None))
+        self.assertEqual(
+            await self.repository.get_by_nhs_number('1373645350'), dict(self.patient, postcode='M1 1AA', version=2)
+        )
+
+    async def test_update_at_any_version_reports_the_new_version(self):
+        await self.repository.create(self.patient)
+
+        self.assertEqual(await self.repository.update_at_version('1373645350', {'postcode': 'M1 1AA'}, None),
+                         (WriteStatus.UPDATED, 2))
+        self.assertEqual(await self.repository.update_at_version('9434765919', {'postcode': 'M1 1AA'}, None),
+                         (WriteStatus.NOT_FOUND, None))
+
+    async def test_create_duplicate_raises(self):
+        await self.repository.create(self.patient)
+
+        with self.assertRaises(DuplicateRecordError):
+            await self.repository.create(self.patient)
+
+    async def test_existing_nhs_numbers(self):
+        await self.repository.create(self.patient)
+
+        self.assertEqual(await self.repository.existing_nhs_numbers(['1373645350', '9434765919']), {'1373645350'})
+
+    async def test_stream_and_upsert_many(self):
+        statuses = await self.repository.upsert_many([self.patient, dict(self.patient, nhs_number='9434765919')])
+        self.assertEqual(statuses, [WriteStatus.CREATED, WriteStatus.CREATED])
+
+        batches = [batch async for batch in self.repository.stream(1)]
+
+        self.assertEqual([[patient['nhs_number'] for patient in batch] for batch in batches], [['1373645350'], ['9434765919']])
+
+
+class TestMemoryAppointmentRepository(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.repository = MemoryAppointmentRepository(MemoryDatabase())
+
+    async def test_upsert_many_does_not_reinstate_cancelled(self):
+        await self.repository.create({'id': 'a', 'status': 'cancelled'})
+        await self.repository.create({'id': 'b', 'status': 'active'})
+
+        statuses = await self.repository.upsert_many([
+            {'id': 'a', 'status': 'active'},
+            {'id': 'b', 'status': 'attended'},
+            {'id': 'c', 'status': 'active'},
+        ])
+
+        self.assertEqual(statuses, [WriteStatus.CONFLICT, WriteStatus.UPDATED, WriteStatus.CREATED])
+        self.assertEqual((await self.repository.get_by_id('a'))['status'], 'cancelled')
+        self.assertEqual([appointment['id'] for appointment in await self.repository.get_page(2, 'a')], ['b', 'c'])
+
+    async def test_update_unless_cancelled_returns_the_previous_appointment(self):
+        appointment = {'id': 'a', 'status': 'active', 'time': '2025-06-04T16:30:00+01:00', 'duration': '1h'}
+        await self.repository.create(appointment)
+
+        self.assertEqual(
+            await self.repository.update_unless_cancelled('a', {'status': 'cancelled'}),
+            (WriteStatus.UPDATED, dict(appointment, version=1))
+        )
+        self.assertEqual(
+            await self.repository.update_unless_cancelled('a', {'status': 'active'}),
+            (WriteStatus.CONFLICT, dict(appointment, status='cancelled', version=2))
+        )
+        self.assertEqual(
+            await self.repository.update_unless_cancelled('a', {'status': 'active'}, 1),
+            (WriteStatus.STALE, dict(appointment, status='cancelled', version=2))
+        )
+        self.assertEqual(await self.repository.update_unless_cancelled('b', {'status': 'active'}),
+                         (WriteStatus.NOT_FOUND, None))
+
+    async def test_get_many(self):
+        appointment = {'status': 'active', 'time': '2025-06-04T16:30:00+01:00', 'duration': '1h'}
+        await self.repository.create(dict(appointment, id='a'))
+        await self.repository.create(dict(appointment, id='b'))
+
+        self.assertEqual(await self.repository.get_many(['b', 'c']), {'b': dict(appointment, id='b')})
+
+    async def test_mark_missed(self):
+        appointment = {'status': 'active', 'time': '2025-06-04T16:30:00+01:00', 'duration': '1h'}
+        await self.repository.create(dict(appointment, id='a'))
+        await self.repository.create(dict(appointment, id='b', duration='1h30m'))
+        await self.repository.create(dict(appointment, id='c', status='attended'))
+        await self.repository.upsert_many([dict(appointment, id='d', time='2025-06-05T16:30:00+01:00')])
+
+        now = datetime(2025, 6, 4, 17, 0, tzinfo=timezone.utc)
+        self.assertEqual(await self.repository.mark_missed(now, 10), ['a', 'b'])
+        self.assertEqual(await self.repository.mark_missed(now, 10), [])
+
+        self.assertEqual(await self.repository.get_by_id('a'), dict(appointment, id='a', status='missed', version=2))
+        self.assertEqual((await self.repository.get_by_id('c'))['status'], 'attended')
+        self.assertEqual((await self.repository.get_by_id('d'))['status'], 'active')
+
+    async def test_mark_missed_follows_updated_time(self):
+        appointment = {'id': 'a', 'status': 'active', 'time': '2025-06-04T16:30:00+01:00', 'duration': '1h'}
+        await self.repository.create(appointment)
+        await self.repository.update_unless_cancelled('a', dict(appointment, time='2025-06-05T16:30:00+01:00'))
+
+        self.assertEqual(await self.repository.mark_missed(datetime(2025, 6, 5, 0, 0, tzinfo=timezone.utc), 10), [])
+        self.assertEqual(await self.repository.mark_missed(datetime(2025, 6, 5, 16, 30, tzinfo=timezone.utc), 10), ['a'])
+
+    async def test_find(self):
+        appointment = {'status': 'active', 'clinician': 'Jason Holloway', 'department': 'oncology', 'duration': '1h'}
+        await self.repository.create(dict(appointment, id='a', patient='1', time='2025-06-04T09:00:00+01:00'))
+        await self.repository.create(dict(appointment, id='b', patient='2', time='2025-06-04T08:00:00+00:00'))
+        await self.repository.create(dict(appointment, id='c', patient='1', time='2025-06-03T09:00:00+00:00',
+                                          status='cancelled'))
+        await self.repository.create(dict(appointment, id='d', patient='1', time='2025-06-05T09:00:00+00:00',
+                                          clinician='Bethany Rice'))
+
+        async def find(limit=10, after=None, **filters):
+            return [appointment['id'] for appointment in await self.repository.find(AppointmentQuery(**filters), limit,
+                                                                                   after)]
+
+        self.assertEqual(await find(clinician='Jason Holloway'), ['c', 'a', 'b'])
+        self.assertEqual(await find(clinician='Jason Holloway', descending=True), ['b', 'a', 'c'])
+        self.assertEqual(await find(department='oncology', status='active', limit=2), ['a', 'b'])
+        self.assertEqual(await find(patient='1', clinician='Jason Holloway'), ['c', 'a'])
+        self.assertEqual(await find(patient='1', time_from=datetime(2025, 6, 4, tzinfo=timezone.utc),
+                                    time_to=datetime(2025, 6, 5, 9, tzinfo=timezone.utc)), ['a'])
+        self.assertEqual(await find(department='oncology', after=(datetime(2025, 6, 4, 8, tzinfo=timezone.utc), 'a')),
+                         ['b', 'd'])
+        self.assertEqual((await self.repository.find(AppointmentQuery(patient='2'), 1))[0]['time'],
+                         '2025-06-04T08:00:00+00:00')
+
+    async def test_find_rejects_unindexed_queries(self):
+        with self.assertRaises(UnindexedQueryError):
+            await self.repository.find(AppointmentQuery(status='active'), 10)
+
+    async def test_find_overlapping(self):
+        appointment = {'status': 'active', 'clinician': 'Jason Holloway', 'duration': '1h'}
+        await self.repository.create(dict(appointment, id='a', time='2025-06-04T09:00:00+00:00'))
+        await self.repository.create(dict(appointment, id='b', time='2025-06-04T11:00:00+00:00', status='cancelled'))
+        await self.repository.create(dict(appointment, id='c', time='2025-06-04T12:00:00+00:00',
+                                          clinician='Bethany Rice'))
+
+        def at(hour, minute=0):
+            return datetime(2025, 6, 4, hour, minute, tzinfo=timezone.utc)
+
+        self.assertEqual(await self.repository.find_overlapping('Jason Holloway', at(9, 30), at(10)), 'a')
+        self.assertEqual(await self.repository.find_overlapping('Jason Holloway', at(8, 30), at(9, 30)), 'a')
+        self.assertIsNone(await self.repository.find_overlapping('Jason Holloway', at(10), at(11)))
+        self.assertIsNone(await self.repository.find_overlapping('Jason Holloway', at(8), at(9)))
+        self.assertIsNone(await self.repository.find_overlapping('Jason Holloway', at(11), at(12, 30)))
+        self.assertIsNone(await self.repository.find_overlapping('Jason Holloway', at(9), at(10), 'a'))
+
+        # Appointments written without the check can overlap, so one ending before start does not end the search
+        await self.repository.create(dict(appointment, id='d', time='2025-06-04T13:00:00+00:00', duration='4h'))
+        await self.repository.create(dict(appointment, id='e', time='2025-06-04T14:00:00+00:00', duration='15m'))
+        self.assertEqual(await self.repository.find_overlapping('Jason Holloway', at(15), at(16)), 'd')
+
+        # An appointment whose end time cannot be worked out is taken to overlap
+        await self.repository.create(dict(appointment, id='f', time='2025-06-04T18:00:00+00:00', duration='a while'))
+        self.assertEqual(await self.repository.find_overlapping('Jason Holloway', at(20), at(21)), 'f')
+
+    async def test_find_overlapping_reads_only_the_appointments_that_could_overlap(self):
+        appointment = {'status': 'active', 'clinician': 'Jason Holloway', 'duration': '30m'}
+        for day in range(1, 29):
+            for hour in range(9, 17):
+                await self.repository.create(dict(appointment, id=f'{day}-{hour}',
+                                                  time=f'2025-02-{day:02}T{hour:02}:00:00+00:00'))
+
+        with mock.patch('src.repository.memory.appointment._is_not_cancelled', wraps=_is_not_cancelled) as read:
+            self.assertIsNone(await self.repository.find_overlapping(
+                'Jason Holloway',
+                datetime(2025, 3, 1, 9, tzinfo=timezone.utc),
+                datetime(2025, 3, 1, 10, tzinfo=timezone.utc)
+            ))
+
+        # Only the day before the new appointment is read, not the whole of February
+        self.assertEqual(read.call_count, 8)
+
+    async def test_find_bookings(self):
+        appointment = {'status': 'active', 'clinician': 'Jason Holloway', 'duration': '1h'}
+        await self.repository.create(dict(appointment, id='a', time='2025-06-03T08:00:00+00:00'))
+        await self.repository.create(dict(appointment, id='b', time='2025-06-03T10:00:00+00:00', duration='a while'))
+        await self.repository.create(dict(appointment, id='c', time='2025-06-04T11:00:00+00:00', status='cancelled'))
+        await self.repository.create(dict(appointment, id='d', time='2025-06-04T12:00:00+00:00'))
+        await self.repository.create(dict(appointment, id='e', time='2025-06-04T13:00:00+00:00'))
+
+        bookings = await self.repository.find_bookings(
+            'Jason Holloway',
+            datetime(2025, 6, 4, 9, tzinfo=timezone.utc),
+            datetime(2025, 6, 4, 13, tzinfo=timezone.utc)
+        )
+
+        self.assertEqual(bookings, [
+            (datetime(2025, 6, 3, 10, tzinfo=timezone.utc), None, 'b'),
+            (datetime(2025, 6, 4, 12, tzinfo=timezone.utc), datetime(2025, 6, 4, 13, tzinfo=timezone.utc), 'd'),
+        ])
+
+    async def test_find_busy_times(self):
+        appointment = {'status': 'active', 'clinician': 'Jason Holloway', 'department': 'oncology', 'duration': '1h'}
+        await self.repository.create(dict(appointment, id='a', time='2025-06-04T10:00:00+01:00'))
+        await self.repository.create(dict(appointment, id='b', time='2025-06-04T08:00:00+00:00', duration='30m',
+                                          clinician='Bethany Rice'))
+        await self.repository.create(dict(appointment, id='c', time='2025-06-04T11:00:00+00:00', status='cancelled'))
+        await self.repository.create(dict(appointment, id='d', time='2025-06-05T11:00:00+00:00'))
+
+        def at(hour, minute=0):
+            return datetime(2025, 6, 4, hour, minute, tzinfo=timezone.utc)
+
+        query = AppointmentQuery(department='oncology', status='cancelled', time_from=at(0), time_to=at(23))
+        self.assertEqual(await self.repository.find_busy_times(query, 10), [(at(8), at(8, 30)), (at(9), at(10))])
+
+        query = AppointmentQuery(clinician='Jason Holloway', department='oncology', time_from=at(0), time_to=at(23))
+        self.assertEqual(await self.repository.find_busy_times(query, 10), [(at(9), at(10))])
+
+
+class TestMemoryRollupRepository(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.memory_database = MemoryDatabase()
+        self.repository = MemoryRollupRepository(self.memory_database)
+
+    async def test_increment_and_get_range(self):
+        await self.repository.increment({
+            ('clinician', 'Jason Holloway', '2025-06-04'): {'booked': 2, 'missed': 1, 'minutes_lost': 60},
+            ('clinician', 'Jason Holloway', '2025-06-06'): {'booked': 1},
+            ('clinician', 'Bethany Rice', '2025-06-04'): {'booked': 1},
+            ('department', 'Jason Holloway', '2025-06-04'): {'booked': 1},
+        })
+        await self.repository.increment({
+            ('clinician', 'Jason Holloway', '2025-06-04'): {'missed': -1, 'attended': 1, 'minutes_lost': -60},
+            ('clinician', 'Jason Holloway', '2025-06-07'): {'booked': 1},
+        })
+
+        rollups = await self.repository.get_range('clinician', 'Jason Holloway', date(2025, 6, 4), date(2025, 6, 6))
+
+        self.assertEqual(rollups, [
+            {'dimension': 'clinician', 'key': 'Jason Holloway', 'day': '2025-06-04', 'booked': 2, 'missed': 0,
+             'minutes_lost': 0, 'attended': 1},
+            {'dimension': 'clinician', 'key': 'Jason Holloway', 'day': '2025-06-06', 'booked': 1},
+        ])
+
+    async def test_replace_all_survives_a_snapshot(self):
+        await self.repository.increment({('clinician', 'Jason Holloway', '2025-06-04'): {'booked': 5}})
+
+        self.assertEqual(await self.repository.replace_all({
+            ('department', 'oncology', '2025-06-04'): {'booked': 1},
+        }), 1)
+        restored = MemoryDatabase()
+        restored.collections['appointment_rollups'].load(
+            json.loads(json.dumps(self.memory_database['appointment_rollups'].snapshot()))
+        )
+        repository = MemoryRollupRepository(restored)
+
+        self.assertEqual(await repository.get_range('clinician', 'Jason Holloway', date(2025, 6, 4), date(2025, 6, 4)), [])
+        self.assertEqual(
+            await repository.get_range('department', 'oncology', date(2025, 6, 1), date(2025, 6, 30)),
+            [{'dimension': 'department', 'key': 'oncology', 'day': '2025-06-04', 'booked': 1}]
+        )
+        await repository.increment({('department', 'oncology', '2025-06-04'): {'booked': 1}})
+        self.assertEqual(
+            (await repository.get_range('department', 'oncology', date(2025, 6, 4), date(2025, 6, 4)))[0]['booked'], 2
+        )
@@ -0,0 +1,320 @@
+import asyncio
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import ANY, AsyncMock, MagicMock
+from src.repository.mongo.appointment import MongoAppointmentRepository
+from src.repository.appointment import AppointmentQuery
+from src.repository.errors import UnindexedQueryError
+from src.repository.results import WriteStatus
+
+
+class FakeAppointments:
+    """Just enough of MongoDB for mark_missed, yielding to other tasks before each operation like a round-trip would."""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    @staticmethod
+    def matches(document, query):
+        for field, condition in query.items():
+            value = document.get(field)
+            if isinstance(condition, dict):
+                if '$in' in condition and value not in condition['$in']:
+                    return False
+                if '$lte' in condition and not (value is not None and value <= condition['$lte']):
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    async def find_keys(self, key_field, query, sort_field, limit):
+        await asyncio.sleep(0)
+        matching = sorted((document for document in self.documents if self.matches(document, query)),
+                          key=lambda document: document[sort_field])
+        return [document[key_field] for document in matching[:limit]]
+
+    async def update_many(self, query, updated_values):
+        await asyncio.sleep(0)
+        matching = [document for document in self.documents if self.matches(document, query)]
+        for document in matching:
+            document.update(updated_values)
+        return MagicMock(modified_count=len(matching))
+
+
+class TestMongoAppointmentRepositoryMarkMissed(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.repository = MongoAppointmentRepository(MagicMock())
+        self.repository.mongo_db = AsyncMock()
+        self.now = datetime(2025, 6, 4, 17, 0, tzinfo=timezone.utc)
+        self.due = {'status': 'active', 'end_time': {'$lte': self.now}}
+
+    async def test_marks_due_appointments_with_one_update(self):
+        self.repository.mongo_db.find_keys.return_value = ['a', 'b']
+        self.repository.mongo_db.update_many.return_value = MagicMock(modified_count=2)
+
+        self.assertEqual(await self.repository.mark_missed(self.now, 100), ['a', 'b'])
+
+        self.repository.mongo_db.find_keys.assert_awaited_once_with('id', self.due, 'end_time', 100)
+        self.repository.mongo_db.update_many.assert_awaited_once_with(
+            {'id': {'$in': ['a', 'b']}, **self.due}, {'status': 'missed', 'missed_by': ANY}
+        )
+
+    async def test_nothing_due_skips_the_update(self):
+        self.repository.mongo_db.find_keys.return_value = []
+
+        self.assertEqual(await self.repository.mark_missed(self.now, 100), [])
+
+        self.repository.mongo_db.update_many.assert_not_awaited()
+
+    async def test_reports_only_appointments_marked(self):
+        self.repository.mongo_db.find_keys.side_effect = [['a', 'b'], ['b']]
+        self.repository.mongo_db.update_many.return_value = MagicMock(modified_count=1)
+
+        self.assertEqual(await self.repository.mark_missed(self.now, 100), ['b'])
+
+        sweep_id = self.repository.mongo_db.update_many.await_args.args[1]['missed_by']
+        self.repository.mongo_db.find_keys.assert_awaited_with(
+            'id', {'id': {'$in': ['a', 'b']}, 'missed_by': sweep_id}, 'id', 2
+        )
+
+    async def test_concurrent_sweeps_report_each_appointment_once(self):
+        appointments = FakeAppointments([
+            {'id': 'a', 'status': 'active', 'end_time': datetime(2025, 6, 4, 15, 0, tzinfo=timezone.utc)},
+            {'id': 'b', 'status': 'active', 'end_time': datetime(2025, 6, 4, 16, 0, tzinfo=timezone.utc)},
+        ])
+        sweepers = [MongoAppointmentRepository(MagicMock()), MongoAppointmentRepository(MagicMock())]
+        for sweeper in sweepers:
+            sweeper.mongo_db = appointments
+
+        # Both sweeps read the due appointments before either marks them, and the second reads one more
+        marked = await asyncio.gather(sweepers[0].mark_missed(self.now, 1), sweepers[1].mark_missed(self.now, 2))
+
+        self.assertEqual(marked, [['a'], ['b']])
+        self.assertEqual({appointment['status'] for appointment in appointments.documents}, {'missed'})
+
+    async def test_writes_store_the_end_time(self):
+        self.repository.mongo_db.create.return_value = MagicMock(acknowledged=True)
+        appointment = {'id': 'a', 'time': '2025-06-04T16:30:00+01:00', 'duration': '1h'}
+
+        await self.repository.create(appointment)
+
+        stored = self.repository.mongo_db.create.await_args.args[0]
+        self.assertEqual(stored['end_time'], datetime(2025, 6, 4, 16, 30, tzinfo=timezone.utc))
+        self.assertNotIn('end_time', appointment)
+
+
+class TestMongoAppointmentRepositoryFindOverlapping(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.repository = MongoAppointmentRepository(MagicMock())
+        self.repository.mongo_db = AsyncMock()
+        self.start = datetime(2025, 6, 4, 9, 30, tzinfo=timezone.utc)
+        self.end = datetime(2025, 6, 4, 10, 0, tzinfo=timezone.utc)
+
+    async def test_reads_any_appointment_starting_before_the_end_and_ending_after_the_start(self):
+        self.repository.mongo_db.find_fields.return_value = [{'id': 'a'}]
+
+        self.assertEqual(await self.repository.find_overlapping('Jason Holloway', self.start, self.end, 'b'), 'a')
+
+        self.repository.mongo_db.find_fields.assert_awaited_once_with(
+            {
+                'clinician': 'Jason Holloway',
+                'time': {'$gt': datetime(2025, 6, 3, 9, 30, tzinfo=timezone.utc), '$lt': self.end},
+                'status': {'$ne': 'cancelled'},
+                '$or': [{'end_time': {'$gt': self.start}}, {'end_time': None}],
+                'id': {'$ne': 'b'},
+            },
+            ('id',),
+            [('time', -1), ('id', -1)],
+            1,
+            [('clinician', 1), ('time', 1), ('id', 1)]
+        )
+
+    async def test_no_overlap(self):
+        self.repository.mongo_db.find_fields.return_value = []
+        self.assertIsNone(await self.repository.find_overlapping('Jason Holloway', self.start, self.end))
+
+
+class TestMongoAppointmentRepositoryFindBookings(unittest.IsolatedAsyncioTestCase):
+    async def test_reads_the_times_that_could_overlap_through_the_clinician_index(self):
+        repository = MongoAppointmentRepository(MagicMock())
+        repository.mongo_db = AsyncMock()
+        # Datetimes are read back from MongoDB as naive UTC
+        repository.mongo_db.find_fields.return_value = [
+            {'id': 'a', 'time': datetime(2025, 6, 3, 10), 'end_time': datetime(2025, 6, 3, 11)},
+            {'id': 'b', 'time': datetime(2025, 6, 4, 9)},
+        ]
+        start = datetime(2025, 6, 4, 9, tzinfo=timezone.utc)
+        end = datetime(2025, 6, 4, 17, tzinfo=timezone.utc)
+
+        self.assertEqual(await repository.find_bookings('Jason Holloway', start, end), [
+            (datetime(2025, 6, 3, 10, tzinfo=timezone.utc), datetime(2025, 6, 3, 11, tzinfo=timezone.utc), 'a'),
+            (datetime(2025, 6, 4, 9, tzinfo=timezone.utc), None, 'b'),
+        ])
+        repository.mongo_db.find_fields.assert_awaited_once_with(
+            {
+                'clinician': 'Jason Holloway',
+                'time': {'$gt': datetime(2025, 6, 3, 9, tzinfo=timezone.utc), '$lt': end},
+                'status': {'$ne': 'cancelled'},
+            },
+            ('id', 'time', 'end_time'),
+            [('time', 1), ('id', 1)],
+            0,
+            [('clinician', 1), ('time', 1), ('id', 1)]
+        )
+
+
+class TestMongoAppointmentRepositoryFindBusyTimes(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.repository = MongoAppointmentRepository(MagicMock())
+        self.repository.mongo_db = AsyncMock()
+        self.start = datetime(2025, 6, 2, tzinfo=timezone.utc)
+        self.end = datetime(2025, 6, 9, tzinfo=timezone.utc)
+
+    async def test_reads_only_the_times_of_appointments_that_are_not_cancelled(self):
+        # Datetimes are read back from MongoDB as naive UTC
+        self.repository.mongo_db.find_fields.return_value = [
+            {'time': datetime(2025, 6, 4, 9), 'end_time': datetime(2025, 6, 4, 10)},
+            {'time': 'legacy'},
+        ]
+        query = AppointmentQuery(department='oncology', status='active', time_from=self.start, time_to=self.end)
+
+        busy_times = await self.repository.find_busy_times(query, 100)
+
+        self.assertEqual(busy_times, [
+            (datetime(2025, 6, 4, 9, tzinfo=timezone.utc), datetime(2025, 6, 4, 10, tzinfo=timezone.utc)),
+        ])
+        self.repository.mongo_db.find_fields.assert_awaited_once_with(
+            {
+                'department': 'oncology',
+                'status': {'$ne': 'cancelled'},
+                'time': {'$gte': self.start, '$lt': self.end},
+            },
+            ('time', 'end_time'),
+            [('time', 1), ('id', 1)],
+            100,
+            [('department', 1), ('time', 1), ('id', 1)]
+        )
+
+
+class TestMongoAppointmentRepositoryFind(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.repository = MongoAppointmentRepository(MagicMock())
+        self.repository.mongo_db = AsyncMock()
+        self.repository.mongo_db.find.return_value = []
+        self.start = datetime(2025, 6, 2, tzinfo=timezone.utc)
+        self.end = datetime(2025, 6, 9, tzinfo=timezone.utc)
+        self.after_time = datetime(2025, 6, 4, 9, tzinfo=timezone.utc)
+
+    async def test_hints_the_index_on_the_most_selective_field(self):
+        query = AppointmentQuery(clinician='Jason Holloway', department='oncology', status='active',
+                                 time_from=self.start, time_to=self.end)
+
+        await self.repository.find(query, 11)
+
+        self.repository.mongo_db.find.assert_awaited_once_with(
+            {
+                'clinician': 'Jason Holloway',
+                'department': 'oncology',
+                'status': 'active',
+                'time': {'$gte': self.start, '$lt': self.end},
+            },
+            [('time', 1), ('id', 1)],
+            11,
+            [('clinician', 1), ('time', 1), ('id', 1)]
+        )
+
+    async def test_continues_after_the_previous_page(self):
+        await self.repository.find(AppointmentQuery(patient='9434765919', time_from=self.start), 11,
+                                   (self.after_time, 'a'))
+
+        query, sort, _, hint = self.repository.mongo_db.find.await_args.args
+        self.assertEqual(query, {
+            'patient': '9434765919',
+            'time': {'$gte': self.after_time},
+            '$or': [{'time': {'$gt': self.after_time}}, {'id': {'$gt': 'a'}}],
+        })
+        self.assertEqual(hint, [('patient', 1), ('time', 1), ('id', 1)])
+
+    async def test_continues_after_the_previous_page_in_descending_order(self):
+        await self.repository.find(AppointmentQuery(department='oncology', time_to=self.end, descending=True), 11,
+                                   (self.after_time, 'a'))
+
+        query, sort, _, _ = self.repository.mongo_db.find.await_args.args
+        self.assertEqual(query, {
+            'department': 'oncology',
+            'time': {'$lt': self.end, '$lte': self.after_time},
+            '$or': [{'time': {'$lt': self.after_time}}, {'id': {'$lt': 'a'}}],
+        })
+        self.assertEqual(sort, [('time', -1), ('id', -1)])
+
+    async def test_rejects_unindexed_queries(self):
+        with self.assertRaises(UnindexedQueryError):
+            await self.repository.find(AppointmentQuery(status='active', time_from=self.start), 11)
+
+        self.repository.mongo_db.find.assert_not_awaited()
+
+
+class TestMongoAppointmentRepositoryUpdateUnlessCancelled(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.repository = MongoAppointmentRepository(MagicMock())
+        self.repository.mongo_db = AsyncMock()
+        self.appointment = {'id': 'a', 'status': 'active'}
+
+    async def test_returns_the_appointment_as_it_was_before_the_update(self):
+        self.repository.mongo_db.find_one_and_update.return_value = self.appointment
+
+        self.assertEqual(
+            await self.repository.update_unless_cancelled('a', {'status': 'attended'}),
+            (WriteStatus.UPDATED, self.appointment)
+        )
+
+        self.repository.mongo_db.find_one_and_update.assert_awaited_once_with(
+            {'id': 'a', 'status': {'$ne': 'cancelled'}}, {'status': 'attended'}, with_version=True
+        )
+        self.repository.mongo_db.get.assert_not_awaited()
+
+    async def test_compare_and_set_filters_on_the_version(self):
+        self.repository.mongo_db.find_one_and_update.return_value = dict(self.appointment, version=3)
+
+        self.assertEqual(
+            await self.repository.update_unless_cancelled('a', {'status': 'attended'}, 3),
+            (WriteStatus.UPDATED, dict(self.appointment, version=3))
+        )
+        await self.repository.update_unless_cancelled('a', {'status': 'attended'}, 0)
+
+        self.assertEqual(self.repository.mongo_db.find_one_and_update.await_args_list[0].args[0],
+                         {'id': 'a', 'status': {'$ne': 'cancelled'}, 'version': 3})
+        self.assertEqual(self.repository.mongo_db.find_one_and_update.await_args_list[1].args[0],
+                         {'id': 'a', 'status': {'$ne': 'cancelled'}, 'version': None})
+
+    async def test_reports_stale_versions(self):
+        self.repository.mongo_db.find_one_and_update.return_value = None
+        self.repository.mongo_db.get.return_value = dict(self.appointment, status='cancelled', version=4)
+
+        self.assertEqual(
+            await self.repository.update_unless_cancelled('a', {'status': 'active'}, 3),
+            (WriteStatus.STALE, dict(self.appointment, status='cancelled', version=4))
+        )
+        self.assertEqual(
+            (await self.repository.update_unless_cancelled('a', {'status': 'active'}, 4))[0],
+            WriteStatus.CONFLICT
+        )
+
+    async def test_reports_cancelled_and_missing_appointments(self):
+        self.repository.mongo_db.find_one_and_update.return_value = None
+        self.repository.mongo_db.get.side_effect = [dict(self.appointment, status='cancelled'), None]
+
+        self.assertEqual(
+            await self.repository.update_unless_cancelled('a', {'status': 'active'}),
+            (WriteStatus.CONFLICT, dict(self.appointment, status='cancelled'))
+        )
+        self.assertEqual(await self.repository.update_unless_cancelled('b', {'status': 'active'}),
+                         (WriteStatus.NOT_FOUND, None))
+
+    async def test_get_many_reads_every_appointment_in_one_query(self):
+        self.repository.mongo_db.find.return_value = [self.appointment]
+
+        self.assertEqual(await self.repository.get_many(['a', 'b']), {'a': self.appointment})
+        self.assertEqual(await self.repository.get_many([]), {})
+
+        self.repository.mongo_db.find.assert_awaited_once_with({'id': {'$in': ['a', 'b']}}, [('id', 1)], 2)
@@ -0,0 +1,31 @@
+import unittest
+from src.repository.mongo.bulk import write_statuses_from_bulk_result
+from src.repository.results import WriteStatus
+
+
+class TestWriteStatusesFromBulkResult(unittest.TestCase):
+
+    def test_matched_operations_are_updates(self):
+        details = {'writeErrors': [], 'upserted': []}
+
+        self.assertEqual(write_statuses_from_bulk_result(details, 2), [WriteStatus.UPDATED, WriteStatus.UPDATED])
+
+    def test_upserted_operations_are_creates(self):
+        details = {'writeErrors': [], 'upserted': [{'index': 1, '_id': 'x'}]}
+
+        self.assertEqual(write_statuses_from_bulk_result(details, 2), [WriteStatus.UPDATED, WriteStatus.CREATED])
+
+    def test_write_errors(self):
+        details = {
+            'writeErrors': [{'index': 0, 'code': 11000}, {'index': 2, 'code': 121}],
+            'upserted': [{'index': 1, '_id': 'x'}]
+        }
+
+        self.assertEqual(
+            write_statuses_from_bulk_result(details, 3),
+            [WriteStatus.CONFLICT, WriteStatus.CREATED, WriteStatus.FAILED]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+from src.repository.mongo.patient import MongoPatientRepository
+from src.repository.results import WriteStatus
+
+
+class TestMongoPatientRepositoryUpdateAtVersion(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.repository = MongoPatientRepository(MagicMock())
+        self.repository.mongo_db = AsyncMock()
+
+    async def test_updates_with_the_version_in_the_filter(self):
+        self.repository.mongo_db.find_one_and_update.return_value = {'nhs_number': '1373645350', 'version': 3}
+
+        self.assertEqual(
+            await self.repository.update_at_version('1373645350', {'postcode': 'M1 1AA'}, 3), (WriteStatus.UPDATED, 4)
+        )
+
+        self.repository.mongo_db.find_one_and_update.assert_awaited_once_with(
+            {'nhs_number': '1373645350', 'version': 3}, {'postcode': 'M1 1AA'}, with_version=True
+        )
+        self.repository.mongo_db.get.assert_not_awaited()
+
+    async def test_patients_without_a_version_are_at_version_0(self):
+        self.repository.mongo_db.find_one_and_update.return_value = {'nhs_number': '1373645350'}
+
+        self.assertEqual(
+            await self.repository.update_at_version('1373645350', {'postcode': 'M1 1AA'}, 0), (WriteStatus.UPDATED, 1)
+        )
+
+        self.repository.mongo_db.find_one_and_update.assert_awaited_once_with(
+            {'nhs_number': '1373645350', 'version': None}, {'postcode': 'M1 1AA'}, with_version=True
+        )
+
+    async def test_update_at_any_version_reports_the_new_version(self):
+        self.repository.mongo_db.find_one_and_update.return_value = {'nhs_number': '1373645350', 'version': 5}
+
+        self.assertEqual(
+            await self.repository.update_at_version('1373645350', {'postcode': 'M1 1AA'}, None),
+            (WriteStatus.UPDATED, 6)
+        )
+
+        self.repository.mongo_db.find_one_and_update.assert_awaited_once_with(
+            {'nhs_number': '1373645350'}, {'postcode': 'M1 1AA'}, with_version=True
+        )
+
+    async def test_reports_stale_and_missing_patients(self):
+        self.repository.mongo_db.find_one_and_update.return_value = None
+        self.repository.mongo_db.get.side_effect = [{'nhs_number': '1373645350'}, None]
+
+        self.assertEqual(
+            await self.repository.update_at_version('1373645350', {'postcode': 'M1 1AA'}, 3), (WriteStatus.STALE, None)
+        )
+        self.assertEqual(
+            await self.repository.update_at_version('9434765919', {'postcode': 'M1 1AA'}, 3),
+            (WriteStatus.NOT_FOUND, None)
+        )
+        self.assertEqual(
+            await self.repository.update_at_version('9434765919', {'postcode': 'M1 1AA'}, None),
+            (WriteStatus.NOT_FOUND, None)
+        )
+        self.assertEqual(self.repository.mongo_db.get.await_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
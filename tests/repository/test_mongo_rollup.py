@@ -0,0 +1,48 @@
+import unittest
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+from src.repository.mongo.rollup import MongoRollupRepository
+
+
+class TestMongoRollupRepository(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.repository = MongoRollupRepository(MagicMock())
+        self.repository.mongo_db = AsyncMock()
+
+    async def test_increment_upserts_every_rollup_in_one_bulk_write(self):
+        await self.repository.increment({
+            ('clinician', 'Jason Holloway', '2025-06-04'): {'booked': 1, 'missed': 1, 'minutes_lost': 60},
+            ('department', 'oncology', '2025-06-04'): {'booked': 1},
+        })
+
+        operations = self.repository.mongo_db.bulk_write.await_args.args[0]
+        self.assertEqual(len(operations), 2)
+        self.assertEqual(operations[0]._filter, {'dimension': 'clinician', 'key': 'Jason Holloway', 'day': '2025-06-04'})
+        self.assertEqual(operations[0]._doc, {'$inc': {'booked': 1, 'missed': 1, 'minutes_lost': 60}})
+        self.assertTrue(operations[0]._upsert)
+
+    async def test_increment_nothing_skips_the_write(self):
+        await self.repository.increment({})
+
+        self.repository.mongo_db.bulk_write.assert_not_awaited()
+
+    async def test_get_range_reads_one_index_range(self):
+        await self.repository.get_range('department', 'oncology', date(2025, 6, 1), date(2025, 6, 30))
+
+        self.repository.mongo_db.find.assert_awaited_once_with(
+            {'dimension': 'department', 'key': 'oncology', 'day': {'$gte': '2025-06-01', '$lte': '2025-06-30'}},
+            [('day', 1)],
+            30
+        )
+
+    async def test_replace_all_deletes_then_inserts_in_batches(self):
+        rollups = {('clinician', str(number), '2025-06-04'): {'booked': 1} for number in range(1500)}
+
+        self.assertEqual(await self.repository.replace_all(rollups), 1500)
+
+        self.repository.mongo_db.delete_many.assert_awaited_once_with({})
+        self.assertEqual(
+            [len(call.args[0]) for call in self.repository.mongo_db.bulk_write.await_args_list], [1000, 500]
+        )
+        first_insert = self.repository.mongo_db.bulk_write.await_args_list[0].args[0][0]
+        self.assertEqual(first_insert._doc, {'dimension': 'clinician', 'key': '0', 'day': '2025-06-04', 'booked': 1})
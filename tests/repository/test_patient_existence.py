@@ -0,0 +1,115 @@
+import unittest
+from unittest.mock import AsyncMock
+from src.repository.caching.bloom_filter import BloomFilter
+from src.repository.caching.patient_existence import BloomFilterPatientRepository
+from src.repository.memory.patient import MemoryPatientRepository
+from src.db.memory import MemoryDatabase
+from src.repository.results import WriteStatus
+
+
+class TestBloomFilterPatientRepository(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.patient = {'nhs_number': '1373645350', 'name': 'Dr Glenn Clark', 'date_of_birth': '1996-02-01', 'postcode': 'N6 2FA'}
+        self.mock_patient_repository = AsyncMock()
+        self.mock_patient_repository.existing_nhs_numbers.return_value = set()
+        self.repository = BloomFilterPatientRepository(self.mock_patient_repository, BloomFilter(1000, 0.001))
+
+    async def test_load_fills_the_filter(self):
+        async def stream(batch_size):
+            yield [self.patient]
+        self.mock_patient_repository.stream = stream
+
+        self.assertEqual(await self.repository.load(), 1)
+
+        self.assertEqual(await self.repository.existing_nhs_numbers(['1373645350']), {'1373645350'})
+        self.mock_patient_repository.existing_nhs_numbers.assert_not_awaited()
+
+    async def test_changes_by_other_processes_stop_numbers_being_trusted(self):
+        self.mock_patient_repository.create.return_value = True
+        await self.repository.create(self.patient)
+        await self.repository.create(dict(self.patient, nhs_number='9434765919'))
+
+        self.repository.invalidate('1373645350')
+        self.assertEqual(await self.repository.existing_nhs_numbers(['1373645350', '9434765919']), {'9434765919'})
+
+        self.repository.invalidate_all()
+        self.assertEqual(await self.repository.existing_nhs_numbers(['9434765919']), set())
+
+    async def test_load_keeps_changes_made_while_it_runs(self):
+        async def stream(batch_size):
+            yield [self.patient, dict(self.patient, nhs_number='9434765919')]
+            # Another process deletes a patient that was already streamed
+            self.repository.invalidate('1373645350')
+            yield [dict(self.patient, nhs_number='4505577104')]
+        self.mock_patient_repository.stream = stream
+
+        await self.repository.load()
+
+        self.assertEqual(
+            await self.repository.existing_nhs_numbers(['1373645350', '9434765919', '4505577104']),
+            {'9434765919', '4505577104'}
+        )
+
+        async def stream_overtaken(batch_size):
+            yield [self.patient]
+            self.repository.invalidate_all()
+        self.mock_patient_repository.stream = stream_overtaken
+
+        await self.repository.load()
+
+        self.assertEqual(await self.repository.existing_nhs_numbers(['1373645350', '9434765919']), set())
+
+    async def test_only_unknown_numbers_are_looked_up(self):
+        self.mock_patient_repository.create.return_value = True
+        await self.repository.create(self.patient)
+        self.mock_patient_repository.existing_nhs_numbers.return_value = {'9434765919'}
+
+        existing = await self.repository.existing_nhs_numbers(['1373645350', '9434765919', '9876543210'])
+
+        self.assertEqual(existing, {'1373645350', '9434765919'})
+        self.mock_patient_repository.existing_nhs_numbers.assert_awaited_once_with({'9434765919', '9876543210'})
+
+        # Numbers found by a lookup are added to the filter
+        self.mock_patient_repository.existing_nhs_numbers.reset_mock()
+        self.assertEqual(await self.repository.existing_nhs_numbers(['9434765919']), {'9434765919'})
+        self.mock_patient_repository.existing_nhs_numbers.assert_not_awaited()
+
+    async def test_deleted_patients_are_looked_up(self):
+        self.mock_patient_repository.create.return_value = True
+        self.mock_patient_repository.delete_by_nhs_number.return_value = True
+        await self.repository.create(self.patient)
+        await self.repository.delete_by_nhs_number('1373645350')
+
+        self.assertEqual(await self.repository.existing_nhs_numbers(['1373645350']), set())
+
+        await self.repository.create(self.patient)
+        self.mock_patient_repository.existing_nhs_numbers.reset_mock()
+        self.assertEqual(await self.repository.existing_nhs_numbers(['1373645350']), {'1373645350'})
+        self.mock_patient_repository.existing_nhs_numbers.assert_not_awaited()
+
+    async def test_update_follows_a_changed_nhs_number(self):
+        self.mock_patient_repository.create.return_value = True
+        self.mock_patient_repository.update_at_version.return_value = (WriteStatus.UPDATED, 2)
+        await self.repository.create(self.patient)
+
+        await self.repository.update_by_nhs_number('1373645350', dict(self.patient, nhs_number='9434765919'))
+
+        self.assertEqual(await self.repository.existing_nhs_numbers(['1373645350', '9434765919']), {'9434765919'})
+
+    async def test_update_matching_no_patient_adds_nothing(self):
+        memory_repository = MemoryPatientRepository(MemoryDatabase())
+        repository = BloomFilterPatientRepository(memory_repository, BloomFilter(1000, 0.001))
+
+        self.assertTrue(await repository.update_by_nhs_number('9434765919', dict(self.patient, nhs_number='4505577104')))
+
+        self.assertIsNone(await repository.get_by_nhs_number('4505577104'))
+        self.assertEqual(await repository.existing_nhs_numbers(['9434765919', '4505577104']), set())
+
+    async def test_upsert_many_adds_written_patients(self):
+        conflicting_patient = dict(self.patient, nhs_number='9434765919')
+        self.mock_patient_repository.upsert_many.return_value = [WriteStatus.CREATED, WriteStatus.FAILED]
+
+        await self.repository.upsert_many([self.patient, conflicting_patient])
+
+        self.assertEqual(await self.repository.existing_nhs_numbers(['1373645350', '9434765919']), {'1373645350'})
+        self.mock_patient_repository.existing_nhs_numbers.assert_awaited_once_with({'9434765919'})
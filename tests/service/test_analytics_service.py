@@ -0,0 +1,69 @@
+import unittest
+from datetime import date
+from unittest.mock import AsyncMock
+from src.service.analytics_service import AnalyticsService
+from src.service.results import ResponseType
+from constants import (
+    ROLLUP_FILTER_ERROR_TEXT,
+    INVALID_QUERY_DATE_RANGE_ERROR_TEXT,
+    ROLLUP_RANGE_TOO_LONG_ERROR_TEXT,
+)
+
+
+class TestAnalyticsService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.mock_rollup_repository = AsyncMock()
+        self.analytics_service = AnalyticsService(self.mock_rollup_repository)
+
+    async def test_get_appointment_rollups(self):
+        self.mock_rollup_repository.get_range.return_value = [
+            {'dimension': 'clinician', 'key': 'Jason Holloway', 'day': '2025-06-04', 'booked': 3, 'missed': 1,
+             'minutes_lost': 60},
+            {'dimension': 'clinician', 'key': 'Jason Holloway', 'day': '2025-06-05', 'booked': 2, 'attended': 2},
+        ]
+
+        response = await self.analytics_service.get_appointment_rollups(
+            clinician='Jason Holloway', day_from='2025-06-01', day_to='2025-06-30'
+        )
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
+        self.assertEqual(response.data, {
+            'days': [
+                {'day': '2025-06-04', 'booked': 3, 'attended': 0, 'missed': 1, 'cancelled': 0, 'minutes_lost': 60},
+                {'day': '2025-06-05', 'booked': 2, 'attended': 2, 'missed': 0, 'cancelled': 0, 'minutes_lost': 0},
+            ],
+            'totals': {'booked': 5, 'attended': 2, 'missed': 1, 'cancelled': 0, 'minutes_lost': 60},
+        })
+        self.mock_rollup_repository.get_range.assert_awaited_once_with(
+            'clinician', 'Jason Holloway', date(2025, 6, 1), date(2025, 6, 30)
+        )
+
+    async def test_get_appointment_rollups_invalid_arguments(self):
+        cases = [
+            ({'day_from': '2025-06-01', 'day_to': '2025-06-30'}, [ROLLUP_FILTER_ERROR_TEXT]),
+            ({'clinician': 'Jason Holloway', 'department': 'oncology', 'day_from': '2025-06-01',
+              'day_to': '2025-06-30'}, [ROLLUP_FILTER_ERROR_TEXT]),
+            ({'department': 'oncology', 'day_from': '2025-06-30', 'day_to': '2025-06-01'},
+             [INVALID_QUERY_DATE_RANGE_ERROR_TEXT]),
+            ({'department': 'oncology', 'day_from': '2025-01-01', 'day_to': '2026-01-02'},
+             [ROLLUP_RANGE_TOO_LONG_ERROR_TEXT]),
+            ({'department': 'oncology', 'day_from': '2025-06-01'}, ["Missing required query argument: 'to'"]),
+            ({'department': 'oncology', 'day_from': '2025-06-01T00:00:00', 'day_to': '2025-06-30'},
+             ['Invalid \'from\' value. Expected a date in the format "YYYY-MM-DD"']),
+        ]
+        for arguments, errors in cases:
+            with self.subTest(arguments=arguments):
+                response = await self.analytics_service.get_appointment_rollups(**arguments)
+
+                self.assertEqual(response.response_type, ResponseType.VALIDATION_ERROR)
+                self.assertEqual(response.errors, errors)
+        self.mock_rollup_repository.get_range.assert_not_awaited()
+
+    async def test_a_year_of_rollups_is_allowed(self):
+        self.mock_rollup_repository.get_range.return_value = []
+
+        response = await self.analytics_service.get_appointment_rollups(
+            department='oncology', day_from='2024-01-01', day_to='2024-12-31'
+        )
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
@@ -1,19 +1,42 @@
+import json
 import unittest
-from unittest.mock import Mock
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, Mock, call
 from src.service.appointment_service import AppointmentService
 from src.service.results import ResponseType
 from constants import (
     ERR_COULD_NOT_CREATE_APPOINTMENT,
     ERR_COULD_NOT_UPDATE_APPOINTMENT,
     ERR_APPOINTMENT_NOT_FOUND,
+    ERR_CLINICIAN_DOUBLE_BOOKED,
+    ERR_APPOINTMENT_VERSION_CONFLICT,
+    ERR_APPOINTMENT_BUSY,
+    PATCH_MAX_ATTEMPTS,
     MSG_NEW_APPOINTMENT_ADDED,
     MSG_APPOINTMENT_UPDATED,
     MSG_APPOINTMENT_CANCELLED,
     STATUS_CANCELLED,
+    INVALID_PAGE_CURSOR_ERROR_TEXT,
+    STREAM_BATCH_SIZE,
+    UNKNOWN_PATIENT_ERROR_TEXT,
+    INVALID_STATUS_ERROR_TEXT,
+    INVALID_QUERY_SORT_ERROR_TEXT,
+    INVALID_QUERY_TIME_RANGE_ERROR_TEXT,
+    UNINDEXED_APPOINTMENT_QUERY_ERROR_TEXT,
+    SLOT_SEARCH_FILTER_ERROR_TEXT,
+    SLOT_SEARCH_WINDOW_TOO_LONG_ERROR_TEXT,
+    SLOT_SEARCH_TOO_BUSY_ERROR_TEXT,
+    SLOT_SEARCH_MAX_APPOINTMENTS,
+    INVALID_SLOT_DURATION_ERROR_TEXT,
+    INVALID_SLOT_LIMIT_ERROR_TEXT,
 )
+from src.repository.errors import DuplicateRecordError
+from src.repository.results import WriteStatus
+from src.repository.appointment import AppointmentQuery
+from src.service.pagination import decode_cursor, encode_cursor
 
 
-class TestAppointmentService(unittest.TestCase):
+class TestAppointmentService(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         self.valid_appointment = {
             'patient': '1953262716',
@@ -26,143 +49,700 @@ class TestAppointmentService(unittest.TestCase):
             'id': '01542f70-929f-4c9a-b4fa-e672310d7e78'
         }
         # Create a mock repository instead of mocking MongoDB directly
-        self.mock_appointment_repository = Mock()
-        self.appointment_service = AppointmentService(self.mock_appointment_repository)
+        self.mock_appointment_repository = AsyncMock()
+        self.mock_appointment_repository.find_overlapping.return_value = None
+        self.mock_patient_repository = AsyncMock()
+        self.mock_patient_repository.existing_nhs_numbers.return_value = {'1953262716'}
+        self.appointment_service = AppointmentService(self.mock_appointment_repository, self.mock_patient_repository)
 
-    def test_create_appointment_success(self):
+    async def test_create_appointment_success(self):
         """Test successful appointment creation."""
-        # Mock that appointment doesn't exist and creation succeeds
-        self.mock_appointment_repository.get_by_id.return_value = None
         self.mock_appointment_repository.create.return_value = True
         
-        response = self.appointment_service.create_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
+        response = await self.appointment_service.create_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
         
         self.assertEqual(response.response_type, ResponseType.SUCCESS)
         self.assertEqual(response.message, MSG_NEW_APPOINTMENT_ADDED.format('01542f70-929f-4c9a-b4fa-e672310d7e78'))
-        self.mock_appointment_repository.create.assert_called_once_with(self.valid_appointment)
+        self.mock_appointment_repository.create.assert_awaited_once_with(self.valid_appointment)
+        self.mock_appointment_repository.get_by_id.assert_not_awaited()
 
-    def test_create_appointment_validation_error(self):
+    async def test_create_appointment_validation_error(self):
         """Test appointment creation with validation errors."""
         invalid_appointment = self.valid_appointment.copy()
         invalid_appointment['status'] = 'invalid_status'
         
-        response = self.appointment_service.create_appointment(invalid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
+        response = await self.appointment_service.create_appointment(invalid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
         
         self.assertEqual(response.response_type, ResponseType.VALIDATION_ERROR)
         assert 'Invalid' in response.errors[0]
 
-    def test_create_appointment_database_error(self):
+    async def test_create_appointment_database_error(self):
         """Test appointment creation with database error."""
-        # Mock that appointment doesn't exist but creation fails
-        self.mock_appointment_repository.get_by_id.return_value = None
         self.mock_appointment_repository.create.return_value = False
         
-        response = self.appointment_service.create_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
+        response = await self.appointment_service.create_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
         
         self.assertEqual(response.response_type, ResponseType.DATABASE_ERROR)
         self.assertIn(ERR_COULD_NOT_CREATE_APPOINTMENT, response.errors)
 
-    def test_create_appointment_already_exists_active(self):
+    async def test_create_appointment_already_exists_active(self):
         """Test appointment creation when appointment already exists and is active."""
-        existing_appointment = self.valid_appointment.copy()
-        existing_appointment['status'] = 'active'
-        self.mock_appointment_repository.get_by_id.return_value = existing_appointment
+        self.mock_appointment_repository.create.side_effect = DuplicateRecordError('01542f70-929f-4c9a-b4fa-e672310d7e78')
+        self.mock_appointment_repository.get_by_id.return_value = self.valid_appointment
 
-        response = self.appointment_service.create_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
+        response = await self.appointment_service.create_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
 
         self.assertEqual(response.response_type, ResponseType.BUSINESS_ERROR)
         self.assertIn(ERR_COULD_NOT_CREATE_APPOINTMENT, response.errors)
 
-    def test_create_appointment_cancelled_appointment_cannot_be_reinstated(self):
+    async def test_create_appointment_cancelled_appointment_cannot_be_reinstated(self):
         """Test a cancelled appointment cannot be recreated."""
         cancelled_appointment = self.valid_appointment.copy()
         cancelled_appointment['status'] = STATUS_CANCELLED
+        self.mock_appointment_repository.create.side_effect = DuplicateRecordError('01542f70-929f-4c9a-b4fa-e672310d7e78')
         self.mock_appointment_repository.get_by_id.return_value = cancelled_appointment
 
-        response = self.appointment_service.create_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
+        response = await self.appointment_service.create_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
 
         self.assertEqual(response.response_type, ResponseType.BUSINESS_ERROR)
         self.assertEqual(response.errors[0], ERR_COULD_NOT_UPDATE_APPOINTMENT)
-        self.mock_appointment_repository.create.assert_not_called()
 
-    def test_update_appointment_success(self):
+    async def test_create_appointment_deleted_after_conflict(self):
+        """Test appointment creation when the conflicting appointment is gone by the time it is read."""
+        self.mock_appointment_repository.create.side_effect = DuplicateRecordError('01542f70-929f-4c9a-b4fa-e672310d7e78')
+        self.mock_appointment_repository.get_by_id.return_value = None
+
+        response = await self.appointment_service.create_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
+
+        self.assertEqual(response.response_type, ResponseType.BUSINESS_ERROR)
+        self.assertIn(ERR_COULD_NOT_CREATE_APPOINTMENT, response.errors)
+
+    async def test_update_appointment_success(self):
         """Test successful appointment update."""
-        # Mock appointment exists and is not cancelled
-        self.mock_appointment_repository.get_by_id.return_value = self.valid_appointment
-        self.mock_appointment_repository.update_by_id.return_value = True
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (WriteStatus.UPDATED, self.valid_appointment)
         
-        response = self.appointment_service.update_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
+        response = await self.appointment_service.update_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
         
         self.assertEqual(response.response_type, ResponseType.SUCCESS)
         self.assertEqual(response.message, MSG_APPOINTMENT_UPDATED.format('01542f70-929f-4c9a-b4fa-e672310d7e78'))
+        self.mock_appointment_repository.get_by_id.assert_not_awaited()
+
+    async def test_create_appointment_unknown_patient(self):
+        """Test an appointment cannot be created for a patient that does not exist."""
+        self.mock_patient_repository.existing_nhs_numbers.return_value = set()
 
-    def test_update_appointment_validation_error(self):
+        response = await self.appointment_service.create_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
+
+        self.assertEqual(response.response_type, ResponseType.VALIDATION_ERROR)
+        self.assertEqual(response.errors, [UNKNOWN_PATIENT_ERROR_TEXT])
+        self.mock_patient_repository.existing_nhs_numbers.assert_awaited_once_with({'1953262716'})
+        self.mock_appointment_repository.create.assert_not_awaited()
+
+    async def test_update_appointment_unknown_patient(self):
+        """Test an appointment cannot be moved to a patient that does not exist."""
+        self.mock_patient_repository.existing_nhs_numbers.return_value = set()
+
+        response = await self.appointment_service.update_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
+
+        self.assertEqual(response.response_type, ResponseType.VALIDATION_ERROR)
+        self.assertEqual(response.errors, [UNKNOWN_PATIENT_ERROR_TEXT])
+        self.mock_appointment_repository.update_unless_cancelled.assert_not_awaited()
+
+    async def test_create_appointment_clinician_double_booked(self):
+        """Test an appointment overlapping another of its clinician's is rejected."""
+        self.mock_appointment_repository.find_overlapping.return_value = 'ac9729b5-5e11-42b4-87e2-6396b4faf1b9'
+
+        response = await self.appointment_service.create_appointment(self.valid_appointment, self.valid_appointment['id'])
+
+        self.assertEqual(response.response_type, ResponseType.BUSINESS_ERROR)
+        self.assertEqual(response.errors, [ERR_CLINICIAN_DOUBLE_BOOKED.format('ac9729b5-5e11-42b4-87e2-6396b4faf1b9')])
+        self.mock_appointment_repository.find_overlapping.assert_awaited_once_with(
+            'Bethany Rice-Hammond',
+            datetime(2025, 6, 4, 15, 30, tzinfo=timezone.utc),
+            datetime(2025, 6, 4, 16, 30, tzinfo=timezone.utc),
+            '01542f70-929f-4c9a-b4fa-e672310d7e78'
+        )
+        self.mock_appointment_repository.create.assert_not_awaited()
+
+    async def test_update_appointment_clinician_double_booked(self):
+        """Test an appointment cannot be moved to overlap another of its clinician's, but can be cancelled."""
+        self.mock_appointment_repository.find_overlapping.return_value = 'ac9729b5-5e11-42b4-87e2-6396b4faf1b9'
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (WriteStatus.UPDATED, self.valid_appointment)
+
+        response = await self.appointment_service.update_appointment(self.valid_appointment, 'other-id')
+
+        self.assertEqual(response.response_type, ResponseType.BUSINESS_ERROR)
+        self.assertEqual(self.mock_appointment_repository.find_overlapping.await_args.args[3], 'other-id')
+        self.mock_appointment_repository.update_unless_cancelled.assert_not_awaited()
+
+        cancelled_appointment = dict(self.valid_appointment, status=STATUS_CANCELLED)
+        response = await self.appointment_service.update_appointment(cancelled_appointment, 'other-id')
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
+
+    async def test_update_appointment_validation_error(self):
         """Test appointment update with validation errors."""
         invalid_appointment = self.valid_appointment.copy()
         invalid_appointment['status'] = 'invalid_status'
         
-        response = self.appointment_service.update_appointment(invalid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
+        response = await self.appointment_service.update_appointment(invalid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
         
         self.assertEqual(response.response_type, ResponseType.VALIDATION_ERROR)
 
-    def test_update_appointment_cancelled_appointment_cannot_be_reinstated(self):
+    async def test_update_appointment_cancelled_appointment_cannot_be_reinstated(self):
         """Test that a cancelled appointment cannot be reinstated with an update."""
-        cancelled_appointment = self.valid_appointment.copy()
-        cancelled_appointment['status'] = STATUS_CANCELLED
-        self.mock_appointment_repository.get_by_id.return_value = cancelled_appointment
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (
+            WriteStatus.CONFLICT, dict(self.valid_appointment, status=STATUS_CANCELLED)
+        )
 
-        response = self.appointment_service.update_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
+        response = await self.appointment_service.update_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
 
         self.assertEqual(response.response_type, ResponseType.BUSINESS_ERROR)
         self.assertEqual(response.errors[0], ERR_COULD_NOT_UPDATE_APPOINTMENT)
-        self.mock_appointment_repository.update_by_id.assert_not_called()
 
-    def test_get_appointment_success(self):
+    async def test_update_appointment_at_version(self):
+        """Test an appointment update given a version passes it on and reports the new version."""
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (
+            WriteStatus.UPDATED, dict(self.valid_appointment, version=3)
+        )
+
+        response = await self.appointment_service.update_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78', 3)
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
+        self.assertEqual(response.version, 4)
+        self.mock_appointment_repository.update_unless_cancelled.assert_awaited_once_with(
+            '01542f70-929f-4c9a-b4fa-e672310d7e78', self.valid_appointment, 3
+        )
+
+    async def test_update_appointment_at_stale_version(self):
+        """Test an appointment update given a version fails its precondition if the appointment is at another."""
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (
+            WriteStatus.STALE, dict(self.valid_appointment, version=4)
+        )
+
+        response = await self.appointment_service.update_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78', 3)
+
+        self.assertEqual(response.response_type, ResponseType.PRECONDITION_FAILED)
+        self.assertEqual(response.errors, [ERR_APPOINTMENT_VERSION_CONFLICT])
+
+    async def test_patch_appointment_status_is_a_single_write(self):
+        """Test a change of status is validated alone and written without reading the appointment first."""
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (
+            WriteStatus.UPDATED, dict(self.valid_appointment, version=2)
+        )
+
+        response = await self.appointment_service.patch_appointment(
+            {'status': 'attended'}, '01542f70-929f-4c9a-b4fa-e672310d7e78'
+        )
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
+        self.assertEqual(response.version, 3)
+        self.mock_appointment_repository.update_unless_cancelled.assert_awaited_once_with(
+            '01542f70-929f-4c9a-b4fa-e672310d7e78', {'status': 'attended'}, None
+        )
+        self.mock_appointment_repository.get_by_id.assert_not_awaited()
+        self.mock_patient_repository.existing_nhs_numbers.assert_not_awaited()
+
+    async def test_patch_appointment_cancelled_appointment_cannot_be_reinstated(self):
+        """Test a change of status cannot reinstate a cancelled appointment."""
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (
+            WriteStatus.CONFLICT, dict(self.valid_appointment, status=STATUS_CANCELLED, version=2)
+        )
+
+        response = await self.appointment_service.patch_appointment(
+            {'status': 'active'}, '01542f70-929f-4c9a-b4fa-e672310d7e78'
+        )
+
+        self.assertEqual(response.response_type, ResponseType.BUSINESS_ERROR)
+        self.assertEqual(response.errors, [ERR_COULD_NOT_UPDATE_APPOINTMENT])
+
+    async def test_patch_appointment_duration_writes_the_whole_schedule(self):
+        """Test a change of duration is checked against the merged appointment and written with its time, at the
+        version read, so the end time can be set from both."""
+        self.mock_appointment_repository.get_by_id.return_value = dict(self.valid_appointment, version=2)
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (
+            WriteStatus.UPDATED, dict(self.valid_appointment, version=2)
+        )
+
+        response = await self.appointment_service.patch_appointment(
+            {'duration': '2h'}, '01542f70-929f-4c9a-b4fa-e672310d7e78'
+        )
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
+        self.mock_appointment_repository.find_overlapping.assert_awaited_once_with(
+            'Bethany Rice-Hammond',
+            datetime(2025, 6, 4, 15, 30, tzinfo=timezone.utc),
+            datetime(2025, 6, 4, 17, 30, tzinfo=timezone.utc),
+            '01542f70-929f-4c9a-b4fa-e672310d7e78'
+        )
+        self.mock_appointment_repository.update_unless_cancelled.assert_awaited_once_with(
+            '01542f70-929f-4c9a-b4fa-e672310d7e78', {'time': '2025-06-04T16:30:00+01:00', 'duration': '2h'}, 2
+        )
+
+    async def test_patch_appointment_schedule_is_read_again_after_a_concurrent_write(self):
+        """Test a change of time is retried if the appointment changed between reading and writing it, unless the
+        client asked for a version."""
+        self.mock_appointment_repository.get_by_id.side_effect = [
+            dict(self.valid_appointment, version=2), dict(self.valid_appointment, version=3)
+        ]
+        self.mock_appointment_repository.update_unless_cancelled.side_effect = [
+            (WriteStatus.STALE, dict(self.valid_appointment, version=3)),
+            (WriteStatus.UPDATED, dict(self.valid_appointment, version=3)),
+        ]
+
+        response = await self.appointment_service.patch_appointment(
+            {'time': '2025-06-04T18:00:00+01:00'}, '01542f70-929f-4c9a-b4fa-e672310d7e78'
+        )
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
+        self.assertEqual(response.version, 4)
+        self.assertEqual(self.mock_appointment_repository.update_unless_cancelled.await_args.args[2], 3)
+
+        self.mock_appointment_repository.get_by_id.side_effect = [dict(self.valid_appointment, version=3)]
+        response = await self.appointment_service.patch_appointment(
+            {'time': '2025-06-04T18:00:00+01:00'}, '01542f70-929f-4c9a-b4fa-e672310d7e78', 2
+        )
+        self.assertEqual(response.response_type, ResponseType.PRECONDITION_FAILED)
+        self.assertEqual(response.errors, [ERR_APPOINTMENT_VERSION_CONFLICT])
+
+    async def test_patch_appointment_schedule_conflicts_once_the_attempts_run_out(self):
+        """Test a change of time without a version is reported as a conflict, rather than a failed precondition, if the
+        appointment changes between reading and writing it on every attempt."""
+        self.mock_appointment_repository.get_by_id.side_effect = [
+            dict(self.valid_appointment, version=version) for version in range(2, 2 + PATCH_MAX_ATTEMPTS)
+        ]
+        self.mock_appointment_repository.update_unless_cancelled.side_effect = [
+            (WriteStatus.STALE, dict(self.valid_appointment, version=version + 1))
+            for version in range(2, 2 + PATCH_MAX_ATTEMPTS)
+        ]
+
+        response = await self.appointment_service.patch_appointment(
+            {'time': '2025-06-04T18:00:00+01:00'}, '01542f70-929f-4c9a-b4fa-e672310d7e78'
+        )
+
+        self.assertEqual(response.response_type, ResponseType.CONFLICT)
+        self.assertEqual(response.errors, [ERR_APPOINTMENT_BUSY])
+        self.assertEqual(self.mock_appointment_repository.update_unless_cancelled.await_count, PATCH_MAX_ATTEMPTS)
+
+    async def test_patch_appointment_validation_error(self):
+        """Test only the fields changed are validated, and a new patient must exist."""
+        response = await self.appointment_service.patch_appointment(
+            {'duration': '1d'}, '01542f70-929f-4c9a-b4fa-e672310d7e78'
+        )
+        self.assertEqual(response.response_type, ResponseType.VALIDATION_ERROR)
+
+        self.mock_patient_repository.existing_nhs_numbers.return_value = set()
+        response = await self.appointment_service.patch_appointment(
+            {'patient': '1953262716'}, '01542f70-929f-4c9a-b4fa-e672310d7e78'
+        )
+        self.assertEqual(response.errors, [UNKNOWN_PATIENT_ERROR_TEXT])
+        self.mock_appointment_repository.update_unless_cancelled.assert_not_awaited()
+
+    async def test_update_appointment_not_found(self):
+        """Test updating an appointment that does not exist."""
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (WriteStatus.NOT_FOUND, None)
+
+        response = await self.appointment_service.update_appointment(self.valid_appointment, '01542f70-929f-4c9a-b4fa-e672310d7e78')
+
+        self.assertEqual(response.response_type, ResponseType.NOT_FOUND)
+        self.assertIn(ERR_APPOINTMENT_NOT_FOUND, response.errors)
+
+    async def test_update_appointment_id_conflict(self):
+        """Test updating an appointment to the ID of another appointment."""
+        self.mock_appointment_repository.update_unless_cancelled.side_effect = DuplicateRecordError('01542f70-929f-4c9a-b4fa-e672310d7e78')
+
+        response = await self.appointment_service.update_appointment(self.valid_appointment, 'ac9729b5-5e11-42b4-87e2-6396b4faf1b9')
+
+        self.assertEqual(response.response_type, ResponseType.BUSINESS_ERROR)
+        self.assertEqual(response.errors[0], ERR_COULD_NOT_UPDATE_APPOINTMENT)
+
+    async def test_get_appointment_success(self):
         """Test successful appointment retrieval."""
         self.mock_appointment_repository.get_by_id.return_value = self.valid_appointment
         
-        response = self.appointment_service.get_appointment('01542f70-929f-4c9a-b4fa-e672310d7e78')
+        response = await self.appointment_service.get_appointment('01542f70-929f-4c9a-b4fa-e672310d7e78')
         
         self.assertEqual(response.response_type, ResponseType.SUCCESS)
         self.assertEqual(response.data['id'], '01542f70-929f-4c9a-b4fa-e672310d7e78')
 
-    def test_get_appointment_not_found(self):
+    async def test_get_appointment_not_found(self):
         """Test appointment retrieval when appointment not found."""
         self.mock_appointment_repository.get_by_id.return_value = None
         
-        response = self.appointment_service.get_appointment('01542f70-929f-4c9a-b4fa-e672310d7e78')
+        response = await self.appointment_service.get_appointment('01542f70-929f-4c9a-b4fa-e672310d7e78')
         
         self.assertEqual(response.response_type, ResponseType.NOT_FOUND)
         self.assertIn(ERR_APPOINTMENT_NOT_FOUND, response.errors)
 
-    def test_delete_appointment_success(self):
+    async def test_delete_appointment_success(self):
         """Test successful appointment deletion (cancellation)."""
-        self.mock_appointment_repository.update_by_id.return_value = True
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (WriteStatus.UPDATED, self.valid_appointment)
         
-        response = self.appointment_service.delete_appointment('01542f70-929f-4c9a-b4fa-e672310d7e78')
+        response = await self.appointment_service.delete_appointment('01542f70-929f-4c9a-b4fa-e672310d7e78')
         
         self.assertEqual(response.response_type, ResponseType.SUCCESS)
         self.assertEqual(response.message, MSG_APPOINTMENT_CANCELLED.format('01542f70-929f-4c9a-b4fa-e672310d7e78'))
+        self.mock_appointment_repository.update_unless_cancelled.assert_awaited_once_with(
+            '01542f70-929f-4c9a-b4fa-e672310d7e78', {'status': STATUS_CANCELLED}
+        )
+
+    async def test_delete_appointment_already_cancelled(self):
+        """Test cancelling an appointment twice succeeds."""
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (
+            WriteStatus.CONFLICT, dict(self.valid_appointment, status=STATUS_CANCELLED)
+        )
+
+        response = await self.appointment_service.delete_appointment('01542f70-929f-4c9a-b4fa-e672310d7e78')
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
 
-    def test_delete_appointment_not_found(self):
+    async def test_delete_appointment_not_found(self):
         """Test appointment deletion when appointment not found."""
-        self.mock_appointment_repository.update_by_id.return_value = False
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (WriteStatus.NOT_FOUND, None)
         
-        response = self.appointment_service.delete_appointment('01542f70-929f-4c9a-b4fa-e672310d7e78')
+        response = await self.appointment_service.delete_appointment('01542f70-929f-4c9a-b4fa-e672310d7e78')
         
         self.assertEqual(response.response_type, ResponseType.NOT_FOUND)
         self.assertIn(ERR_APPOINTMENT_NOT_FOUND, response.errors)
 
-    def test_get_all_appointments_success(self):
+    async def test_get_all_appointments_success(self):
         """Test successful retrieval of all appointments."""
         mock_appointments = [self.valid_appointment, self.valid_appointment.copy()]
         self.mock_appointment_repository.get_all.return_value = mock_appointments
         
-        response = self.appointment_service.get_all_appointments()
+        response = await self.appointment_service.get_all_appointments()
         
         self.assertEqual(response.response_type, ResponseType.SUCCESS)
         self.assertEqual(len(response.data), 2)
-        self.mock_appointment_repository.get_all.assert_called_once()
+        self.mock_appointment_repository.get_all.assert_awaited_once()
+
+    async def test_get_appointments_page_with_next_page(self):
+        """Test a full page returns a cursor that continues after its last appointment."""
+        second_appointment = dict(self.valid_appointment, id='ac9729b5-5e11-42b4-87e2-6396b4faf1b9')
+        self.mock_appointment_repository.get_page.return_value = [self.valid_appointment, second_appointment]
+
+        response = await self.appointment_service.get_appointments_page('1', None)
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
+        self.assertEqual(response.data, [self.valid_appointment])
+        self.assertEqual(decode_cursor(response.next_cursor), '01542f70-929f-4c9a-b4fa-e672310d7e78')
+        self.mock_appointment_repository.get_page.assert_awaited_once_with(2, None)
+
+    async def test_get_appointments_page_invalid_cursor(self):
+        """Test a cursor that was not issued by the API is rejected."""
+        response = await self.appointment_service.get_appointments_page(None, '%%%')
+
+        self.assertEqual(response.response_type, ResponseType.VALIDATION_ERROR)
+        self.assertIn(INVALID_PAGE_CURSOR_ERROR_TEXT, response.errors)
+        self.mock_appointment_repository.get_page.assert_not_awaited()
+
+    async def test_find_appointments_builds_an_indexed_query(self):
+        """Test filters become a repository query, with times without an offset taken to be UTC."""
+        self.mock_appointment_repository.find.return_value = [self.valid_appointment]
+
+        response = await self.appointment_service.find_appointments(
+            clinician='Bethany Rice-Hammond', status='active', time_from='2025-06-02T00:00:00+01:00',
+            time_to='2025-06-09T00:00:00', sort='-time', limit='10'
+        )
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
+        self.assertEqual(response.data, [self.valid_appointment])
+        self.assertIsNone(response.next_cursor)
+        self.mock_appointment_repository.find.assert_awaited_once_with(
+            AppointmentQuery(
+                clinician='Bethany Rice-Hammond',
+                status='active',
+                time_from=datetime(2025, 6, 1, 23, tzinfo=timezone.utc),
+                time_to=datetime(2025, 6, 9, tzinfo=timezone.utc),
+                descending=True
+            ),
+            11,
+            None
+        )
+
+    async def test_find_appointments_pages_on_time_and_id(self):
+        """Test a full page returns a cursor holding the UTC time and ID of its last appointment."""
+        second_appointment = dict(self.valid_appointment, id='ac9729b5-5e11-42b4-87e2-6396b4faf1b9')
+        self.mock_appointment_repository.find.return_value = [self.valid_appointment, second_appointment]
+
+        response = await self.appointment_service.find_appointments(patient='1953262716', limit='1')
+
+        self.assertEqual(response.data, [self.valid_appointment])
+        self.assertEqual(json.loads(decode_cursor(response.next_cursor)),
+                         ['2025-06-04T15:30:00+00:00', '01542f70-929f-4c9a-b4fa-e672310d7e78'])
+
+        await self.appointment_service.find_appointments(patient='1953262716', limit='1', cursor=response.next_cursor)
+
+        self.assertEqual(self.mock_appointment_repository.find.await_args.args[2],
+                         (datetime(2025, 6, 4, 15, 30, tzinfo=timezone.utc), '01542f70-929f-4c9a-b4fa-e672310d7e78'))
+
+    async def test_find_appointments_rejects_unindexed_filters(self):
+        """Test a query that no index supports is rejected rather than run as a collection scan."""
+        response = await self.appointment_service.find_appointments(status='active', time_from='2025-06-02T00:00:00')
+
+        self.assertEqual(response.response_type, ResponseType.VALIDATION_ERROR)
+        self.assertEqual(response.errors, [UNINDEXED_APPOINTMENT_QUERY_ERROR_TEXT])
+        self.mock_appointment_repository.find.assert_not_awaited()
+
+    async def test_find_appointments_invalid_arguments(self):
+        """Test every invalid argument is reported."""
+        response = await self.appointment_service.find_appointments(
+            department='oncology', status='late', time_from='2025-06-09T00:00:00', time_to='2025-06-02T00:00:00',
+            sort='clinician', cursor=encode_cursor('["yesterday", "a"]')
+        )
+
+        self.assertEqual(response.response_type, ResponseType.VALIDATION_ERROR)
+        self.assertEqual(response.errors, [
+            INVALID_PAGE_CURSOR_ERROR_TEXT,
+            INVALID_QUERY_TIME_RANGE_ERROR_TEXT,
+            INVALID_STATUS_ERROR_TEXT,
+            INVALID_QUERY_SORT_ERROR_TEXT,
+        ])
+        response = await self.appointment_service.find_appointments(department='oncology', time_to='next week')
+        self.assertEqual(response.errors, ["Invalid 'to' value. Expected an ISO 8601 datetime"])
+        self.mock_appointment_repository.find.assert_not_awaited()
+
+    async def test_find_free_slots(self):
+        """Test free slots are found around the busy times read for the window, in the offset the window was given in."""
+        self.mock_appointment_repository.find_busy_times.return_value = [
+            (datetime(2025, 6, 3, 23, tzinfo=timezone.utc), datetime(2025, 6, 4, 8, 30, tzinfo=timezone.utc)),
+            (datetime(2025, 6, 4, 9, tzinfo=timezone.utc), datetime(2025, 6, 4, 10, tzinfo=timezone.utc)),
+        ]
+
+        response = await self.appointment_service.find_free_slots(
+            department='oncology', time_from='2025-06-04T09:00:00+01:00', time_to='2025-06-04T12:00:00+01:00',
+            duration='30m', limit='2'
+        )
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
+        self.assertEqual(response.data, [
+            {'start': '2025-06-04T09:30:00+01:00', 'end': '2025-06-04T10:00:00+01:00'},
+            {'start': '2025-06-04T11:00:00+01:00', 'end': '2025-06-04T11:30:00+01:00'},
+        ])
+        self.mock_appointment_repository.find_busy_times.assert_awaited_once_with(
+            AppointmentQuery(
+                department='oncology',
+                time_from=datetime(2025, 6, 3, 8, tzinfo=timezone.utc),
+                time_to=datetime(2025, 6, 4, 11, tzinfo=timezone.utc)
+            ),
+            SLOT_SEARCH_MAX_APPOINTMENTS + 1
+        )
+
+    async def test_find_free_slots_invalid_arguments(self):
+        """Test every invalid argument is reported."""
+        response = await self.appointment_service.find_free_slots(
+            time_from='2025-06-01T00:00:00', time_to='2025-08-01T00:00:00', duration='0m', limit='0'
+        )
+
+        self.assertEqual(response.response_type, ResponseType.VALIDATION_ERROR)
+        self.assertEqual(response.errors, [
+            SLOT_SEARCH_FILTER_ERROR_TEXT,
+            SLOT_SEARCH_WINDOW_TOO_LONG_ERROR_TEXT,
+            INVALID_SLOT_DURATION_ERROR_TEXT,
+            INVALID_SLOT_LIMIT_ERROR_TEXT,
+        ])
+        response = await self.appointment_service.find_free_slots(clinician='Bethany Rice-Hammond')
+        self.assertEqual(response.errors, [
+            "Missing required query argument: 'from'",
+            "Missing required query argument: 'to'",
+            "Missing required query argument: 'duration'",
+        ])
+        self.mock_appointment_repository.find_busy_times.assert_not_awaited()
+
+    async def test_find_free_slots_too_many_appointments(self):
+        """Test a window holding more appointments than can be searched is rejected."""
+        busy_time = (datetime(2025, 6, 4, 9, tzinfo=timezone.utc), datetime(2025, 6, 4, 10, tzinfo=timezone.utc))
+        self.mock_appointment_repository.find_busy_times.return_value = [busy_time] * (SLOT_SEARCH_MAX_APPOINTMENTS + 1)
+
+        response = await self.appointment_service.find_free_slots(
+            department='oncology', time_from='2025-06-04T00:00:00', time_to='2025-06-05T00:00:00', duration='1h'
+        )
+
+        self.assertEqual(response.errors, [SLOT_SEARCH_TOO_BUSY_ERROR_TEXT])
+
+    async def test_get_patient_appointments(self):
+        """Test a patient's appointments are read from the patient index, filtered by status."""
+        self.mock_appointment_repository.find.return_value = [self.valid_appointment]
+
+        response = await self.appointment_service.get_patient_appointments('1953262716', 'active', '20')
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
+        self.assertEqual(response.data, [self.valid_appointment])
+        self.mock_appointment_repository.find.assert_awaited_once_with(
+            AppointmentQuery(patient='1953262716', status='active'), 21, None
+        )
+
+    async def test_get_patient_appointments_invalid_status(self):
+        """Test an unknown status is rejected."""
+        response = await self.appointment_service.get_patient_appointments('1953262716', 'late')
+
+        self.assertEqual(response.response_type, ResponseType.VALIDATION_ERROR)
+        self.assertEqual(response.errors, [INVALID_STATUS_ERROR_TEXT])
+
+    def test_stream_appointments_reads_in_batches(self):
+        """Test streaming delegates to the repository with the configured batch size."""
+        # stream is an async generator function, calling it does not return a coroutine
+        self.mock_appointment_repository.stream = Mock()
+
+        batches = self.appointment_service.stream_appointments()
+
+        self.assertIs(batches, self.mock_appointment_repository.stream.return_value)
+        self.mock_appointment_repository.stream.assert_called_once_with(STREAM_BATCH_SIZE)
+
+    async def test_bulk_upsert_appointments_cancelled_appointment_cannot_be_reinstated(self):
+        """Test a cancelled appointment in a bulk write is reported rather than reinstated."""
+        self.mock_appointment_repository.upsert_many.return_value = [WriteStatus.CONFLICT]
+
+        response = await self.appointment_service.bulk_upsert_appointments([self.valid_appointment])
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
+        self.assertEqual(response.data[0]['status'], 'error')
+        self.assertEqual(response.data[0]['errors'], [ERR_COULD_NOT_UPDATE_APPOINTMENT])
+
+    async def test_bulk_upsert_appointments_checks_patients_in_one_lookup(self):
+        """Test the patients of a bulk write are looked up together and unknown ones reported."""
+        second_appointment = dict(self.valid_appointment, id='3fd51de5-a30a-458e-89e1-bb7f1b89cab2', patient='9434765919')
+        self.mock_appointment_repository.upsert_many.return_value = [WriteStatus.CREATED]
+
+        response = await self.appointment_service.bulk_upsert_appointments([self.valid_appointment, second_appointment])
+
+        self.assertEqual(response.data[0]['status'], 'created')
+        self.assertEqual(response.data[1]['errors'], [UNKNOWN_PATIENT_ERROR_TEXT])
+        self.mock_patient_repository.existing_nhs_numbers.assert_awaited_once_with({'1953262716', '9434765919'})
+        self.mock_appointment_repository.upsert_many.assert_awaited_once_with([self.valid_appointment])
+
+    async def test_bulk_upsert_appointments_checks_the_clinician_is_available(self):
+        """Test appointments of a bulk write that overlap a stored appointment, or another in the batch, of the same
+        clinician are reported rather than written, reading each clinician's appointments once."""
+        overlapping_stored = dict(self.valid_appointment, id='3fd51de5-a30a-458e-89e1-bb7f1b89cab2',
+                                  time='2025-06-04T09:00:00+01:00')
+        overlapping_batch = dict(self.valid_appointment, id='9e1b3a4c-0d2f-4a55-8f6e-1c2b3d4e5f60',
+                                 time='2025-06-04T17:00:00+01:00')
+        other_clinician = dict(overlapping_batch, id='b7a0e2a1-7f31-4c1e-9c55-2d8e9f0a1b2c', clinician='Jason Holloway')
+        stored_bookings = {
+            'Bethany Rice-Hammond': [
+                (datetime(2025, 6, 4, 7, 30, tzinfo=timezone.utc), datetime(2025, 6, 4, 8, 30, tzinfo=timezone.utc),
+                 'ac9729b5-5e11-42b4-87e2-6396b4faf1b9'),
+                # The stored copy of an appointment the batch rewrites does not count against it
+                (datetime(2025, 6, 4, 15, 30, tzinfo=timezone.utc), None, self.valid_appointment['id']),
+            ],
+            'Jason Holloway': [],
+        }
+        self.mock_appointment_repository.find_bookings.side_effect = \
+            lambda clinician, start, end: stored_bookings[clinician]
+        self.mock_appointment_repository.upsert_many.return_value = [WriteStatus.CREATED, WriteStatus.CREATED]
+
+        response = await self.appointment_service.bulk_upsert_appointments([
+            overlapping_batch, self.valid_appointment, overlapping_stored, other_clinician
+        ])
+
+        self.assertEqual([result['status'] for result in response.data], ['error', 'created', 'error', 'created'])
+        self.assertEqual(response.data[0]['errors'], [ERR_CLINICIAN_DOUBLE_BOOKED.format(self.valid_appointment['id'])])
+        self.assertEqual(response.data[2]['errors'], [ERR_CLINICIAN_DOUBLE_BOOKED.format(
+            'ac9729b5-5e11-42b4-87e2-6396b4faf1b9'
+        )])
+        self.mock_appointment_repository.upsert_many.assert_awaited_once_with([self.valid_appointment, other_clinician])
+        self.assertEqual(self.mock_appointment_repository.find_bookings.await_args_list, [
+            call('Bethany Rice-Hammond', datetime(2025, 6, 4, 8, tzinfo=timezone.utc),
+                 datetime(2025, 6, 4, 17, tzinfo=timezone.utc)),
+            call('Jason Holloway', datetime(2025, 6, 4, 16, tzinfo=timezone.utc),
+                 datetime(2025, 6, 4, 17, tzinfo=timezone.utc)),
+        ])
+        self.mock_appointment_repository.find_overlapping.assert_not_awaited()
+
+
+class TestAppointmentServiceRollups(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.appointment = {
+            'patient': '1953262716',
+            'status': 'active',
+            'time': '2025-06-04T16:30:00+01:00',
+            'duration': '1h',
+            'clinician': 'Bethany Rice-Hammond',
+            'department': 'oncology',
+            'postcode': 'IM2N 4LG',
+            'id': '01542f70-929f-4c9a-b4fa-e672310d7e78'
+        }
+        self.mock_appointment_repository = AsyncMock()
+        self.mock_appointment_repository.find_overlapping.return_value = None
+        self.mock_patient_repository = AsyncMock()
+        self.mock_patient_repository.existing_nhs_numbers.return_value = {'1953262716'}
+        self.mock_rollup_repository = AsyncMock()
+        self.appointment_service = AppointmentService(
+            self.mock_appointment_repository, self.mock_patient_repository, self.mock_rollup_repository
+        )
+
+    def rollup_deltas(self):
+        return self.mock_rollup_repository.increment.await_args.args[0]
+
+    async def test_create_counts_the_appointment_as_booked(self):
+        self.mock_appointment_repository.create.return_value = True
+
+        await self.appointment_service.create_appointment(self.appointment, self.appointment['id'])
+
+        self.assertEqual(self.rollup_deltas(), {
+            ('clinician', 'Bethany Rice-Hammond', '2025-06-04'): {'booked': 1},
+            ('department', 'oncology', '2025-06-04'): {'booked': 1},
+        })
+
+    async def test_update_moves_the_count_from_the_previous_status(self):
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (WriteStatus.UPDATED, self.appointment)
+
+        await self.appointment_service.update_appointment(dict(self.appointment, status='missed'), self.appointment['id'])
+
+        self.assertEqual(self.rollup_deltas(), {
+            ('clinician', 'Bethany Rice-Hammond', '2025-06-04'): {'missed': 1, 'minutes_lost': 60},
+            ('department', 'oncology', '2025-06-04'): {'missed': 1, 'minutes_lost': 60},
+        })
+
+    async def test_delete_counts_the_cancellation_once(self):
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (WriteStatus.UPDATED, self.appointment)
+
+        await self.appointment_service.delete_appointment(self.appointment['id'])
+
+        self.assertEqual(self.rollup_deltas()[('department', 'oncology', '2025-06-04')], {'cancelled': 1})
+
+        self.mock_rollup_repository.increment.reset_mock()
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (
+            WriteStatus.CONFLICT, dict(self.appointment, status=STATUS_CANCELLED)
+        )
+
+        await self.appointment_service.delete_appointment(self.appointment['id'])
+
+        self.mock_rollup_repository.increment.assert_not_awaited()
+
+    async def test_failed_writes_are_not_counted(self):
+        self.mock_appointment_repository.update_unless_cancelled.return_value = (WriteStatus.NOT_FOUND, None)
+
+        await self.appointment_service.update_appointment(self.appointment, self.appointment['id'])
+
+        self.mock_rollup_repository.increment.assert_not_awaited()
+
+    async def test_bulk_upsert_counts_the_appointments_written(self):
+        created = dict(self.appointment, id='3fd51de5-a30a-458e-89e1-bb7f1b89cab2', department='cardiology',
+                       time='2025-06-04T18:00:00+01:00')
+        cancelled = dict(self.appointment, id='ac9729b5-5e11-42b4-87e2-6396b4faf1b9', department='neurology',
+                         time='2025-06-04T20:00:00+01:00')
+        self.mock_appointment_repository.get_many.return_value = {
+            self.appointment['id']: self.appointment,
+            cancelled['id']: dict(cancelled, status=STATUS_CANCELLED),
+        }
+        self.mock_appointment_repository.upsert_many.return_value = [
+            WriteStatus.UPDATED, WriteStatus.CREATED, WriteStatus.CONFLICT
+        ]
+
+        await self.appointment_service.bulk_upsert_appointments([
+            dict(self.appointment, status='attended'), created, cancelled
+        ])
+
+        self.mock_appointment_repository.get_many.assert_awaited_once_with(
+            [self.appointment['id'], created['id'], cancelled['id']]
+        )
+        self.assertEqual(self.rollup_deltas(), {
+            ('clinician', 'Bethany Rice-Hammond', '2025-06-04'): {'attended': 1, 'booked': 1},
+            ('department', 'oncology', '2025-06-04'): {'attended': 1},
+            ('department', 'cardiology', '2025-06-04'): {'booked': 1},
+        })
 
 
 if __name__ == '__main__':
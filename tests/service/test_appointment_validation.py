@@ -1,14 +1,17 @@
 import unittest
-from src.service.appointment_validation import validate
+from src.service.appointment_validation import validate, validate_many, validate_changes
 from constants import (
     MISSING_REQUIRED_FIELD_ERROR_TEXT,
     INVALID_UUID_ERROR_TEXT,
     INVALID_ISO8601_TIME_ERROR_TEXT,
     INVALID_DURATION_FORMAT_ERROR_TEXT,
+    DURATION_TOO_LONG_ERROR_TEXT,
     INVALID_STATUS_ERROR_TEXT,
     INVALID_UK_POSTCODE_ERROR_TEXT,
     INVALID_PATIENT_ID_ERROR_TEXT,
-    INVALID_CLINICIAN_ERROR_TEXT
+    INVALID_CLINICIAN_ERROR_TEXT,
+    UNKNOWN_FIELD_ERROR_TEXT,
+    NO_CHANGES_ERROR_TEXT
 )
 
 
@@ -63,6 +66,12 @@ class TestValidation(unittest.TestCase):
         errors = validate(appointment)
         assert INVALID_DURATION_FORMAT_ERROR_TEXT.format('duration') in errors
 
+    def test_duration_too_long(self):
+        for duration, errors in [('24h', []), ('1440m', []), ('25h', [DURATION_TOO_LONG_ERROR_TEXT.format('duration')]),
+                                 ('1441m', [DURATION_TOO_LONG_ERROR_TEXT.format('duration')])]:
+            with self.subTest(duration=duration):
+                self.assertEqual(validate(dict(self.valid_appointment, duration=duration)), errors)
+
     def test_invalid_status(self):
         appointment = self.valid_appointment.copy()
         appointment['status'] = 'closed'
@@ -122,5 +131,29 @@ class TestValidation(unittest.TestCase):
         errors = validate(appointment)
         assert INVALID_CLINICIAN_ERROR_TEXT in errors
 
+    def test_uuid_forms(self):
+        for appointment_id in ['01542F70-929F-4C9A-B4FA-E672310D7E78', '01542f70929f4c9ab4fae672310d7e78']:
+            with self.subTest(appointment_id=appointment_id):
+                errors = validate(dict(self.valid_appointment, id=appointment_id))
+                self.assertEqual(errors, [])
+        errors = validate(dict(self.valid_appointment, id=12345))
+        self.assertEqual(errors, [INVALID_UUID_ERROR_TEXT.format('id')])
+
+    def test_validate_many(self):
+        results = validate_many([self.valid_appointment, dict(self.valid_appointment, status='pending', duration='1d')])
+
+        self.assertEqual(results, [[], [INVALID_DURATION_FORMAT_ERROR_TEXT.format('duration'), INVALID_STATUS_ERROR_TEXT]])
+
+    def test_validate_changes_checks_only_the_fields_changed(self):
+        self.assertEqual(validate_changes({'status': 'attended'}), [])
+        self.assertEqual(validate_changes({'status': 'pending', 'duration': '1d'}),
+                         [INVALID_STATUS_ERROR_TEXT, INVALID_DURATION_FORMAT_ERROR_TEXT.format('duration')])
+        self.assertEqual(validate_changes({'clinician': ''}), [MISSING_REQUIRED_FIELD_ERROR_TEXT.format('clinician')])
+        self.assertEqual(validate_changes({'end_time': '2025-06-04T17:30:00+01:00'}),
+                         [UNKNOWN_FIELD_ERROR_TEXT.format('end_time')])
+        for changes in [{}, [], 'attended']:
+            with self.subTest(changes=changes):
+                self.assertEqual(validate_changes(changes), [NO_CHANGES_ERROR_TEXT])
+
 if __name__ == '__main__':
     unittest.main()
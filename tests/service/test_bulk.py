@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+from src.service.bulk import bulk_upsert, check_bulk_size
+from src.service.patient_validation import validate_many
+from src.repository.results import WriteStatus
+from constants import (
+    INVALID_BULK_RECORD_ERROR_TEXT,
+    TOO_MANY_BULK_RECORDS_ERROR_TEXT,
+    BULK_MAX_RECORDS,
+)
+
+
+class TestBulkUpsert(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.valid_patient = {
+            'nhs_number': '9434765919',
+            'name': 'Dr Glenn Clark',
+            'date_of_birth': '1996-02-01',
+            'postcode': 'N6 2FA'
+        }
+        self.upsert_many = AsyncMock()
+
+    async def _bulk_upsert(self, records):
+        return await bulk_upsert(records, validate_many, self.upsert_many, 'nhs_number', 'conflict', 'failed')
+
+    async def test_reports_status_of_each_record(self):
+        second_patient = dict(self.valid_patient, nhs_number='9876543210')
+        self.upsert_many.return_value = [WriteStatus.CREATED, WriteStatus.UPDATED]
+
+        results = await self._bulk_upsert([self.valid_patient, second_patient])
+
+        self.assertEqual(results, [
+            {'index': 0, 'nhs_number': '9434765919', 'status': 'created'},
+            {'index': 1, 'nhs_number': '9876543210', 'status': 'updated'},
+        ])
+        self.upsert_many.assert_awaited_once_with([self.valid_patient, second_patient])
+
+    async def test_invalid_records_do_not_fail_the_batch(self):
+        invalid_patient = dict(self.valid_patient, nhs_number='123')
+        self.upsert_many.return_value = [WriteStatus.CREATED]
+
+        results = await self._bulk_upsert([invalid_patient, None, self.valid_patient])
+
+        self.assertEqual(results[0]['status'], 'error')
+        self.assertIn('Invalid NHS number. Must be a 10-digit number', results[0]['errors'])
+        self.assertEqual(results[1], {'index': 1, 'status': 'error', 'errors': [INVALID_BULK_RECORD_ERROR_TEXT]})
+        self.assertEqual(results[2]['status'], 'created')
+        self.upsert_many.assert_awaited_once_with([self.valid_patient])
+
+    async def test_conflicts_and_failures_are_reported_as_errors(self):
+        self.upsert_many.return_value = [WriteStatus.CONFLICT, WriteStatus.FAILED]
+
+        results = await self._bulk_upsert([self.valid_patient, self.valid_patient])
+
+        self.assertEqual(results[0]['errors'], ['conflict'])
+        self.assertEqual(results[1]['errors'], ['failed'])
+
+    async def test_writes_in_batches(self):
+        self.upsert_many.side_effect = lambda batch: [WriteStatus.CREATED] * len(batch)
+
+        with patch('src.service.bulk.BULK_WRITE_BATCH_SIZE', 2):
+            results = await self._bulk_upsert([self.valid_patient] * 5)
+
+        self.assertEqual(self.upsert_many.await_count, 3)
+        self.assertTrue(all(result['status'] == 'created' for result in results))
+
+    async def test_all_invalid_records_skip_the_database(self):
+        results = await self._bulk_upsert([None])
+
+        self.assertEqual(results[0]['status'], 'error')
+        self.upsert_many.assert_not_awaited()
+
+    async def test_failed_reference_checks_are_reported_as_errors(self):
+        second_patient = dict(self.valid_patient, nhs_number='9876543210')
+        check_references = AsyncMock(return_value=[['unknown'], []])
+        self.upsert_many.return_value = [WriteStatus.CREATED]
+
+        results = await bulk_upsert([self.valid_patient, second_patient, 'not a record'], validate_many,
+                                    self.upsert_many, 'nhs_number', 'conflict', 'failed', check_references)
+
+        self.assertEqual(results[0], {'index': 0, 'nhs_number': '9434765919', 'status': 'error', 'errors': ['unknown']})
+        self.assertEqual(results[1]['status'], 'created')
+        check_references.assert_awaited_once_with([self.valid_patient, second_patient])
+        self.upsert_many.assert_awaited_once_with([second_patient])
+
+    def test_check_bulk_size(self):
+        self.assertEqual(check_bulk_size([None] * BULK_MAX_RECORDS), [])
+        self.assertEqual(check_bulk_size([None] * (BULK_MAX_RECORDS + 1)), [TOO_MANY_BULK_RECORDS_ERROR_TEXT])
+
+
+if __name__ == '__main__':
+    unittest.main()
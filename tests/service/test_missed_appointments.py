@@ -0,0 +1,54 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+from src.service.missed_appointments import MissedAppointmentSweeper
+
+
+class TestMissedAppointmentSweeper(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.now = datetime(2025, 6, 4, 17, 0, tzinfo=timezone.utc)
+        self.mock_appointment_repository = AsyncMock()
+        self.sweeper = MissedAppointmentSweeper(self.mock_appointment_repository, 2, clock=lambda: self.now)
+
+    async def test_sweep_marks_a_bounded_batch(self):
+        self.mock_appointment_repository.mark_missed.return_value = ['a', 'b']
+
+        self.assertEqual(await self.sweeper.sweep(), 2)
+
+        self.mock_appointment_repository.mark_missed.assert_awaited_once_with(self.now, 2)
+
+    async def test_counts_appointments_marked(self):
+        self.mock_appointment_repository.mark_missed.side_effect = [['a', 'b'], ['c'], []]
+
+        for _ in range(3):
+            await self.sweeper.sweep()
+
+        self.assertEqual(self.sweeper.last_marked, 0)
+        self.assertEqual(self.sweeper.total_marked, 3)
+
+    async def test_counts_appointments_marked_in_the_rollups(self):
+        mock_rollup_repository = AsyncMock()
+        sweeper = MissedAppointmentSweeper(self.mock_appointment_repository, 2, lambda: self.now, mock_rollup_repository)
+        self.mock_appointment_repository.mark_missed.return_value = ['a']
+        self.mock_appointment_repository.get_many.return_value = {
+            'a': {'id': 'a', 'status': 'missed', 'time': '2025-06-04T16:30:00+01:00', 'duration': '30m',
+                  'clinician': 'Jason Holloway', 'department': 'oncology'},
+        }
+
+        await sweeper.sweep()
+
+        self.mock_appointment_repository.get_many.assert_awaited_once_with(['a'])
+        mock_rollup_repository.increment.assert_awaited_once_with({
+            ('clinician', 'Jason Holloway', '2025-06-04'): {'missed': 1, 'minutes_lost': 30},
+            ('department', 'oncology', '2025-06-04'): {'missed': 1, 'minutes_lost': 30},
+        })
+
+    async def test_nothing_marked_skips_the_rollups(self):
+        mock_rollup_repository = AsyncMock()
+        sweeper = MissedAppointmentSweeper(self.mock_appointment_repository, 2, lambda: self.now, mock_rollup_repository)
+        self.mock_appointment_repository.mark_missed.return_value = []
+
+        await sweeper.sweep()
+
+        self.mock_appointment_repository.get_many.assert_not_awaited()
+        mock_rollup_repository.increment.assert_not_awaited()
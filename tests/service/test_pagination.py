@@ -0,0 +1,69 @@
+import json
+import unittest
+from src.service.pagination import encode_cursor, decode_cursor, parse_page_request, build_page, build_keyset_page
+from constants import (
+    DEFAULT_PAGE_LIMIT,
+    MAX_PAGE_LIMIT,
+    INVALID_PAGE_LIMIT_ERROR_TEXT,
+    INVALID_PAGE_CURSOR_ERROR_TEXT,
+)
+
+
+class TestPagination(unittest.TestCase):
+
+    def test_cursor_round_trip(self):
+        for key in ['1373645350', 'ac9729b5-5e11-42b4-87e2-6396b4faf1b9']:
+            with self.subTest(key=key):
+                self.assertEqual(decode_cursor(encode_cursor(key)), key)
+
+    def test_decode_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            decode_cursor('not a cursor!')
+
+    def test_parse_page_request_defaults(self):
+        self.assertEqual(parse_page_request(None, None), (DEFAULT_PAGE_LIMIT, None, []))
+
+    def test_parse_page_request_with_cursor(self):
+        limit, after, errors = parse_page_request('10', encode_cursor('1373645350'))
+
+        self.assertEqual((limit, after, errors), (10, '1373645350', []))
+
+    def test_parse_page_request_invalid_limit(self):
+        for limit in ['0', '-1', 'abc', str(MAX_PAGE_LIMIT + 1)]:
+            with self.subTest(limit=limit):
+                _, _, errors = parse_page_request(limit, None)
+                self.assertEqual(errors, [INVALID_PAGE_LIMIT_ERROR_TEXT])
+
+    def test_parse_page_request_invalid_cursor(self):
+        _, _, errors = parse_page_request(None, '%%%')
+
+        self.assertEqual(errors, [INVALID_PAGE_CURSOR_ERROR_TEXT])
+
+    def test_build_page_last_page(self):
+        documents = [{'id': 'a'}, {'id': 'b'}]
+
+        self.assertEqual(build_page(documents, 2, 'id'), (documents, None))
+
+    def test_build_page_with_more_results(self):
+        documents = [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}]
+
+        page, next_cursor = build_page(documents, 2, 'id')
+
+        self.assertEqual(page, documents[:2])
+        self.assertEqual(decode_cursor(next_cursor), 'b')
+
+    def test_build_keyset_page(self):
+        documents = [{'time': 1, 'id': 'a'}, {'time': 1, 'id': 'b'}, {'time': 2, 'id': 'c'}]
+
+        def key(document):
+            return [document['time'], document['id']]
+
+        page, next_cursor = build_keyset_page(documents, 2, key)
+
+        self.assertEqual(page, documents[:2])
+        self.assertEqual(json.loads(decode_cursor(next_cursor)), [1, 'b'])
+        self.assertEqual(build_keyset_page(documents, 3, key), (documents, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
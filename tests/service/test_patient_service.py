@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import Mock
+from unittest.mock import AsyncMock, Mock
 from src.service.patient_service import PatientService
 from src.service.results import ResponseType
 from constants import (
@@ -9,10 +9,17 @@ from constants import (
     MSG_NEW_PATIENT_ADDED,
     MSG_PATIENT_UPDATED,
     MSG_PATIENT_DELETED,
+    INVALID_PAGE_LIMIT_ERROR_TEXT,
+    STREAM_BATCH_SIZE,
+    ERR_PATIENT_ALREADY_EXISTS,
+    ERR_PATIENT_VERSION_CONFLICT,
 )
+from src.repository.errors import DuplicateRecordError
+from src.repository.results import WriteStatus
+from src.service.pagination import encode_cursor, decode_cursor
 
 
-class TestPatientService(unittest.TestCase):
+class TestPatientService(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         self.valid_patient = {
             'nhs_number': '1373645350',
@@ -21,116 +28,236 @@ class TestPatientService(unittest.TestCase):
             'postcode': 'N6 2FA'
         }
         # Create a mock repository instead of mocking MongoDB directly
-        self.mock_patient_repository = Mock()
+        self.mock_patient_repository = AsyncMock()
         self.patient_service = PatientService(self.mock_patient_repository)
 
-    def test_create_patient_success(self):
+    async def test_create_patient_success(self):
         """Test successful patient creation."""
         self.mock_patient_repository.create.return_value = True
         
-        response = self.patient_service.create_patient(self.valid_patient, '1373645350')
+        response = await self.patient_service.create_patient(self.valid_patient, '1373645350')
         
         self.assertEqual(response.response_type, ResponseType.SUCCESS)
         self.assertEqual(response.message, MSG_NEW_PATIENT_ADDED.format('1373645350'))
-        self.mock_patient_repository.create.assert_called_once_with(self.valid_patient)
+        self.mock_patient_repository.create.assert_awaited_once_with(self.valid_patient)
 
-    def test_create_patient_validation_error(self):
+    async def test_create_patient_already_exists(self):
+        """Test patient creation when the NHS number is already registered."""
+        self.mock_patient_repository.create.side_effect = DuplicateRecordError('1373645350')
+
+        response = await self.patient_service.create_patient(self.valid_patient, '1373645350')
+
+        self.assertEqual(response.response_type, ResponseType.BUSINESS_ERROR)
+        self.assertIn(ERR_PATIENT_ALREADY_EXISTS, response.errors)
+
+    async def test_create_patient_validation_error(self):
         """Test patient creation with validation errors."""
         invalid_patient = self.valid_patient.copy()
         invalid_patient['nhs_number'] = 'invalid'
         
-        response = self.patient_service.create_patient(invalid_patient, '1373645350')
+        response = await self.patient_service.create_patient(invalid_patient, '1373645350')
         
         self.assertEqual(response.response_type, ResponseType.VALIDATION_ERROR)
         assert 'Invalid NHS number' in response.errors[0]
 
-    def test_create_patient_database_error(self):
+    async def test_create_patient_database_error(self):
         """Test patient creation with database error."""
         self.mock_patient_repository.create.return_value = False
         
-        response = self.patient_service.create_patient(self.valid_patient, '1373645350')
+        response = await self.patient_service.create_patient(self.valid_patient, '1373645350')
         
         self.assertEqual(response.response_type, ResponseType.DATABASE_ERROR)
         self.assertIn(ERR_COULD_NOT_CREATE_PATIENT, response.errors)
 
-    def test_update_patient_success(self):
-        """Test successful patient update."""
-        self.mock_patient_repository.update_by_nhs_number.return_value = True
+    async def test_update_patient_success(self):
+        """Test successful patient update, which reports the patient's new version without being given one."""
+        self.mock_patient_repository.update_at_version.return_value = (WriteStatus.UPDATED, 5)
         
-        response = self.patient_service.update_patient(self.valid_patient, '1373645350')
+        response = await self.patient_service.update_patient(self.valid_patient, '1373645350')
         
         self.assertEqual(response.response_type, ResponseType.SUCCESS)
         self.assertEqual(response.message, MSG_PATIENT_UPDATED.format('1373645350'))
-        self.mock_patient_repository.update_by_nhs_number.assert_called_once_with('1373645350', self.valid_patient)
+        self.assertEqual(response.version, 5)
+        self.mock_patient_repository.update_at_version.assert_awaited_once_with('1373645350', self.valid_patient, None)
+
+    async def test_update_patient_at_version(self):
+        """Test a patient update given a version is a compare-and-set that reports the new version."""
+        self.mock_patient_repository.update_at_version.return_value = (WriteStatus.UPDATED, 4)
+
+        response = await self.patient_service.update_patient(self.valid_patient, '1373645350', 3)
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
+        self.assertEqual(response.version, 4)
+        self.mock_patient_repository.update_at_version.assert_awaited_once_with('1373645350', self.valid_patient, 3)
+        self.mock_patient_repository.update_by_nhs_number.assert_not_awaited()
+
+    async def test_update_patient_at_stale_version(self):
+        """Test a patient update given a version fails its precondition if the patient is at another or is missing."""
+        cases = [(WriteStatus.STALE, ERR_PATIENT_VERSION_CONFLICT), (WriteStatus.NOT_FOUND, ERR_PATIENT_NOT_FOUND)]
+        for status, error in cases:
+            with self.subTest(status=status):
+                self.mock_patient_repository.update_at_version.return_value = (status, None)
+
+                response = await self.patient_service.update_patient(self.valid_patient, '1373645350', 3)
+
+                self.assertEqual(response.response_type, ResponseType.PRECONDITION_FAILED)
+                self.assertEqual(response.errors, [error])
 
-    def test_update_patient_validation_error(self):
+    async def test_patch_patient(self):
+        """Test a patch validates and sets only the fields given."""
+        self.mock_patient_repository.update_at_version.return_value = (WriteStatus.UPDATED, 3)
+
+        response = await self.patient_service.patch_patient({'postcode': 'M1 1AA'}, '1373645350')
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
+        self.assertEqual(response.version, 3)
+        self.mock_patient_repository.update_at_version.assert_awaited_once_with(
+            '1373645350', {'postcode': 'M1 1AA'}, None
+        )
+
+    async def test_patch_patient_errors(self):
+        """Test a patch of invalid fields is rejected, and one of a missing patient is not found."""
+        response = await self.patient_service.patch_patient({'postcode': 'M1'}, '1373645350')
+        self.assertEqual(response.response_type, ResponseType.VALIDATION_ERROR)
+        self.mock_patient_repository.update_at_version.assert_not_awaited()
+
+        self.mock_patient_repository.update_at_version.return_value = (WriteStatus.NOT_FOUND, None)
+        response = await self.patient_service.patch_patient({'postcode': 'M1 1AA'}, '1373645350')
+        self.assertEqual(response.response_type, ResponseType.NOT_FOUND)
+        response = await self.patient_service.patch_patient({'postcode': 'M1 1AA'}, '1373645350', 2)
+        self.assertEqual(response.response_type, ResponseType.PRECONDITION_FAILED)
+
+    async def test_update_patient_validation_error(self):
         """Test patient update with validation errors."""
         invalid_patient = self.valid_patient.copy()
         invalid_patient['nhs_number'] = 'invalid'
         
-        response = self.patient_service.update_patient(invalid_patient, '1373645350')
+        response = await self.patient_service.update_patient(invalid_patient, '1373645350')
         
         self.assertEqual(response.response_type, ResponseType.VALIDATION_ERROR)
         assert 'Invalid NHS number' in response.errors[0]
 
-    def test_update_patient_database_error(self):
+    async def test_update_patient_database_error(self):
         """Test patient update with database error."""
-        self.mock_patient_repository.update_by_nhs_number.return_value = False
+        self.mock_patient_repository.update_at_version.return_value = (WriteStatus.FAILED, None)
         
-        response = self.patient_service.update_patient(self.valid_patient, '1373645350')
+        response = await self.patient_service.update_patient(self.valid_patient, '1373645350')
         
         self.assertEqual(response.response_type, ResponseType.DATABASE_ERROR)
         self.assertIn(ERR_COULD_NOT_UPDATE_PATIENT, response.errors)
 
-    def test_get_patient_success(self):
+    async def test_get_patient_success(self):
         """Test successful patient retrieval."""
         self.mock_patient_repository.get_by_nhs_number.return_value = self.valid_patient
         
-        response = self.patient_service.get_patient('1373645350')
+        response = await self.patient_service.get_patient('1373645350')
         
         self.assertEqual(response.response_type, ResponseType.SUCCESS)
         self.assertEqual(response.data['nhs_number'], '1373645350')
         self.assertEqual(response.data['name'], 'Dr Glenn Clark')
-        self.mock_patient_repository.get_by_nhs_number.assert_called_once_with('1373645350')
+        self.mock_patient_repository.get_by_nhs_number.assert_awaited_once_with('1373645350')
+
+    async def test_get_patient_returns_its_version_apart(self):
+        """Test the patient's version is returned alongside rather than within it."""
+        self.mock_patient_repository.get_by_nhs_number.return_value = dict(self.valid_patient, version=3)
+
+        response = await self.patient_service.get_patient('1373645350')
 
-    def test_get_patient_not_found(self):
+        self.assertEqual(response.data, self.valid_patient)
+        self.assertEqual(response.version, 3)
+
+        self.mock_patient_repository.get_by_nhs_number.return_value = dict(self.valid_patient)
+        response = await self.patient_service.get_patient('1373645350')
+        self.assertEqual(response.version, 0)
+
+    async def test_get_patient_not_found(self):
         """Test patient retrieval when patient not found."""
         self.mock_patient_repository.get_by_nhs_number.return_value = None
         
-        response = self.patient_service.get_patient('1373645350')
+        response = await self.patient_service.get_patient('1373645350')
         
         self.assertEqual(response.response_type, ResponseType.NOT_FOUND)
         self.assertIn(ERR_PATIENT_NOT_FOUND, response.errors)
 
-    def test_delete_patient_success(self):
+    async def test_delete_patient_success(self):
         """Test successful patient deletion."""
         self.mock_patient_repository.delete_by_nhs_number.return_value = True
         
-        response = self.patient_service.delete_patient('1373645350')
+        response = await self.patient_service.delete_patient('1373645350')
         
         self.assertEqual(response.response_type, ResponseType.SUCCESS)
         self.assertEqual(response.message, MSG_PATIENT_DELETED.format('1373645350'))
-        self.mock_patient_repository.delete_by_nhs_number.assert_called_once_with('1373645350')
+        self.mock_patient_repository.delete_by_nhs_number.assert_awaited_once_with('1373645350')
 
-    def test_delete_patient_not_found(self):
+    async def test_delete_patient_not_found(self):
         """Test patient deletion when patient not found."""
         self.mock_patient_repository.delete_by_nhs_number.return_value = False
         
-        response = self.patient_service.delete_patient('1373645350')
+        response = await self.patient_service.delete_patient('1373645350')
         
         self.assertEqual(response.response_type, ResponseType.NOT_FOUND)
         self.assertIn(ERR_PATIENT_NOT_FOUND, response.errors)
 
-    def test_get_all_patients_success(self):
+    async def test_get_all_patients_success(self):
         """Test successful retrieval of all patients."""
         mock_patients = [self.valid_patient, self.valid_patient.copy()]
         self.mock_patient_repository.get_all.return_value = mock_patients
         
-        response = self.patient_service.get_all_patients()
+        response = await self.patient_service.get_all_patients()
         
         self.assertEqual(response.response_type, ResponseType.SUCCESS)
         self.assertEqual(len(response.data), 2)
-        self.mock_patient_repository.get_all.assert_called_once()
+        self.mock_patient_repository.get_all.assert_awaited_once()
+
+    async def test_get_patients_page_last_page(self):
+        """Test a page that holds the remaining patients has no next cursor."""
+        self.mock_patient_repository.get_page.return_value = [self.valid_patient]
+
+        response = await self.patient_service.get_patients_page('2', None)
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
+        self.assertEqual(response.data, [self.valid_patient])
+        self.assertIsNone(response.next_cursor)
+        self.mock_patient_repository.get_page.assert_awaited_once_with(3, None)
+
+    async def test_get_patients_page_with_next_page(self):
+        """Test a full page returns a cursor that continues after its last patient."""
+        second_patient = dict(self.valid_patient, nhs_number='9434765919')
+        third_patient = dict(self.valid_patient, nhs_number='9876543210')
+        self.mock_patient_repository.get_page.return_value = [self.valid_patient, second_patient, third_patient]
+
+        response = await self.patient_service.get_patients_page('2', encode_cursor('1234567881'))
+
+        self.assertEqual(response.data, [self.valid_patient, second_patient])
+        self.assertEqual(decode_cursor(response.next_cursor), '9434765919')
+        self.mock_patient_repository.get_page.assert_awaited_once_with(3, '1234567881')
+
+    async def test_get_patients_page_invalid_limit(self):
+        """Test an invalid limit is rejected without querying the repository."""
+        response = await self.patient_service.get_patients_page('0', None)
+
+        self.assertEqual(response.response_type, ResponseType.VALIDATION_ERROR)
+        self.assertIn(INVALID_PAGE_LIMIT_ERROR_TEXT, response.errors)
+        self.mock_patient_repository.get_page.assert_not_awaited()
+
+    def test_stream_patients_reads_in_batches(self):
+        """Test streaming delegates to the repository with the configured batch size."""
+        # stream is an async generator function, calling it does not return a coroutine
+        self.mock_patient_repository.stream = Mock()
+
+        batches = self.patient_service.stream_patients()
+
+        self.assertIs(batches, self.mock_patient_repository.stream.return_value)
+        self.mock_patient_repository.stream.assert_called_once_with(STREAM_BATCH_SIZE)
+
+    async def test_bulk_upsert_patients_success(self):
+        """Test bulk writes report the outcome of each patient."""
+        self.mock_patient_repository.upsert_many.return_value = [WriteStatus.CREATED]
+
+        response = await self.patient_service.bulk_upsert_patients([self.valid_patient])
+
+        self.assertEqual(response.response_type, ResponseType.SUCCESS)
+        self.assertEqual(response.data, [{'index': 0, 'nhs_number': '1373645350', 'status': 'created'}])
 
 
 if __name__ == '__main__':
@@ -1,5 +1,5 @@
 import unittest
-from src.service.patient_validation import validate
+from src.service.patient_validation import validate, validate_many, validate_changes
 from src.service.validation_utils import validate_nhs_number_checksum
 from constants import READABLE_DATE_FORMAT
 
@@ -169,6 +169,31 @@ class TestValidatePatientData(unittest.TestCase):
                 errors = validate(data)
                 self.assertEqual(errors, [])
 
+    def test_non_string_values(self):
+        data = dict(self.valid_patient, nhs_number=9434765919, date_of_birth=19960201, postcode=['N6 2FA'])
+        errors = validate(data)
+        self.assertEqual(errors, [
+            'Invalid NHS number. Must be a 10-digit number',
+            f'Invalid date format for date_of_birth. Expected "{READABLE_DATE_FORMAT}"',
+            'Invalid UK postcode format'
+        ])
+
+    def test_validate_many(self):
+        invalid_patient = dict(self.valid_patient, nhs_number='9434765918')
+        missing_name = {key: value for key, value in self.valid_patient.items() if key != 'name'}
+
+        results = validate_many([self.valid_patient, invalid_patient, missing_name])
+
+        self.assertEqual(results, [[], ['Invalid NHS number checksum'], ['Missing required field: name']])
+        self.assertEqual(validate_many([]), [])
+
+    def test_validate_changes(self):
+        self.assertEqual(validate_changes({'postcode': 'M1 1AA'}), [])
+        self.assertEqual(validate_changes({'postcode': 'M1', 'version': 3}),
+                         ['Invalid UK postcode format', 'Unknown field: version'])
+        self.assertEqual(validate_changes({'name': None}), ['Missing required field: name'])
+        self.assertEqual(validate_changes({'nhs_number': '9434765918'}), ['Invalid NHS number checksum'])
+
 
 if __name__ == '__main__':
     unittest.main()
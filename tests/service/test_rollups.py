@@ -0,0 +1,89 @@
+import unittest
+from collections import defaultdict
+from datetime import date
+from unittest.mock import AsyncMock
+from src.db.memory import MemoryDatabase
+from src.repository.memory.appointment import MemoryAppointmentRepository
+from src.repository.memory.rollup import MemoryRollupRepository
+from src.service.rollups import add_contribution, rollup_deltas, record_changes, rebuild_rollups
+
+
+class TestRollups(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.appointment = {
+            'id': 'a',
+            'status': 'active',
+            'time': '2025-06-04T23:30:00-01:00',
+            'duration': '1h30m',
+            'clinician': 'Jason Holloway',
+            'department': 'oncology',
+        }
+
+    def test_add_contribution_counts_the_local_day(self):
+        rollups = defaultdict(dict)
+
+        add_contribution(rollups, dict(self.appointment, status='missed'))
+
+        self.assertEqual(rollups, {
+            ('clinician', 'Jason Holloway', '2025-06-04'): {'booked': 1, 'missed': 1, 'minutes_lost': 90},
+            ('department', 'oncology', '2025-06-04'): {'booked': 1, 'missed': 1, 'minutes_lost': 90},
+        })
+
+    def test_add_contribution_skips_unparsable_times(self):
+        rollups = defaultdict(dict)
+
+        add_contribution(rollups, dict(self.appointment, time='tomorrow'))
+
+        self.assertEqual(rollups, {})
+
+    def test_rollup_deltas_only_hold_what_changed(self):
+        missed = dict(self.appointment, status='missed')
+        moved = dict(self.appointment, time='2025-06-06T09:00:00+01:00', clinician='Bethany Rice')
+
+        self.assertEqual(rollup_deltas([(None, self.appointment)]), {
+            ('clinician', 'Jason Holloway', '2025-06-04'): {'booked': 1},
+            ('department', 'oncology', '2025-06-04'): {'booked': 1},
+        })
+        self.assertEqual(rollup_deltas([(self.appointment, missed)]), {
+            ('clinician', 'Jason Holloway', '2025-06-04'): {'missed': 1, 'minutes_lost': 90},
+            ('department', 'oncology', '2025-06-04'): {'missed': 1, 'minutes_lost': 90},
+        })
+        self.assertEqual(rollup_deltas([(self.appointment, moved)]), {
+            ('clinician', 'Jason Holloway', '2025-06-04'): {'booked': -1},
+            ('department', 'oncology', '2025-06-04'): {'booked': -1},
+            ('clinician', 'Bethany Rice', '2025-06-06'): {'booked': 1},
+            ('department', 'oncology', '2025-06-06'): {'booked': 1},
+        })
+        self.assertEqual(rollup_deltas([(self.appointment, dict(self.appointment))]), {})
+
+    async def test_record_changes_logs_rather_than_raises(self):
+        rollup_repository = AsyncMock()
+        rollup_repository.increment.side_effect = ConnectionError()
+
+        with self.assertLogs('src.service.rollups', 'ERROR'):
+            await record_changes(rollup_repository, [(None, self.appointment)])
+
+    async def test_rebuild_matches_the_incremental_rollups(self):
+        memory_database = MemoryDatabase()
+        appointment_repository = MemoryAppointmentRepository(memory_database)
+        rollup_repository = MemoryRollupRepository(memory_database)
+        appointments = [
+            dict(self.appointment, id='a'),
+            dict(self.appointment, id='b', status='missed'),
+            dict(self.appointment, id='c', status='cancelled', duration='15m'),
+            dict(self.appointment, id='d', status='attended', time='2025-06-05T09:00:00+01:00'),
+        ]
+        for appointment in appointments:
+            await appointment_repository.create(appointment)
+            await record_changes(rollup_repository, [(None, appointment)])
+        incremental = await rollup_repository.get_range('clinician', 'Jason Holloway', date(2025, 6, 1), date(2025, 6, 30))
+        await rollup_repository.increment({('clinician', 'Jason Holloway', '2025-06-04'): {'booked': 10}})
+
+        self.assertEqual(await rebuild_rollups(appointment_repository, rollup_repository, 3), (4, 4))
+
+        rebuilt = await rollup_repository.get_range('clinician', 'Jason Holloway', date(2025, 6, 1), date(2025, 6, 30))
+        self.assertEqual(rebuilt, incremental)
+        self.assertEqual(rebuilt[0], {
+            'dimension': 'clinician', 'key': 'Jason Holloway', 'day': '2025-06-04',
+            'booked': 3, 'missed': 1, 'minutes_lost': 90, 'cancelled': 1
+        })
@@ -0,0 +1,46 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from src.service.slots import free_slots
+
+
+def at(hour, minute=0):
+    return datetime(2025, 6, 4, hour, minute, tzinfo=timezone.utc)
+
+
+class TestFreeSlots(unittest.TestCase):
+
+    def setUp(self):
+        self.half_hour = timedelta(minutes=30)
+
+    def test_empty_window_is_split_into_slots(self):
+        self.assertEqual(free_slots([], at(9), at(10, 15), self.half_hour, 10), [(at(9), at(9, 30)), (at(9, 30), at(10))])
+
+    def test_slots_fill_the_gaps_between_busy_times(self):
+        busy_times = [(at(9, 15), at(10)), (at(11), at(11, 30))]
+
+        self.assertEqual(free_slots(busy_times, at(9), at(12), self.half_hour, 10), [
+            (at(10), at(10, 30)),
+            (at(10, 30), at(11)),
+            (at(11, 30), at(12)),
+        ])
+
+    def test_overlapping_busy_times_are_merged(self):
+        busy_times = [(at(8), at(10)), (at(9), at(9, 30)), (at(9, 45), at(11)), (at(10, 30), at(12))]
+
+        self.assertEqual(free_slots(busy_times, at(9), at(13), self.half_hour, 10), [
+            (at(12), at(12, 30)),
+            (at(12, 30), at(13)),
+        ])
+
+    def test_busy_times_after_the_window_are_ignored(self):
+        busy_times = [(at(10), at(11)), (at(12), at(13))]
+
+        self.assertEqual(free_slots(busy_times, at(9), at(10), timedelta(hours=1), 10), [(at(9), at(10))])
+
+    def test_limit(self):
+        self.assertEqual(len(free_slots([(at(12), at(13))], at(9), at(17), self.half_hour, 4)), 4)
+        self.assertEqual(len(free_slots([(at(12), at(13))], at(9), at(17), self.half_hour, 6)), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()